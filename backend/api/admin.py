@@ -0,0 +1,30 @@
+from django.contrib import admin
+
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "duration_ms", "view", "call_site", "database")
+    list_filter = ("view", "database")
+    search_fields = ("fingerprint", "view", "path", "call_site")
+    readonly_fields = (
+        "created_at",
+        "duration_ms",
+        "database",
+        "view",
+        "method",
+        "path",
+        "call_site",
+        "param_shape",
+        "fingerprint",
+        "sql",
+        "plan",
+    )
+    ordering = ("-id",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
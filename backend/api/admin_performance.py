@@ -0,0 +1,182 @@
+"""Changelists that stay fast on the large tables (listings, reports).
+
+``PerformanceAdminMixin`` swaps the stock pieces that scale with the table:
+
+- counts are exact only up to ``ADMIN_EXACT_COUNT_LIMIT``; past that the
+  planner's row estimate is shown ("about N"), and the unfiltered total is
+  never counted;
+- under the default newest-first order, pages are walked by keyset
+  (``?after=<pk>``, "Next page") instead of ``OFFSET``;
+- ``AutocompleteFilter`` filters by a foreign key without loading every
+  related row into the sidebar;
+- ``chunked_action`` runs a bulk action as one short transaction per
+  ``ADMIN_ACTION_CHUNK_SIZE`` rows rather than one long lock over the whole
+  selection.
+"""
+from __future__ import annotations
+
+import json
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
+
+from market.keyset import chunked_update
+
+CURSOR_VAR = "after"
+
+
+def planner_row_estimate(queryset) -> int | None:
+    """The planner's row estimate for ``queryset`` (Postgres), else None."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Counts at most ``ADMIN_EXACT_COUNT_LIMIT`` rows, then estimates.
+
+    ``estimated`` is set once the count is past the limit; the count is then
+    the planner's estimate, never less than the rows actually seen.
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        capped = self.object_list[: limit + 1].count()
+        if capped <= limit:
+            return capped
+        self.estimated = True
+        return max(capped, planner_row_estimate(self.object_list) or 0)
+
+
+class PerformanceChangeList(ChangeList):
+    """A changelist paged by primary-key cursor under the default ordering.
+
+    The cursor only narrows the rows shown: filters, search, sorting links and
+    "select all" actions work on the whole filtered queryset, as usual.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        try:
+            self.cursor = int(request.GET.get(CURSOR_VAR, ""))
+        except ValueError:
+            self.cursor = None
+        self.next_cursor = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Any other link (filter, sort, search) starts again from the first page.
+        new_params = {CURSOR_VAR: None, **(new_params or {})}
+        return super().get_query_string(new_params, remove)
+
+    @property
+    def keyset(self) -> bool:
+        """Paged by cursor: the default newest-first order, not "show all"."""
+        return ORDER_VAR not in self.params and ALL_VAR not in self.params
+
+    def get_results(self, request):
+        if self.keyset:
+            # Numbered pages are replaced by "Next page"; never OFFSET.
+            self.page_num = 1
+        super().get_results(request)
+        if not self.keyset:
+            return
+        rows = self.queryset if self.cursor is None else self.queryset.filter(pk__lt=self.cursor)
+        self.result_list = rows[: self.list_per_page]
+        self.multi_page = False
+        page = list(self.result_list)
+        if len(page) == self.list_per_page:
+            self.next_cursor = page[-1].pk
+
+    @property
+    def next_page_url(self) -> str:
+        return self.get_query_string({CURSOR_VAR: self.next_cursor}) if self.next_cursor else ""
+
+    @property
+    def first_page_url(self) -> str:
+        return self.get_query_string()
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """A foreign-key filter picked with the admin's autocomplete widget.
+
+    The related admin must define ``search_fields``. Unlike the stock filter,
+    no related rows are loaded to render it.
+    """
+
+    template = "admin/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.admin_site = model_admin.admin_site
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            "selected": not self.lookup_val and not self.lookup_val_isnull,
+            "query_string": changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            "display": _("All"),
+        }
+
+    def widget_html(self) -> str:
+        remote = self.field.remote_field.model
+        field = forms.ModelChoiceField(
+            queryset=remote._default_manager.all(),
+            required=False,
+            widget=AutocompleteSelect(self.field, self.admin_site, attrs={"data-filter-param": self.lookup_kwarg}),
+        )
+        value = self.lookup_val[-1] if self.lookup_val else None
+        return field.widget.render(self.lookup_kwarg, value)
+
+
+class PerformanceAdminMixin:
+    """ModelAdmin defaults for tables too large to count or scan."""
+
+    change_list_template = "admin/performance_change_list.html"
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    ordering = ("-id",)
+
+    def get_changelist(self, request, **kwargs):
+        return PerformanceChangeList
+
+    def chunked_action(self, request, queryset, message: str, *, on_chunk=None, **values) -> None:
+        chunk_size = settings.ADMIN_ACTION_CHUNK_SIZE
+        updated = chunked_update(queryset, chunk_size=chunk_size, on_chunk=on_chunk, **values)
+        self.message_user(request, message % {"count": updated})
+
+    @property
+    def media(self):
+        media = super().media
+        filters = [f for f in self.list_filter if isinstance(f, tuple) and f[1] is AutocompleteFilter]
+        if filters:
+            field = self.model._meta.get_field(filters[0][0])
+            media += AutocompleteSelect(field, self.admin_site).media
+            media += forms.Media(js=["admin/js/autocomplete_filter.js"])
+        return media
@@ -0,0 +1,302 @@
+"""Per-request SQL accounting, ``Server-Timing`` headers and query budgets.
+
+``SQLInstrumentationMiddleware`` counts and times every statement run on the
+request thread (via ``connection.execute_wrapper``) and reports::
+
+    Server-Timing: db;dur=3.1;desc="4 queries", render;dur=0.8, total;dur=12.5
+
+``render`` is the time spent rendering the response body (JSON encoding)
+after the view returns; serializers build their ``.data`` inside the view,
+so that work is only part of ``total``.
+
+Views that mix in ``QueryBudgetMixin`` declare how many queries each action
+may run. Requests over budget are logged; under ``enforce_query_budgets``
+(tests) they raise ``QueryBudgetExceeded`` instead.
+
+With ``NPLUSONE_DETECTION_ENABLED`` every statement is also fingerprinted
+(literals and placeholders normalized); shapes run at least
+``NPLUSONE_THRESHOLD`` times in one request are logged with the Python line
+that issued them, and listed in an ``X-Repeated-Queries`` header when
+``NPLUSONE_HEADER_ENABLED``. Fingerprints are memoized per SQL string and the
+stack is only walked once a shape reaches the threshold, so the detector is
+cheap enough to leave on in staging.
+
+Statements slower than ``SLOW_QUERY_THRESHOLD_MS`` are noted with their call
+site and written to the ``SlowQuery`` log once the response is ready (see
+``api.slow_queries``).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import random
+import re
+import sys
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.test.utils import override_settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_seconds: float = 0.0
+    view: str = ""
+    budget: int | None = None
+    # Queries already run when the view body started (authentication, permissions).
+    view_queries_start: int = 0
+    view_finished: float | None = None
+    rendered: float | None = None
+    # Only kept in strict mode, to explain a budget failure.
+    statements: list[str] | None = None
+    # Executions per SQL fingerprint, and where a shape was first seen repeating.
+    # Only kept when N+1 detection is enabled.
+    shapes: dict[str, int] | None = None
+    repeat_sites: dict[str, str] = field(default_factory=dict)
+    # Statements over SLOW_QUERY_THRESHOLD_MS, written to SlowQuery after the response.
+    slow: list = field(default_factory=list)
+
+    def mark_rendered(self, response):
+        self.rendered = time.perf_counter()
+        return response
+
+    @property
+    def render_seconds(self) -> float | None:
+        if self.view_finished is None or self.rendered is None:
+            return None
+        return max(0.0, self.rendered - self.view_finished)
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_sql_stats", default=None)
+
+
+def current_request_stats() -> RequestStats | None:
+    return _current.get()
+
+
+def _strict() -> bool:
+    return bool(getattr(settings, "QUERY_BUDGET_STRICT", False))
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s|\?")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint_sql(sql: str) -> str:
+    """Normalize a statement so executions that differ only in values compare equal.
+
+    ``WHERE id = 7`` and ``WHERE id = %s`` both become ``WHERE id = ?``; an
+    ``IN`` list or ``VALUES`` rows of any length become ``(...)``.
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _VALUE_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _project_root() -> str:
+    return os.path.join(str(settings.BASE_DIR), "")
+
+
+# The request-wide middlewares are never the interesting caller.
+_SKIPPED_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ("instrumentation.py", "metrics.py", "profiling.py", "slow_queries.py")
+}
+
+
+def _call_site() -> str:
+    """The innermost frame in project code (not Django, DRF or the instrumentation)."""
+    root = _project_root()
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root) and filename not in _SKIPPED_FILES and "site-packages" not in filename:
+            return f"{os.path.relpath(filename, root)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "?"
+
+
+def _nplusone_enabled() -> bool:
+    return bool(getattr(settings, "NPLUSONE_DETECTION_ENABLED", False))
+
+
+def repeated_shapes(stats: RequestStats) -> list[tuple[int, str, str]]:
+    """``(count, call site, fingerprint)`` for each shape over the threshold, most frequent first."""
+    if not stats.shapes:
+        return []
+    threshold = int(getattr(settings, "NPLUSONE_THRESHOLD", 5))
+    found = [
+        (count, stats.repeat_sites.get(shape, "?"), shape)
+        for shape, count in stats.shapes.items()
+        if count >= threshold
+    ]
+    return sorted(found, key=lambda item: -item[0])
+
+
+def enforce_query_budgets(obj):
+    """Test decorator (class or method): exceeding a view's query budget fails the test."""
+    return override_settings(QUERY_BUDGET_STRICT=True)(obj)
+
+
+class SQLInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "SQL_INSTRUMENTATION_ENABLED", True):
+            return self.get_response(request)
+
+        stats = RequestStats(
+            statements=[] if _strict() else None,
+            shapes={} if _nplusone_enabled() else None,
+        )
+        token = _current.set(stats)
+        request.sql_stats = stats
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(self._wrapper(stats)))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = time.perf_counter() - stats.started
+        if getattr(settings, "SERVER_TIMING_ENABLED", True):
+            parts = [f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"']
+            if stats.render_seconds is not None:
+                parts.append(f"render;dur={stats.render_seconds * 1000:.1f}")
+            parts.append(f"total;dur={total * 1000:.1f}")
+            response["Server-Timing"] = ", ".join(parts)
+
+        repeated = repeated_shapes(stats)
+        if repeated:
+            for count, site, shape in repeated:
+                logger.warning(
+                    "Repeated query shape: %s ran %d times in %s for %s %s: %s",
+                    site, count, stats.view or "?", request.method, request.path, shape[:500],
+                )
+            if getattr(settings, "NPLUSONE_HEADER_ENABLED", False):
+                response["X-Repeated-Queries"] = ", ".join(
+                    f'{count};site="{site}"' for count, site, _ in repeated[:5]
+                )
+
+        view_queries = stats.queries - stats.view_queries_start
+        if stats.budget is not None and view_queries > stats.budget:
+            message = (
+                f"{stats.view} ran {view_queries} queries (budget {stats.budget}) "
+                f"for {request.method} {request.path}"
+            )
+            if stats.statements is not None:
+                statements = stats.statements[stats.view_queries_start:]
+                raise QueryBudgetExceeded(message + ":\n" + "\n".join(statements))
+            logger.warning("Query budget exceeded: %s", message)
+
+        if stats.slow:
+            from api.slow_queries import record_slow_queries
+
+            match = getattr(request, "resolver_match", None)
+            record_slow_queries(
+                stats.slow,
+                view=stats.view or (match.view_name if match is not None else ""),
+                method=request.method,
+                path=request.path,
+            )
+        return response
+
+    @staticmethod
+    def _wrapper(stats: RequestStats):
+        threshold = int(getattr(settings, "NPLUSONE_THRESHOLD", 5))
+        slow_seconds = float(getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0) or 0) / 1000
+        slow_sample_rate = float(getattr(settings, "SLOW_QUERY_SAMPLE_RATE", 1.0))
+        slow_limit = int(getattr(settings, "SLOW_QUERY_MAX_PER_REQUEST", 20))
+
+        def wrapper(execute, sql, params, many, context):
+            if stats.shapes is not None:
+                shape = fingerprint_sql(sql)
+                count = stats.shapes.get(shape, 0) + 1
+                stats.shapes[shape] = count
+                if count == threshold:
+                    stats.repeat_sites[shape] = _call_site()
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                stats.db_seconds += elapsed
+                stats.queries += 1
+                if stats.statements is not None:
+                    stats.statements.append(sql)
+                if (
+                    slow_seconds
+                    and elapsed >= slow_seconds
+                    and len(stats.slow) < slow_limit
+                    and (slow_sample_rate >= 1 or random.random() < slow_sample_rate)
+                ):
+                    from api.slow_queries import SlowStatement
+
+                    stats.slow.append(
+                        SlowStatement(sql, params, many, elapsed, _call_site(), context["connection"].alias)
+                    )
+
+        return wrapper
+
+
+class QueryBudgetMixin:
+    """Declare the SQL budget of a DRF view.
+
+    ``query_budgets`` maps action names (or lower-case HTTP methods for plain
+    APIViews) to the most queries that action may run; ``query_budget`` is the
+    fallback. Authentication and permission checks are not counted. Budgets
+    should not grow with page size: a list action that needs one more query
+    per row has an N+1. Occasional maintenance on a row's first touch adds its
+    fixed cost with ``extend_query_budget``.
+    """
+
+    query_budget: int | None = None
+    query_budgets: dict[str, int] = {}
+
+    def get_query_budget(self) -> int | None:
+        action = getattr(self, "action", None) or self.request.method.lower()
+        return self.query_budgets.get(action, self.query_budget)
+
+    def extend_query_budget(self, queries: int) -> None:
+        """Allow this request ``queries`` more statements, for a step with a known upper bound."""
+        stats = current_request_stats()
+        if stats is not None and stats.budget is not None:
+            stats.budget += queries
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        stats = current_request_stats()
+        if stats is not None:
+            action = getattr(self, "action", None) or request.method.lower()
+            stats.view = f"{type(self).__name__}.{action}"
+            stats.budget = self.get_query_budget()
+            stats.view_queries_start = stats.queries
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        stats = current_request_stats()
+        if stats is not None and hasattr(response, "add_post_render_callback") and not response.is_rendered:
+            stats.view_finished = time.perf_counter()
+            response.add_post_render_callback(stats.mark_rendered)
+        return response
@@ -0,0 +1,332 @@
+"""In-process metrics with Prometheus text exposition at ``/metrics``.
+
+Recording is a dict update under a lock (about a microsecond). Each process
+keeps its own registry; when ``METRICS_DIR`` is set, a background thread
+writes a snapshot of it to ``<METRICS_DIR>/metrics-<pid>.json`` every
+``METRICS_FLUSH_SECONDS``, and a scrape sums the snapshots of every process
+sharing the directory (gunicorn workers, ``run_tasks``). Without a directory
+only the scraped process is reported. A scrape deletes the snapshots of
+processes that have exited, so recycled workers don't pile up files (their
+counters drop out of the sum, which Prometheus reads as a reset).
+"""
+from __future__ import annotations
+
+import bisect
+import ipaddress
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+JOB_BUCKETS = (1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0, 10800.0)
+
+
+class _Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, tuple[str, ...]], float] = {}
+        # name, labels -> [per-bucket counts..., +Inf count, sum]
+        self._histograms: dict[tuple[str, tuple[str, ...]], list[float]] = {}
+        self._flusher_started = False
+        # A forked worker inherits the parent's values but not its flusher thread.
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._flusher_started = False
+
+    def _start_flusher(self) -> None:
+        self._flusher_started = True
+        if getattr(settings, "METRICS_DIR", ""):
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def inc(self, name: str, labels: tuple[str, ...], amount: float = 1.0) -> None:
+        key = (name, labels)
+        with self._lock:
+            if not self._flusher_started:
+                self._start_flusher()
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def observe(self, name: str, labels: tuple[str, ...], value: float, buckets: tuple[float, ...]) -> None:
+        index = bisect.bisect_left(buckets, value)
+        key = (name, labels)
+        with self._lock:
+            if not self._flusher_started:
+                self._start_flusher()
+            row = self._histograms.get(key)
+            if row is None:
+                row = self._histograms[key] = [0.0] * (len(buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                "histograms": [
+                    [name, list(labels), list(row)] for (name, labels), row in self._histograms.items()
+                ],
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def flush(self) -> None:
+        directory = getattr(settings, "METRICS_DIR", "")
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(tmp, path)
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(float(getattr(settings, "METRICS_FLUSH_SECONDS", 5.0)))
+            try:
+                self.flush()
+            except OSError:
+                logger.warning("Could not write metrics snapshot", exc_info=True)
+
+
+registry = _Registry()
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        METRICS[name] = self
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if settings.METRICS_ENABLED:
+            registry.inc(self.name, labels, amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        METRICS[name] = self
+
+    def observe(self, value: float, *labels: str) -> None:
+        if settings.METRICS_ENABLED:
+            registry.observe(self.name, labels, value, self.buckets)
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def timed(self, *labels: str):
+        """Decorator form of ``time()``."""
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(*labels):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+
+METRICS: dict[str, Counter | Histogram] = {}
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP responses by view, method and status.", ("view", "method", "status")
+)
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Request latency by view.", ("view", "method"))
+HTTP_DB_TIME = Histogram("http_request_db_seconds", "Time spent in SQL per request, by view.", ("view",))
+HTTP_DB_QUERIES = Counter("http_request_db_queries_total", "SQL statements run by requests, by view.", ("view",))
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result")
+)
+IMAGE_PROCESSING = Histogram(
+    "image_processing_seconds",
+    "Image variant generation time by kind.",
+    ("kind",),
+    buckets=LATENCY_BUCKETS + (30.0, 60.0),
+)
+SEED_JOB_DURATION = Histogram(
+    "seed_job_duration_seconds",
+    "Admin seed job run time by scenario and outcome.",
+    ("scenario", "status"),
+    JOB_BUCKETS,
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+class MetricsMiddleware:
+    """Record latency, status and SQL time for every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        # Unmatched paths share one label so 404 scans can't blow up cardinality.
+        view = (match.view_name or match.route) if match is not None else "unmatched"
+        method = request.method
+        HTTP_REQUESTS.inc(view, method, str(response.status_code))
+        HTTP_LATENCY.observe(elapsed, view, method)
+        stats = getattr(request, "sql_stats", None)
+        if stats is not None:
+            HTTP_DB_TIME.observe(stats.db_seconds, view)
+            HTTP_DB_QUERIES.inc(view, amount=stats.queries)
+        return response
+
+
+_SNAPSHOT_NAME = re.compile(r"^metrics-(\d+)\.json(\.tmp)?$")
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user.
+        return True
+    return True
+
+
+def _merged_snapshots() -> list[dict]:
+    directory = getattr(settings, "METRICS_DIR", "")
+    if not directory:
+        return [registry.snapshot()]
+    registry.flush()
+    snapshots = []
+    for name in sorted(os.listdir(directory)):
+        match = _SNAPSHOT_NAME.match(name)
+        if match is None:
+            continue
+        if not _process_alive(int(match.group(1))):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+            continue
+        if match.group(2):
+            # A live process's snapshot being written; the .json is still there.
+            continue
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                snapshots.append(json.load(fh))
+        except (OSError, ValueError):
+            # Being replaced right now, or the process died mid-write.
+            continue
+    return snapshots
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render_prometheus() -> str:
+    counters: dict[tuple[str, tuple], float] = {}
+    histograms: dict[tuple[str, tuple], list[float]] = {}
+    for snap in _merged_snapshots():
+        for name, labels, value in snap.get("counters", []):
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0.0) + value
+        for name, labels, row in snap.get("histograms", []):
+            key = (name, tuple(labels))
+            merged = histograms.get(key)
+            if merged is None or len(merged) != len(row):
+                histograms[key] = list(row)
+            else:
+                histograms[key] = [a + b for a, b in zip(merged, row)]
+
+    lines: list[str] = []
+    for metric in METRICS.values():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if metric.kind == "counter":
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric.name:
+                    lines.append(f"{name}{_format_labels(metric.labelnames, labels)} {_format_number(value)}")
+            continue
+        for (name, labels), row in sorted(histograms.items()):
+            if name != metric.name or len(row) != len(metric.buckets) + 2:
+                continue
+            cumulative = 0.0
+            for bound, count in zip((*metric.buckets, float("inf")), row[:-1]):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(
+                    f"{name}_bucket{_format_labels(metric.labelnames, labels, le)} {_format_number(cumulative)}"
+                )
+            lines.append(f"{name}_sum{_format_labels(metric.labelnames, labels)} {_format_number(row[-1])}")
+            lines.append(f"{name}_count{_format_labels(metric.labelnames, labels)} {_format_number(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def is_internal_ip(address: str | None) -> bool:
+    if not address:
+        return False
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    for network in getattr(settings, "METRICS_ALLOWED_IPS", []):
+        try:
+            if ip in ipaddress.ip_network(network, strict=False):
+                return True
+        except ValueError:
+            logger.warning("Ignoring invalid METRICS_ALLOWED_IPS entry %r", network)
+    return False
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duration_ms', models.FloatField()),
+                ('database', models.CharField(blank=True, default='', max_length=50)),
+                ('fingerprint', models.TextField()),
+                ('sql', models.TextField()),
+                ('param_shape', models.CharField(blank=True, default='', max_length=500)),
+                ('view', models.CharField(blank=True, default='', max_length=200)),
+                ('method', models.CharField(blank=True, default='', max_length=10)),
+                ('path', models.CharField(blank=True, default='', max_length=500)),
+                ('call_site', models.CharField(blank=True, default='', max_length=500)),
+                ('plan', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name_plural': 'slow queries',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from django.db import models
+from django.utils import timezone
+
+
+class SlowQuery(models.Model):
+    """A statement that ran past SLOW_QUERY_THRESHOLD_MS during a request.
+
+    The table is a ring buffer: only the newest SLOW_QUERY_LOG_SIZE rows are kept.
+    """
+
+    created_at = models.DateTimeField(default=timezone.now)
+    duration_ms = models.FloatField()
+    database = models.CharField(max_length=50, blank=True, default="")
+
+    # Literals and placeholders normalized (api.instrumentation.fingerprint_sql).
+    fingerprint = models.TextField()
+    sql = models.TextField()
+    # Python types of the bound parameters, never their values.
+    param_shape = models.CharField(max_length=500, blank=True, default="")
+
+    view = models.CharField(max_length=200, blank=True, default="")
+    method = models.CharField(max_length=10, blank=True, default="")
+    path = models.CharField(max_length=500, blank=True, default="")
+    call_site = models.CharField(max_length=500, blank=True, default="")
+    plan = models.TextField(blank=True, default="")
+
+    class Meta:
+        ordering = ["-id"]
+        verbose_name_plural = "slow queries"
+
+    def __str__(self) -> str:
+        return f"{self.duration_ms:.0f}ms {self.view or self.path}"
@@ -0,0 +1,214 @@
+"""On-demand request profiling for staff.
+
+A staff request carrying ``X-Profile: json`` (or ``collapsed``), or the
+``?_profile=`` query parameter, runs under a sampling profiler. The view's
+response is replaced by the profile:
+
+* ``collapsed``: ``text/plain`` collapsed stacks (``frame;frame;leaf count``)
+  for flamegraph.pl, speedscope or inferno;
+* ``json``: the same stacks plus every SQL statement with its duration and
+  the statements grouped by shape, slowest first.
+
+The flag is ignored for everyone else, so the cost for other requests is one
+header/query-string lookup. The sampler wakes every
+``PROFILER_INTERVAL_SECONDS`` and stops after ``PROFILER_MAX_SAMPLES``, and
+only one request per process is profiled at a time.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from api.instrumentation import fingerprint_sql
+
+PROFILE_FORMATS = ("json", "collapsed")
+
+# One profiled request per process keeps the overhead bounded under load.
+_busy = threading.Lock()
+
+
+def _frame_label(code, root: str) -> str:
+    filename = code.co_filename
+    if filename.startswith(root):
+        filename = filename[len(root):]
+    else:
+        # Library frames: keep the path from the package directory on.
+        marker = filename.rfind("site-packages" + os.sep)
+        if marker != -1:
+            filename = filename[marker + len("site-packages") + 1:]
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id: int, *, interval: float, max_samples: int):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_samples = max_samples
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._root = os.path.join(str(settings.BASE_DIR), "")
+        self._labels: dict = {}
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return False
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code, self._root)
+        return label
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval) and self.samples < self.max_samples:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class _QueryRecorder:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.statements: list[dict] = []
+        self.count = 0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.total += elapsed
+            if len(self.statements) < self.limit:
+                self.statements.append({"sql": sql, "ms": round(elapsed * 1000, 3)})
+
+    def summary(self) -> dict:
+        shapes: dict[str, dict] = {}
+        for statement in self.statements:
+            shape = shapes.setdefault(
+                fingerprint_sql(statement["sql"]), {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            shape["count"] += 1
+            shape["total_ms"] += statement["ms"]
+            shape["max_ms"] = max(shape["max_ms"], statement["ms"])
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "truncated": self.count > len(self.statements),
+            "shapes": sorted(
+                ({"sql": sql, **{k: round(v, 3) for k, v in s.items()}} for sql, s in shapes.items()),
+                key=lambda s: -s["total_ms"],
+            ),
+            "statements": self.statements,
+        }
+
+
+def requested_format(request) -> str | None:
+    value = request.headers.get("X-Profile") or request.GET.get("_profile")
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value in ("1", "true", "yes"):
+        return "json"
+    return value if value in PROFILE_FORMATS else None
+
+
+def _is_staff(request) -> bool:
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return bool(user.is_staff)
+    # API clients authenticate per request (JWT), after the middleware stack.
+    try:
+        authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        user = Request(request, authenticators=authenticators).user
+    except APIException:
+        return False
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
+class ProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        fmt = requested_format(request) if getattr(settings, "PROFILER_ENABLED", True) else None
+        if fmt is None or not _is_staff(request):
+            return self.get_response(request)
+        if not _busy.acquire(blocking=False):
+            response = self.get_response(request)
+            response["X-Profile"] = "busy"
+            return response
+        try:
+            return self._profile(request, fmt)
+        finally:
+            _busy.release()
+
+    def _profile(self, request, fmt: str) -> HttpResponse:
+        recorder = _QueryRecorder(int(getattr(settings, "PROFILER_MAX_QUERIES", 1000)))
+        profiler = SamplingProfiler(
+            threading.get_ident(),
+            interval=float(getattr(settings, "PROFILER_INTERVAL_SECONDS", 0.005)),
+            max_samples=int(getattr(settings, "PROFILER_MAX_SAMPLES", 5000)),
+        )
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(recorder))
+            with profiler:
+                response = self.get_response(request)
+                if hasattr(response, "render") and not response.is_rendered:
+                    response.render()
+        elapsed = time.perf_counter() - started
+
+        if fmt == "collapsed":
+            profile = HttpResponse(profiler.collapsed(), content_type="text/plain; charset=utf-8")
+        else:
+            body = {
+                "method": request.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "duration_ms": round(elapsed * 1000, 3),
+                "interval_ms": round(profiler.interval * 1000, 3),
+                "samples": profiler.samples,
+                "collapsed": profiler.collapsed(),
+                "queries": recorder.summary(),
+            }
+            profile = HttpResponse(json.dumps(body), content_type="application/json")
+        profile["X-Profile"] = fmt
+        profile["X-Profiled-Status"] = str(response.status_code)
+        profile["Cache-Control"] = "no-store"
+        return profile
@@ -0,0 +1,95 @@
+"""EXPLAIN a queryset and flag full scans and sorts on the large tables.
+
+Used by the query-plan regression tests (``api/tests/test_query_plans.py``).
+On Postgres the plan is taken with ``enable_seqscan`` and ``enable_sort``
+off, so a ``Seq Scan`` or ``Sort`` that remains means no index can serve the
+query, whatever the (tiny) test tables' statistics say. SQLite plans by rule
+when no ``ANALYZE`` statistics exist, so its plans are stable as they are.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from django.db import connections, transaction
+
+# Tables that grow with traffic; scans and sorts on anything else are cheap.
+LARGE_TABLES = frozenset(
+    {
+        "market_listing",
+        "market_listingattributevalue",
+        "market_listingimage",
+        "messaging_privatemessage",
+        "messaging_publicquestion",
+    }
+)
+
+SEQ_SCAN = "seq_scan"
+TEMP_SORT = "temp_sort"
+
+_PG_SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+_PG_SORT = re.compile(r"(?:->\s+|^\s*)(?:Incremental )?Sort\s+\(")
+_PG_SORT_KEY = re.compile(r"(?:Presorted|Sort) Key: (?:\()?(\w+)\.")
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?!\w| USING)")
+_SQLITE_TEMP_SORT = re.compile(r"USE TEMP B-TREE FOR (?:ORDER BY|GROUP BY|DISTINCT)")
+
+
+@dataclass(frozen=True)
+class PlanIssue:
+    kind: str
+    table: str
+    line: str
+
+    def __str__(self) -> str:
+        return f"{self.kind} on {self.table}: {self.line.strip()}"
+
+
+def explain_queryset(queryset) -> list[str]:
+    """The plan of ``queryset``'s main SELECT, one line per node."""
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+    with transaction.atomic(using=queryset.db), connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+            cursor.execute("EXPLAIN " + sql, params)
+        elif connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        else:
+            raise NotImplementedError(f"No plan support for {connection.vendor}")
+        return [str(row[-1]) for row in cursor.fetchall()]
+
+
+def plan_issues(lines: list[str], *, vendor: str, main_table: str, tables=LARGE_TABLES) -> list[PlanIssue]:
+    """Full scans and explicit sorts touching ``tables``.
+
+    SQLite does not say which table a temp B-tree sorts, so it is charged to
+    ``main_table`` (the queryset's model).
+    """
+    issues: list[PlanIssue] = []
+    for index, line in enumerate(lines):
+        if vendor == "postgresql":
+            match = _PG_SEQ_SCAN.search(line)
+            if match:
+                issues.append(PlanIssue(SEQ_SCAN, match.group(1), line))
+            elif _PG_SORT.search(line):
+                table = main_table
+                for following in lines[index + 1:index + 4]:
+                    key = _PG_SORT_KEY.search(following)
+                    if key:
+                        table = key.group(1)
+                        break
+                issues.append(PlanIssue(TEMP_SORT, table, line))
+        else:
+            match = _SQLITE_SCAN.search(line.strip())
+            if match:
+                issues.append(PlanIssue(SEQ_SCAN, match.group(1), line))
+            elif _SQLITE_TEMP_SORT.search(line):
+                issues.append(PlanIssue(TEMP_SORT, main_table, line))
+    return [issue for issue in issues if issue.table in tables]
+
+
+def queryset_plan_issues(queryset, tables=LARGE_TABLES) -> tuple[list[PlanIssue], list[str]]:
+    lines = explain_queryset(queryset)
+    vendor = connections[queryset.db].vendor
+    return plan_issues(lines, vendor=vendor, main_table=queryset.model._meta.db_table, tables=tables), lines
@@ -0,0 +1,97 @@
+"""Persist slow statements captured by ``SQLInstrumentationMiddleware``.
+
+The middleware's execute wrapper only notes statements slower than
+``SLOW_QUERY_THRESHOLD_MS`` (sampled at ``SLOW_QUERY_SAMPLE_RATE``). Once the
+response is ready they are written here, with an ``EXPLAIN`` plan for reads,
+into ``SlowQuery``, which is trimmed to the newest ``SLOW_QUERY_LOG_SIZE``
+rows and browsable in the Django admin.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from api.instrumentation import fingerprint_sql
+from api.models import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SlowStatement:
+    sql: str
+    params: object
+    many: bool
+    seconds: float
+    call_site: str
+    alias: str
+
+
+def param_shape(params, many: bool = False) -> str:
+    """Type names of the bound parameters, e.g. ``int, str, NoneType``."""
+    if params is None:
+        return ""
+    if many:
+        params = next(iter(params), ()) or ()
+    if isinstance(params, dict):
+        return ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items())
+    return ", ".join(type(value).__name__ for value in params)
+
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+def explain(statement: SlowStatement) -> str:
+    """The statement's plan, or "" when it can't be had.
+
+    Plain EXPLAIN (no ANALYZE) only plans, so this is safe for writes too.
+    """
+    if statement.many or not statement.sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return ""
+    connection = connections[statement.alias]
+    if connection.vendor == "postgresql":
+        prefix = "EXPLAIN "
+    elif connection.vendor == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return ""
+    try:
+        with transaction.atomic(using=statement.alias), connection.cursor() as cursor:
+            cursor.execute(prefix + statement.sql, statement.params)
+            rows = cursor.fetchall()
+    except Exception:
+        logger.warning("Could not EXPLAIN slow query", exc_info=True)
+        return ""
+    # Postgres returns one text column per plan line; SQLite (id, parent, notused, detail).
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def record_slow_queries(statements: list[SlowStatement], *, view: str, method: str, path: str) -> None:
+    want_plan = getattr(settings, "SLOW_QUERY_EXPLAIN", True)
+    try:
+        rows = SlowQuery.objects.bulk_create(
+            [
+                SlowQuery(
+                    duration_ms=round(s.seconds * 1000, 3),
+                    database=s.alias,
+                    fingerprint=fingerprint_sql(s.sql),
+                    sql=s.sql,
+                    param_shape=param_shape(s.params, s.many)[:500],
+                    view=view[:200],
+                    method=method,
+                    path=path[:500],
+                    call_site=s.call_site[:500],
+                    plan=explain(s) if want_plan else "",
+                )
+                for s in statements
+            ]
+        )
+        newest = max((row.id for row in rows if row.id is not None), default=None)
+        if newest is not None:
+            SlowQuery.objects.filter(id__lte=newest - int(getattr(settings, "SLOW_QUERY_LOG_SIZE", 1000))).delete()
+    except Exception:
+        # Diagnostics must never fail the request they describe.
+        logger.warning("Could not record slow queries", exc_info=True)
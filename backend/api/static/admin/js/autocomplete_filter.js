@@ -0,0 +1,16 @@
+'use strict';
+// Reload the changelist filtered by the value picked in an AutocompleteFilter
+// (api.admin_performance), back on the first page.
+{
+    const $ = django.jQuery;
+    $(document).on('change', '.autocomplete-filter select', function() {
+        const url = new URL(window.location.href);
+        url.searchParams.delete(this.dataset.filterParam);
+        url.searchParams.delete('after');
+        url.searchParams.delete('p');
+        if (this.value) {
+            url.searchParams.set(this.dataset.filterParam, this.value);
+        }
+        window.location.href = url.toString();
+    });
+}
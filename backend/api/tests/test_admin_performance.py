@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from market.admin import ListingAdmin
+from market.keyset import chunked_update
+from market.models import Category, City, Governorate, Listing, ListingStatus, ModerationStatus
+from reports.models import ListingReport
+
+User = get_user_model()
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    ADMIN_EXACT_COUNT_LIMIT=5,
+    ADMIN_ACTION_CHUNK_SIZE=2,
+)
+class AdminPerformanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username="perf_admin", password="pass12345", email="a@example.com"
+        )
+        cls.seller = User.objects.create_user(username="perf_seller", password="pass12345")
+        category = Category.objects.create(name_ar="أثاث", name_en="Perf Furniture", slug="perf-furniture")
+        gov = Governorate.objects.create(name_ar="محافظة", name_en="Perf Gov", slug="perf-gov")
+        cls.cities = [
+            City.objects.create(governorate=gov, name_ar=f"مدينة {i}", name_en=f"Perf City {i}", slug=f"pc-{i}")
+            for i in range(2)
+        ]
+        cls.listings = [
+            Listing.objects.create(
+                seller=cls.seller,
+                title="wooden table" if i == 3 else f"item {i}",
+                description="oak" if i == 4 else "",
+                category=category,
+                governorate=gov,
+                city=cls.cities[i % 2],
+                status=ListingStatus.PUBLISHED,
+                moderation_status=ModerationStatus.PENDING,
+            )
+            for i in range(7)
+        ]
+        cls.report = ListingReport.objects.create(listing=cls.listings[3], reporter=cls.seller, reason="spam")
+        ListingReport.objects.create(listing=cls.listings[1], reporter=cls.admin, reason="fraud")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _ids(self, response):
+        return [obj.pk for obj in response.context["cl"].result_list]
+
+    def test_estimated_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get("/admin/market/listing/")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.context["cl"].paginator.estimated)
+        # Past the limit of 5: no planner estimate on SQLite, so the rows seen.
+        self.assertContains(r, "about 6")
+        counts = [q["sql"] for q in ctx.captured_queries if "COUNT(" in q["sql"]]
+        self.assertTrue(counts)
+        self.assertTrue(all("LIMIT 6" in sql for sql in counts), counts)
+
+        r = self.client.get("/admin/market/listing/", {"city__id__exact": self.cities[0].pk})
+        self.assertFalse(r.context["cl"].paginator.estimated)
+        self.assertEqual(r.context["cl"].result_count, 4)
+
+    @mock.patch.object(ListingAdmin, "list_per_page", 3)
+    def test_cursor_pages(self):
+        newest_first = [listing.pk for listing in reversed(self.listings)]
+        first = self.client.get("/admin/market/listing/", {"p": "3"})
+        self.assertEqual(self._ids(first), newest_first[:3])
+        self.assertContains(first, f"?after={newest_first[2]}")
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get("/admin/market/listing/", {"after": newest_first[2]})
+        self.assertEqual(self._ids(second), newest_first[3:6])
+        self.assertFalse(any("OFFSET" in q["sql"] for q in ctx.captured_queries))
+        last = self.client.get("/admin/market/listing/", {"after": newest_first[5]})
+        self.assertEqual(self._ids(last), newest_first[6:])
+        self.assertIsNone(last.context["cl"].next_cursor)
+        self.assertContains(last, "First page")
+        # Sorting by a column drops the cursor and pages by number again.
+        cl = last.context["cl"]
+        self.assertNotIn("after=", cl.get_query_string({"o": "2"}))
+        self.assertTrue(self.client.get("/admin/market/listing/", {"o": "-1"}).context["cl"].multi_page)
+
+    def test_autocomplete_filter_renders_without_loading_choices(self):
+        r = self.client.get("/admin/market/listing/", {"city__id__exact": self.cities[1].pk})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(sorted(self._ids(r)), sorted(listing.pk for listing in self.listings[1::2]))
+        self.assertContains(r, 'data-filter-param="city__id__exact"')
+        self.assertContains(r, f'<option value="{self.cities[1].pk}" selected>')
+        self.assertNotContains(r, f'<option value="{self.cities[0].pk}"')
+        self.assertContains(r, "admin/js/autocomplete_filter.js")
+
+    def test_search(self):
+        r = self.client.get("/admin/market/listing/", {"q": "oak"})
+        self.assertEqual(self._ids(r), [self.listings[4].pk])
+        r = self.client.get("/admin/market/listing/", {"q": str(self.listings[2].pk)})
+        self.assertIn(self.listings[2].pk, self._ids(r))
+
+        for term, expected in [
+            ("wooden", [self.report.pk]),
+            ("perf_seller", [self.report.pk]),
+            ("spam", [self.report.pk]),
+            (str(self.listings[3].pk), [self.report.pk]),
+        ]:
+            with self.subTest(term):
+                r = self.client.get("/admin/reports/listingreport/", {"q": term})
+                self.assertEqual(self._ids(r), expected)
+
+    def test_bulk_actions_run_in_chunks(self):
+        selected = [listing.pk for listing in self.listings[:5]]
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.post(
+                "/admin/market/listing/",
+                {"action": "approve", "_selected_action": selected},
+                follow=True,
+            )
+        self.assertContains(r, "Approved 5 listing(s).")
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(
+            Listing.objects.filter(moderation_status=ModerationStatus.APPROVED).count(),
+            5,
+        )
+
+        # Rows leaving the filter as they are updated are still all reached.
+        pending = Listing.objects.filter(moderation_status=ModerationStatus.APPROVED)
+        self.assertEqual(chunked_update(pending, chunk_size=2, moderation_status=ModerationStatus.REJECTED), 5)
+        self.assertFalse(Listing.objects.filter(moderation_status=ModerationStatus.APPROVED).exists())
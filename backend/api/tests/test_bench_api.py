@@ -0,0 +1,49 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from market.models import Category, City, Governorate
+from messaging.models import PrivateMessage
+
+
+@override_settings(ADMIN_SEEDING_ENABLED=True)
+class BenchApiTests(TestCase):
+    def setUp(self):
+        gov = Governorate.objects.create(name_ar="محافظة", name_en="Bench Gov", slug="bench-gov")
+        for i in range(2):
+            City.objects.create(
+                governorate=gov, name_ar=f"مدينة {i}", name_en=f"Bench City {i}", slug=f"bench-city-{i}"
+            )
+            Category.objects.create(name_ar=f"فئة {i}", name_en=f"Bench Cat {i}", slug=f"bench-cat-{i}")
+
+    def test_smoke_run_writes_results_and_rolls_back_writes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "bench.json")
+            call_command(
+                "bench_api", "--prepare", "--listings", "80", "--iterations", "3", "--warmup", "1",
+                "--output", out, stdout=StringIO(),
+            )
+            messages_before = PrivateMessage.objects.count()
+            call_command(
+                "bench_api", "--listings", "80", "--iterations", "2", "--warmup", "0",
+                "--scenario", "message_send", "--baseline", out, stdout=StringIO(),
+            )
+            self.assertEqual(PrivateMessage.objects.count(), messages_before)
+            with open(out) as fh:
+                report = json.load(fh)
+
+        self.assertEqual(report["meta"]["tier"], "10k")
+        self.assertEqual(report["meta"]["listings"], 80)
+        scenarios = report["scenarios"]
+        scenario_names = ("list", "list_filtered", "search", "detail", "mine", "thread_inbox", "bulk_update")
+        for name in (*scenario_names, "message_send"):
+            self.assertIn(name, scenarios)
+            result = scenarios[name]
+            self.assertEqual(result["requests"], 3)
+            self.assertTrue(all(code.startswith("2") for code in result["status_codes"]), (name, result))
+            self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+            self.assertGreater(result["queries_mean"], 0)
@@ -0,0 +1,137 @@
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from market.models import Category, City, Governorate, Listing, ListingImage, Profile
+
+User = get_user_model()
+
+
+def _png_bytes(size=(640, 480)):
+    buf = BytesIO()
+    Image.new("RGB", size, color=(200, 10, 10)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@override_settings(IMAGE_PROCESSING_EAGER=True)
+class DirectUploadTests(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username="upseller", password="pass1234")
+        self.other = User.objects.create_user(username="upother", password="pass1234")
+        category = Category.objects.create(name_ar="رفع", name_en="Test Uploads", slug="test-uploads")
+        gov = Governorate.objects.create(name_ar="محافظة رفع", name_en="Up Gov", slug="up-gov")
+        city = City.objects.create(governorate=gov, name_ar="مدينة رفع", name_en="Up City", slug="up-city")
+        self.listing = Listing.objects.create(
+            seller=self.seller, title="Bike", category=category, governorate=gov, city=city
+        )
+
+    def _ticket(self, **overrides):
+        body = {
+            "kind": "listing_image",
+            "listing_id": self.listing.id,
+            "filename": "bike photo.png",
+            "content_type": "image/png",
+            "size": 1000,
+        }
+        body.update(overrides)
+        return self.client.post("/api/v1/uploads/tickets/", body, format="json")
+
+    def test_listing_image_ticket_upload_finalize(self):
+        self.client.force_authenticate(self.seller)
+        r = self._ticket()
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        upload = r.data["upload"]
+        self.assertEqual(upload["method"], "PUT")
+        self.assertTrue(upload["url"].startswith("http://testserver/api/v1/uploads/local/"))
+
+        # The storage endpoint is authorized by the signed URL alone.
+        self.client.force_authenticate(None)
+        put = self.client.put(upload["url"], data=_png_bytes(), content_type=upload["headers"]["Content-Type"])
+        self.assertEqual(put.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(put.data["name"].startswith(f"listings/{self.listing.id}/"))
+
+        # URLs are single-use.
+        again = self.client.put(upload["url"], data=_png_bytes(), content_type="image/png")
+        self.assertEqual(again.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(self.seller)
+        r = self.client.post(
+            "/api/v1/uploads/finalize/", {"ticket": r.data["ticket"], "alt_text": "Bike"}, format="json"
+        )
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        image = ListingImage.objects.get(id=r.data["id"])
+        self.assertEqual(image.image.name, put.data["name"])
+        self.assertEqual(image.alt_text, "Bike")
+        self.assertEqual(image.derivatives_status, "ready")
+        self.assertIsNotNone(r.data["srcset"])
+
+    def test_retried_finalize_after_dedup_returns_the_image(self):
+        self.client.force_authenticate(self.seller)
+        finalized = []
+        for _ in range(2):
+            r = self._ticket()
+            ticket = r.data["ticket"]
+            put = self.client.put(r.data["upload"]["url"], data=_png_bytes(), content_type="image/png")
+            finalized.append(self.client.post("/api/v1/uploads/finalize/", {"ticket": ticket}, format="json"))
+        # The second upload matched the first's blob, so its own object is gone.
+        self.assertFalse(default_storage.exists(put.data["name"]))
+
+        # The retry is answered from the database, whatever the cache holds.
+        cache.clear()
+        retry = self.client.post("/api/v1/uploads/finalize/", {"ticket": ticket}, format="json")
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED, retry.data)
+        self.assertEqual(retry.data["id"], finalized[1].data["id"])
+        self.assertEqual(ListingImage.objects.filter(listing=self.listing).count(), 2)
+
+    def test_avatar_via_direct_upload(self):
+        self.client.force_authenticate(self.seller)
+        r = self._ticket(kind="avatar", listing_id=None, filename="me.png")
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.client.put(r.data["upload"]["url"], data=_png_bytes((900, 900)), content_type="image/png")
+
+        r = self.client.post("/api/v1/uploads/finalize/", {"ticket": r.data["ticket"]}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        profile = Profile.objects.get(user=self.seller)
+        self.assertEqual(profile.avatar_status, "ready")
+        self.assertTrue(profile.avatar.name.startswith(f"profiles/{self.seller.id}/avatars/"))
+        self.assertTrue(bool(profile.avatar_thumbnail))
+
+    def test_rejects_foreign_listing_oversize_and_missing_object(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self._ticket().status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self._ticket(size=50 * 1024 * 1024).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._ticket(content_type="text/plain").status_code, status.HTTP_400_BAD_REQUEST)
+
+        r = self._ticket()
+        missing = self.client.post("/api/v1/uploads/finalize/", {"ticket": r.data["ticket"]}, format="json")
+        self.assertEqual(missing.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(self.other)
+        forbidden = self.client.post("/api/v1/uploads/finalize/", {"ticket": r.data["ticket"]}, format="json")
+        self.assertEqual(forbidden.status_code, status.HTTP_403_FORBIDDEN)
+
+        tampered = self.client.post("/api/v1/uploads/finalize/", {"ticket": r.data["ticket"] + "x"}, format="json")
+        self.assertEqual(tampered.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_local_put_enforces_ticket_limits(self):
+        self.client.force_authenticate(self.seller)
+        r = self._ticket(kind="avatar", listing_id=None)
+        url = r.data["upload"]["url"]
+
+        wrong_type = self.client.put(url, data=_png_bytes(), content_type="image/jpeg")
+        self.assertEqual(wrong_type.status_code, status.HTTP_400_BAD_REQUEST)
+        too_big = self.client.put(url, data=b"\0" * (5 * 1024 * 1024 + 1), content_type="image/png")
+        self.assertEqual(too_big.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Nothing was stored, so the ticket cannot be finalized.
+        r = self.client.post("/api/v1/uploads/finalize/", {"ticket": r.data["ticket"]}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(r.data["detail"], "Upload not found")
@@ -0,0 +1,110 @@
+import csv
+import gzip
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from market.models import Category, City, Governorate, Listing, ListingStatus, ModerationStatus
+from reports.models import ListingReport, ReportStatus
+
+User = get_user_model()
+
+
+@override_settings(EXPORT_CHUNK_SIZE=3)
+class ExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="export_staff", password="pass12345", is_staff=True)
+        cls.seller = User.objects.create_user(username="export_seller", password="pass12345")
+        category = Category.objects.create(name_ar="تصدير", name_en="Export", slug="export")
+        gov = Governorate.objects.create(name_ar="محافظة", name_en="Export Gov", slug="export-gov")
+        cls.cities = [
+            City.objects.create(governorate=gov, name_ar=f"مدينة {i}", name_en=f"Export City {i}", slug=f"ec-{i}")
+            for i in range(2)
+        ]
+        cls.listings = [
+            Listing.objects.create(
+                seller=cls.seller,
+                title=f"سيارة {i}",
+                category=category,
+                governorate=gov,
+                city=cls.cities[i % 2],
+                price=i * 10,
+                status=ListingStatus.PUBLISHED,
+                moderation_status=ModerationStatus.APPROVED,
+                is_removed=i == 6,
+            )
+            for i in range(8)
+        ]
+        for i, listing in enumerate(cls.listings[:4]):
+            ListingReport.objects.create(
+                listing=listing,
+                reporter=cls.seller,
+                reason="spam",
+                message=f'line one\nsays "{i}"',
+                status=ReportStatus.OPEN if i < 3 else ReportStatus.RESOLVED,
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.staff)
+
+    def _get(self, path, params=None, **extra):
+        r = self.client.get(path, params or {}, **extra)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as ctx:
+            body = b"".join(r.streaming_content)
+        return r, body, len(ctx.captured_queries)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.get("/api/v1/exports/listings.ndjson").status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get("/api/v1/exports/reports.csv").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_listings_ndjson_in_keyset_chunks(self):
+        r, body, queries = self._get("/api/v1/exports/listings.ndjson", {"include_removed": "1"})
+        self.assertTrue(r.streaming)
+        self.assertEqual(r["Content-Type"], "application/x-ndjson; charset=utf-8")
+        self.assertIn('filename="listings-', r["Content-Disposition"])
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([row["id"] for row in rows], [listing.id for listing in self.listings])
+        self.assertEqual(rows[1]["title"], "سيارة 1")
+        self.assertEqual(rows[1]["price"], "10.00")
+        self.assertEqual(rows[1]["seller_username"], "export_seller")
+        # 8 rows in chunks of 3: three queries, none for the rows' relations.
+        self.assertEqual(queries, 3)
+
+    def test_listing_filters_apply(self):
+        _, body, _ = self._get("/api/v1/exports/listings.ndjson", {"city": self.cities[0].id, "price_min": "20"})
+        ids = [json.loads(line)["id"] for line in body.decode().splitlines()]
+        # Removed listings stay out unless include_removed=1.
+        self.assertEqual(ids, [self.listings[2].id, self.listings[4].id])
+
+        r = self.client.get("/api/v1/exports/listings.csv", {"city": "x"})
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reports_csv(self):
+        r, body, _ = self._get("/api/v1/exports/reports.csv", HTTP_ACCEPT="text/csv")
+        self.assertEqual(r["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        # Like /reports/: open reports unless another status is asked for.
+        self.assertEqual([int(row["listing_id"]) for row in rows], [listing.id for listing in self.listings[:3]])
+        self.assertEqual(rows[0]["message"], 'line one\nsays "0"')
+        self.assertEqual(rows[0]["handled_at"], "")
+
+        _, body, _ = self._get("/api/v1/exports/reports.csv", {"status": "resolved"})
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual([int(row["listing_id"]) for row in rows], [self.listings[3].id])
+
+    def test_gzip(self):
+        _, plain, _ = self._get("/api/v1/exports/listings.ndjson")
+        r, compressed, _ = self._get("/api/v1/exports/listings.ndjson", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", r["Vary"])
+        self.assertEqual(gzip.decompress(compressed), plain)
@@ -0,0 +1,137 @@
+import random
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from PIL import Image, ImageDraw
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from market.image_dedup import BKTree, hamming
+from market.models import Category, City, Governorate, ImageBlob, Listing, ListingImage
+
+User = get_user_model()
+
+
+def _photo(size=(640, 480), quality=90, seed=1):
+    rnd = random.Random(seed)
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rnd.randrange(size[0]), rnd.randrange(size[1])
+        color = tuple(rnd.randrange(256) for _ in range(3))
+        draw.rectangle([x, y, x + size[0] // 5, y + size[1] // 5], fill=color)
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _resized(data: bytes, size, quality):
+    img = Image.open(BytesIO(data)).resize(size)
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+@override_settings(IMAGE_PROCESSING_EAGER=True)
+class ImageDedupTests(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username="dupseller", password="pass1234")
+        self.staff = User.objects.create_user(username="dupstaff", password="pass1234", is_staff=True)
+        category = Category.objects.create(name_ar="تكرار", name_en="Test Dedup", slug="test-dedup")
+        gov = Governorate.objects.create(name_ar="محافظة تكرار", name_en="Dup Gov", slug="dup-gov")
+        city = City.objects.create(governorate=gov, name_ar="مدينة تكرار", name_en="Dup City", slug="dup-city")
+        self.listings = [
+            Listing.objects.create(
+                seller=self.seller, title=f"Chair {i}", category=category, governorate=gov, city=city
+            )
+            for i in range(3)
+        ]
+
+    def _upload(self, listing, data, name="chair.jpg"):
+        self.client.force_authenticate(self.seller)
+        file = SimpleUploadedFile(name, data, content_type="image/jpeg")
+        r = self.client.post(f"/api/v1/listings/{listing.id}/images/", {"image": file}, format="multipart")
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        return ListingImage.objects.get(id=r.data["id"])
+
+    def test_identical_uploads_share_one_blob(self):
+        data = _photo()
+        first = self._upload(self.listings[0], data)
+        second = self._upload(self.listings[1], data, name="copy.jpg")
+
+        self.assertEqual(ImageBlob.objects.count(), 1)
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertIsNotNone(blob.phash)
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith(f"blobs/{blob.sha256[:2]}/{blob.sha256}"))
+        # The second copy reuses the blob's derivatives instead of re-encoding.
+        self.assertEqual(second.derivatives, blob.derivatives)
+        self.assertEqual(first.derivatives, blob.derivatives)
+        thumb = blob.derivatives["thumb"]["jpeg"]
+        self.assertTrue(thumb.startswith(f"blobs/derived/{blob.sha256[:2]}/{blob.sha256}_thumb"))
+
+        self.client.delete(f"/api/v1/listings/{self.listings[0].id}/images/{first.id}/")
+        # Still used by the second copy.
+        self.assertTrue(default_storage.exists(thumb))
+        self.client.delete(f"/api/v1/listings/{self.listings[1].id}/images/{second.id}/")
+        self.assertEqual(ImageBlob.objects.get().ref_count, 0)
+
+        call_command("gc_image_blobs", grace_hours=0, stdout=StringIO())
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.file.name))
+        self.assertFalse(default_storage.exists(thumb))
+
+    def test_gc_moves_per_image_derivatives_onto_the_blob(self):
+        data = _photo()
+        first = self._upload(self.listings[0], data)
+        second = self._upload(self.listings[1], data, name="copy.jpg")
+        # As processed before derivatives belonged to the blob: each image has its own.
+        own = f"listings/{second.listing_id}/derived/{second.id}/copy_thumb.jpg"
+        own = default_storage.save(own, BytesIO(b"thumb"))
+        ImageBlob.objects.update(derivatives={})
+        ListingImage.objects.filter(id=second.id).update(derivatives={"thumb": {"jpeg": own}})
+
+        call_command("gc_image_blobs", stdout=StringIO())
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.derivatives, first.derivatives)
+        second.refresh_from_db()
+        self.assertEqual(second.derivatives, first.derivatives)
+        self.assertFalse(default_storage.exists(own))
+
+    def test_duplicates_endpoint_finds_near_identical_photos(self):
+        data = _photo()
+        self._upload(self.listings[0], data)
+        self._upload(self.listings[1], _resized(data, (500, 375), quality=60))
+        self._upload(self.listings[2], _photo(seed=99))
+        self.assertEqual(ImageBlob.objects.count(), 3)
+
+        url = f"/api/v1/listings/{self.listings[0].id}/duplicates/"
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.staff)
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["listing_id"] for row in r.data["results"]], [self.listings[1].id])
+        self.assertLessEqual(r.data["results"][0]["distance"], r.data["max_distance"])
+
+
+class BKTreeTests(SimpleTestCase):
+    def test_search_matches_brute_force(self):
+        rnd = random.Random(7)
+        values = [rnd.getrandbits(64) for _ in range(500)]
+        # A few near neighbours of the query.
+        query = values[0]
+        values += [query ^ (1 << bit) for bit in (3, 17, 40)]
+        tree = BKTree()
+        for i, value in enumerate(values):
+            tree.add(value, i)
+
+        for max_distance in (0, 4, 20):
+            expected = sorted(i for i, v in enumerate(values) if hamming(v, query) <= max_distance)
+            self.assertEqual(sorted(i for _d, i in tree.search(query, max_distance)), expected)
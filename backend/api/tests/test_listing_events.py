@@ -0,0 +1,252 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from market import events
+from market.expiry import archive_expired
+from market.models import (
+    Category,
+    CategoryAttributeDefinition,
+    City,
+    ExchangeRate,
+    Governorate,
+    Listing,
+    ListingEvent,
+    ListingEventKind,
+    ListingImage,
+    ListingStatus,
+    ModerationStatus,
+)
+from market.pricing import listings_in, renormalize
+
+User = get_user_model()
+
+
+@override_settings(
+    LISTING_EVENT_PAGE_SIZE=3,
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class ListingEventTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username="event_seller", password="pass12345")
+        cls.staff = User.objects.create_superuser(username="event_staff", password="pass12345")
+        cls.category = Category.objects.create(name_ar="أحداث", name_en="Outbox", slug="outbox-events")
+        cls.color = CategoryAttributeDefinition.objects.create(
+            category=cls.category, key="color", label_ar="اللون", label_en="Color", type="enum",
+            choices=["red", "blue"],
+        )
+        cls.gov = Governorate.objects.create(name_ar="محافظة", name_en="Event Gov", slug="event-gov")
+        cls.city = City.objects.create(
+            governorate=cls.gov, name_ar="مدينة", name_en="Event City", slug="event-city"
+        )
+
+    def _listing(self, title="item", **fields):
+        return Listing.objects.create(
+            seller=self.seller,
+            title=title,
+            category=self.category,
+            governorate=self.gov,
+            city=self.city,
+            **{"status": ListingStatus.PUBLISHED, "moderation_status": ModerationStatus.APPROVED, **fields},
+        )
+
+    def _events(self, since=0):
+        return [(e.listing_id, e.kind, e.fields) for e in ListingEvent.objects.filter(pk__gt=since)]
+
+    def _last(self):
+        return ListingEvent.objects.order_by("pk").values_list("pk", flat=True).last() or 0
+
+    def test_saves_and_deletes_record_events_in_their_transaction(self):
+        listing = self._listing()
+        self.assertEqual(self._events(), [(listing.pk, "created", [])])
+
+        start = self._last()
+        listing.moderation_status = ModerationStatus.REJECTED
+        listing.save(update_fields=["moderation_status"])
+        listing.title = "renamed"
+        listing.save()
+        ListingImage.objects.create(listing=listing, image="listings/e/a.jpg")
+        self.assertEqual(
+            self._events(start),
+            [
+                (listing.pk, "updated", ["moderation_status"]),
+                (listing.pk, "updated", []),
+                (listing.pk, "images", []),
+            ],
+        )
+
+        start = self._last()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            listing.save(update_fields=["title"])
+            raise RuntimeError
+        self.assertEqual(self._events(start), [])
+
+        pk = listing.pk
+        listing.delete()
+        self.assertEqual(self._events(start), [(pk, "deleted", [])])
+
+    def test_batched_writes_one_event_per_listing(self):
+        listing = self._listing()
+        other = self._listing("other")
+        other_pk = other.pk
+        start = self._last()
+        with events.batched():
+            listing.save(update_fields=["title"])
+            ListingImage.objects.create(listing=listing, image="listings/e/b.jpg")
+            other.save(update_fields=["price"])
+            with self.assertRaises(RuntimeError), events.batched():
+                other.delete()
+                raise RuntimeError
+            self.assertEqual(self._events(start), [])
+        self.assertEqual(
+            self._events(start),
+            [(listing.pk, "updated", ["images", "title"]), (other_pk, "updated", ["price", "price_normalized"])],
+        )
+
+    def test_api_writes_record_events(self):
+        listing = self._listing()
+        other = self._listing("other")
+        images = [ListingImage.objects.create(listing=listing, image=f"listings/e/{i}.jpg") for i in range(2)]
+        self.client.force_authenticate(self.seller)
+
+        start = self._last()
+        r = self.client.patch(
+            f"/api/v1/listings/{listing.pk}/", {"title": "renamed", "attributes": {"color": "red"}}, format="json"
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        # One event per request, naming what the request set (and what that changed).
+        self.assertEqual(
+            self._events(start),
+            [(listing.pk, "updated", ["attributes", "moderation_status", "title", "updated_at"])],
+        )
+
+        start = self._last()
+        r = self.client.post(
+            f"/api/v1/listings/{listing.pk}/images/reorder/",
+            {"order": [images[1].pk, images[0].pk]},
+            format="json",
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        self.client.delete(f"/api/v1/listings/{listing.pk}/images/{images[0].pk}/")
+        self.assertEqual(self._events(start), [(listing.pk, "images", []), (listing.pk, "images", [])])
+
+        # Queryset updates: one event per listing that changed.
+        start = self._last()
+        r = self.client.post(
+            "/api/v1/listings/bulk_update/",
+            {"ids": [listing.pk, other.pk], "price": "10", "currency": "SYP"},
+            format="json",
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        self.assertEqual(
+            sorted(self._events(start)),
+            [(pk, "updated", ["currency", "price", "price_normalized"]) for pk in (listing.pk, other.pk)],
+        )
+
+        start = self._last()
+        self.client.force_authenticate(self.staff)
+        r = self.client.post(
+            "/api/v1/listings/bulk_update/", {"ids": [listing.pk], "moderation_status": "rejected"}, format="json"
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        self.assertEqual(self._events(start), [(listing.pk, "updated", ["moderation_status"])])
+
+    def test_background_and_admin_paths_record_events(self):
+        expired = self._listing("expired")
+        usd = self._listing("usd", price=Decimal("5"), currency="USD")
+        Listing.objects.filter(pk=expired.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        start = self._last()
+        archive_expired(notify=False)
+        ExchangeRate.objects.create(currency="USD", rate=Decimal("13000"))
+        renormalize(listings_in("USD"))
+        self.assertEqual(
+            self._events(start),
+            [(expired.pk, "updated", ["status"]), (usd.pk, "updated", ["price_normalized"])],
+        )
+
+        start = self._last()
+        self.client.force_login(self.staff)
+        self.client.post("/admin/market/listing/", {"action": "flag", "_selected_action": [usd.pk]})
+        self.client.post(
+            "/admin/market/listing/",
+            {"action": "delete_selected", "_selected_action": [expired.pk], "post": "yes"},
+        )
+        self.assertEqual(
+            self._events(start), [(usd.pk, "updated", ["is_flagged"]), (expired.pk, "deleted", [])]
+        )
+
+    def test_consumer_api(self):
+        listings = [self._listing(f"item {i}") for i in range(4)]
+        first = ListingEvent.objects.order_by("pk").first().pk
+
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.get("/api/v1/listing-events/").status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.staff)
+        r = self.client.get("/api/v1/listing-events/", {"consumer": "search"})
+        self.assertEqual([e["listing_id"] for e in r.data["events"]], [listing.pk for listing in listings[:3]])
+        self.assertEqual(r.data["events"][0]["kind"], ListingEventKind.CREATED)
+        self.assertEqual((r.data["position"], r.data["has_more"]), (first + 2, True))
+
+        r = self.client.post(
+            "/api/v1/listing-events/", {"consumer": "search", "position": first + 2}, format="json"
+        )
+        self.assertEqual(r.data, {"consumer": "search", "position": first + 2})
+        # Checkpoints never move back.
+        r = self.client.post("/api/v1/listing-events/", {"consumer": "search", "position": first}, format="json")
+        self.assertEqual(r.data["position"], first + 2)
+
+        r = self.client.get("/api/v1/listing-events/", {"consumer": "search"})
+        self.assertEqual([e["listing_id"] for e in r.data["events"]], [listings[3].pk])
+        self.assertFalse(r.data["has_more"])
+        r = self.client.get("/api/v1/listing-events/", {"after": first, "limit": 1})
+        self.assertEqual([e["id"] for e in r.data["events"]], [first + 1])
+
+    def test_reads_in_commit_order(self):
+        for i in range(3):
+            self._listing(f"item {i}")
+        first, second, slow = ListingEvent.objects.order_by("pk")
+        # ``slow`` took its id last but belongs to a transaction that started
+        # writing between the other two; while it runs, reads stop before it.
+        ListingEvent.objects.filter(pk=first.pk).update(txid=10)
+        ListingEvent.objects.filter(pk=second.pk).update(txid=12)
+        ListingEvent.objects.filter(pk=slow.pk).update(txid=11)
+        with mock.patch.object(events, "_committed", lambda qs: qs.filter(txid__lt=11)):
+            self.assertEqual([e.pk for e in events.read(0)], [first.pk])
+        events.advance("search", first.pk)
+
+        # Once it commits, it is delivered after the checkpoint, not skipped.
+        self.assertEqual([e.pk for e in events.read(events.position("search"))], [slow.pk, second.pk])
+        events.advance("search", second.pk)
+        self.assertEqual(events.advance("search", slow.pk), second.pk)
+        self.assertEqual(events.read(events.position("search")), [])
+
+    def test_prune(self):
+        listing = self._listing()
+        ListingEvent.objects.update(created_at=timezone.now() - timedelta(days=30))
+        self.assertEqual(events.prune(), 0)
+        events.advance("search", self._last())
+        events.advance("sitemap", 0)
+        self.assertEqual(events.prune(), 0)
+
+        listing.save(update_fields=["title"])
+        events.advance("search", self._last())
+        events.advance("sitemap", self._last())
+        out = StringIO()
+        call_command("prune_listing_events", stdout=out)
+        self.assertIn("Pruned 1 listing event(s).", out.getvalue())
+        self.assertEqual(self._events(), [(listing.pk, "updated", ["title"])])
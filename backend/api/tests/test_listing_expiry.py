@@ -0,0 +1,163 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from market.expiry import archive_expired
+from market.models import Category, City, Governorate, Listing, ListingStatus, ModerationStatus
+from market.tasks import schedule_listing_expiry
+from taskqueue import queue
+from taskqueue.models import Task, TaskStatus
+
+User = get_user_model()
+
+
+@override_settings(LISTING_TTL_DAYS=30, LISTING_EXPIRY_CHUNK_SIZE=2)
+class ListingExpiryTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(
+            username="expiry_seller", password="pass12345", email="s@example.com"
+        )
+        cls.other = User.objects.create_user(username="expiry_other", password="pass12345")
+        cls.vehicles = Category.objects.create(
+            name_ar="مركبات", name_en="Vehicles", slug="exp-vehicles", listing_ttl_days=7
+        )
+        cls.cars = Category.objects.create(name_ar="سيارات", name_en="Cars", slug="exp-cars", parent=cls.vehicles)
+        cls.jobs = Category.objects.create(name_ar="وظائف", name_en="Jobs", slug="exp-jobs", listing_ttl_days=0)
+        cls.misc = Category.objects.create(name_ar="متفرقات", name_en="Misc", slug="exp-misc")
+        cls.gov = Governorate.objects.create(name_ar="محافظة", name_en="Expiry Gov", slug="expiry-gov")
+        cls.city = City.objects.create(
+            governorate=cls.gov, name_ar="مدينة", name_en="Expiry City", slug="expiry-city"
+        )
+
+    def _listing(self, title, category, *, seller=None, status=ListingStatus.PUBLISHED):
+        return Listing.objects.create(
+            seller=seller or self.seller,
+            title=title,
+            category=category,
+            governorate=self.gov,
+            city=self.city,
+            status=status,
+            moderation_status=ModerationStatus.APPROVED,
+        )
+
+    def _days_left(self, listing):
+        listing.refresh_from_db()
+        return round((listing.expires_at - timezone.now()) / timedelta(days=1))
+
+    def test_publishing_stamps_category_ttl(self):
+        self.assertEqual(self._days_left(self._listing("car", self.cars)), 7)
+        self.assertEqual(self._days_left(self._listing("misc", self.misc)), 30)
+        self.assertIsNone(self._listing("job", self.jobs).expires_at)
+
+        draft = self._listing("draft", self.cars, status=ListingStatus.DRAFT)
+        self.assertIsNone(draft.expires_at)
+        draft.status = ListingStatus.PUBLISHED
+        draft.save(update_fields=["status"])
+        self.assertEqual(self._days_left(draft), 7)
+
+    @override_settings(TASKQUEUE_EAGER=True)
+    def test_sweep_archives_in_chunks_and_sends_one_digest_per_seller(self):
+        past = timezone.now() - timedelta(minutes=1)
+        expired = [self._listing(f"old {i}", self.misc) for i in range(5)]
+        expired.append(self._listing("old other", self.misc, seller=self.other))
+        fresh = self._listing("fresh", self.misc)
+        Listing.objects.filter(pk__in=[listing.pk for listing in expired]).update(expires_at=past)
+
+        result = archive_expired()
+        self.assertEqual((result.archived, result.chunks), (6, 3))
+        self.assertEqual(
+            set(Listing.objects.filter(status=ListingStatus.ARCHIVED).values_list("pk", flat=True)),
+            {listing.pk for listing in expired},
+        )
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, ListingStatus.PUBLISHED)
+
+        # The other seller has no email address.
+        self.assertEqual(result.digests, 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["s@example.com"])
+        self.assertIn("5 of your listings expired", mail.outbox[0].body)
+        self.assertIn("- old 4", mail.outbox[0].body)
+
+        self.assertEqual(archive_expired().archived, 0)
+
+    def test_digest_mail_errors_are_retried(self):
+        listing = self._listing("old", self.misc)
+        Listing.objects.filter(pk=listing.pk).update(expires_at=timezone.now())
+        self.assertEqual(archive_expired().digests, 1)
+
+        (digest,) = queue.claim("w1", 1, names=["market.send_expiry_digest"])
+        with mock.patch("market.expiry.send_mail", side_effect=SMTPException("down")):
+            with self.assertLogs("taskqueue.queue", level="ERROR"):
+                self.assertFalse(queue.execute(digest, worker_id="w1"))
+        digest.refresh_from_db()
+        self.assertEqual(digest.status, TaskStatus.QUEUED)
+        self.assertEqual(len(mail.outbox), 0)
+
+        Task.objects.filter(id=digest.id).update(run_at=timezone.now())
+        (digest,) = queue.claim("w1", 1, names=["market.send_expiry_digest"])
+        self.assertTrue(queue.execute(digest, worker_id="w1"))
+        self.assertIn("1 of your listings expired", mail.outbox[0].body)
+
+    def test_failed_sweep_still_queues_the_next(self):
+        schedule_listing_expiry(delay_seconds=0)
+        (sweep,) = queue.claim("w1", 1)
+        with mock.patch("market.expiry.archive_expired", side_effect=RuntimeError("boom")):
+            with self.assertLogs("taskqueue.queue", level="ERROR"):
+                self.assertFalse(queue.execute(sweep, worker_id="w1"))
+        sweep.refresh_from_db()
+        self.assertEqual(sweep.status, TaskStatus.FAILED)
+        self.assertEqual(
+            Task.objects.filter(name="market.expire_listings", status=TaskStatus.QUEUED).count(), 1
+        )
+
+    def test_renew(self):
+        listing = self._listing("car", self.cars)
+        Listing.objects.filter(pk=listing.pk).update(
+            status=ListingStatus.ARCHIVED, expires_at=timezone.now() - timedelta(days=1)
+        )
+
+        self.client.force_authenticate(self.other)
+        r = self.client.post(f"/api/v1/listings/{listing.pk}/renew/")
+        self.assertEqual(r.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(self.seller)
+        r = self.client.post(f"/api/v1/listings/{listing.pk}/renew/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        self.assertEqual(r.data["status"], ListingStatus.PUBLISHED)
+        self.assertEqual(self._days_left(listing), 7)
+
+        draft = self._listing("draft", self.cars, status=ListingStatus.DRAFT)
+        r = self.client.post(f"/api/v1/listings/{draft.pk}/renew/")
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_publish_stamps_expiry(self):
+        draft = self._listing("draft", self.cars, status=ListingStatus.DRAFT)
+        self.client.force_authenticate(self.seller)
+        r = self.client.post(
+            "/api/v1/listings/bulk_update/", {"ids": [draft.pk], "status": ListingStatus.PUBLISHED}, format="json"
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        self.assertEqual(self._days_left(draft), 7)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("expire_listings", "--schedule", stdout=out)
+        call_command("expire_listings", "--schedule", stdout=out)
+        self.assertEqual(Task.objects.filter(name="market.expire_listings").count(), 1)
+
+        listing = self._listing("old", self.misc)
+        Listing.objects.filter(pk=listing.pk).update(expires_at=timezone.now())
+        call_command("expire_listings", "--no-notify", stdout=out)
+        self.assertIn("Archived 1 listing(s) in 1 chunk(s); queued 0 digest(s).", out.getvalue())
+        self.assertEqual(len(mail.outbox), 0)
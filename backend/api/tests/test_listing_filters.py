@@ -0,0 +1,139 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import QueryDict
+from django.test import SimpleTestCase
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from api.v1.listing_filters import AttrFilter, parse_listing_filters
+from market.models import (
+    Category,
+    CategoryAttributeDefinition,
+    City,
+    Governorate,
+    Listing,
+    ListingAttributeValue,
+    ListingStatus,
+    ModerationStatus,
+)
+
+User = get_user_model()
+
+
+class FilterPlanParsingTests(SimpleTestCase):
+    def test_equal_filters_share_a_plan(self):
+        plan = parse_listing_filters(QueryDict("city=3,1&city=2&price__gte=100.00&seller=&page=2&ordering=price"))
+        self.assertEqual(plan.city, (1, 2, 3))
+        self.assertEqual(plan.price_min, Decimal("100"))
+        self.assertEqual(plan.seller, ())
+        self.assertEqual(plan.signature, "city=1,2,3&price_min=100")
+
+        same = parse_listing_filters(QueryDict("price_min=100&city=1,2,3&city=1"))
+        self.assertEqual(same, plan)
+        self.assertEqual(same.signature, plan.signature)
+        # Memoized by the raw filter params.
+        self.assertIs(parse_listing_filters(QueryDict("price_min=100&city=1,2,3&city=1")), same)
+
+    def test_attribute_filters_are_normalized(self):
+        plan = parse_listing_filters(
+            QueryDict("category=5&attr_fuel__in=petrol, diesel,petrol&attr_year__gte=2015")
+        )
+        self.assertEqual(
+            plan.attrs, (AttrFilter("fuel", "in", "diesel,petrol"), AttrFilter("year", "gte", "2015"))
+        )
+        self.assertEqual(plan.signature, "category=5&attr_fuel__in=diesel,petrol&attr_year__gte=2015")
+
+    def test_invalid_params(self):
+        cases = {
+            "city=1,x": "Invalid id list for city",
+            "status=sold": "Invalid status: sold",
+            "price_max=-1": "price_max cannot be negative",
+            "price__gte=abc": "Invalid decimal for price_min",
+            "is_flagged=maybe": "Invalid boolean for is_flagged",
+            "attr_year=2015": "attr_* filters require category to be set",
+            "city=" + ",".join(str(i) for i in range(60)): "Too many values for city (max 50)",
+        }
+        for query, message in cases.items():
+            with self.subTest(query), self.assertRaises(ValidationError) as ctx:
+                parse_listing_filters(QueryDict(query))
+            self.assertEqual(str(ctx.exception.detail["detail"]), message)
+
+
+class MultiValueFilterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user(username="filter_seller", password="pass12345")
+        gov = Governorate.objects.create(name_ar="محافظة", name_en="Filter Gov", slug="filter-gov")
+        cls.cities = [
+            City.objects.create(governorate=gov, name_ar=f"مدينة {i}", name_en=f"Filter City {i}", slug=f"fc-{i}")
+            for i in range(3)
+        ]
+        cls.cars = Category.objects.create(name_ar="سيارات", name_en="Filter Cars", slug="filter-cars")
+        sedans = Category.objects.create(
+            name_ar="سيدان", name_en="Filter Sedans", slug="filter-sedans", parent=cls.cars
+        )
+        cls.bikes = Category.objects.create(name_ar="دراجات", name_en="Filter Bikes", slug="filter-bikes")
+        other = Category.objects.create(name_ar="أخرى", name_en="Filter Other", slug="filter-other")
+        year_defs = {
+            category: CategoryAttributeDefinition.objects.create(
+                category=category, key="year", label_ar="سنة", label_en="Year", type="int", is_filterable=True
+            )
+            for category in (cls.cars, cls.bikes)
+        }
+
+        cls.listings = {}
+        for name, category, city, year in [
+            ("sedan_2020", sedans, cls.cities[0], 2020),
+            ("car_2010", cls.cars, cls.cities[1], 2010),
+            ("bike_2021", cls.bikes, cls.cities[2], 2021),
+            ("other", other, cls.cities[0], None),
+        ]:
+            listing = Listing.objects.create(
+                seller=seller,
+                title=name,
+                category=category,
+                governorate=gov,
+                city=city,
+                status=ListingStatus.PUBLISHED,
+                moderation_status=ModerationStatus.APPROVED,
+            )
+            if year is not None:
+                definition = year_defs[cls.bikes if category == cls.bikes else cls.cars]
+                ListingAttributeValue.objects.create(listing=listing, definition=definition, int_value=year)
+            cls.listings[name] = listing.id
+
+    def _titles(self, params):
+        r = self.client.get("/api/v1/listings/", params)
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        return sorted(item["title"] for item in r.data["results"])
+
+    def test_multi_value_city_and_category_subtrees(self):
+        self.assertEqual(
+            self._titles({"city": f"{self.cities[0].id},{self.cities[2].id}"}),
+            ["bike_2021", "other", "sedan_2020"],
+        )
+        self.assertEqual(
+            self._titles({"category": f"{self.cars.id},{self.bikes.id}"}), ["bike_2021", "car_2010", "sedan_2020"]
+        )
+        self.assertEqual(
+            self._titles({"category": f"{self.cars.id},{self.bikes.id}", "city": self.cities[0].id}),
+            ["sedan_2020"],
+        )
+
+    def test_attribute_filter_across_selected_categories(self):
+        params = {"category": f"{self.cars.id},{self.bikes.id}", "attr_year__gte": "2015"}
+        self.assertEqual(self._titles(params), ["bike_2021", "sedan_2020"])
+
+        r = self.client.get("/api/v1/listings/", {"category": self.cars.id, "attr_color": "red"})
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(r.data["detail"], "Unknown attribute filter: color")
+
+    def test_bench_command(self):
+        out = StringIO()
+        call_command("bench_listing_filters", "--iterations", "3", stdout=out)
+        self.assertIn("multi_value", out.getvalue())
+        self.assertIn("attribute", out.getvalue())
@@ -0,0 +1,91 @@
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from market.image_ingest import open_for_resize
+from market.models import Category, City, Governorate, Listing, ListingImage, ListingStatus, ModerationStatus
+
+User = get_user_model()
+
+
+@override_settings(IMAGE_PROCESSING_EAGER=True)
+class ListingImageDerivativeTests(APITestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username="imgseller", password="pass1234")
+        category = Category.objects.create(name_ar="صور", name_en="Test Images", slug="test-images")
+        gov = Governorate.objects.create(name_ar="محافظة صور", name_en="Img Gov", slug="img-gov")
+        city = City.objects.create(governorate=gov, name_ar="مدينة صور", name_en="Img City", slug="img-city")
+        self.listing = Listing.objects.create(
+            seller=self.seller,
+            title="Sofa",
+            category=category,
+            governorate=gov,
+            city=city,
+            status=ListingStatus.PUBLISHED,
+            moderation_status=ModerationStatus.APPROVED,
+        )
+
+    def _upload(self):
+        img = Image.new("RGB", (2000, 1000), color=(10, 200, 30))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 CW
+        exif[0x010F] = "TestCam"  # Make
+        buf = BytesIO()
+        img.save(buf, format="JPEG", exif=exif.tobytes())
+        file = SimpleUploadedFile("sofa.jpg", buf.getvalue(), content_type="image/jpeg")
+        self.client.force_authenticate(self.seller)
+        return self.client.post(f"/api/v1/listings/{self.listing.id}/images/", {"image": file}, format="multipart")
+
+    def test_upload_generates_oriented_stripped_ladder(self):
+        r = self._upload()
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+
+        image = ListingImage.objects.get(id=r.data["id"])
+        self.assertEqual(image.derivatives_status, "ready")
+        self.assertEqual(set(image.derivatives), {"thumb", "medium", "large"})
+
+        thumb = image.derivatives["thumb"]
+        # Portrait after EXIF transpose.
+        self.assertEqual((thumb["width"], thumb["height"]), (160, 320))
+        with image.image.storage.open(thumb["jpeg"]) as fh:
+            derived = Image.open(fh)
+            derived.load()
+        self.assertEqual(derived.size, (160, 320))
+        self.assertEqual(len(derived.getexif()), 0)
+        with image.image.storage.open(thumb["webp"]) as fh:
+            self.assertEqual(Image.open(fh).format, "WEBP")
+
+    def test_serializers_expose_srcset_and_thumbnail(self):
+        self._upload()
+
+        r = self.client.get(f"/api/v1/listings/{self.listing.id}/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        srcset = r.data["images"][0]["srcset"]
+        self.assertIn("webp", srcset)
+        self.assertTrue(srcset["jpeg"].endswith(" 800w"))
+        self.assertEqual(srcset["jpeg"].count(","), 2)
+
+        r = self.client.get("/api/v1/listings/")
+        row = next(x for x in r.data["results"] if x["id"] == self.listing.id)
+        self.assertTrue(row["thumbnail"].startswith("http://testserver/"))
+        self.assertTrue(row["thumbnail"].endswith("_thumb.jpg"))
+
+    def test_oversized_upload_rejected_from_header(self):
+        with override_settings(IMAGE_MAX_PIXELS=1_000_000):
+            r = self._upload()
+        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ListingImage.objects.filter(listing=self.listing).exists())
+
+    def test_jpeg_decoded_at_reduced_scale(self):
+        img = Image.new("RGB", (2000, 1000), color=(10, 200, 30))
+        buf = BytesIO()
+        img.save(buf, format="JPEG")
+        file = SimpleUploadedFile("wide.jpg", buf.getvalue(), content_type="image/jpeg")
+        with open_for_resize(file, (320, 320)) as decoded:
+            # 1/4 DCT scale is the smallest that still covers 320px wide.
+            self.assertEqual(decoded.size, (500, 250))
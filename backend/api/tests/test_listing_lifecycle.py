@@ -0,0 +1,214 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.instrumentation import enforce_query_budgets
+from market.lifecycle import freeze_cold, move_cold_listings
+from market.models import (
+    ArchivedListingAttributeValue,
+    ArchivedListingImage,
+    Category,
+    CategoryAttributeDefinition,
+    City,
+    Governorate,
+    ImageBlob,
+    Listing,
+    ListingAttributeValue,
+    ListingImage,
+    ListingStatus,
+    ModerationStatus,
+)
+from market.tasks import schedule_cold_listing_moves
+from taskqueue import queue
+from taskqueue.models import Task, TaskStatus
+
+User = get_user_model()
+
+
+@override_settings(
+    LISTING_COLD_AFTER_DAYS=30,
+    LISTING_COLD_CHUNK_SIZE=2,
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+# Reading and thawing cold listings stays within the views' extended budgets.
+@enforce_query_budgets
+class ListingLifecycleTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username="cold_seller", password="pass12345")
+        cls.staff = User.objects.create_user(username="cold_staff", password="pass12345", is_staff=True)
+        cls.category = Category.objects.create(name_ar="ألوان", name_en="Cold", slug="cold")
+        cls.color = CategoryAttributeDefinition.objects.create(
+            category=cls.category, key="color", label_ar="اللون", label_en="Color", type="enum",
+            choices=["red", "blue"], is_filterable=True,
+        )
+        cls.gov = Governorate.objects.create(name_ar="محافظة", name_en="Cold Gov", slug="cold-gov")
+        cls.city = City.objects.create(governorate=cls.gov, name_ar="مدينة", name_en="Cold City", slug="cold-city")
+        cls.blob = ImageBlob.objects.create(
+            sha256="c" * 64, file="blobs/cold.jpg", ref_count=1, hashed_at=timezone.now()
+        )
+
+    def _listing(self, title, *, age_days=40, **fields):
+        listing = Listing.objects.create(
+            seller=self.seller,
+            title=title,
+            category=self.category,
+            governorate=self.gov,
+            city=self.city,
+            **{"status": ListingStatus.PUBLISHED, "moderation_status": ModerationStatus.APPROVED, **fields},
+        )
+        ListingImage.objects.create(listing=listing, image=f"listings/{listing.pk}/a.jpg", blob=self.blob)
+        ListingAttributeValue.objects.create(listing=listing, definition=self.color, enum_value="red")
+        Listing.objects.filter(pk=listing.pk).update(updated_at=timezone.now() - timedelta(days=age_days))
+        listing.refresh_from_db()
+        return listing
+
+    def _cold(self, title="archived", **fields):
+        listing = self._listing(title, status=ListingStatus.ARCHIVED, **fields)
+        freeze_cold()
+        listing.refresh_from_db()
+        self.assertTrue(listing.is_cold)
+        return listing
+
+    def test_freeze_moves_only_long_cold_listings(self):
+        image_ids = {}
+        cold = []
+        for title, fields in [
+            ("archived", {"status": ListingStatus.ARCHIVED}),
+            ("removed", {"is_removed": True}),
+            ("rejected", {"moderation_status": ModerationStatus.REJECTED}),
+        ]:
+            listing = self._listing(title, **fields)
+            image_ids[listing.pk] = listing.images.get().pk
+            cold.append(listing)
+        live = self._listing("live")
+        recent = self._listing("recently archived", age_days=3, status=ListingStatus.ARCHIVED)
+        created_at = cold[0].images.get().created_at
+
+        self.assertEqual(freeze_cold(), 3)
+        self.assertEqual(
+            set(Listing.objects.filter(is_cold=True).values_list("pk", flat=True)),
+            {listing.pk for listing in cold},
+        )
+        self.assertEqual(dict(ArchivedListingImage.objects.values_list("listing_id", "id")), image_ids)
+        self.assertEqual(ArchivedListingImage.objects.get(pk=image_ids[cold[0].pk]).created_at, created_at)
+        self.assertEqual(ArchivedListingAttributeValue.objects.count(), 3)
+        self.assertEqual(
+            set(ListingImage.objects.values_list("listing_id", flat=True)), {live.pk, recent.pk}
+        )
+        # Moving is not an edit.
+        self.assertLess(Listing.objects.get(pk=cold[0].pk).updated_at, timezone.now() - timedelta(days=30))
+        self.assertEqual(freeze_cold(), 0)
+
+    def test_owner_and_staff_read_through(self):
+        cold = self._cold()
+        self._listing("live")
+
+        self.client.force_authenticate(self.seller)
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get("/api/v1/listings/mine/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        thumbnails = {item["id"]: item["thumbnail"] for item in r.data["results"]}
+        self.assertTrue(thumbnails[cold.pk].endswith(f"listings/{cold.pk}/a.jpg"))
+        archived_reads = [q["sql"] for q in ctx.captured_queries if "archivedlistingimage" in q["sql"]]
+        self.assertEqual(len(archived_reads), 1)
+
+        r = self.client.get(f"/api/v1/listings/{cold.pk}/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["attributes"], {"color": "red"})
+        self.assertEqual(len(r.data["images"]), 1)
+        r = self.client.get(f"/api/v1/listings/{cold.pk}/images/")
+        self.assertEqual(len(r.data), 1)
+
+        removed = self._cold("removed", is_removed=True)
+        self.client.force_authenticate(self.staff)
+        r = self.client.get("/api/v1/listings/", {"include_removed": "1"})
+        thumbnails = {item["id"]: item["thumbnail"] for item in r.data["results"]}
+        self.assertTrue(thumbnails[removed.pk].endswith(f"listings/{removed.pk}/a.jpg"))
+
+        # Reads never move rows back.
+        self.assertTrue(Listing.objects.get(pk=cold.pk).is_cold)
+
+    def test_reviving_thaws(self):
+        renewed = self._cold("renewed")
+        bulk = self._cold("bulk")
+        saved = self._cold("saved")
+        self.client.force_authenticate(self.seller)
+
+        r = self.client.post(f"/api/v1/listings/{renewed.pk}/renew/")
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        self.assertEqual(len(r.data["images"]), 1)
+
+        r = self.client.post(
+            "/api/v1/listings/bulk_update/", {"ids": [bulk.pk], "status": ListingStatus.PUBLISHED}, format="json"
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+
+        saved.status = ListingStatus.DRAFT
+        saved.save(update_fields=["status"])
+
+        for listing in (renewed, bulk, saved):
+            listing.refresh_from_db()
+            self.assertFalse(listing.is_cold)
+            self.assertEqual(listing.images.count(), 1)
+        self.assertFalse(ArchivedListingImage.objects.exists())
+        self.assertFalse(ArchivedListingAttributeValue.objects.exists())
+
+        r = self.client.get("/api/v1/listings/", {"category": self.category.pk, "attr_color": "red"})
+        self.assertEqual({item["id"] for item in r.data["results"]}, {renewed.pk, bulk.pk, saved.pk})
+
+    def test_stale_instance_keeps_cold_flag(self):
+        listing = self._listing("stale", status=ListingStatus.ARCHIVED)
+        freeze_cold()
+        listing.title = "edited while archived"
+        listing.save()
+        listing.refresh_from_db()
+        self.assertTrue(listing.is_cold)
+        self.assertEqual(listing.current_images.count(), 1)
+
+    def test_failed_pass_still_queues_the_next(self):
+        schedule_cold_listing_moves(delay_seconds=0)
+        (run,) = queue.claim("w1", 1)
+        with mock.patch("market.lifecycle.move_cold_listings", side_effect=RuntimeError("boom")):
+            with self.assertLogs("taskqueue.queue", level="ERROR"):
+                self.assertFalse(queue.execute(run, worker_id="w1"))
+        queued = Task.objects.filter(name="market.move_cold_listings", status=TaskStatus.QUEUED)
+        self.assertEqual(queued.count(), 1)
+
+        # Nor does a worker dying mid-pass wedge the queue.
+        queued.update(run_at=timezone.now())
+        (run,) = queue.claim("dead-worker", 1)
+        Task.objects.filter(id=run.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(queue.requeue_expired(), 1)
+        run.refresh_from_db()
+        self.assertEqual(run.status, TaskStatus.FAILED)
+
+    def test_task_command_and_blob_references(self):
+        cold = self._cold()
+        # Revived by a queryset update that bypassed thawing; the periodic pass catches it.
+        Listing.objects.filter(pk=cold.pk).update(status=ListingStatus.PUBLISHED)
+        self._listing("to freeze", is_removed=True)
+        self.assertEqual(move_cold_listings().as_dict(), {"thawed": 1, "frozen": 1})
+
+        out = StringIO()
+        call_command("move_cold_listings", "--schedule", stdout=out)
+        call_command("move_cold_listings", "--schedule", stdout=out)
+        self.assertEqual(Task.objects.filter(name="market.move_cold_listings").count(), 1)
+        call_command("move_cold_listings", stdout=out)
+        self.assertIn("Moved 0 listing(s) to cold storage and 0 back.", out.getvalue())
+
+        ImageBlob.objects.filter(pk=self.blob.pk).update(ref_count=0)
+        call_command("gc_image_blobs", "--grace-hours", "0", stdout=out)
+        self.assertEqual(ImageBlob.objects.get(pk=self.blob.pk).ref_count, 2)
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from market.models import Category, City, Governorate, Listing, ListingStatus, ModerationStatus
+
+User = get_user_model()
+
+
+class SignedInFeedTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username="feed_seller", password="pass12345")
+        cls.other = User.objects.create_user(username="feed_other", password="pass12345")
+        category = Category.objects.create(name_ar="تجربة", name_en="Feed Test", slug="feed-test")
+        gov = Governorate.objects.create(name_ar="محافظة", name_en="Feed Gov", slug="feed-gov")
+        cls.city = City.objects.create(governorate=gov, name_ar="مدينة", name_en="Feed City", slug="feed-city")
+        states = [
+            (ListingStatus.PUBLISHED, ModerationStatus.APPROVED, False),
+            (ListingStatus.DRAFT, ModerationStatus.PENDING, False),
+            (ListingStatus.PUBLISHED, ModerationStatus.PENDING, False),
+            (ListingStatus.PUBLISHED, ModerationStatus.APPROVED, True),
+        ]
+        now = timezone.now()
+        for i in range(72):
+            listing_status, moderation_status, is_removed = states[i % len(states)]
+            listing = Listing.objects.create(
+                seller=cls.seller if i % 3 == 0 else cls.other,
+                title=f"Feed {i}",
+                category=category,
+                governorate=gov,
+                city=cls.city,
+                price=None if i % 5 == 0 else Decimal(i % 7),
+                status=listing_status,
+                moderation_status=moderation_status,
+                is_removed=is_removed,
+            )
+            # Pairs share a timestamp, so the id tie-break matters.
+            Listing.objects.filter(pk=listing.pk).update(created_at=now - timedelta(minutes=i // 2))
+
+    def _expected(self, *ordering):
+        public = Q(status=ListingStatus.PUBLISHED, moderation_status=ModerationStatus.APPROVED)
+        qs = Listing.objects.filter(public | Q(seller=self.seller), is_removed=False)
+        return list(qs.order_by(*ordering).values_list("id", flat=True))
+
+    def _all_pages(self, params):
+        ids, page, count = [], 1, None
+        while True:
+            r = self.client.get("/api/v1/listings/", {**params, "page": page})
+            self.assertEqual(r.status_code, status.HTTP_200_OK)
+            count = r.data["count"]
+            ids.extend(item["id"] for item in r.data["results"])
+            if not r.data["next"]:
+                return ids, count
+            page += 1
+
+    def test_feed_matches_public_or_own_across_pages(self):
+        self.client.force_authenticate(self.seller)
+        ids, count = self._all_pages({})
+        expected = self._expected("-created_at", "-id")
+        self.assertGreater(len(expected), 20)
+        self.assertEqual(ids, expected)
+        self.assertEqual(count, len(expected))
+
+        # Own drafts are in, other sellers' drafts and removed listings are not.
+        own_draft = Listing.objects.filter(seller=self.seller, status=ListingStatus.DRAFT).first()
+        others_draft = Listing.objects.filter(seller=self.other, status=ListingStatus.DRAFT).first()
+        self.assertIn(own_draft.id, ids)
+        self.assertNotIn(others_draft.id, ids)
+        self.assertFalse(Listing.objects.filter(id__in=ids, is_removed=True).exists())
+
+    def test_many_own_listings(self):
+        self.client.force_authenticate(self.seller)
+        with mock.patch("market.visibility.OWN_KEYS_LIMIT", 2):
+            ids, count = self._all_pages({})
+        self.assertEqual(ids, self._expected("-created_at", "-id"))
+        self.assertEqual(count, len(ids))
+
+    def test_price_ordering_and_filters(self):
+        self.client.force_authenticate(self.seller)
+        ids, _ = self._all_pages({"ordering": "price"})
+        prices = dict(Listing.objects.values_list("id", "price"))
+        self.assertEqual(sorted(ids), sorted(self._expected("id")))
+        ordered = [prices[pk] for pk in ids]
+        # NULL prices last, as on Postgres.
+        self.assertEqual(ordered, sorted(ordered, key=lambda p: (p is None, p or 0)))
+
+        ids, count = self._all_pages({"status": ListingStatus.DRAFT, "city": self.city.id})
+        own_drafts = Listing.objects.filter(seller=self.seller, status=ListingStatus.DRAFT, is_removed=False)
+        self.assertEqual(ids, list(own_drafts.order_by("-created_at", "-id").values_list("id", flat=True)))
+        self.assertEqual(count, len(ids))
+
+    def test_anonymous_and_detail_unchanged(self):
+        ids, _ = self._all_pages({})
+        public = Listing.objects.filter(
+            status=ListingStatus.PUBLISHED, moderation_status=ModerationStatus.APPROVED, is_removed=False
+        )
+        self.assertEqual(ids, list(public.order_by("-created_at", "-id").values_list("id", flat=True)))
+
+        own_draft = Listing.objects.filter(seller=self.seller, status=ListingStatus.DRAFT).first()
+        self.assertEqual(
+            self.client.get(f"/api/v1/listings/{own_draft.id}/").status_code, status.HTTP_404_NOT_FOUND
+        )
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.get(f"/api/v1/listings/{own_draft.id}/").status_code, status.HTTP_200_OK)
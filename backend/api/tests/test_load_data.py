@@ -0,0 +1,43 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from market.models import Category, City, Governorate, ImageBlob, Listing, ListingImage
+from messaging.models import PrivateMessage, PrivateThread
+
+
+@override_settings(ADMIN_SEEDING_ENABLED=True)
+class GenerateLoadDataTests(TestCase):
+    def setUp(self):
+        gov = Governorate.objects.create(name_ar="محافظة حمل", name_en="Load Gov", slug="load-gov")
+        for i in range(3):
+            City.objects.create(
+                governorate=gov, name_ar=f"مدينة {i}", name_en=f"Load City {i}", slug=f"load-city-{i}"
+            )
+            Category.objects.create(name_ar=f"فئة {i}", name_en=f"Load Cat {i}", slug=f"load-cat-{i}")
+
+    def _generate(self, *extra):
+        call_command(
+            "generate_load_data", "--listings", "120", "--users", "20", "--seed", "9", "--chunk-size", "50",
+            "--image-pool", "2", *extra, stdout=StringIO(),
+        )
+        return list(
+            Listing.objects.filter(seller__username__startswith="load_9_")
+            .order_by("id")
+            .values_list("title", "price", "category_id", "city_id", "seller__username")
+        )
+
+    def test_generates_related_rows_deterministically(self):
+        first = self._generate()
+        self.assertEqual(len(first), 120)
+        self.assertTrue(PrivateThread.objects.exists())
+        self.assertEqual(
+            PrivateMessage.objects.count(),
+            PrivateMessage.objects.filter(thread__in=PrivateThread.objects.all()).count(),
+        )
+        # Images share the rendered pool through counted blobs.
+        self.assertEqual(ImageBlob.objects.count(), 2)
+        self.assertEqual(sum(ImageBlob.objects.values_list("ref_count", flat=True)), ListingImage.objects.count())
+
+        self.assertEqual(self._generate("--purge"), first)
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import threading
+from io import BytesIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from market import resize_cache, views as market_views
+
+
+def _jpeg(size=(1200, 900)):
+    buf = BytesIO()
+    Image.new("RGB", size, color=(30, 60, 90)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+class MediaResizeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        override = override_settings(
+            IMAGE_RESIZE_CACHE_DIR=self.cache_dir,
+            IMAGE_RESIZE_SIZES=["128x128", "480x360"],
+            IMAGE_RESIZE_CACHE_MAX_BYTES=10 * 1024 * 1024,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.name = default_storage.save("listings/resize-test/photo.jpg", ContentFile(_jpeg()))
+        self.addCleanup(default_storage.delete, self.name)
+
+    def test_renders_once_then_serves_from_disk(self):
+        url = f"/media-resize/480x360/{self.name}"
+        render = mock.patch.object(market_views, "render_resized", wraps=resize_cache.render_resized)
+        stat = mock.patch.object(resize_cache, "_stored_version", wraps=resize_cache._stored_version)
+        with render as render, stat as stat:
+            first = self.client.get(url)
+            second = self.client.get(url)
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=second["ETag"])
+        self.assertEqual(render.call_count, 1)
+        # Only the first request asked storage for the source's version.
+        self.assertEqual(stat.call_count, 1)
+        self.assertEqual(not_modified.status_code, 304)
+
+        for r in (first, second):
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r["Content-Type"], "image/jpeg")
+            self.assertEqual(r["Cache-Control"], market_views.RESIZED_MUTABLE_CACHE_CONTROL)
+        self.assertEqual(Image.open(BytesIO(b"".join(second.streaming_content))).size, (480, 360))
+
+    def test_replaced_source_is_rendered_again(self):
+        url = f"/media-resize/128x128/{self.name}"
+        first = self.client.get(url)
+        self.assertNotIn("immutable", first["Cache-Control"])
+
+        default_storage.delete(self.name)
+        default_storage.save(self.name, ContentFile(_jpeg(size=(300, 900))))
+        # Until the cached version expires the old variant is still current.
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        cache.clear()
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertEqual(Image.open(BytesIO(b"".join(second.streaming_content))).size, (43, 128))
+
+        # Blob names embed the content hash, so their variants never change.
+        blob = default_storage.save(f"blobs/ab/{'ab' * 32}.jpg", ContentFile(_jpeg()))
+        self.addCleanup(default_storage.delete, blob)
+        self.assertIn("immutable", self.client.get(f"/media-resize/128x128/{blob}")["Cache-Control"])
+
+    def test_corrupt_source_is_not_found(self):
+        truncated = default_storage.save("listings/resize-test/truncated.jpg", ContentFile(_jpeg()[:2000]))
+        self.addCleanup(default_storage.delete, truncated)
+        self.assertEqual(self.client.get(f"/media-resize/128x128/{truncated}").status_code, 404)
+
+    def test_rejects_unlisted_sizes_and_paths(self):
+        self.assertEqual(self.client.get(f"/media-resize/500x500/{self.name}").status_code, 404)
+        self.assertEqual(self.client.get("/media-resize/128x128/listings/../secrets.jpg").status_code, 404)
+        self.assertEqual(self.client.get("/media-resize/128x128/other/photo.jpg").status_code, 404)
+        self.assertEqual(self.client.get("/media-resize/128x128/listings/missing.jpg").status_code, 404)
+
+    def test_concurrent_misses_render_once(self):
+        cache = resize_cache.DiskLRUCache(self.cache_dir, 10 * 1024 * 1024)
+        calls = []
+
+        def render():
+            with cache.lock("k"):
+                if cache.open("k") is None:
+                    calls.append(1)
+                    cache.put("k", b"x" * 10)
+
+        threads = [threading.Thread(target=render) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+
+    def test_evicts_least_recently_used_past_limit(self):
+        cache = resize_cache.DiskLRUCache(self.cache_dir, 350)
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.put(key, b"x" * 100)
+            # Older mtime == less recently used.
+            os.utime(cache.path_for(key), (1000 + i, 1000 + i))
+        cache.open("a").close()  # a hit refreshes "a"
+        cache.put("d", b"x" * 100)
+
+        remaining = {key for key in "abcd" if os.path.exists(cache.path_for(key))}
+        self.assertEqual(remaining, {"a", "c", "d"})
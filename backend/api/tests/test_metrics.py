@@ -0,0 +1,111 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.metrics import registry
+from market.models import Governorate
+
+User = get_user_model()
+
+
+def _sample(text: str, series: str) -> float:
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        Governorate.objects.create(name_ar="م", name_en="Metrics Gov", slug="metrics-gov")
+
+    def test_internal_ip_or_staff_only(self):
+        outside = APIClient(REMOTE_ADDR="203.0.113.9")
+        self.assertIn(
+            outside.get("/metrics").status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+        )
+
+        outside.force_authenticate(User.objects.create_user(username="plain", password="pass12345"))
+        self.assertEqual(outside.get("/metrics").status_code, status.HTTP_403_FORBIDDEN)
+
+        outside.force_authenticate(User.objects.create_user(username="ops", password="pass12345", is_staff=True))
+        self.assertEqual(outside.get("/metrics").status_code, status.HTTP_200_OK)
+
+        res = APIClient(REMOTE_ADDR="127.0.0.1").get("/metrics")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/plain; version=0.0.4"))
+
+    def test_records_requests_per_view(self):
+        client = APIClient()
+        for _ in range(3):
+            self.assertEqual(client.get("/api/v1/governorates/").status_code, status.HTTP_200_OK)
+        client.get("/no-such-page/")
+
+        text = client.get("/metrics").content.decode()
+        self.assertEqual(
+            _sample(text, 'http_requests_total{view="governorate-list",method="GET",status="200"}'), 3
+        )
+        self.assertEqual(
+            _sample(text, 'http_request_duration_seconds_bucket{view="governorate-list",method="GET",le="+Inf"}'),
+            3,
+        )
+        self.assertEqual(
+            _sample(text, 'http_request_duration_seconds_count{view="governorate-list",method="GET"}'), 3
+        )
+        self.assertGreater(_sample(text, 'http_request_db_queries_total{view="governorate-list"}'), 0)
+        self.assertIn('http_request_db_seconds_count{view="governorate-list"} 3', text)
+        self.assertIn('view="unmatched"', text)
+        self.assertIn("# TYPE image_processing_seconds histogram", text)
+
+    def test_sums_snapshots_of_other_processes(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            with open(os.path.join(directory, "metrics-1.json"), "w") as fh:
+                json.dump(
+                    {
+                        "counters": [["cache_requests_total", ["listing_questions", "hit"], 5]],
+                        "histograms": [
+                            ["seed_job_duration_seconds", ["demo", "succeeded"], [0, 1, 0, 0, 0, 0, 0, 0, 0, 3.5]]
+                        ],
+                    },
+                    fh,
+                )
+            registry.inc("cache_requests_total", ("listing_questions", "hit"), 2)
+
+            text = APIClient().get("/metrics").content.decode()
+            self.assertTrue(os.path.exists(os.path.join(directory, f"metrics-{os.getpid()}.json")))
+
+        self.assertEqual(_sample(text, 'cache_requests_total{cache="listing_questions",result="hit"}'), 7)
+        self.assertEqual(
+            _sample(text, 'seed_job_duration_seconds_bucket{scenario="demo",status="succeeded",le="1"}'), 0
+        )
+        self.assertEqual(
+            _sample(text, 'seed_job_duration_seconds_bucket{scenario="demo",status="succeeded",le="5"}'), 1
+        )
+        self.assertEqual(_sample(text, 'seed_job_duration_seconds_sum{scenario="demo",status="succeeded"}'), 3.5)
+
+    def test_drops_snapshots_of_exited_processes(self):
+        exited = subprocess.Popen([sys.executable, "-c", ""])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            for name in (f"metrics-{exited.pid}.json", f"metrics-{exited.pid}.json.tmp"):
+                with open(os.path.join(directory, name), "w") as fh:
+                    json.dump({"counters": [["cache_requests_total", ["listing_questions", "miss"], 4]]}, fh)
+            registry.inc("cache_requests_total", ("listing_questions", "miss"), 1)
+
+            text = APIClient().get("/metrics").content.decode()
+            remaining = os.listdir(directory)
+
+        self.assertEqual(_sample(text, 'cache_requests_total{cache="listing_questions",result="miss"}'), 1)
+        self.assertEqual(remaining, [f"metrics-{os.getpid()}.json"])
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_can_be_disabled(self):
+        APIClient().get("/api/v1/governorates/")
+        self.assertEqual(registry.snapshot(), {"counters": [], "histograms": []})
@@ -0,0 +1,153 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from market.models import Category, City, ExchangeRate, Governorate, Listing, ListingStatus, ModerationStatus
+
+User = get_user_model()
+
+
+@override_settings(
+    PRICE_BASE_CURRENCY="SYP",
+    PRICE_RENORMALIZE_CHUNK_SIZE=2,
+    TASKQUEUE_EAGER=True,
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class NormalizedPriceTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username="price_seller", password="pass12345")
+        cls.category = Category.objects.create(name_ar="أسعار", name_en="Prices", slug="prices")
+        cls.gov = Governorate.objects.create(name_ar="محافظة", name_en="Price Gov", slug="price-gov")
+        cls.city = City.objects.create(
+            governorate=cls.gov, name_ar="مدينة", name_en="Price City", slug="price-city"
+        )
+        ExchangeRate.objects.create(currency="usd", rate=Decimal("13000"))
+        cls.listings = {
+            name: cls._listing(name, price, currency)
+            for name, price, currency in [
+                ("syp_cheap", "50000", "SYP"),
+                ("usd_10", "10", "USD"),
+                ("syp_dear", "200000", "syp"),
+                ("usd_100", "100", "usd"),
+                ("eur_5", "5", "EUR"),
+                ("no_price", None, "USD"),
+            ]
+        }
+
+    @classmethod
+    def _listing(cls, title, price, currency):
+        return Listing.objects.create(
+            seller=cls.seller,
+            title=title,
+            price=price and Decimal(price),
+            currency=currency,
+            category=cls.category,
+            governorate=cls.gov,
+            city=cls.city,
+            status=ListingStatus.PUBLISHED,
+            moderation_status=ModerationStatus.APPROVED,
+        )
+
+    def _normalized(self, name):
+        return Listing.objects.get(pk=self.listings[name].pk).price_normalized
+
+    def _titles(self, params):
+        r = self.client.get("/api/v1/listings/", params)
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        return [item["title"] for item in r.data["results"]]
+
+    def test_save_normalizes(self):
+        self.assertEqual(ExchangeRate.objects.get().currency, "USD")
+        self.assertEqual(self._normalized("syp_dear"), Decimal("200000"))
+        self.assertEqual(self._normalized("usd_10"), Decimal("130000"))
+        self.assertIsNone(self._normalized("eur_5"))
+        self.assertIsNone(self._normalized("no_price"))
+
+        listing = self.listings["usd_10"]
+        listing.price = Decimal("2")
+        listing.save(update_fields=["price"])
+        self.assertEqual(self._normalized("usd_10"), Decimal("26000"))
+
+    def test_ordering_and_range_compare_across_currencies(self):
+        # Where unknown prices (null) sort is up to the database; leave them out.
+        priced = {"price_min": "0"}
+        self.assertEqual(
+            self._titles({**priced, "ordering": "price"}), ["syp_cheap", "usd_10", "syp_dear", "usd_100"]
+        )
+        self.assertEqual(
+            self._titles({**priced, "ordering": "-price"}), ["usd_100", "syp_dear", "usd_10", "syp_cheap"]
+        )
+        self.assertEqual(
+            self._titles({"price_min": "100000", "price_max": "1000000", "ordering": "price"}),
+            ["usd_10", "syp_dear"],
+        )
+
+    def test_rate_change_reprices_in_background(self):
+        self.client.force_login(User.objects.create_superuser(username="price_admin", password="pass12345"))
+        rate = ExchangeRate.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post(
+                f"/admin/market/exchangerate/{rate.pk}/change/", {"currency": "USD", "rate": "15000"}
+            )
+        self.assertEqual(r.status_code, 302)
+        self.assertEqual(self._normalized("usd_100"), Decimal("1500000"))
+        self.assertEqual(self._normalized("syp_cheap"), Decimal("50000"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post("/admin/market/exchangerate/add/", {"currency": "eur", "rate": "14000"})
+        self.assertEqual(r.status_code, 302)
+        self.assertEqual(self._normalized("eur_5"), Decimal("70000"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post(f"/admin/market/exchangerate/{rate.pk}/delete/", {"post": "yes"})
+        self.assertEqual(r.status_code, 302)
+        self.assertIsNone(self._normalized("usd_10"))
+
+    def test_rate_saved_anywhere_reprices(self):
+        rate = ExchangeRate.objects.get()
+        rate.rate = Decimal("14000")
+        with self.captureOnCommitCallbacks(execute=True):
+            rate.save()
+        self.assertEqual(self._normalized("usd_100"), Decimal("1400000"))
+        with self.captureOnCommitCallbacks() as callbacks:
+            rate.save()
+        self.assertEqual(callbacks, [])
+
+        rate.currency = "eur"
+        with self.captureOnCommitCallbacks(execute=True):
+            rate.save()
+        self.assertIsNone(self._normalized("usd_100"))
+        self.assertEqual(self._normalized("eur_5"), Decimal("70000"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ExchangeRate.objects.all().delete()
+        self.assertIsNone(self._normalized("eur_5"))
+
+    def test_bulk_update_renormalizes(self):
+        self.client.force_authenticate(self.seller)
+        listing = self.listings["syp_cheap"]
+        r = self.client.post(
+            "/api/v1/listings/bulk_update/", {"ids": [listing.pk], "currency": "USD"}, format="json"
+        )
+        self.assertEqual(r.status_code, status.HTTP_200_OK, r.data)
+        self.assertEqual(self._normalized("syp_cheap"), Decimal("650000000"))
+
+    def test_renormalize_command(self):
+        Listing.objects.update(price_normalized=None)
+        out = StringIO()
+        call_command("renormalize_prices", "--currency", "usd", stdout=out)
+        self.assertIn("Re-priced 3 listing(s).", out.getvalue())
+        self.assertEqual(self._normalized("usd_100"), Decimal("1300000"))
+        self.assertIsNone(self._normalized("syp_cheap"))
+
+        call_command("renormalize_prices", stdout=out)
+        self.assertEqual(self._normalized("syp_cheap"), Decimal("50000"))
@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -7,6 +9,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 User = get_user_model()
 
 
+@override_settings(IMAGE_PROCESSING_EAGER=True)
 class ProfileApiTests(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="u1", password="pass1234")
@@ -91,6 +94,9 @@ class ProfileApiTests(APITestCase):
 
         # Medium should be resized to fit within 400x400
         self.assertTrue(m.width <= 400 and m.height <= 400)
+        # `avatar` is the medium rendition; the upload itself is `avatar_original`.
+        self.assertEqual(r.data["avatar"], r.data["avatar_medium"])
+        self.assertTrue(r.data["avatar_original"].endswith(profile.avatar.name))
         # Thumbnail should be at most 128x128
         self.assertTrue(t.width <= 128 and t.height <= 128)
 
@@ -124,5 +130,32 @@ class ProfileApiTests(APITestCase):
         self.assertEqual(r2.status_code, status.HTTP_200_OK)
         self.assertIn("cover_medium", r2.data)
         self.assertTrue(str(r2.data.get("cover_medium")).startswith("http://testserver/"))
+        self.assertEqual(r2.data["cover"], r2.data["cover_medium"])
+        self.assertIn("cover_original", r2.data)
         profile = Profile.objects.get(user=self.user)
         self.assertTrue(bool(profile.cover_medium))
+
+    @override_settings(IMAGE_PROCESSING_EAGER=False)
+    def test_avatar_upload_is_processed_off_request(self):
+        from io import BytesIO, StringIO
+        from PIL import Image
+
+        self.client.force_authenticate(self.user)
+        buf = BytesIO()
+        Image.new("RGB", (800, 600), color=(0, 255, 0)).save(buf, format="PNG")
+        file = SimpleUploadedFile("avatar.png", buf.getvalue(), content_type="image/png")
+
+        r = self.client.post(reverse("v1-me-avatar"), {"avatar": file})
+        self.assertEqual(r.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(r.data.get("avatar_status"), "pending")
+        self.assertIsNone(r.data.get("avatar_thumbnail"))
+        self.assertIsNone(r.data.get("avatar"))
+
+        # The recovery sweep picks up anything still pending.
+        call_command("process_profile_images", stdout=StringIO())
+        from market.models import Profile
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(profile.avatar_status, "ready")
+        self.assertTrue(bool(profile.avatar_thumbnail))
+        t = Image.open(profile.avatar_thumbnail.path)
+        self.assertTrue(t.width <= 128 and t.height <= 128)
@@ -0,0 +1,77 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.profiling import SamplingProfiler
+from market.models import Governorate
+
+User = get_user_model()
+
+
+def _busy_loop(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class RequestProfilerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="profiler_staff", password="pass12345", is_staff=True)
+        cls.user = User.objects.create_user(username="profiler_user", password="pass12345")
+        Governorate.objects.create(name_ar="م", name_en="Profile Gov", slug="profile-gov")
+
+    def test_staff_gets_profile_with_sql_timings(self):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        res = client.get("/api/v1/governorates/", HTTP_X_PROFILE="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["X-Profile"], "json")
+        self.assertEqual(res["X-Profiled-Status"], "200")
+
+        body = json.loads(res.content)
+        self.assertEqual(body["path"], "/api/v1/governorates/")
+        self.assertGreaterEqual(body["queries"]["count"], 1)
+        self.assertEqual(len(body["queries"]["statements"]), body["queries"]["count"])
+        self.assertTrue(any("market_governorate" in s["sql"] for s in body["queries"]["shapes"]))
+        self.assertIn("samples", body)
+
+    def test_jwt_staff_and_query_flag(self):
+        token = RefreshToken.for_user(self.staff).access_token
+        res = APIClient().get(
+            "/api/v1/governorates/", {"_profile": "collapsed"}, HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        self.assertEqual(res["X-Profile"], "collapsed")
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+
+    def test_ignored_for_non_staff(self):
+        client = APIClient()
+        self.assertNotIn("X-Profile", client.get("/api/v1/governorates/", HTTP_X_PROFILE="json"))
+        client.force_authenticate(self.user)
+        res = client.get("/api/v1/governorates/", {"_profile": "json"})
+        self.assertNotIn("X-Profile", res)
+        self.assertIn("results", res.json())
+
+    @override_settings(PROFILER_ENABLED=False)
+    def test_can_be_disabled(self):
+        client = APIClient()
+        client.force_authenticate(self.staff)
+        self.assertNotIn("X-Profile", client.get("/api/v1/governorates/", HTTP_X_PROFILE="json"))
+
+    def test_sampler_collapses_stacks(self):
+        import threading
+
+        with SamplingProfiler(threading.get_ident(), interval=0.001, max_samples=20) as profiler:
+            _busy_loop(0.2)
+        self.assertEqual(profiler.samples, 20)
+        lines = profiler.collapsed().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any("_busy_loop (api/tests/test_profiling.py:" in line for line in lines), lines[:3])
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+        self.assertIn(";", stack)
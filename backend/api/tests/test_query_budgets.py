@@ -0,0 +1,297 @@
+import re
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.instrumentation import QueryBudgetExceeded, enforce_query_budgets
+from market.models import (
+    Category,
+    CategoryAttributeDefinition,
+    City,
+    Governorate,
+    Listing,
+    ListingAttributeValue,
+    ListingImage,
+    ListingStatus,
+    ModerationStatus,
+    Neighborhood,
+)
+from messaging.models import PrivateMessage, PrivateThread, PublicQuestion
+from reports.models import ListingReport
+
+User = get_user_model()
+
+
+def _queries(response) -> int:
+    return int(re.search(r'desc="(\d+) queries"', response["Server-Timing"]).group(1))
+
+
+def _jpeg(seed: int) -> SimpleUploadedFile:
+    # New bytes per run: an upload that matches a stored blob skips the derivative pass.
+    buf = BytesIO()
+    Image.new("RGB", (400, 300), color=(seed % 256, 200, 30)).save(buf, format="JPEG")
+    return SimpleUploadedFile("budget.jpg", buf.getvalue(), content_type="image/jpeg")
+
+
+# Image uploads run their derivative pass inline: the worst case for the budget.
+@override_settings(IMAGE_PROCESSING_EAGER=True)
+@enforce_query_budgets
+class QueryBudgetTests(TestCase):
+    """Every viewset endpoint stays within its declared budget, whatever the row count."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username="budget_seller", password="pass12345")
+        cls.buyer = User.objects.create_user(username="budget_buyer", password="pass12345")
+        cls.staff = User.objects.create_user(username="budget_staff", password="pass12345", is_staff=True)
+
+        parent = Category.objects.create(name_ar="أب", name_en="Budget Parent", slug="budget-parent")
+        cls.category = Category.objects.create(
+            name_ar="ابن", name_en="Budget Child", slug="budget-child", parent=parent
+        )
+        cls.color = CategoryAttributeDefinition.objects.create(
+            category=parent, key="color", label_ar="اللون", label_en="Color", type="enum",
+            choices=["red", "blue"], is_filterable=True,
+        )
+        cls.locations = []
+        for g in range(2):
+            gov = Governorate.objects.create(name_ar=f"م{g}", name_en=f"Budget Gov {g}", slug=f"budget-gov-{g}")
+            for c in range(2):
+                city = City.objects.create(
+                    governorate=gov, name_ar=f"مد{g}{c}", name_en=f"Budget City {g}{c}",
+                    slug=f"budget-city-{g}-{c}",
+                )
+                hood = Neighborhood.objects.create(
+                    city=city, name_ar=f"ح{g}{c}", name_en=f"Budget Hood {g}{c}", slug=f"budget-hood-{g}-{c}"
+                )
+                cls.locations.append((gov, city, hood))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _make_rows(self, n: int):
+        listings = []
+        for i in range(n):
+            gov, city, hood = self.locations[i % len(self.locations)]
+            listing = Listing.objects.create(
+                seller=self.seller, title=f"Budget {i}", description="d", price=1000 + i,
+                currency="SYP", category=self.category, governorate=gov, city=city, neighborhood=hood,
+                status=ListingStatus.PUBLISHED, moderation_status=ModerationStatus.APPROVED,
+            )
+            for k in range(2):
+                ListingImage.objects.create(
+                    listing=listing, image=f"listings/budget/{listing.id}-{k}.jpg", sort_order=k
+                )
+            ListingAttributeValue.objects.create(listing=listing, definition=self.color, enum_value="red")
+            PublicQuestion.objects.create(listing=listing, author=self.buyer, question="Still available?")
+            thread = PrivateThread.objects.create(listing=listing, buyer=self.buyer, seller=self.seller)
+            PrivateMessage.objects.create(thread=thread, sender=self.buyer, body="Hi")
+            PrivateMessage.objects.create(thread=thread, sender=self.seller, body="Hello")
+            ListingReport.objects.create(listing=listing, reporter=self.buyer, reason="spam")
+            listings.append(listing)
+        return listings
+
+    def _requests(self, listing, thread, question, report):
+        category_id = self.category.id
+        city_id = listing.city_id
+        image_ids = list(listing.images.values_list("id", flat=True))
+        return [
+            (None, "get", "/api/v1/categories/", None),
+            (None, "get", f"/api/v1/categories/{category_id}/", None),
+            (None, "get", f"/api/v1/categories/{category_id}/attributes/", None),
+            (None, "get", "/api/v1/governorates/", None),
+            (None, "get", f"/api/v1/governorates/{listing.governorate_id}/", None),
+            (None, "get", "/api/v1/cities/", None),
+            (None, "get", f"/api/v1/cities/{city_id}/", None),
+            (None, "get", "/api/v1/neighborhoods/", None),
+            (None, "get", f"/api/v1/neighborhoods/{listing.neighborhood_id}/", None),
+            (None, "get", "/api/v1/listings/", None),
+            (None, "get", f"/api/v1/listings/?category={category_id}&attr_color=red&city={city_id}", None),
+            (None, "get", f"/api/v1/listings/{listing.id}/", None),
+            (None, "get", f"/api/v1/listings/{listing.id}/images/", None),
+            (None, "get", f"/api/v1/listings/{listing.id}/questions/", None),
+            (self.seller, "get", "/api/v1/listings/mine/", None),
+            (self.seller, "post", "/api/v1/listings/bulk_update/", {"ids": [listing.id], "data": {"price": 5}}),
+            (self.staff, "get", "/api/v1/listings/?include_removed=1", None),
+            (self.staff, "get", f"/api/v1/listings/{listing.id}/duplicates/", None),
+            (None, "get", f"/api/v1/questions/{question.id}/", None),
+            (self.buyer, "get", "/api/v1/threads/", None),
+            (self.buyer, "get", f"/api/v1/threads/{thread.id}/", None),
+            (self.buyer, "get", f"/api/v1/threads/{thread.id}/messages/", None),
+            (self.buyer, "post", f"/api/v1/threads/{thread.id}/messages/", {"thread": thread.id, "body": "Deal"}),
+            (self.buyer, "get", "/api/v1/reports/", None),
+            (self.staff, "get", "/api/v1/reports/", None),
+            (self.staff, "get", f"/api/v1/reports/{report.id}/", None),
+            # Writes.
+            (self.buyer, "post", f"/api/v1/listings/{listing.id}/questions/", {"question": "Warranty?"}),
+            (self.seller, "post", f"/api/v1/questions/{question.id}/answer/", {"answer": "Yes"}),
+            (self.staff, "post", "/api/v1/threads/", {"listing_id": listing.id}),
+            (self.buyer, "patch", f"/api/v1/threads/{thread.id}/", {}),
+            (self.buyer, "put", f"/api/v1/threads/{thread.id}/", {"listing": listing.id}),
+            (self.staff, "post", "/api/v1/reports/", {"listing": listing.id, "reason": "other"}),
+            (self.staff, "patch", f"/api/v1/reports/{report.id}/", {"status": "resolved"}),
+            (self.staff, "post", f"/api/v1/listings/{listing.id}/moderate/", {"moderation_status": "approved"}),
+            (self.seller, "patch", f"/api/v1/listings/{listing.id}/", {"title": "Renamed"}),
+            (self.seller, "patch", f"/api/v1/listings/{listing.id}/", {"attributes": {"color": "blue"}}),
+            (
+                self.seller,
+                "put",
+                f"/api/v1/listings/{listing.id}/",
+                {
+                    "title": "Replaced", "description": "d", "price": "20", "currency": "USD",
+                    "category": category_id, "governorate": listing.governorate_id, "city": city_id,
+                    "status": "published", "attributes": {"color": "red"},
+                },
+            ),
+            (self.seller, "post", f"/api/v1/listings/{listing.id}/renew/", None),
+            (self.seller, "post", "/api/v1/listings/bulk_update/", {"ids": [listing.id], "status": "archived"}),
+            (self.seller, "post", "/api/v1/listings/bulk_update/", {"ids": [listing.id], "status": "published"}),
+            (
+                self.staff, "post", "/api/v1/listings/bulk_update/",
+                {"ids": [listing.id], "moderation_status": "rejected"},
+            ),
+            (self.staff, "post", "/api/v1/listings/bulk_update/", {"ids": [listing.id], "is_flagged": True}),
+            (
+                self.seller,
+                "post",
+                "/api/v1/listings/",
+                {
+                    "title": "Fresh", "description": "d", "price": "10", "currency": "SYP",
+                    "category": category_id, "governorate": listing.governorate_id, "city": city_id,
+                },
+            ),
+            (self.seller, "post", f"/api/v1/listings/{listing.id}/images/", {"image": _jpeg(listing.id)},
+             "multipart"),
+            (self.seller, "post", f"/api/v1/listings/{listing.id}/images/reorder/", {"order": image_ids[::-1]}),
+            (self.seller, "delete", f"/api/v1/listings/{listing.id}/images/{image_ids[0]}/", None),
+            (self.buyer, "delete", f"/api/v1/threads/{thread.id}/", None),
+            (self.seller, "delete", f"/api/v1/listings/{listing.id}/", None),
+        ]
+
+    def _run(self, n: int) -> list[tuple[str, int]]:
+        cache.clear()
+        listing = self._make_rows(n)[0]
+        thread = PrivateThread.objects.filter(listing=listing).first()
+        question = PublicQuestion.objects.filter(listing=listing).first()
+        report = ListingReport.objects.filter(listing=listing).first()
+        counts = []
+        for user, method, url, body, *fmt in self._requests(listing, thread, question, report):
+            self.client.force_authenticate(user)
+            res = getattr(self.client, method)(url, body, format=fmt[0] if fmt else "json")
+            self.assertLess(res.status_code, 300, (url, res.status_code, getattr(res, "data", None)))
+            counts.append((f"{method} {url}", _queries(res)))
+        return counts
+
+    def test_endpoints_within_budget_and_flat_in_row_count(self):
+        few = self._run(2)
+        many = self._run(10)
+        self.assertEqual([n for _, n in few], [n for _, n in many], list(zip(few, many)))
+
+    def test_exceeding_budget_fails(self):
+        self._make_rows(2)
+        with override_settings(QUERY_BUDGET_STRICT=True):
+            from api.v1.views import GovernorateViewSet
+
+            original = GovernorateViewSet.query_budgets
+            GovernorateViewSet.query_budgets = {"list": 0}
+            try:
+                with self.assertRaises(QueryBudgetExceeded):
+                    self.client.get("/api/v1/governorates/")
+            finally:
+                GovernorateViewSet.query_budgets = original
+
+
+class ServerTimingTests(TestCase):
+    def test_server_timing_header(self):
+        Governorate.objects.create(name_ar="م", name_en="Timing Gov", slug="timing-gov")
+        res = APIClient().get("/api/v1/governorates/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        header = res["Server-Timing"]
+        self.assertRegex(header, r'^db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, total;dur=[\d.]+$')
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_header_can_be_disabled(self):
+        self.assertNotIn("Server-Timing", APIClient().get("/api/v1/governorates/"))
+
+    def test_over_budget_is_logged_outside_tests(self):
+        from api.v1.views import GovernorateViewSet
+
+        original = GovernorateViewSet.query_budgets
+        GovernorateViewSet.query_budgets = {"list": 0}
+        try:
+            with self.assertLogs("api.instrumentation", level="WARNING") as logs:
+                res = APIClient().get("/api/v1/governorates/")
+        finally:
+            GovernorateViewSet.query_budgets = original
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("GovernorateViewSet.list ran 2 queries (budget 0)", logs.output[0])
+
+
+@override_settings(NPLUSONE_DETECTION_ENABLED=True, NPLUSONE_THRESHOLD=3, NPLUSONE_HEADER_ENABLED=True)
+class RepeatedQueryShapeTests(TestCase):
+    def setUp(self):
+        for g in range(4):
+            gov = Governorate.objects.create(name_ar=f"م{g}", name_en=f"Shape Gov {g}", slug=f"shape-gov-{g}")
+            City.objects.create(
+                governorate=gov, name_ar=f"مد{g}", name_en=f"Shape City {g}", slug=f"shape-city-{g}"
+            )
+
+    def _get(self, view):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        from api.instrumentation import SQLInstrumentationMiddleware
+
+        def handler(request):
+            view()
+            return HttpResponse("ok")
+
+        return SQLInstrumentationMiddleware(handler)(RequestFactory().get("/shapes/"))
+
+    def test_fingerprint_normalizes_literals(self):
+        from api.instrumentation import fingerprint_sql
+
+        self.assertEqual(
+            fingerprint_sql("SELECT * FROM t WHERE id = 7 AND name = 'it''s'  AND x IN (%s, %s, %s)"),
+            fingerprint_sql("SELECT * FROM t WHERE id = %s AND name = %s AND x IN (%s)"),
+        )
+        self.assertEqual(fingerprint_sql("SELECT a FROM t1 WHERE b = 2"), "SELECT a FROM t1 WHERE b = ?")
+
+    def test_repeated_shape_is_logged_with_call_site(self):
+        def n_plus_one():
+            for city in City.objects.filter(slug__startswith="shape-"):
+                city.governorate.name_en
+
+        with self.assertLogs("api.instrumentation", level="WARNING") as logs:
+            res = self._get(n_plus_one)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("ran 4 times", logs.output[0])
+        self.assertIn("api/tests/test_query_budgets.py:", logs.output[0])
+        self.assertIn('"market_governorate"', logs.output[0])
+        self.assertRegex(
+            res["X-Repeated-Queries"], r'^4;site="api/tests/test_query_budgets\.py:\d+ \(n_plus_one\)"$'
+        )
+
+    def test_batched_queries_are_not_reported(self):
+        def batched():
+            for city in City.objects.filter(slug__startswith="shape-").select_related("governorate"):
+                city.governorate.name_en
+
+        res = self._get(batched)
+        self.assertNotIn("X-Repeated-Queries", res)
+
+    @override_settings(NPLUSONE_HEADER_ENABLED=False)
+    def test_header_is_opt_in(self):
+        def n_plus_one():
+            for city in City.objects.filter(slug__startswith="shape-"):
+                city.governorate.name_en
+
+        with self.assertLogs("api.instrumentation", level="WARNING"):
+            res = self._get(n_plus_one)
+        self.assertNotIn("X-Repeated-Queries", res)
@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.query_plans import SEQ_SCAN, TEMP_SORT, PlanIssue, plan_issues, queryset_plan_issues
+from api.v1.views import ListingViewSet
+from market.models import Category, CategoryAttributeDefinition, City
+from market.visibility import SignedInFeed
+
+User = get_user_model()
+
+# (name, user, query params, allowed (kind, table) issues with the reason).
+# Adding a predicate to ListingViewSet.get_queryset that stops the feed indexes
+# from serving a case fails it here; extend the allowlist only deliberately.
+CATALOG = [
+    ("feed", None, {}, {}),
+    ("feed_newest_first", None, {"ordering": "-created_at"}, {}),
+    ("city", None, {"city": "{city}"}, {}),
+    ("city_multi", None, {"city": "{city},{other_city}"}, {}),
+    ("category_subtree", None, {"category": "{category}"}, {}),
+    ("category_city", None, {"category": "{category}", "city": "{city}"}, {}),
+    ("governorate", None, {"governorate": "{governorate}"}, {}),
+    ("seller", None, {"seller": "{seller}"}, {}),
+    ("search", None, {"search": "corolla"}, {}),
+    ("price_range", None, {"price_min": "100", "price_max": "5000"}, {}),
+    ("attr_enum", None, {"category": "{category}", "attr_fuel": "diesel"}, {}),
+    ("attr_int_range", None, {"category": "{category}", "attr_year__gte": "2015"}, {}),
+    (
+        "price_ordering",
+        None,
+        {"ordering": "-price"},
+        {
+            (TEMP_SORT, "market_listing"): (
+                "Postgres walks listing_public_price_norm_idx; SQLite's rule-based planner prefers the "
+                "status index and sorts"
+            ),
+        },
+    ),
+    ("signed_in_feed", "user", {}, {}),
+    ("signed_in_city", "user", {"city": "{city}"}, {}),
+    (
+        "staff_include_removed",
+        "staff",
+        {"include_removed": "1"},
+        {
+            (SEQ_SCAN, "market_listing"): "staff see every row; nothing to narrow on",
+            (TEMP_SORT, "market_listing"): "no index on created_at alone",
+        },
+    ),
+]
+
+
+class ListingQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username="plan_seller", password="pass12345")
+        cls.staff = User.objects.create_user(username="plan_staff", password="pass12345", is_staff=True)
+        cls.category = Category.objects.create(name_ar="سيارات", name_en="Plan Cars", slug="plan-cars")
+        Category.objects.create(name_ar="سيدان", name_en="Plan Sedans", slug="plan-sedans", parent=cls.category)
+        CategoryAttributeDefinition.objects.create(
+            category=cls.category, key="fuel", label_ar="وقود", label_en="Fuel", type="enum",
+            choices=["diesel", "petrol"], is_filterable=True,
+        )
+        CategoryAttributeDefinition.objects.create(
+            category=cls.category, key="year", label_ar="سنة", label_en="Year", type="int", is_filterable=True,
+        )
+        cls.city, cls.other_city = City.objects.select_related("governorate")[:2]
+
+    def _querysets(self, user, params):
+        values = {
+            "city": self.city.id,
+            "other_city": self.other_city.id,
+            "governorate": self.city.governorate_id,
+            "category": self.category.id,
+            "seller": self.seller.id,
+        }
+        params = {key: value.format(**values) for key, value in params.items()}
+        request = Request(APIRequestFactory().get("/api/v1/listings/", params))
+        request.user = {"user": self.seller, "staff": self.staff}.get(user) or AnonymousUser()
+        view = ListingViewSet(action="list", request=request, format_kwarg=None, args=(), kwargs={})
+        queryset = view.filter_queryset(view.get_queryset())
+        # The page the list action would fetch; a signed-in feed reads each stream.
+        streams = queryset.streams if isinstance(queryset, SignedInFeed) else [queryset]
+        return [stream[:20] for stream in streams]
+
+    def test_listing_feed_plans(self):
+        for name, user, params, allowed in CATALOG:
+            for queryset in self._querysets(user, params):
+                with self.subTest(name):
+                    issues, lines = queryset_plan_issues(queryset)
+                    unexpected = [str(issue) for issue in issues if (issue.kind, issue.table) not in allowed]
+                    self.assertEqual(unexpected, [], f"{connection.vendor} plan for {name}:\n" + "\n".join(lines))
+
+
+class PlanParserTests(SimpleTestCase):
+    def test_postgres_plan(self):
+        lines = [
+            "Limit  (cost=1.1..2.2 rows=20 width=8)",
+            "  ->  Sort  (cost=1.1..2.2 rows=20 width=8)",
+            "        Sort Key: market_listing.price DESC",
+            "        ->  Seq Scan on market_listing  (cost=0.0..1.0 rows=1 width=8)",
+            "              Filter: (NOT is_removed)",
+            "  ->  Seq Scan on market_category  (cost=0.0..1.0 rows=1 width=8)",
+            "  ->  Index Scan Backward using market_list_status_idx on market_listing  (cost=0.1..8.1 rows=1)",
+        ]
+        issues = plan_issues(lines, vendor="postgresql", main_table="market_listing")
+        self.assertEqual(
+            [(i.kind, i.table) for i in issues], [(TEMP_SORT, "market_listing"), (SEQ_SCAN, "market_listing")]
+        )
+
+    def test_sqlite_plan(self):
+        lines = [
+            "SCAN market_listing",
+            "SCAN market_listing USING INDEX market_list_status_idx",
+            "SEARCH market_listingattributevalue USING INDEX x (listing_id=?)",
+            "SCAN market_category",
+            "USE TEMP B-TREE FOR ORDER BY",
+        ]
+        issues = plan_issues(lines, vendor="sqlite", main_table="market_listing")
+        self.assertEqual(issues[0], PlanIssue(SEQ_SCAN, "market_listing", "SCAN market_listing"))
+        self.assertEqual([(i.kind, i.table) for i in issues[1:]], [(TEMP_SORT, "market_listing")])
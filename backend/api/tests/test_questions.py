@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from market.models import Category, City, Governorate, Listing, ListingStatus, ModerationStatus
+from messaging.models import PublicQuestion
+
+User = get_user_model()
+
+
+class ListingQuestionsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username="seller", password="pass1234")
+        self.buyer = User.objects.create_user(username="buyer", password="pass1234")
+        category = Category.objects.create(name_ar="تجربة", name_en="Test QA", slug="test-qa")
+        gov = Governorate.objects.create(name_ar="محافظة تجربة", name_en="Test Gov", slug="test-gov")
+        city = City.objects.create(governorate=gov, name_ar="مدينة", name_en="Test City", slug="test-city")
+        self.listing = Listing.objects.create(
+            seller=self.seller,
+            title="Phone",
+            category=category,
+            governorate=gov,
+            city=city,
+            status=ListingStatus.PUBLISHED,
+            moderation_status=ModerationStatus.APPROVED,
+        )
+        self.url = f"/api/v1/listings/{self.listing.id}/questions/"
+
+    def test_paginated_answered_first(self):
+        for i in range(3):
+            PublicQuestion.objects.create(listing=self.listing, author=self.buyer, question=f"q{i}")
+        answered = PublicQuestion.objects.filter(question="q0").first()
+
+        self.client.force_authenticate(self.seller)
+        r = self.client.post(f"/api/v1/questions/{answered.id}/answer/", {"answer": "yes"}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(None)
+        r = self.client.get(self.url, {"page_size": 2})
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(r.data["count"], 3)
+        self.assertEqual(len(r.data["results"]), 2)
+        self.assertEqual(r.data["results"][0]["id"], answered.id)
+
+    def test_cache_invalidated_on_create_and_answer(self):
+        r = self.client.get(self.url)
+        self.assertEqual(r.data["count"], 0)
+
+        # Served from cache: only the listing lookup (and its image prefetch) hits the DB.
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+        self.client.force_authenticate(self.buyer)
+        r = self.client.post(self.url, {"question": "Still available?"}, format="json")
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        question_id = r.data["id"]
+
+        r = self.client.get(self.url)
+        self.assertEqual(r.data["count"], 1)
+        self.assertEqual(r.data["results"][0]["answer"], "")
+
+        self.client.force_authenticate(self.seller)
+        self.client.post(f"/api/v1/questions/{question_id}/answer/", {"answer": "Yes"}, format="json")
+
+        r = self.client.get(self.url)
+        self.assertEqual(r.data["results"][0]["answer"], "Yes")
+
+    def test_cached_page_links_follow_the_request(self):
+        for i in range(3):
+            PublicQuestion.objects.create(listing=self.listing, author=self.buyer, question=f"q{i}")
+
+        r = self.client.get(self.url, {"page_size": 2}, HTTP_HOST="localhost")
+        self.assertEqual(r.data["next"], f"http://localhost{self.url}?page=2&page_size=2")
+        self.assertIsNone(r.data["previous"])
+
+        r = self.client.get(self.url, {"page_size": 2}, secure=True)
+        self.assertEqual(r.data["next"], f"https://testserver{self.url}?page=2&page_size=2")
+
+        r = self.client.get(self.url, {"page_size": 2, "page": 2}, secure=True)
+        self.assertIsNone(r.data["next"])
+        self.assertEqual(r.data["previous"], f"https://testserver{self.url}?page_size=2")
+        self.assertEqual(len(r.data["results"]), 1)
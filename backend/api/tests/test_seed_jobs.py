@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from market.models import AdminSeedJob, AdminSeedJobLog, AdminSeedJobStatus
+from market.seed_jobs import SeedJobReporter, read_job_log, report_progress
+from taskqueue.worker import Worker
+
+User = get_user_model()
+
+
+class SeedJobProgressTests(TransactionTestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="staff", password="pass12345", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_reporter_streams_lines_and_progress(self):
+        job = AdminSeedJob.objects.create(
+            scenario="demo", status=AdminSeedJobStatus.RUNNING, started_at=timezone.now()
+        )
+        with SeedJobReporter(job.id, flush_seconds=3600) as reporter:
+            reporter.write("line 0\nline 1\nli")
+            report_progress(5, 20)
+            reporter.persist()
+            reporter.write("ne 2\n")
+            for n in range(3, 10):
+                reporter.write(f"line {n}\n")
+            reporter.write("unterminated")
+
+        job.refresh_from_db()
+        self.assertEqual(job.log_lines, 11)
+        self.assertEqual((job.progress_processed, job.progress_total), (5, 20))
+        self.assertEqual(AdminSeedJobLog.objects.filter(job=job).count(), 2)
+        self.assertTrue(reporter.tail().endswith("line 9\nunterminated"))
+        # Outside a job, progress reports are dropped.
+        report_progress(1, 1)
+
+        lines, next_offset = read_job_log(job.id, 0, 1000)
+        self.assertEqual(lines, [f"line {n}" for n in range(10)] + ["unterminated"])
+        self.assertEqual(next_offset, 11)
+        # Offsets and limits cut across chunk boundaries.
+        self.assertEqual(read_job_log(job.id, 1, 2), (["line 1", "line 2"], 3))
+        self.assertEqual(read_job_log(job.id, 11, 10), ([], 11))
+
+    def test_job_endpoint_returns_only_new_lines(self):
+        job = AdminSeedJob.objects.create(
+            scenario="demo",
+            status=AdminSeedJobStatus.RUNNING,
+            started_at=timezone.now() - timedelta(seconds=10),
+            output="legacy blob",
+        )
+        with SeedJobReporter(job.id, flush_seconds=3600) as reporter:
+            reporter.write("a\nb\nc\n")
+            reporter.progress(25, 100)
+
+        url = f"/api/v1/admin/seed/jobs/{job.id}/"
+        res = self.client.get(url, {"log_offset": 1})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("output", res.data)
+        self.assertEqual(res.data["log"], {"offset": 1, "next_offset": 3, "lines": ["b", "c"]})
+        progress = res.data["progress"]
+        self.assertEqual((progress["processed"], progress["total"], progress["percent"]), (25, 100, 25.0))
+        self.assertGreater(progress["rate_per_second"], 0)
+        self.assertGreater(progress["eta_seconds"], 0)
+
+        res = self.client.get(url, {"log_offset": 3})
+        self.assertEqual(res.data["log"]["lines"], [])
+
+        res = self.client.get(url)
+        self.assertEqual(res.data["output"], "legacy blob")
+        self.assertNotIn("log", res.data)
+
+        res = self.client.get(url, {"log_offset": "x"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seed_listings_job_reports_progress(self):
+        with override_settings(ADMIN_SEEDING_ENABLED=True):
+            res = self.client.post(
+                "/api/v1/admin/seed/",
+                {
+                    "scenario": "seed_listings",
+                    "options": {"per_category": 1, "max_categories": 3, "no_images": True, "sleep_seconds": 0.001},
+                },
+                format="json",
+            )
+            job_id = res.data["id"]
+            Worker(concurrency=1, names=["market.run_seed_job"], poll_seconds=0.05).run(drain=True)
+
+        job = AdminSeedJob.objects.get(id=job_id)
+        self.assertEqual(job.status, AdminSeedJobStatus.SUCCEEDED, job.error)
+        self.assertGreater(job.progress_total, 0)
+        self.assertEqual(job.progress_processed, job.progress_total)
+        lines, _ = read_job_log(job_id, 0, 1000)
+        self.assertIn("Listing seeding complete", "\n".join(lines))
+        self.assertIn("Listing seeding complete", job.output)
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import SlowQuery
+from api.slow_queries import param_shape
+from market.models import Governorate
+
+User = get_user_model()
+
+
+# Any positive threshold below a real statement's duration records everything.
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0.000001)
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.gov = Governorate.objects.create(name_ar="م", name_en="Slow Gov", slug="slow-gov")
+
+    def test_records_statement_view_call_site_and_plan(self):
+        res = APIClient().get(f"/api/v1/cities/?governorate={self.gov.id}")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        row = SlowQuery.objects.filter(view="CityViewSet.list", sql__contains='FROM "market_city"').last()
+        self.assertIsNotNone(row)
+        self.assertEqual(row.method, "GET")
+        self.assertEqual(row.path, "/api/v1/cities/")
+        self.assertEqual(row.database, "default")
+        self.assertGreater(row.duration_ms, 0)
+        self.assertIn('"market_city"."governorate_id" = ?', row.fingerprint)
+        self.assertIn("int", row.param_shape)
+        self.assertIn("market_city", row.plan)
+        self.assertTrue(row.call_site)
+
+    def test_ring_buffer_keeps_newest_rows(self):
+        with override_settings(SLOW_QUERY_LOG_SIZE=3):
+            for _ in range(3):
+                APIClient().get("/api/v1/governorates/")
+        self.assertLessEqual(SlowQuery.objects.count(), 3)
+        self.assertEqual(SlowQuery.objects.first().view, "GovernorateViewSet.list")
+
+    @override_settings(SLOW_QUERY_SAMPLE_RATE=0.0)
+    def test_sampling_can_skip_everything(self):
+        APIClient().get("/api/v1/governorates/")
+        self.assertFalse(SlowQuery.objects.exists())
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_threshold_zero_disables(self):
+        APIClient().get("/api/v1/governorates/")
+        self.assertFalse(SlowQuery.objects.exists())
+
+    @override_settings(
+        STORAGES={
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+        }
+    )
+    def test_admin_lists_slow_queries(self):
+        admin = User.objects.create_superuser(username="slow_admin", password="pass12345", email="a@example.com")
+        APIClient().get("/api/v1/governorates/")
+        client = self.client
+        client.force_login(admin)
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0):
+            res = client.get("/admin/api/slowquery/")
+            self.assertEqual(res.status_code, 200)
+            self.assertContains(res, "GovernorateViewSet.list")
+            detail = client.get(f"/admin/api/slowquery/{SlowQuery.objects.first().id}/change/")
+            self.assertEqual(detail.status_code, 200)
+
+    def test_param_shape(self):
+        self.assertEqual(param_shape((1, "a", None)), "int, str, NoneType")
+        self.assertEqual(param_shape([(1, 2.5)], many=True), "int, float")
+        self.assertEqual(param_shape(None), "")
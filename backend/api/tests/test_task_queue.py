@@ -0,0 +1,151 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from market.models import AdminSeedJob, AdminSeedJobStatus
+from taskqueue import queue
+from taskqueue.models import Task, TaskStatus
+from taskqueue.registry import task
+from taskqueue.worker import Worker
+
+User = get_user_model()
+
+calls: list = []
+
+
+@task("tests.record", priority=0)
+def record(*, value):
+    calls.append(value)
+    return {"value": value}
+
+
+@task("tests.flaky", max_attempts=3, retry_backoff=10)
+def flaky(*, value):
+    raise RuntimeError(f"boom {value}")
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claims_by_priority_and_completes(self):
+        low = queue.enqueue("tests.record", {"value": "low"})
+        high = queue.enqueue("tests.record", {"value": "high"}, priority=5)
+        later = queue.enqueue("tests.record", {"value": "later"}, run_at=timezone.now() + timedelta(hours=1))
+
+        claimed = queue.claim("w1", 10)
+        self.assertEqual([t.id for t in claimed], [high.id, low.id])
+        self.assertEqual(queue.claim("w2", 10), [])
+
+        for t in claimed:
+            self.assertTrue(queue.execute(t, worker_id="w1"))
+        self.assertEqual(calls, ["high", "low"])
+        high.refresh_from_db()
+        self.assertEqual(high.status, TaskStatus.SUCCEEDED)
+        self.assertEqual(high.result, {"value": "high"})
+        later.refresh_from_db()
+        self.assertEqual(later.status, TaskStatus.QUEUED)
+
+    def test_failures_back_off_then_fail(self):
+        t = queue.enqueue("tests.flaky", {"value": 1})
+        for attempt in (1, 2):
+            (claimed,) = queue.claim("w1", 1)
+            with self.assertLogs("taskqueue.queue", level="ERROR"):
+                self.assertFalse(queue.execute(claimed, worker_id="w1"))
+            t.refresh_from_db()
+            self.assertEqual((t.status, t.attempts), (TaskStatus.QUEUED, attempt))
+            # 10s then 20s, each +/- 20% jitter.
+            delay = (t.run_at - timezone.now()).total_seconds()
+            self.assertGreater(delay, 10 * 2 ** (attempt - 1) * 0.8 - 1)
+            self.assertLess(delay, 10 * 2 ** (attempt - 1) * 1.2 + 1)
+            Task.objects.filter(id=t.id).update(run_at=timezone.now())
+
+        (claimed,) = queue.claim("w1", 1)
+        with self.assertLogs("taskqueue.queue", level="ERROR"):
+            queue.execute(claimed, worker_id="w1")
+        t.refresh_from_db()
+        self.assertEqual((t.status, t.attempts), (TaskStatus.FAILED, 3))
+        self.assertIn("boom 1", t.last_error)
+
+    def test_expired_lease_is_requeued_and_late_result_discarded(self):
+        t = queue.enqueue("tests.record", {"value": "x"})
+        (claimed,) = queue.claim("dead-worker", 1)
+        Task.objects.filter(id=t.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(queue.requeue_expired(), 1)
+        (reclaimed,) = queue.claim("w2", 1)
+        self.assertEqual(reclaimed.attempts, 2)
+        # The original worker lost its lease: it can neither heartbeat nor settle.
+        self.assertEqual(queue.heartbeat("dead-worker", [t.id]), 0)
+        self.assertFalse(queue.complete(claimed, "dead-worker"))
+        self.assertTrue(queue.complete(reclaimed, "w2"))
+
+    def test_retry_yields_to_a_queued_duplicate(self):
+        failing = queue.enqueue("tests.flaky", {"value": 1}, dedupe_key="k")
+        (claimed,) = queue.claim("w1", 1)
+        queue.enqueue("tests.flaky", {"value": 2}, dedupe_key="k")
+        with self.assertLogs("taskqueue.queue", level="ERROR"):
+            self.assertFalse(queue.execute(claimed, worker_id="w1"))
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, TaskStatus.FAILED)
+
+        expired = queue.enqueue("tests.record", {"value": 1}, dedupe_key="k")
+        other = queue.enqueue("tests.record", {"value": 2})
+        queue.claim("dead-worker", 2, names=["tests.record"])
+        queue.enqueue("tests.record", {"value": 3}, dedupe_key="k")
+        Task.objects.filter(id__in=[expired.id, other.id]).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(queue.requeue_expired(), 2)
+        expired.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((expired.status, other.status), (TaskStatus.FAILED, TaskStatus.QUEUED))
+
+    def test_dedupe_key_returns_queued_task(self):
+        first = queue.enqueue("tests.record", {"value": 1}, dedupe_key="k")
+        second = queue.enqueue("tests.record", {"value": 2}, dedupe_key="k")
+        self.assertEqual(first.id, second.id)
+
+        queue.claim("w1", 1)
+        third = queue.enqueue("tests.record", {"value": 3}, dedupe_key="k")
+        self.assertNotEqual(third.id, first.id)
+
+    @override_settings(TASKQUEUE_EAGER=True)
+    def test_eager_runs_inline(self):
+        t = queue.enqueue("tests.record", {"value": "now"})
+        self.assertEqual(t.status, TaskStatus.SUCCEEDED)
+        self.assertEqual(calls, ["now"])
+
+
+class TaskWorkerTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_drains_queue(self):
+        for n in range(6):
+            queue.enqueue("tests.record", {"value": n})
+        # The in-memory test database (SQLite shared cache) fails concurrent writers
+        # with "table is locked" instead of waiting, so settle from one thread here.
+        processed = Worker(concurrency=1, names=["tests.record"], poll_seconds=0.05).run(drain=True)
+        self.assertEqual(processed, 6)
+        self.assertEqual(sorted(calls), list(range(6)))
+        self.assertFalse(Task.objects.exclude(status=TaskStatus.SUCCEEDED).exists())
+
+    def test_admin_seed_job_runs_on_queue(self):
+        staff = User.objects.create_user(username="staff", password="pass12345", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        with override_settings(ADMIN_SEEDING_ENABLED=True):
+            res = client.post("/api/v1/admin/seed/", {"scenario": "demo"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        job_id = res.data["id"]
+        self.assertTrue(Task.objects.filter(name="market.run_seed_job", payload__job_id=job_id).exists())
+
+        Worker(concurrency=1, names=["market.run_seed_job"], poll_seconds=0.05).run(drain=True)
+        job = AdminSeedJob.objects.get(id=job_id)
+        self.assertEqual(job.status, AdminSeedJobStatus.SUCCEEDED, job.error)
+        self.assertIsNotNone(job.result)
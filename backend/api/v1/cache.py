@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import cache
+
+from api.metrics import record_cache_lookup
+
+
+def _questions_version_key(listing_id: int) -> str:
+    return f"v1:listing:{listing_id}:questions:version"
+
+
+def listing_questions_version(listing_id: int) -> int:
+    key = _questions_version_key(listing_id)
+    version = cache.get(key)
+    if version is None:
+        # Never expire the version counter; a reset would resurrect stale pages.
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key) or 1
+    return int(version)
+
+
+def listing_questions_cache_key(listing_id: int, *, page: str, page_size: str) -> str:
+    version = listing_questions_version(listing_id)
+    return f"v1:listing:{listing_id}:question-pages:{version}:{page}:{page_size}"
+
+
+def get_cached_listing_questions(listing_id: int, *, page: str, page_size: str):
+    data = cache.get(listing_questions_cache_key(listing_id, page=page, page_size=page_size))
+    record_cache_lookup("listing_questions", data is not None)
+    return data
+
+
+def set_cached_listing_questions(listing_id: int, data, *, page: str, page_size: str) -> None:
+    cache.set(
+        listing_questions_cache_key(listing_id, page=page, page_size=page_size),
+        data,
+        timeout=settings.PUBLIC_QUESTIONS_CACHE_SECONDS,
+    )
+
+
+def invalidate_listing_questions(listing_id: int) -> None:
+    # Bumping the version orphans every cached page for the listing at once;
+    # old entries simply expire.
+    key = _questions_version_key(listing_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 2, timeout=None)
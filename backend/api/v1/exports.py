@@ -0,0 +1,125 @@
+"""Streaming staff exports (``/api/v1/exports/<dataset>.<ndjson|csv>``).
+
+Rows are read in primary-key order by keyset: each chunk is one
+``pk > last`` query of ``EXPORT_CHUNK_SIZE`` rows, fetched as plain tuples.
+Only one chunk is in memory at a time and no cursor or transaction is held
+between chunks, so an export of any size runs in constant memory and works
+behind a transaction-pooling proxy. Each chunk is encoded and handed to the
+response as one piece, gzip-compressed when the client accepts it.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import re
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from rest_framework.negotiation import BaseContentNegotiation
+
+from market.keyset import keyset_chunks
+
+# (column, field path) per dataset, in output order.
+LISTING_COLUMNS = (
+    ("id", "id"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+    ("title", "title"),
+    ("description", "description"),
+    ("status", "status"),
+    ("moderation_status", "moderation_status"),
+    ("is_flagged", "is_flagged"),
+    ("is_removed", "is_removed"),
+    ("price", "price"),
+    ("currency", "currency"),
+    ("price_normalized", "price_normalized"),
+    ("category_id", "category_id"),
+    ("category_slug", "category__slug"),
+    ("governorate_id", "governorate_id"),
+    ("city_id", "city_id"),
+    ("neighborhood_id", "neighborhood_id"),
+    ("seller_id", "seller_id"),
+    ("seller_username", "seller__username"),
+    ("latitude", "latitude"),
+    ("longitude", "longitude"),
+)
+REPORT_COLUMNS = (
+    ("id", "id"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+    ("listing_id", "listing_id"),
+    ("listing_title", "listing__title"),
+    ("reporter_id", "reporter_id"),
+    ("reporter_username", "reporter__username"),
+    ("reason", "reason"),
+    ("message", "message"),
+    ("status", "status"),
+    ("handled_by_id", "handled_by_id"),
+    ("handled_at", "handled_at"),
+)
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+_accepts_gzip = re.compile(r"\bgzip\b")
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """The export format comes from the URL; any Accept header is fine."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0] if parsers else None
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def _ndjson(columns, chunks):
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n" for row in rows
+        ).encode()
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv(columns, chunks):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns).encode()
+    for rows in chunks:
+        yield "".join(writer.writerow([_csv_value(value) for value in row]) for row in rows).encode()
+
+
+ENCODERS = {"ndjson": _ndjson, "csv": _csv}
+
+
+def export_response(request, queryset: QuerySet, spec, *, dataset: str, fmt: str, chunk_size: int):
+    columns = [column for column, _ in spec]
+    content = ENCODERS[fmt](columns, keyset_chunks(queryset, [field for _, field in spec], chunk_size))
+    gzip = bool(_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+    response = StreamingHttpResponse(
+        compress_sequence(content) if gzip else content, content_type=CONTENT_TYPES[fmt]
+    )
+    if gzip:
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    stamp = timezone.now().strftime("%Y%m%dT%H%M%SZ")
+    response["Content-Disposition"] = f'attachment; filename="{dataset}-{stamp}.{fmt}"'
+    response["Cache-Control"] = "no-store"
+    # Ask buffering proxies (nginx) to pass chunks through as they come.
+    response["X-Accel-Buffering"] = "no"
+    return response
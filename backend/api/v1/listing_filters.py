@@ -0,0 +1,386 @@
+"""Listing filters: query params parsed once into a canonical plan.
+
+The list filters are declared in ``LISTING_FILTERS`` (plus the ``attr_*``
+family). ``parse_listing_filters`` validates and normalizes them into a
+``ListingFilterPlan``: ids sorted and de-duplicated, aliases folded, empty
+params dropped. Equal filters give equal plans whatever the param order or
+spelling. Parsing reads no data, so plans are memoized by their raw params,
+and ``ListingFilterPlan.signature`` is a stable key for caches, counts and
+facets.
+
+``ListingFilterPlan.apply`` compiles a plan onto a queryset. Only that step
+reads the database: category subtrees (one query per tree level for all
+selected roots together) and, for ``attr_*`` filters, the attribute
+definitions.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from decimal import Decimal, InvalidOperation
+from functools import cached_property, lru_cache
+from typing import Callable
+
+from django.db.models import OuterRef, QuerySet, Subquery
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+
+from market.models import (
+    Category,
+    CategoryAttributeDefinition,
+    ListingAttributeValue,
+    ListingStatus,
+    ModerationStatus,
+)
+
+# Multi-value filters take comma-separated ids (city=1,2,3) and/or repeated params.
+MAX_FILTER_VALUES = 50
+ATTR_PREFIX = "attr_"
+
+
+def _invalid(message: str) -> ValidationError:
+    return ValidationError({"detail": message})
+
+
+def _parse_bool(value: str) -> bool | None:
+    value = value.strip().lower()
+    if value in {"1", "true", "yes", "y", "on"}:
+        return True
+    if value in {"0", "false", "no", "n", "off"}:
+        return False
+    return None
+
+
+# --- Param parsers: (name, raw values) -> normalized value -------------------
+
+def parse_ids(name: str, raw: list[str]) -> tuple[int, ...]:
+    try:
+        ids = {int(item) for value in raw for item in value.split(",") if item.strip()}
+    except ValueError:
+        raise _invalid(f"Invalid id list for {name}")
+    if len(ids) > MAX_FILTER_VALUES:
+        raise _invalid(f"Too many values for {name} (max {MAX_FILTER_VALUES})")
+    return tuple(sorted(ids))
+
+
+def parse_choice(choices) -> Callable[[str, list[str]], str]:
+    def parse(name: str, raw: list[str]) -> str:
+        value = raw[-1].strip()
+        if value not in choices.values:
+            raise _invalid(f"Invalid {name}: {value}")
+        return value
+
+    return parse
+
+
+def parse_price(name: str, raw: list[str]) -> Decimal:
+    try:
+        price = Decimal(raw[-1].strip())
+    except (InvalidOperation, ValueError):
+        raise _invalid(f"Invalid decimal for {name}")
+    if not price.is_finite():
+        raise _invalid(f"Invalid decimal for {name}")
+    if price < 0:
+        raise _invalid(f"{name} cannot be negative")
+    return price
+
+
+def parse_flag(name: str, raw: list[str]) -> bool:
+    value = _parse_bool(raw[-1])
+    if value is None:
+        raise _invalid(f"Invalid boolean for {name}")
+    return value
+
+
+@dataclass(frozen=True)
+class FilterParam:
+    name: str
+    parse: Callable[[str, list[str]], object]
+    # Alternative spellings; the first one present wins, the canonical name first.
+    aliases: tuple[str, ...] = ()
+
+
+LISTING_FILTERS = (
+    FilterParam("category", parse_ids),
+    FilterParam("governorate", parse_ids),
+    FilterParam("city", parse_ids),
+    FilterParam("neighborhood", parse_ids),
+    FilterParam("seller", parse_ids),
+    FilterParam("status", parse_choice(ListingStatus)),
+    FilterParam("moderation_status", parse_choice(ModerationStatus)),
+    FilterParam("price_min", parse_price, aliases=("price__gte",)),
+    FilterParam("price_max", parse_price, aliases=("price__lte",)),
+    FilterParam("is_flagged", parse_flag),
+    FilterParam("include_removed", parse_flag),
+    FilterParam("is_removed", parse_flag),
+)
+_PARAM_NAMES = tuple(name for spec in LISTING_FILTERS for name in (spec.name, *spec.aliases))
+
+
+# --- Attribute filters: attr_<key>[__<op>]=<value> ----------------------------
+
+def _attr_int(key: str, op: str, value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise _invalid(f"Invalid integer for {key}")
+
+
+def _attr_decimal(key: str, op: str, value: str) -> Decimal:
+    try:
+        return Decimal(value)
+    except (InvalidOperation, ValueError):
+        raise _invalid(f"Invalid decimal for {key}")
+
+
+def _attr_bool(key: str, op: str, value: str) -> bool:
+    parsed = _parse_bool(value)
+    if parsed is None:
+        raise _invalid("Invalid boolean value")
+    return parsed
+
+
+def _attr_enum(key: str, op: str, value: str):
+    if op == "in":
+        items = [item for item in value.split(",") if item]
+        if not items:
+            raise _invalid(f"Invalid list for {key}")
+        return items
+    return value
+
+
+def _attr_text(key: str, op: str, value: str) -> str:
+    return value
+
+
+_ORDERED_OPS = ("eq", "gt", "gte", "lt", "lte")
+# Definition type -> (ListingAttributeValue column, supported ops, value parser).
+ATTRIBUTE_FILTERS = {
+    "int": ("int_value", _ORDERED_OPS, _attr_int),
+    "decimal": ("decimal_value", _ORDERED_OPS, _attr_decimal),
+    "bool": ("bool_value", ("eq",), _attr_bool),
+    "enum": ("enum_value", ("eq", "in"), _attr_enum),
+    "text": ("text_value", ("eq", "icontains"), _attr_text),
+}
+
+
+@dataclass(frozen=True)
+class AttrFilter:
+    key: str
+    op: str
+    # Raw text; "in" lists are stripped, de-duplicated and sorted.
+    value: str
+
+    @classmethod
+    def parse(cls, name: str, value: str) -> AttrFilter:
+        key, _, op = name[len(ATTR_PREFIX):].partition("__")
+        op = op or "eq"
+        if op == "in":
+            value = ",".join(sorted({item.strip() for item in value.split(",") if item.strip()}))
+        return cls(key, op, value)
+
+
+# --- Plans -------------------------------------------------------------------
+
+def _in(field: str, ids) -> dict:
+    # A single value stays an equality, which every index (partial ones included) matches.
+    return {field: ids[0]} if len(ids) == 1 else {f"{field}__in": list(ids)}
+
+
+def category_subtree_ids(root_ids) -> list[int]:
+    """The selected categories and all their descendants, one query per tree level."""
+    ids = list(root_ids)
+    seen = set(ids)
+    frontier = list(ids)
+    while frontier:
+        children = Category.objects.filter(parent_id__in=frontier).values_list("id", flat=True)
+        frontier = [cid for cid in children if cid not in seen]
+        seen.update(frontier)
+        ids.extend(frontier)
+    return ids
+
+
+def attribute_definitions(root_ids) -> dict[str, list[CategoryAttributeDefinition]]:
+    """Per attribute key, the definition each selected category sees.
+
+    A category inherits its ancestors' attributes; a key redefined lower in
+    the tree overrides the inherited one.
+    """
+    chains = [list(reversed(c.ancestor_ids_including_self())) for c in Category.objects.filter(id__in=root_ids)]
+    if not chains:
+        raise _invalid("attr_* filters require category to be set")
+    defs = list(
+        CategoryAttributeDefinition.objects.filter(category_id__in={cid for chain in chains for cid in chain})
+    )
+    by_key: dict[str, dict[int, CategoryAttributeDefinition]] = {}
+    for chain in chains:
+        pos = {cid: idx for idx, cid in enumerate(chain)}
+        visible: dict[str, CategoryAttributeDefinition] = {}
+        inherited = sorted(
+            (d for d in defs if d.category_id in pos), key=lambda d: (pos[d.category_id], d.sort_order)
+        )
+        for d in inherited:
+            visible[d.key] = d
+        for key, d in visible.items():
+            by_key.setdefault(key, {})[d.id] = d
+    return {key: list(found.values()) for key, found in by_key.items()}
+
+
+@dataclass(frozen=True)
+class ListingFilterPlan:
+    category: tuple[int, ...] = ()
+    governorate: tuple[int, ...] = ()
+    city: tuple[int, ...] = ()
+    neighborhood: tuple[int, ...] = ()
+    seller: tuple[int, ...] = ()
+    status: str | None = None
+    moderation_status: str | None = None
+    price_min: Decimal | None = None
+    price_max: Decimal | None = None
+    is_flagged: bool | None = None
+    include_removed: bool = False
+    is_removed: bool | None = None
+    attrs: tuple[AttrFilter, ...] = ()
+
+    @cached_property
+    def signature(self) -> str:
+        """Canonical query string of the plan; equal filters share it."""
+        parts = []
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if value == f.default:
+                continue
+            if f.name == "attrs":
+                parts.extend(f"{ATTR_PREFIX}{a.key}__{a.op}={a.value}" for a in value)
+            elif isinstance(value, tuple):
+                parts.append(f"{f.name}={','.join(map(str, value))}")
+            elif isinstance(value, bool):
+                parts.append(f"{f.name}={int(value)}")
+            elif isinstance(value, Decimal):
+                parts.append(f"{f.name}={value.normalize():f}")
+            else:
+                parts.append(f"{f.name}={value}")
+        return "&".join(parts)
+
+    def apply(self, queryset: QuerySet, *, staff: bool = False) -> QuerySet:
+        qs = queryset
+        # Removed listings are hidden by default. Staff can opt-in via include_removed=1.
+        show_removed = self.include_removed and staff
+        if not show_removed:
+            qs = qs.filter(is_removed=False)
+        if self.status:
+            qs = qs.filter(status=self.status)
+        if self.moderation_status:
+            qs = qs.filter(moderation_status=self.moderation_status)
+        if self.seller:
+            qs = qs.filter(**_in("seller_id", self.seller))
+        if self.category:
+            # Each selected category stands for its whole subtree.
+            qs = qs.filter(**_in("category_id", category_subtree_ids(self.category)))
+        if self.governorate:
+            qs = qs.filter(**_in("governorate_id", self.governorate))
+        if self.city:
+            qs = qs.filter(**_in("city_id", self.city))
+        if self.neighborhood:
+            qs = qs.filter(**_in("neighborhood_id", self.neighborhood))
+        # Price bounds are in PRICE_BASE_CURRENCY, whatever each listing is priced in.
+        if self.price_min is not None:
+            qs = qs.filter(price_normalized__gte=self.price_min)
+        if self.price_max is not None:
+            qs = qs.filter(price_normalized__lte=self.price_max)
+        if self.is_flagged is not None:
+            qs = qs.filter(is_flagged=self.is_flagged)
+        # Staff-only: filtering by is_removed when include_removed is enabled.
+        if show_removed and self.is_removed is not None:
+            qs = qs.filter(is_removed=self.is_removed)
+        if self.attrs:
+            qs = self._apply_attrs(qs)
+        return qs
+
+    def _apply_attrs(self, qs: QuerySet) -> QuerySet:
+        defs_by_key = attribute_definitions(self.category)
+        for idx, attr in enumerate(self.attrs):
+            defs = defs_by_key.get(attr.key)
+            if not defs:
+                raise _invalid(f"Unknown attribute filter: {attr.key}")
+            if not all(d.is_filterable for d in defs):
+                raise _invalid(f"Attribute is not filterable: {attr.key}")
+            if len({d.type for d in defs}) > 1:
+                raise _invalid(f"Attribute {attr.key} has different types in the selected categories")
+            try:
+                column, ops, parse_value = ATTRIBUTE_FILTERS[defs[0].type]
+            except KeyError:
+                raise _invalid(f"Unsupported attribute type for {attr.key}")
+            if attr.op not in ops:
+                raise _invalid(f"Unsupported operator for {attr.key}: {attr.op}")
+
+            lookup = column if attr.op == "eq" else f"{column}__{attr.op}"
+            value_qs = ListingAttributeValue.objects.filter(
+                listing_id=OuterRef("pk"), **_in("definition_id", [d.id for d in defs])
+            ).filter(**{lookup: parse_value(attr.key, attr.op, attr.value)})
+            qs = qs.annotate(**{f"_has_attr_{idx}": Subquery(value_qs.values("id")[:1])}).filter(
+                **{f"_has_attr_{idx}__isnull": False}
+            )
+        return qs
+
+
+def _values(query_params, name: str) -> tuple[str, ...]:
+    if hasattr(query_params, "getlist"):
+        raw = query_params.getlist(name)
+    else:
+        raw = [] if query_params.get(name) is None else [query_params.get(name)]
+    return tuple(str(value) for value in raw if str(value).strip())
+
+
+def parse_listing_filters(query_params) -> ListingFilterPlan:
+    """The filter plan for ``query_params`` (a QueryDict or plain mapping).
+
+    Raises ``ValidationError`` with a ``detail`` message for invalid values.
+    """
+    present = tuple((name, values) for name in _PARAM_NAMES if (values := _values(query_params, name)))
+    attrs = tuple(
+        sorted(
+            (name, values[-1])
+            for name in query_params
+            if name.startswith(ATTR_PREFIX) and (values := _values(query_params, name))
+        )
+    )
+    return _plan_for(present, attrs)
+
+
+@lru_cache(maxsize=1024)
+def _plan_for(present: tuple, attrs: tuple) -> ListingFilterPlan:
+    raw = dict(present)
+    kwargs = {}
+    for spec in LISTING_FILTERS:
+        name = next((n for n in (spec.name, *spec.aliases) if n in raw), None)
+        if name is not None:
+            kwargs[spec.name] = spec.parse(spec.name, list(raw[name]))
+    if attrs:
+        if not kwargs.get("category"):
+            raise _invalid("attr_* filters require category to be set")
+        parsed = {AttrFilter.parse(name, value) for name, value in attrs}
+        kwargs["attrs"] = tuple(sorted(parsed, key=lambda a: (a.key, a.op, a.value)))
+    return ListingFilterPlan(**kwargs)
+
+
+# Tests and benchmarks measure cold parses.
+clear_plan_cache = _plan_for.cache_clear
+
+
+class ListingOrderingFilter(OrderingFilter):
+    """``ordering=price`` sorts by the price in the base currency.
+
+    ``Listing.price`` is in each listing's own currency, so it is not
+    comparable across listings; ``price_normalized`` is (see market.pricing).
+    """
+
+    ordering_aliases = {"price": "price_normalized"}
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [
+            ("-" if term.startswith("-") else "") + self.ordering_aliases.get(term.lstrip("-"), term.lstrip("-"))
+            for term in ordering
+        ]
@@ -0,0 +1,30 @@
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PublicQuestionPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+
+    def get_page_data(self, data) -> dict:
+        """The page without its links, which depend on the requesting host; for caching."""
+        return {"count": self.page.paginator.count, "page": self.page.number, "results": data}
+
+    def get_cached_response_data(self, request, page_data: dict) -> dict:
+        """Rebuild ``get_paginated_response`` data for ``request`` from ``get_page_data``."""
+        url = request.build_absolute_uri()
+        number, count = page_data["page"], page_data["count"]
+        has_next = number * self.get_page_size(request) < count
+        if number <= 1:
+            previous = None
+        elif number == 2:
+            previous = remove_query_param(url, self.page_query_param)
+        else:
+            previous = replace_query_param(url, self.page_query_param, number - 1)
+        return {
+            "count": count,
+            "next": replace_query_param(url, self.page_query_param, number + 1) if has_next else None,
+            "previous": previous,
+            "results": page_data["results"],
+        }
@@ -11,9 +11,13 @@ from market.models import (
     Governorate,
     Listing,
     ListingAttributeValue,
+    ListingEvent,
+    ListingEventKind,
     ListingImage,
     Neighborhood,
 )
+from market import events
+from market.lifecycle import prefetch_archived
 from messaging.models import PrivateMessage, PrivateThread, PublicQuestion
 from reports.models import ListingReport, ReportStatus
 
@@ -142,8 +146,10 @@ class ProfileSerializer(serializers.ModelSerializer):
     avatar = serializers.SerializerMethodField()
     avatar_medium = serializers.SerializerMethodField()
     avatar_thumbnail = serializers.SerializerMethodField()
+    avatar_original = serializers.SerializerMethodField()
     cover = serializers.SerializerMethodField()
     cover_medium = serializers.SerializerMethodField()
+    cover_original = serializers.SerializerMethodField()
     avatar_cache_control = serializers.SerializerMethodField()
     governorate = GovernorateSerializer(read_only=True)
     governorate_id = serializers.PrimaryKeyRelatedField(
@@ -182,10 +188,24 @@ class ProfileSerializer(serializers.ModelSerializer):
             "created_at",
             "avatar_medium",
             "avatar_thumbnail",
+            "avatar_original",
+            "cover_original",
             "avatar_cache_control",
+            "avatar_status",
+            "cover_status",
+            "updated_at",
+        ]
+        read_only_fields = [
+            "id",
+            "user_id",
+            "seller_rating",
+            "listings_count",
+            "followers_count",
+            "avatar_status",
+            "cover_status",
+            "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "user_id", "seller_rating", "listings_count", "followers_count", "created_at", "updated_at"]
 
     def get_avatar(self, obj):
         try:
@@ -212,6 +232,15 @@ class ProfileSerializer(serializers.ModelSerializer):
             return None
 
     def get_avatar(self, obj):
+        # The medium rendition, as before uploads were processed off-request;
+        # None until the first upload has been processed.
+        try:
+            request = self.context.get("request")
+            return self._build_url(request, getattr(obj, "avatar_medium", None))
+        except Exception:
+            return None
+
+    def get_avatar_original(self, obj):
         try:
             request = self.context.get("request")
             return self._build_url(request, getattr(obj, "avatar", None))
@@ -235,12 +264,18 @@ class ProfileSerializer(serializers.ModelSerializer):
     def get_cover(self, obj):
         try:
             request = self.context.get("request")
-            url = getattr(obj, "cover")
-            return self._build_url(request, url)
+            return self._build_url(request, getattr(obj, "cover_medium", None))
         except Exception:
             pass
         return None
 
+    def get_cover_original(self, obj):
+        try:
+            request = self.context.get("request")
+            return self._build_url(request, getattr(obj, "cover", None))
+        except Exception:
+            return None
+
     def get_cover_medium(self, obj):
         try:
             request = self.context.get("request")
@@ -254,7 +289,46 @@ class ProfileSerializer(serializers.ModelSerializer):
         return "max-age=86400"
 
 
+def _absolute_media_url(request, storage, path: str | None):
+    if not path:
+        return None
+    url = storage.url(path)
+    if request is not None and not url.startswith("http://") and not url.startswith("https://"):
+        return request.build_absolute_uri(url)
+    return url
+
+
+def _listing_image_srcset(image: ListingImage, request) -> dict[str, str] | None:
+    # {"jpeg": "<url> 320w, <url> 800w, ...", "webp": "..."} for <source srcset>.
+    derivatives = getattr(image, "derivatives", None) or {}
+    if not derivatives:
+        return None
+
+    storage = image.image.storage
+    out: dict[str, str] = {}
+    for fmt in ("jpeg", "webp"):
+        seen_widths: set[int] = set()
+        parts = []
+        for entry in sorted(derivatives.values(), key=lambda e: int(e.get("width") or 0)):
+            width = int(entry.get("width") or 0)
+            if not width or width in seen_widths or not entry.get(fmt):
+                continue
+            seen_widths.add(width)
+            parts.append(f"{_absolute_media_url(request, storage, entry[fmt])} {width}w")
+        if parts:
+            out[fmt] = ", ".join(parts)
+    return out or None
+
+
 class ListingImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
+    def get_srcset(self, obj):
+        try:
+            return _listing_image_srcset(obj, self.context.get("request"))
+        except Exception:
+            return None
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
         try:
@@ -276,11 +350,22 @@ class ListingImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ListingImage
-        fields = ["id", "image", "alt_text", "sort_order", "created_at"]
+        fields = ["id", "image", "alt_text", "sort_order", "srcset", "created_at"]
         read_only_fields = ["id", "created_at"]
 
 
+class ListingListSerializerList(serializers.ListSerializer):
+    def to_representation(self, data):
+        listings = list(data.all() if hasattr(data, "all") else data)
+        # One query per archive relation for the page's cold listings, if any.
+        prefetch_archived(listings, *self.child.archived_lookups)
+        return super().to_representation(listings)
+
+
 class ListingListSerializer(serializers.ModelSerializer):
+    # Relations read through Listing.current_* for cold listings (market.lifecycle).
+    archived_lookups = ("archived_images",)
+
     seller_id = serializers.IntegerField(source="seller.id", read_only=True)
     seller_username = serializers.CharField(source="seller.username", read_only=True)
     thumbnail = serializers.SerializerMethodField()
@@ -292,7 +377,8 @@ class ListingListSerializer(serializers.ModelSerializer):
     def get_thumbnail(self, obj):
         img = None
         try:
-            img = obj.images.order_by("sort_order", "id").first()
+            # Uses the prefetched images (Meta ordering is sort_order, id).
+            img = next(iter(obj.current_images), None)
         except Exception:
             img = None
 
@@ -300,16 +386,24 @@ class ListingListSerializer(serializers.ModelSerializer):
             return None
 
         try:
-            url = img.image.url
             request = self.context.get("request")
+            thumb = (getattr(img, "derivatives", None) or {}).get("thumb") or {}
+            if thumb.get("jpeg"):
+                return _absolute_media_url(request, img.image.storage, thumb["jpeg"])
+            url = img.image.url
             if request is not None:
                 return request.build_absolute_uri(url)
             return url
         except Exception:
             return None
 
+    def to_representation(self, instance):
+        prefetch_archived([instance], *self.archived_lookups)
+        return super().to_representation(instance)
+
     class Meta:
         model = Listing
+        list_serializer_class = ListingListSerializerList
         fields = [
             "id",
             "title",
@@ -329,18 +423,21 @@ class ListingListSerializer(serializers.ModelSerializer):
             "latitude",
             "longitude",
             "created_at",
+            "expires_at",
         ]
 
 
 class ListingDetailSerializer(ListingListSerializer):
-    images = ListingImageSerializer(many=True, read_only=True)
+    archived_lookups = ("archived_images", "archived_attribute_values__definition")
+
+    images = ListingImageSerializer(source="current_images", many=True, read_only=True)
     attributes = serializers.SerializerMethodField()
 
     def get_attributes(self, obj):
         # Return a simple key->value map.
         out = {}
         try:
-            values = list(getattr(obj, "attribute_values").all())
+            values = list(obj.current_attribute_values)
         except Exception:
             values = []
 
@@ -399,6 +496,8 @@ class ListingWriteSerializer(serializers.ModelSerializer):
         if category is not None:
             defs = _effective_attribute_definitions(category)
             defs_by_key = {d.key: d for d in defs}
+            # Reused by _upsert_attributes, which writes for the same category.
+            self._attribute_definitions = defs
 
             if incoming_attributes is not None:
                 unknown = [k for k in incoming_attributes.keys() if k not in defs_by_key]
@@ -441,7 +540,8 @@ class ListingWriteSerializer(serializers.ModelSerializer):
                 current: dict[str, object] = {}
                 if self.instance is not None:
                     existing = ListingAttributeValue.objects.filter(listing=self.instance).select_related("definition")
-                    for ev in existing:
+                    self._current_attribute_values = {ev.definition_id: ev for ev in existing}
+                    for ev in self._current_attribute_values.values():
                         dk = getattr(ev.definition, "key", None)
                         if not dk:
                             continue
@@ -478,21 +578,28 @@ class ListingWriteSerializer(serializers.ModelSerializer):
 
         return attrs
 
-    def _upsert_attributes(self, listing: Listing, incoming: dict):
-        defs = _effective_attribute_definitions(listing.category)
+    def _upsert_attributes(self, listing: Listing, incoming: dict, *, created: bool = False):
+        defs = getattr(self, "_attribute_definitions", None)
+        if defs is None:
+            defs = _effective_attribute_definitions(listing.category)
         defs_by_key = {d.key: d for d in defs}
-
-        for k, raw in (incoming or {}).items():
-            d = defs_by_key.get(k)
-            if not d:
-                continue
-
+        incoming = {defs_by_key[k]: raw for k, raw in (incoming or {}).items() if k in defs_by_key}
+        existing = {} if created else getattr(self, "_current_attribute_values", None)
+        if existing is None:
+            existing = {
+                v.definition_id: v
+                for v in ListingAttributeValue.objects.filter(listing=listing, definition__in=list(incoming))
+            }
+
+        cleared = []
+        for d, raw in incoming.items():
             # Null/empty string means delete the value (useful for PATCH).
             if raw is None or (isinstance(raw, str) and not raw.strip()):
-                ListingAttributeValue.objects.filter(listing=listing, definition=d).delete()
+                if d.id in existing:
+                    cleared.append(d.id)
                 continue
 
-            v, _created = ListingAttributeValue.objects.get_or_create(listing=listing, definition=d)
+            v = existing.get(d.id) or ListingAttributeValue(listing=listing, definition=d)
             v.int_value = None
             v.decimal_value = None
             v.text_value = None
@@ -515,19 +622,28 @@ class ListingWriteSerializer(serializers.ModelSerializer):
 
             v.save()
 
+        # A queryset delete: record the change event ourselves.
+        if cleared:
+            deleted, _ = ListingAttributeValue.objects.filter(listing=listing, definition_id__in=cleared).delete()
+            if deleted:
+                events.record([listing.pk], ListingEventKind.ATTRIBUTES)
+
     def create(self, validated_data):
         incoming_attributes = validated_data.pop("attributes", None)
         listing = super().create(validated_data)
         if incoming_attributes is not None:
-            self._upsert_attributes(listing, incoming_attributes)
+            self._upsert_attributes(listing, incoming_attributes, created=True)
         return listing
 
     def update(self, instance, validated_data):
         incoming_attributes = validated_data.pop("attributes", None)
-        listing = super().update(instance, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Save only what the request set, so the change event names it.
+        instance.save(update_fields=[*validated_data, "updated_at"])
         if incoming_attributes is not None:
-            self._upsert_attributes(listing, incoming_attributes)
-        return listing
+            self._upsert_attributes(instance, incoming_attributes)
+        return instance
 
     class Meta:
         model = Listing
@@ -567,6 +683,29 @@ class PublicQuestionAnswerSerializer(serializers.Serializer):
     answer = serializers.CharField()
 
 
+class UploadTicketRequestSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=["listing_image", "avatar", "cover"])
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=100)
+    size = serializers.IntegerField(min_value=1)
+    listing_id = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate_content_type(self, value):
+        if not value.startswith("image/"):
+            raise serializers.ValidationError("Invalid file type")
+        return value
+
+    def validate(self, attrs):
+        if attrs["kind"] == "listing_image" and not attrs.get("listing_id"):
+            raise serializers.ValidationError({"listing_id": "listing_id is required for listing images"})
+        return attrs
+
+
+class UploadFinalizeSerializer(serializers.Serializer):
+    ticket = serializers.CharField()
+    alt_text = serializers.CharField(max_length=140, required=False, allow_blank=True)
+
+
 class PrivateMessageSerializer(serializers.ModelSerializer):
     sender_username = serializers.CharField(source="sender.username", read_only=True)
 
@@ -640,3 +779,14 @@ class ListingReportCreateSerializer(serializers.ModelSerializer):
 
 class ListingReportStaffUpdateSerializer(serializers.Serializer):
     status = serializers.ChoiceField(choices=[ReportStatus.RESOLVED, ReportStatus.DISMISSED])
+
+
+class ListingEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ListingEvent
+        fields = ["id", "listing_id", "kind", "fields", "created_at"]
+
+
+class ListingEventCheckpointSerializer(serializers.Serializer):
+    consumer = serializers.RegexField(r"^[\w.-]+$", max_length=100)
+    position = serializers.IntegerField(min_value=0)
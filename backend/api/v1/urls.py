@@ -1,4 +1,4 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
@@ -9,6 +9,7 @@ from .views import (
     CityViewSet,
     GovernorateViewSet,
     HealthView,
+    ListingEventView,
     ListingViewSet,
     MeView,
     NeighborhoodViewSet,
@@ -20,6 +21,10 @@ from .views import (
     MeProfileView,
     AvatarUploadView,
     CoverUploadView,
+    ExportView,
+    LocalDirectUploadView,
+    UploadFinalizeView,
+    UploadTicketView,
 )
 
 router = DefaultRouter()
@@ -44,5 +49,12 @@ urlpatterns = [
     path("me/profile/", MeProfileView.as_view(), name="v1-me-profile"),
     path("me/profile/avatar/", AvatarUploadView.as_view(), name="v1-me-avatar"),
     path("me/profile/cover/", CoverUploadView.as_view(), name="v1-me-cover"),
+    path("uploads/tickets/", UploadTicketView.as_view(), name="v1-upload-ticket"),
+    path("uploads/finalize/", UploadFinalizeView.as_view(), name="v1-upload-finalize"),
+    path("uploads/local/<str:token>/", LocalDirectUploadView.as_view(), name="v1-upload-local"),
+    re_path(
+        r"^exports/(?P<dataset>listings|reports)\.(?P<fmt>ndjson|csv)$", ExportView.as_view(), name="v1-export"
+    ),
+    path("listing-events/", ListingEventView.as_view(), name="v1-listing-events"),
     path("", include(router.urls)),
 ]
@@ -1,11 +1,19 @@
+import os
+import uuid
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import OuterRef, Q, Subquery
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, OuterRef, Q, Subquery, prefetch_related_objects
 from django.utils import timezone
 from decimal import Decimal, InvalidOperation
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.filters import SearchFilter
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -14,8 +22,9 @@ from market.models import (
     CategoryAttributeDefinition,
     City,
     Governorate,
+    ImageProcessingStatus,
     Listing,
-    ListingAttributeValue,
+    ListingEventKind,
     ListingImage,
     ModerationStatus,
     Neighborhood,
@@ -25,8 +34,34 @@ from market.models import (
 from messaging.models import PrivateMessage, PrivateThread, PublicQuestion
 from reports.models import ListingReport, ReportStatus
 
+from api.instrumentation import QueryBudgetMixin
+from market.image_dedup import (
+    acquire_blob_for_stored,
+    acquire_blob_for_upload,
+    release_blob,
+    release_blobs,
+    similar_blob_ids_many,
+)
+from market.image_ingest import ImageRejected, probe
+from market.images import delete_derivatives
+from market.seed_jobs import job_progress, read_job_log
+from market import events
+from market.expiry import renew, stamp_expiry
+from market.lifecycle import THAW_QUERIES, thaw, thaw_live
+from market.pricing import normalized_price_expression
 from market.seeding import is_admin_seeding_enabled, run_admin_seed
-
+from market.storage import DirectUploadError
+from market.tasks import enqueue_listing_image, enqueue_profile_image, enqueue_seed_job
+from market.visibility import SignedInFeed, public_listing_q
+
+from .cache import (
+    get_cached_listing_questions,
+    invalidate_listing_questions,
+    set_cached_listing_questions,
+)
+from .exports import LISTING_COLUMNS, REPORT_COLUMNS, IgnoreClientContentNegotiation, export_response
+from .listing_filters import ListingOrderingFilter, parse_listing_filters
+from .pagination import PublicQuestionPagination
 from .permissions import IsOwnerOrReadOnly
 from .serializers import (
     CategorySerializer,
@@ -35,6 +70,8 @@ from .serializers import (
     CreateThreadSerializer,
     GovernorateSerializer,
     ListingDetailSerializer,
+    ListingEventCheckpointSerializer,
+    ListingEventSerializer,
     ListingImageSerializer,
     ListingListSerializer,
     ListingWriteSerializer,
@@ -45,6 +82,8 @@ from .serializers import (
     PublicQuestionCreateSerializer,
     PublicQuestionSerializer,
     RegisterSerializer,
+    UploadFinalizeSerializer,
+    UploadTicketRequestSerializer,
     UserMeSerializer,
     ListingReportCreateSerializer,
     ListingReportSerializer,
@@ -135,6 +174,53 @@ class MeProfileView(APIView):
         return Response(serializer.data)
 
 
+BULK_UPDATE_MAX_IDS = 200
+
+# Upload size limits shared by the multipart and direct upload paths.
+UPLOAD_MAX_BYTES = {
+    "avatar": 5 * 1024 * 1024,
+    "cover": 8 * 1024 * 1024,
+    "listing_image": 10 * 1024 * 1024,
+}
+
+
+def _get_or_create_market_profile(user):
+    profile = getattr(user, "market_profile", None)
+    if profile is None:
+        from market.models import Profile
+
+        profile = Profile.objects.create(user=user)
+    return profile
+
+
+def _queue_profile_image(profile, kind: str) -> None:
+    # The original is already assigned to profile.<kind>; variants are generated off-request.
+    setattr(profile, f"{kind}_status", ImageProcessingStatus.PENDING)
+    profile.save()
+    enqueue_profile_image(profile.id, kind, getattr(profile, kind).name)
+    profile.refresh_from_db()
+
+
+def _profile_image_response(request, profile, kind: str) -> Response:
+    from .serializers import ProfileSerializer
+
+    data = ProfileSerializer(profile, context={"request": request}).data
+    ready = getattr(profile, f"{kind}_status") == ImageProcessingStatus.READY
+    return Response(data, status=status.HTTP_200_OK if ready else status.HTTP_202_ACCEPTED)
+
+
+def _mark_listing_pending_if_seller_change(listing: Listing, user) -> None:
+    if not getattr(user, "is_authenticated", False):
+        return
+    if getattr(user, "is_staff", False):
+        return
+    if listing.seller_id != user.id:
+        return
+    if listing.moderation_status != ModerationStatus.PENDING:
+        listing.moderation_status = ModerationStatus.PENDING
+        listing.save(update_fields=["moderation_status", "updated_at"])
+
+
 class AvatarUploadView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -144,60 +230,20 @@ class AvatarUploadView(APIView):
             return Response({"detail": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
 
         # Basic validations
-        if file.size > 5 * 1024 * 1024:
+        if file.size > UPLOAD_MAX_BYTES["avatar"]:
             return Response({"detail": "File too large"}, status=status.HTTP_400_BAD_REQUEST)
         if not getattr(file, "content_type", "").startswith("image/"):
             return Response({"detail": "Invalid file type"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = request.user
-        profile = getattr(user, "market_profile", None)
-        if profile is None:
-            from market.models import Profile
-
-            profile = Profile.objects.create(user=user)
-
-        # Process image: create thumbnail and a medium version.
         try:
-            from PIL import Image
-            from io import BytesIO
-            from django.core.files.base import ContentFile
-
-            img = Image.open(file)
-            img = img.convert("RGB")
-
-            # Save medium 400x400
-            med = img.copy()
-            med.thumbnail((400, 400))
-            buf = BytesIO()
-            med.save(buf, format="JPEG", quality=85)
-            med_content = ContentFile(buf.getvalue(), name=file.name)
-
-            # Save thumb 128x128
-            thumb = img.copy()
-            thumb.thumbnail((128, 128))
-            buf2 = BytesIO()
-            thumb.save(buf2, format="JPEG", quality=85)
-            thumb_content = ContentFile(buf2.getvalue(), name=file.name)
-
-            # Store the medium and thumbnail variants
-            profile.avatar.save(file.name, med_content, save=False)
-            # Also save explicit medium and thumbnail fields for direct access
-            try:
-                profile.avatar_medium.save(file.name, med_content, save=False)
-                profile.avatar_thumbnail.save(f"thumb_{file.name}", thumb_content, save=False)
-            except Exception:
-                # In case fields not present for older deployments, ignore
-                pass
+            probe(file)
+        except ImageRejected as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-            profile.save()
-        except Exception:
-            # fallback: save raw file
-            profile.avatar = file
-            profile.save()
-
-        from .serializers import ProfileSerializer
-
-        return Response(ProfileSerializer(profile, context={"request": request}).data)
+        profile = _get_or_create_market_profile(request.user)
+        profile.avatar.save(file.name, file, save=False)
+        _queue_profile_image(profile, "avatar")
+        return _profile_image_response(request, profile, "avatar")
 
 
 class CoverUploadView(APIView):
@@ -209,47 +255,198 @@ class CoverUploadView(APIView):
             return Response({"detail": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
 
         # Basic validations
-        if file.size > 8 * 1024 * 1024:
+        if file.size > UPLOAD_MAX_BYTES["cover"]:
             return Response({"detail": "File too large"}, status=status.HTTP_400_BAD_REQUEST)
         if not getattr(file, "content_type", "").startswith("image/"):
             return Response({"detail": "Invalid file type"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = request.user
-        profile = getattr(user, "market_profile", None)
-        if profile is None:
-            from market.models import Profile
+        try:
+            probe(file)
+        except ImageRejected as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-            profile = Profile.objects.create(user=user)
+        profile = _get_or_create_market_profile(request.user)
+        profile.cover.save(file.name, file, save=False)
+        _queue_profile_image(profile, "cover")
+        return _profile_image_response(request, profile, "cover")
+
+
+# -- Direct-to-storage uploads ---------------------------------------------------
+#
+# 1. POST uploads/tickets/   -> signed upload URL + opaque finalize ticket
+# 2. client PUTs the bytes straight to the storage backend (GCS, or the local
+#    stand-in at uploads/local/<token>/)
+# 3. POST uploads/finalize/  -> registers the object and queues processing
+
+UPLOAD_TICKET_SALT = "api.v1.upload-ticket"
+
+
+def _direct_upload_name(kind: str, *, user, listing: Listing | None, filename: str) -> str:
+    from market.models import Profile, listing_image_upload_to, profile_avatar_upload_to, profile_cover_upload_to
+
+    base, ext = os.path.splitext(os.path.basename(filename))
+    safe = default_storage.get_valid_name(f"{base[:40]}{ext[:10]}") or "upload"
+    # Unique per ticket so the object can be written exactly once.
+    unique = f"{uuid.uuid4().hex}_{safe}"
+    if kind == "listing_image":
+        return listing_image_upload_to(ListingImage(listing=listing), unique)
+    if kind == "avatar":
+        return profile_avatar_upload_to(Profile(user=user), unique)
+    return profile_cover_upload_to(Profile(user=user), unique)
+
+
+class UploadTicketView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadTicketRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if not hasattr(default_storage, "direct_upload_ticket"):
+            return Response(
+                {"detail": "Direct uploads are not supported by the configured storage."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+
+        kind = data["kind"]
+        max_bytes = UPLOAD_MAX_BYTES[kind]
+        if data["size"] > max_bytes:
+            return Response({"detail": "File too large"}, status=status.HTTP_400_BAD_REQUEST)
+
+        listing = None
+        if kind == "listing_image":
+            listing = Listing.objects.filter(id=data["listing_id"]).first()
+            if listing is None:
+                return Response({"detail": "Listing not found"}, status=status.HTTP_404_NOT_FOUND)
+            if listing.seller_id != request.user.id:
+                return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+
+        name = _direct_upload_name(kind, user=request.user, listing=listing, filename=data["filename"])
+        expires_in = settings.DIRECT_UPLOAD_TICKET_SECONDS
+        upload = default_storage.direct_upload_ticket(
+            name,
+            content_type=data["content_type"],
+            max_bytes=max_bytes,
+            expires_in=expires_in,
+        ).as_dict()
+        if not upload["url"].startswith("http://") and not upload["url"].startswith("https://"):
+            upload["url"] = request.build_absolute_uri(upload["url"])
+
+        ticket = signing.dumps(
+            {"u": request.user.id, "k": kind, "n": name, "l": listing.id if listing else None, "max": max_bytes},
+            salt=UPLOAD_TICKET_SALT,
+        )
+        return Response(
+            {"ticket": ticket, "upload": upload, "expires_in": expires_in}, status=status.HTTP_201_CREATED
+        )
+
+
+class LocalDirectUploadView(APIView):
+    """Receives PUTs for the local storage stand-in; the signed token is the credential."""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def put(self, request, token: str):
+        receive = getattr(default_storage, "receive_direct_upload", None)
+        if receive is None:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            from PIL import Image
-            from io import BytesIO
-            from django.core.files.base import ContentFile
-
-            img = Image.open(file)
-            img = img.convert("RGB")
-
-            # Save medium cover: max 1200x400
-            med = img.copy()
-            med.thumbnail((1200, 400))
-            buf = BytesIO()
-            med.save(buf, format="JPEG", quality=85)
-            med_content = ContentFile(buf.getvalue(), name=file.name)
-
-            # Save the primary cover and the medium variant
-            profile.cover.save(file.name, med_content, save=False)
-            try:
-                profile.cover_medium.save(file.name, med_content, save=False)
-            except Exception:
-                pass
-            profile.save()
-        except Exception:
-            profile.cover = file
-            profile.save()
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
 
-        from .serializers import ProfileSerializer
+        try:
+            name = receive(
+                token,
+                request.stream,
+                content_type=request.content_type or "",
+                content_length=content_length or None,
+            )
+        except DirectUploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(ProfileSerializer(profile, context={"request": request}).data)
+        return Response({"name": name}, status=status.HTTP_201_CREATED)
+
+
+class UploadFinalizeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadFinalizeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            payload = signing.loads(
+                serializer.validated_data["ticket"],
+                salt=UPLOAD_TICKET_SALT,
+                # Allow finalizing a little after the upload URL itself expired.
+                max_age=settings.DIRECT_UPLOAD_TICKET_SECONDS * 2,
+            )
+        except signing.SignatureExpired:
+            return Response({"detail": "Upload ticket expired"}, status=status.HTTP_400_BAD_REQUEST)
+        except signing.BadSignature:
+            return Response({"detail": "Invalid upload ticket"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if payload.get("u") != request.user.id:
+            return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+
+        kind = payload["k"]
+        name = payload["n"]
+        if kind == "listing_image":
+            # Finalize is idempotent: a retried call returns the registered image,
+            # even when dedup already replaced the uploaded object with a shared blob.
+            image = ListingImage.objects.filter(
+                Q(image=name) | Q(upload_name=name),
+                listing_id=payload.get("l"),
+                listing__seller=request.user,
+            ).first()
+            if image is not None:
+                return Response(
+                    ListingImageSerializer(image, context={"request": request}).data,
+                    status=status.HTTP_201_CREATED,
+                )
+        if not default_storage.exists(name):
+            return Response({"detail": "Upload not found"}, status=status.HTTP_400_BAD_REQUEST)
+        if default_storage.size(name) > int(payload["max"]):
+            default_storage.delete(name)
+            return Response({"detail": "File too large"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with default_storage.open(name, "rb") as fh:
+                probe(fh)
+        except ImageRejected as exc:
+            default_storage.delete(name)
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if kind == "listing_image":
+            listing = Listing.objects.filter(id=payload.get("l"), seller=request.user).first()
+            if listing is None:
+                return Response({"detail": "Listing not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            blob = acquire_blob_for_stored(name)
+            image = ListingImage.objects.create(
+                listing=listing,
+                image=blob.file.name,
+                blob=blob,
+                alt_text=serializer.validated_data.get("alt_text", ""),
+                derivatives_status=ImageProcessingStatus.PENDING,
+                upload_name=name,
+            )
+            enqueue_listing_image(image.id, image.image.name)
+            _mark_listing_pending_if_seller_change(listing, request.user)
+            image.refresh_from_db()
+            return Response(
+                ListingImageSerializer(image, context={"request": request}).data,
+                status=status.HTTP_201_CREATED,
+            )
+
+        profile = _get_or_create_market_profile(request.user)
+        if getattr(profile, kind).name != name:
+            setattr(profile, kind, name)
+            _queue_profile_image(profile, kind)
+        return _profile_image_response(request, profile, kind)
 
 
 class RegisterView(APIView):
@@ -279,11 +476,14 @@ class AdminSeedView(APIView):
         if not isinstance(options, dict):
             return Response({"detail": "options must be an object."}, status=status.HTTP_400_BAD_REQUEST)
 
-        job = AdminSeedJob.objects.create(
-            scenario=str(scenario or "demo"),
-            options=options,
-            requested_by=request.user,
-        )
+        with transaction.atomic():
+            job = AdminSeedJob.objects.create(
+                scenario=str(scenario or "demo"),
+                options=options,
+                requested_by=request.user,
+            )
+            enqueue_seed_job(job)
+        job.refresh_from_db(fields=["status"])
 
         return Response(
             {"id": job.id, "status": job.status, "scenario": job.scenario, "created_at": job.created_at},
@@ -298,30 +498,48 @@ class AdminSeedJobView(APIView):
         if not getattr(request.user, "is_staff", False):
             return Response({"detail": "Not allowed."}, status=status.HTTP_403_FORBIDDEN)
 
-        job = AdminSeedJob.objects.filter(id=job_id).first()
+        log_offset = request.query_params.get("log_offset")
+        if log_offset is not None:
+            try:
+                log_offset = int(log_offset)
+            except (TypeError, ValueError):
+                return Response({"detail": "log_offset must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+            if log_offset < 0:
+                return Response({"detail": "log_offset must be >= 0."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The full output blob is only loaded when a client asks for it (no log_offset).
+        qs = AdminSeedJob.objects.all() if log_offset is None else AdminSeedJob.objects.defer("output")
+        job = qs.filter(id=job_id).first()
         if not job:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        return Response(
-            {
-                "id": job.id,
-                "status": job.status,
-                "scenario": job.scenario,
-                "options": job.options,
-                "created_at": job.created_at,
-                "started_at": job.started_at,
-                "finished_at": job.finished_at,
-                "result": job.result,
-                "output": job.output,
-                "error": job.error,
-            }
-        )
+        payload = {
+            "id": job.id,
+            "status": job.status,
+            "scenario": job.scenario,
+            "options": job.options,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "progress": job_progress(job),
+            "log_lines": job.log_lines,
+            "result": job.result,
+            "error": job.error,
+        }
+        if log_offset is None:
+            payload["output"] = job.output
+        else:
+            lines, next_offset = read_job_log(job.id, log_offset, settings.SEED_JOB_LOG_PAGE_LINES)
+            payload["log"] = {"offset": log_offset, "next_offset": next_offset, "lines": lines}
+        return Response(payload)
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(QueryBudgetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     pagination_class = None
+    query_budget = 1
+    query_budgets = {"attributes": 4}
 
     @action(detail=True, methods=["get"], permission_classes=[AllowAny], url_path="attributes")
     def attributes(self, request, pk=None):
@@ -346,14 +564,16 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(CategoryAttributeDefinitionSerializer(out, many=True).data)
 
 
-class GovernorateViewSet(viewsets.ReadOnlyModelViewSet):
+class GovernorateViewSet(QueryBudgetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Governorate.objects.all()
     serializer_class = GovernorateSerializer
+    query_budget = 2
 
 
-class CityViewSet(viewsets.ReadOnlyModelViewSet):
+class CityViewSet(QueryBudgetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = City.objects.select_related("governorate").all()
     serializer_class = CitySerializer
+    query_budget = 2
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -363,9 +583,10 @@ class CityViewSet(viewsets.ReadOnlyModelViewSet):
         return qs
 
 
-class NeighborhoodViewSet(viewsets.ReadOnlyModelViewSet):
+class NeighborhoodViewSet(QueryBudgetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Neighborhood.objects.select_related("city", "city__governorate").all()
     serializer_class = NeighborhoodSerializer
+    query_budget = 2
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -375,7 +596,15 @@ class NeighborhoodViewSet(viewsets.ReadOnlyModelViewSet):
         return qs
 
 
+def _filter_staff_reports(qs, query_params):
+    status_q = (query_params.get("status") or "").strip().lower()
+    if status_q:
+        return qs.filter(status=status_q)
+    return qs.filter(status=ReportStatus.OPEN)
+
+
 class ListingReportViewSet(
+    QueryBudgetMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -384,18 +613,14 @@ class ListingReportViewSet(
 ):
     permission_classes = [IsAuthenticated]
     ordering_fields = ["created_at"]
+    query_budget = 2
 
     def get_queryset(self):
         user = self.request.user
         qs = ListingReport.objects.select_related("listing", "reporter", "handled_by")
 
         if getattr(user, "is_staff", False):
-            status_q = (self.request.query_params.get("status") or "").strip().lower()
-            if status_q:
-                qs = qs.filter(status=status_q)
-            else:
-                qs = qs.filter(status=ReportStatus.OPEN)
-            return qs
+            return _filter_staff_reports(qs, self.request.query_params)
 
         return qs.filter(reporter=user)
 
@@ -425,244 +650,182 @@ class ListingReportViewSet(
         return Response(ListingReportSerializer(report).data)
 
 
-class ListingViewSet(viewsets.ModelViewSet):
+class ExportView(APIView):
+    """Staff-only streaming exports of listings and reports.
+
+    Takes the same filter params as ``/listings/`` and ``/reports/``; see
+    ``api.v1.exports``.
+    """
+
+    permission_classes = [IsAuthenticated]
+    content_negotiation_class = IgnoreClientContentNegotiation
+
+    def get(self, request, dataset: str, fmt: str):
+        if not getattr(request.user, "is_staff", False):
+            return Response({"detail": "Not allowed."}, status=status.HTTP_403_FORBIDDEN)
+
+        if dataset == "listings":
+            queryset = parse_listing_filters(request.query_params).apply(Listing.objects.all(), staff=True)
+            spec = LISTING_COLUMNS
+        else:
+            queryset = _filter_staff_reports(ListingReport.objects.all(), request.query_params)
+            spec = REPORT_COLUMNS
+        return export_response(
+            request, queryset, spec, dataset=dataset, fmt=fmt, chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+
+
+class ListingEventView(APIView):
+    """Staff-only feed of listing change events for incremental indexers.
+
+    ``GET ?consumer=<name>`` returns the events after that consumer's
+    checkpoint (or ``?after=<id>``), up to ``limit``; once applied, the
+    consumer ``POST``s ``{"consumer", "position"}`` with the last id it
+    handled. See ``market.events``.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not getattr(request.user, "is_staff", False):
+            return Response({"detail": "Not allowed."}, status=status.HTTP_403_FORBIDDEN)
+        consumer = request.query_params.get("consumer")
+        try:
+            after = int(request.query_params["after"]) if "after" in request.query_params else None
+            limit = int(request.query_params.get("limit") or settings.LISTING_EVENT_PAGE_SIZE)
+        except ValueError:
+            return Response({"detail": "after and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if after is None:
+            after = events.position(consumer) if consumer else 0
+        limit = max(1, min(limit, settings.LISTING_EVENT_PAGE_SIZE))
+        page = events.read(after, limit=limit)
+        return Response(
+            {
+                "events": ListingEventSerializer(page, many=True).data,
+                # Where the next read starts once these are applied.
+                "position": page[-1].id if page else after,
+                "has_more": len(page) == limit,
+            }
+        )
+
+    def post(self, request):
+        if not getattr(request.user, "is_staff", False):
+            return Response({"detail": "Not allowed."}, status=status.HTTP_403_FORBIDDEN)
+        serializer = ListingEventCheckpointSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        consumer = serializer.validated_data["consumer"]
+        return Response(
+            {"consumer": consumer, "position": events.advance(consumer, serializer.validated_data["position"])}
+        )
+
+
+class ListingViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    filter_backends = [DjangoFilterBackend, SearchFilter, ListingOrderingFilter]
     search_fields = ["title", "description"]
     ordering_fields = ["created_at", "price"]
+    # What each action runs, and where the headroom goes. Reads of one listing
+    # are the row, its images, attribute values and definitions; a cold listing
+    # (market.lifecycle) reads one more query per archive relation, and thawing
+    # one extends the budget by THAW_QUERIES. Writes record their change event
+    # (market.events), wrapped in SAVEPOINT/RELEASE inside a transaction.
+    query_budgets = {
+        # Count, page and images; category filters add the subtree, one query per
+        # ancestor level and the attribute definitions.
+        "list": 8,
+        # The four reads, plus the archived images and values of a cold listing.
+        "retrieve": 6,
+        # Count, page and images, plus archived images when a page holds cold listings.
+        "mine": 4,
+        # Category, governorate and city lookups, the category's ancestors and
+        # definitions, then SAVEPOINT, the INSERT, its event and RELEASE.
+        "create": 9,
+        # Row and images, the six related lookups and current values, the write
+        # (SAVEPOINT, exchange rate, listing and value UPDATEs, event, RELEASE),
+        # then the four reads for the response.
+        "update": 18,
+        # As update without the location lookups, plus one spare for a value write.
+        "partial_update": 15,
+        # Row, images and blobs, the event, the cascade across threads, messages,
+        # images, values, questions, reports and their archive tables, then
+        # releasing the shared blobs.
+        "destroy": 15,
+        # Scoping selects, the write with expiry stamping (category TTLs, one
+        # UPDATE per distinct expiry), the cold-thaw check and the response page.
+        "bulk_update": 16,
+        # The four reads, then the UPDATE and its event when the status changes.
+        "moderate": 6,
+        # The four reads, category TTLs, the UPDATE and its event.
+        "renew": 7,
+        # Row, images and their blobs' hashes; spare for the matches' listings.
+        "duplicates": 6,
+        # Blob claim, image INSERT, the inline derivative pass
+        # (IMAGE_PROCESSING_EAGER), moderation, event and the reload.
+        "images": 19,
+        # Row, images, the DELETE and its event, plus releasing a shared blob.
+        "delete_image": 8,
+        # Row, images, the position UPDATEs, the event and the reload.
+        "reorder_images": 9,
+        # Row and images, then the page (count and rows) or the INSERT.
+        "questions": 4,
+    }
 
     def _mark_pending_if_seller_change(self, listing: Listing):
-        user = self.request.user
-        if not getattr(user, "is_authenticated", False):
-            return
-        if getattr(user, "is_staff", False):
-            return
-        if listing.seller_id != user.id:
-            return
-        if listing.moderation_status != ModerationStatus.PENDING:
-            listing.moderation_status = ModerationStatus.PENDING
-            listing.save(update_fields=["moderation_status", "updated_at"])
+        _mark_listing_pending_if_seller_change(listing, self.request.user)
 
     def get_queryset(self):
         qs = Listing.objects.select_related(
             "category",
             "governorate",
-            "city",
-            "neighborhood",
+            # The nested location serializers walk up to the governorate.
+            "city__governorate",
+            "neighborhood__city__governorate",
             "seller",
         ).prefetch_related("images")
 
-        if getattr(self, "action", None) == "retrieve":
+        if getattr(self, "action", None) in {"retrieve", "moderate", "renew"}:
             qs = qs.prefetch_related("attribute_values", "attribute_values__definition")
 
         user = self.request.user
-        public_visibility = Q(
-            status=ListingStatus.PUBLISHED,
-            moderation_status=ModerationStatus.APPROVED,
-        )
+        public_visibility = public_listing_q()
 
+        self._signed_in_feed_user = None
         if user.is_authenticated:
             if getattr(user, "is_staff", False):
                 qs = qs
+            elif getattr(self, "action", None) == "list":
+                # Applied in filter_queryset, as two index-friendly streams.
+                self._signed_in_feed_user = user
             else:
                 qs = qs.filter(public_visibility | Q(seller=user))
         else:
             qs = qs.filter(public_visibility)
 
-        # Basic filters
-        qp = self.request.query_params
-
-        selected_category_obj = None
-
-        # Removed listings are hidden by default. Staff can opt-in via include_removed=1.
-        include_removed = str(qp.get("include_removed") or "").lower() in {"1", "true", "yes"}
-        if not (include_removed and getattr(user, "is_staff", False)):
-            qs = qs.filter(is_removed=False)
-        if qp.get("status"):
-            qs = qs.filter(status=qp.get("status"))
-        if qp.get("moderation_status"):
-            qs = qs.filter(moderation_status=qp.get("moderation_status"))
-        if qp.get("seller"):
-            qs = qs.filter(seller_id=qp.get("seller"))
-        if qp.get("category"):
-            raw = str(qp.get("category") or "").strip()
-            try:
-                root_id = int(raw)
-            except Exception:
-                root_id = None
-
-            if root_id is not None:
-                selected_category_obj = Category.objects.filter(id=root_id).first()
-                # Treat category as a subtree filter (selected category + all descendants).
-                ids: list[int] = [root_id]
-                frontier: list[int] = [root_id]
-                seen: set[int] = {root_id}
-
-                # Depth is expected to be small; this keeps queries bounded.
-                while frontier:
-                    child_ids = list(
-                        Category.objects.filter(parent_id__in=frontier).values_list("id", flat=True)
-                    )
-                    frontier = []
-                    for cid in child_ids:
-                        if cid in seen:
-                            continue
-                        seen.add(cid)
-                        ids.append(cid)
-                        frontier.append(cid)
-
-                qs = qs.filter(category_id__in=ids)
-        if qp.get("governorate"):
-            qs = qs.filter(governorate_id=qp.get("governorate"))
-        if qp.get("city"):
-            qs = qs.filter(city_id=qp.get("city"))
-        if qp.get("neighborhood"):
-            qs = qs.filter(neighborhood_id=qp.get("neighborhood"))
-
-        # Price range filters
-        # Supports both price_min/price_max and price__gte/price__lte.
-        raw_price_min = (qp.get("price_min") if qp.get("price_min") is not None else qp.get("price__gte"))
-        raw_price_max = (qp.get("price_max") if qp.get("price_max") is not None else qp.get("price__lte"))
-
-        if raw_price_min is not None and str(raw_price_min).strip() != "":
-            try:
-                price_min = Decimal(str(raw_price_min).strip())
-            except (InvalidOperation, ValueError):
-                raise ValidationError({"detail": "Invalid decimal for price_min"})
-            if price_min < 0:
-                raise ValidationError({"detail": "price_min cannot be negative"})
-            qs = qs.filter(price__gte=price_min)
-
-        if raw_price_max is not None and str(raw_price_max).strip() != "":
-            try:
-                price_max = Decimal(str(raw_price_max).strip())
-            except (InvalidOperation, ValueError):
-                raise ValidationError({"detail": "Invalid decimal for price_max"})
-            if price_max < 0:
-                raise ValidationError({"detail": "price_max cannot be negative"})
-            qs = qs.filter(price__lte=price_max)
-
-        if qp.get("is_flagged") is not None:
-            raw = str(qp.get("is_flagged") or "").lower()
-            if raw in {"1", "true", "yes"}:
-                qs = qs.filter(is_flagged=True)
-            elif raw in {"0", "false", "no"}:
-                qs = qs.filter(is_flagged=False)
-
-        # Staff-only: allow filtering by is_removed when include_removed is enabled.
-        if include_removed and getattr(user, "is_staff", False) and qp.get("is_removed") is not None:
-            raw = str(qp.get("is_removed") or "").lower()
-            if raw in {"1", "true", "yes"}:
-                qs = qs.filter(is_removed=True)
-            elif raw in {"0", "false", "no"}:
-                qs = qs.filter(is_removed=False)
-
-        # Attribute filters: query params starting with attr_
-        attr_params = [(k, v) for k, v in qp.items() if str(k).startswith("attr_")]
-        if attr_params:
-            if selected_category_obj is None:
-                raise ValidationError({"detail": "attr_* filters require category to be set"})
-
-            ancestor_ids = selected_category_obj.ancestor_ids_including_self()
-            order = list(reversed(ancestor_ids))
-            pos = {cid: idx for idx, cid in enumerate(order)}
-            defs = list(CategoryAttributeDefinition.objects.filter(category_id__in=ancestor_ids))
-            defs.sort(key=lambda d: (pos.get(d.category_id, 10_000), d.sort_order, d.key))
-            defs_by_key = {}
-            for d in defs:
-                defs_by_key[d.key] = d
-
-            def parse_bool(s: str) -> bool:
-                ss = str(s).strip().lower()
-                if ss in {"1", "true", "yes", "y", "on"}:
-                    return True
-                if ss in {"0", "false", "no", "n", "off"}:
-                    return False
-                raise ValidationError({"detail": "Invalid boolean value"})
-
-            for idx, (raw_key, raw_val) in enumerate(attr_params):
-                name = str(raw_key)
-                raw_val = str(raw_val)
-                base = name[len("attr_") :]
-                if "__" in base:
-                    key, op = base.split("__", 1)
-                else:
-                    key, op = base, "eq"
-
-                d = defs_by_key.get(key)
-                if not d:
-                    raise ValidationError({"detail": f"Unknown attribute filter: {key}"})
-                if not d.is_filterable:
-                    raise ValidationError({"detail": f"Attribute is not filterable: {key}"})
-
-                value_qs = ListingAttributeValue.objects.filter(listing_id=OuterRef("pk"), definition=d)
-
-                if d.type == "int":
-                    try:
-                        num = int(raw_val)
-                    except Exception:
-                        raise ValidationError({"detail": f"Invalid integer for {key}"})
-                    if op == "eq":
-                        value_qs = value_qs.filter(int_value=num)
-                    elif op == "gte":
-                        value_qs = value_qs.filter(int_value__gte=num)
-                    elif op == "lte":
-                        value_qs = value_qs.filter(int_value__lte=num)
-                    elif op == "gt":
-                        value_qs = value_qs.filter(int_value__gt=num)
-                    elif op == "lt":
-                        value_qs = value_qs.filter(int_value__lt=num)
-                    else:
-                        raise ValidationError({"detail": f"Unsupported operator for {key}: {op}"})
-
-                elif d.type == "decimal":
-                    try:
-                        num = Decimal(raw_val)
-                    except Exception:
-                        raise ValidationError({"detail": f"Invalid decimal for {key}"})
-                    if op == "eq":
-                        value_qs = value_qs.filter(decimal_value=num)
-                    elif op == "gte":
-                        value_qs = value_qs.filter(decimal_value__gte=num)
-                    elif op == "lte":
-                        value_qs = value_qs.filter(decimal_value__lte=num)
-                    elif op == "gt":
-                        value_qs = value_qs.filter(decimal_value__gt=num)
-                    elif op == "lt":
-                        value_qs = value_qs.filter(decimal_value__lt=num)
-                    else:
-                        raise ValidationError({"detail": f"Unsupported operator for {key}: {op}"})
-
-                elif d.type == "bool":
-                    if op != "eq":
-                        raise ValidationError({"detail": f"Unsupported operator for {key}: {op}"})
-                    value_qs = value_qs.filter(bool_value=parse_bool(raw_val))
-
-                elif d.type == "enum":
-                    if op == "eq":
-                        value_qs = value_qs.filter(enum_value=str(raw_val))
-                    elif op == "in":
-                        items = [x.strip() for x in str(raw_val).split(",") if x.strip()]
-                        if not items:
-                            raise ValidationError({"detail": f"Invalid list for {key}"})
-                        value_qs = value_qs.filter(enum_value__in=items)
-                    else:
-                        raise ValidationError({"detail": f"Unsupported operator for {key}: {op}"})
-
-                elif d.type == "text":
-                    if op == "eq":
-                        value_qs = value_qs.filter(text_value=str(raw_val))
-                    elif op == "icontains":
-                        value_qs = value_qs.filter(text_value__icontains=str(raw_val))
-                    else:
-                        raise ValidationError({"detail": f"Unsupported operator for {key}: {op}"})
-                else:
-                    raise ValidationError({"detail": f"Unsupported attribute type for {key}"})
-
-                qs = qs.annotate(**{f"_has_attr_{idx}": Subquery(value_qs.values("id")[:1])}).filter(
-                    **{f"_has_attr_{idx}__isnull": False}
-                )
-
-        return qs
+        # Parsed once per distinct set of filter params; see listing_filters.
+        self.filter_plan = parse_listing_filters(self.request.query_params)
+        return self.filter_plan.apply(qs, staff=getattr(user, "is_staff", False))
+
+    def get_object(self):
+        listing = super().get_object()
+        if listing.is_cold and self.request.method not in SAFE_METHODS and self.action != "destroy":
+            # Edited again: its attribute values and images go back to the live
+            # tables, once, and the (empty) prefetches are redone from them.
+            lookups = self.get_queryset()._prefetch_related_lookups
+            self.extend_query_budget(THAW_QUERIES + len(lookups))
+            thaw(listing)
+            listing._prefetched_objects_cache = {}
+            prefetch_related_objects([listing], *lookups)
+        return listing
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        user = getattr(self, "_signed_in_feed_user", None)
+        if user is None:
+            return queryset
+        # The public-or-own OR defeats the feed indexes; see market.visibility.
+        if SignedInFeed.supports(queryset):
+            return SignedInFeed(queryset, user)
+        return queryset.filter(public_listing_q() | Q(seller=user))
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def mine(self, request):
@@ -670,8 +833,9 @@ class ListingViewSet(viewsets.ModelViewSet):
             Listing.objects.select_related(
                 "category",
                 "governorate",
-                "city",
-                "neighborhood",
+                # The nested location serializers walk up to the governorate.
+                "city__governorate",
+                "neighborhood__city__governorate",
                 "seller",
             )
             .prefetch_related("images")
@@ -695,8 +859,10 @@ class ListingViewSet(viewsets.ModelViewSet):
         except (TypeError, ValueError):
             return Response({"detail": "ids must contain integer ids"}, status=status.HTTP_400_BAD_REQUEST)
 
-        if len(ids) > 200:
-            return Response({"detail": "ids is too large (max 200)"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > BULK_UPDATE_MAX_IDS:
+            return Response(
+                {"detail": f"ids is too large (max {BULK_UPDATE_MAX_IDS})"}, status=status.HTTP_400_BAD_REQUEST
+            )
 
         data = payload.get("data")
         if data is None:
@@ -727,7 +893,12 @@ class ListingViewSet(viewsets.ModelViewSet):
 
             to_change = qs_all.exclude(moderation_status=desired)
             updated_ids = list(to_change.values_list("id", flat=True))
-            to_change.update(moderation_status=desired)
+            with events.batched():
+                to_change.update(moderation_status=desired)
+                events.record(updated_ids, ListingEventKind.UPDATED, ["moderation_status"])
+            # One chunk: at most BULK_UPDATE_MAX_IDS listings.
+            self.extend_query_budget(THAW_QUERIES)
+            thaw_live(qs_all, chunk_size=BULK_UPDATE_MAX_IDS + 1)
             visible = self.get_queryset().filter(id__in=list(found_ids))
             return Response(
                 {
@@ -760,7 +931,12 @@ class ListingViewSet(viewsets.ModelViewSet):
             updated_ids = list(changed_qs.values_list("id", flat=True))
 
             if update_data:
-                qs_all.update(**update_data)
+                with events.batched():
+                    qs_all.update(**update_data)
+                    events.record(updated_ids, ListingEventKind.UPDATED, update_data)
+                # One chunk: at most BULK_UPDATE_MAX_IDS listings.
+                self.extend_query_budget(THAW_QUERIES)
+                thaw_live(qs_all, chunk_size=BULK_UPDATE_MAX_IDS + 1)
 
             visible = self.get_queryset().filter(id__in=list(found_ids))
             return Response(
@@ -826,7 +1002,21 @@ class ListingViewSet(viewsets.ModelViewSet):
         changed_qs = changed_qs.exclude(**already_match)
         updated_ids = list(changed_qs.values_list("id", flat=True))
         if update_data:
-            qs_allowed.update(**update_data)
+            changed_fields = set(update_data)
+            # stamp_expiry's events merge into this block's: one per listing.
+            with events.batched():
+                qs_allowed.update(**update_data)
+                if {"price", "currency"} & update_data.keys():
+                    # A bounded id list: one statement, no need for renormalize's chunks.
+                    qs_allowed.update(price_normalized=normalized_price_expression())
+                    changed_fields.add("price_normalized")
+                if "status" in update_data:
+                    stamp_expiry(qs_allowed)
+                events.record(updated_ids, ListingEventKind.UPDATED, changed_fields)
+            if "status" in update_data:
+                # One chunk: at most BULK_UPDATE_MAX_IDS listings.
+                self.extend_query_budget(THAW_QUERIES)
+                thaw_live(qs_allowed, chunk_size=BULK_UPDATE_MAX_IDS + 1)
 
         visible = self.get_queryset().filter(id__in=list(qs_allowed.values_list("id", flat=True)))
         return Response(
@@ -857,6 +1047,66 @@ class ListingViewSet(viewsets.ModelViewSet):
 
         return Response(ListingDetailSerializer(listing).data)
 
+    @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated, IsOwnerOrReadOnly])
+    def renew(self, request, pk=None):
+        """Publish an expired listing again, or push a published one's expiry back to a full TTL."""
+        listing = self.get_object()
+        if listing.is_removed:
+            return Response({"detail": "Removed listings cannot be renewed"}, status=status.HTTP_400_BAD_REQUEST)
+        if listing.status not in {ListingStatus.PUBLISHED, ListingStatus.ARCHIVED}:
+            return Response(
+                {"detail": "Only published or archived listings can be renewed"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        renew(listing)
+        return Response(ListingDetailSerializer(listing, context={"request": request}).data)
+
+    @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated])
+    def duplicates(self, request, pk=None):
+        """Other listings that reuse this listing's photos, exactly or near-identically."""
+        if not getattr(request.user, "is_staff", False):
+            return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
+
+        listing = self.get_object()
+        try:
+            max_distance = int(request.query_params.get("distance", settings.IMAGE_NEAR_DUPLICATE_DISTANCE))
+        except (TypeError, ValueError):
+            return Response({"detail": "distance must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        max_distance = max(0, min(max_distance, 16))
+
+        # blob_id -> (distance, image id on this listing)
+        matches: dict[int, tuple[int, int]] = {}
+        images = list(listing.images.exclude(blob=None).values_list("id", "blob_id", "blob__phash"))
+        similar = similar_blob_ids_many([phash for _, _, phash in images if phash is not None], max_distance)
+        for image_id, blob_id, phash in images:
+            candidates = [(0, blob_id)]
+            if phash is not None:
+                candidates.extend(similar[phash])
+            for distance, other_blob_id in candidates:
+                if other_blob_id not in matches or distance < matches[other_blob_id][0]:
+                    matches[other_blob_id] = (distance, image_id)
+
+        others = (
+            ListingImage.objects.filter(blob_id__in=list(matches))
+            .exclude(listing_id=listing.id)
+            .select_related("listing")
+        )
+        results = []
+        for other in others:
+            distance, image_id = matches[other.blob_id]
+            results.append(
+                {
+                    "listing_id": other.listing_id,
+                    "listing_title": other.listing.title,
+                    "seller_id": other.listing.seller_id,
+                    "image_id": other.id,
+                    "matched_image_id": image_id,
+                    "distance": distance,
+                }
+            )
+        results.sort(key=lambda row: (row["distance"], row["listing_id"], row["image_id"]))
+        return Response({"max_distance": max_distance, "results": results})
+
     def get_serializer_class(self):
         if self.action in {"create", "update", "partial_update"}:
             return ListingWriteSerializer
@@ -865,11 +1115,23 @@ class ListingViewSet(viewsets.ModelViewSet):
         return ListingListSerializer
 
     def perform_create(self, serializer):
-        serializer.save(seller=self.request.user)
+        # The listing, its attributes and their change event commit together.
+        with events.batched():
+            serializer.save(seller=self.request.user)
 
     def perform_update(self, serializer):
-        listing = serializer.save()
-        self._mark_pending_if_seller_change(listing)
+        with events.batched():
+            listing = serializer.save()
+            self._mark_pending_if_seller_change(listing)
+
+    def perform_destroy(self, instance):
+        images = list(instance.current_images.values_list("blob_id", "derivatives"))
+        instance.delete()
+        for blob_id, derivatives in images:
+            if blob_id is None:
+                # Legacy images own their derivatives; a blob's go in gc_image_blobs.
+                delete_derivatives(derivatives)
+        release_blobs(blob_id for blob_id, _ in images)
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop("partial", False)
@@ -877,7 +1139,8 @@ class ListingViewSet(viewsets.ModelViewSet):
         serializer = ListingWriteSerializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
-        instance.refresh_from_db()
+        # Reload with the relations the detail serializer walks (refresh_from_db drops them).
+        instance = self.get_queryset().prefetch_related("attribute_values__definition").get(pk=instance.pk)
         return Response(ListingDetailSerializer(instance, context={"request": request}).data)
 
     def partial_update(self, request, *args, **kwargs):
@@ -888,15 +1151,33 @@ class ListingViewSet(viewsets.ModelViewSet):
     def images(self, request, pk=None):
         listing = self.get_object()
         if request.method == "GET":
-            return Response(ListingImageSerializer(listing.images.all(), many=True, context={"request": request}).data)
+            return Response(
+                ListingImageSerializer(listing.current_images, many=True, context={"request": request}).data
+            )
 
         if listing.seller != request.user:
             return Response({"detail": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
 
         serializer = ListingImageSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        image = ListingImage.objects.create(listing=listing, **serializer.validated_data)
-        self._mark_pending_if_seller_change(listing)
+        upload = serializer.validated_data.pop("image")
+        try:
+            probe(upload)
+        except ImageRejected as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        # Identical bytes (e.g. the same photo on several listings) share one stored original.
+        blob = acquire_blob_for_upload(upload)
+        with events.batched():
+            image = ListingImage.objects.create(
+                listing=listing,
+                image=blob.file.name,
+                blob=blob,
+                derivatives_status=ImageProcessingStatus.PENDING,
+                **serializer.validated_data,
+            )
+            enqueue_listing_image(image.id, image.image.name)
+            self._mark_pending_if_seller_change(listing)
+        image.refresh_from_db()
         return Response(ListingImageSerializer(image, context={"request": request}).data, status=status.HTTP_201_CREATED)
 
     @action(
@@ -920,8 +1201,12 @@ class ListingViewSet(viewsets.ModelViewSet):
         if not img:
             return Response({"detail": "Image not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        img.delete()
-        self._mark_pending_if_seller_change(listing)
+        with events.batched():
+            img.delete()
+            release_blob(img.blob_id)
+            self._mark_pending_if_seller_change(listing)
+        if img.blob_id is None:
+            delete_derivatives(img.derivatives)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=["post"], url_path="images/reorder", permission_classes=[IsAuthenticated])
@@ -964,10 +1249,11 @@ class ListingViewSet(viewsets.ModelViewSet):
                 img.sort_order = idx
                 to_update.append(img)
 
-        if to_update:
-            ListingImage.objects.bulk_update(to_update, ["sort_order"])
-
-        self._mark_pending_if_seller_change(listing)
+        with events.batched():
+            if to_update:
+                ListingImage.objects.bulk_update(to_update, ["sort_order"])
+                events.record([listing.id], ListingEventKind.IMAGES)
+            self._mark_pending_if_seller_change(listing)
 
         refreshed = listing.images.order_by("sort_order", "id")
         return Response(ListingImageSerializer(refreshed, many=True, context={"request": request}).data)
@@ -976,8 +1262,27 @@ class ListingViewSet(viewsets.ModelViewSet):
     def questions(self, request, pk=None):
         listing = self.get_object()
         if request.method == "GET":
-            qs = PublicQuestion.objects.filter(listing=listing).select_related("author", "answered_by")
-            return Response(PublicQuestionSerializer(qs, many=True).data)
+            paginator = PublicQuestionPagination()
+            page_no = str(request.query_params.get(paginator.page_query_param) or "1")
+            page_size = str(paginator.get_page_size(request))
+
+            cached = get_cached_listing_questions(listing.id, page=page_no, page_size=page_size)
+            if cached is not None:
+                return Response(paginator.get_cached_response_data(request, cached))
+
+            # Answered questions first, newest first within each group.
+            qs = (
+                PublicQuestion.objects.filter(listing=listing)
+                .select_related("author", "answered_by")
+                .annotate(is_answered=ExpressionWrapper(Q(answered_at__isnull=False), output_field=BooleanField()))
+                .order_by("-is_answered", "-created_at", "-id")
+            )
+            page = paginator.paginate_queryset(qs, request, view=self)
+            # Cached without next/previous links: a page stored through one host
+            # or scheme must not hand its URLs to another.
+            data = paginator.get_page_data(PublicQuestionSerializer(page, many=True).data)
+            set_cached_listing_questions(listing.id, data, page=page_no, page_size=page_size)
+            return Response(paginator.get_cached_response_data(request, data))
 
         if not request.user.is_authenticated:
             return Response({"detail": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
@@ -989,12 +1294,14 @@ class ListingViewSet(viewsets.ModelViewSet):
             author=request.user,
             question=serializer.validated_data["question"],
         )
+        invalidate_listing_questions(listing.id)
         return Response(PublicQuestionSerializer(q).data, status=status.HTTP_201_CREATED)
 
 
-class PublicQuestionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+class PublicQuestionViewSet(QueryBudgetMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     queryset = PublicQuestion.objects.select_related("listing", "author", "answered_by").all()
     serializer_class = PublicQuestionSerializer
+    query_budget = 3
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def answer(self, request, pk=None):
@@ -1007,12 +1314,15 @@ class PublicQuestionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
         q.answered_by = request.user
         q.answered_at = timezone.now()
         q.save(update_fields=["answer", "answered_by", "answered_at"])
+        invalidate_listing_questions(q.listing_id)
         return Response(PublicQuestionSerializer(q).data)
 
 
-class PrivateThreadViewSet(viewsets.ModelViewSet):
+class PrivateThreadViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = PrivateThreadSerializer
+    query_budget = 3
+    query_budgets = {"create": 5}
 
     def get_queryset(self):
         user = self.request.user
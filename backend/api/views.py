@@ -1,7 +1,24 @@
-from rest_framework.decorators import api_view
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import BasePermission
 from rest_framework.response import Response
 
+from api.metrics import is_internal_ip, render_prometheus
+
 
 @api_view(["GET"])
 def health(request):
     return Response({"status": "ok"})
+
+
+class IsStaffOrInternalIP(BasePermission):
+    def has_permission(self, request, view):
+        if is_internal_ip(request.META.get("REMOTE_ADDR")):
+            return True
+        return bool(request.user and request.user.is_staff)
+
+
+@api_view(["GET"])
+@permission_classes([IsStaffOrInternalIP])
+def metrics(request):
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
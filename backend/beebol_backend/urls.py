@@ -4,9 +4,14 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from api.views import metrics
+from market.views import resized_media
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
+    path("metrics", metrics, name="metrics"),
+    path("media-resize/<int:width>x<int:height>/<path:name>", resized_media, name="media-resize"),
     path("", include(("django_classified.urls", "django_classified"), namespace="django_classified")),
 ]
 
@@ -1,47 +1,72 @@
-from django.contrib import admin
-from .models import AdminSeedJob, AdminSeedJobStatus
-# ...existing code...
-
-@admin.register(AdminSeedJob)
-class AdminSeedJobAdmin(admin.ModelAdmin):
-    list_display = ("id", "scenario", "status", "requested_by", "created_at", "started_at", "finished_at")
-    list_filter = ("status", "scenario")
-    search_fields = ("id", "scenario", "requested_by__username")
-    readonly_fields = ("created_at", "started_at", "finished_at", "result", "output", "error")
-    ordering = ("-created_at", "-id")
-
-    actions = ["enqueue_seed_listings_job"]
-
-    def enqueue_seed_listings_job(self, request, queryset):
-        for _ in queryset:
-            AdminSeedJob.objects.create(
-                scenario="seed_listings",
-                options={"per_category": 5, "images_per_listing": 1, "sleep_seconds": 0.3},
-                requested_by=request.user,
-            )
-        self.message_user(request, "Seed job(s) enqueued.")
-    enqueue_seed_listings_job.short_description = "Enqueue seed_listings job (slow, safe)"
 from django.contrib import admin, messages
 from django.core.management import call_command
+from django.db import transaction
 from django.http import HttpResponseNotAllowed
 from django.shortcuts import redirect
 from django.urls import path
 
+from api.admin_performance import AutocompleteFilter, PerformanceAdminMixin
+
+from . import events
+from .lifecycle import thaw_live
 from .models import (
+    AdminSeedJob,
+    AdminSeedJobStatus,
+    ArchivedListingImage,
     Category,
     CategoryAttributeDefinition,
     City,
+    ExchangeRate,
     Governorate,
+    ImageBlob,
     Listing,
     ListingAttributeValue,
+    ListingEventKind,
     ListingImage,
     Neighborhood,
 )
+from .search import search_listings
+from .tasks import enqueue_seed_job
+# ...existing code...
+
+
+@admin.register(AdminSeedJob)
+class AdminSeedJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "scenario", "status", "requested_by", "created_at", "started_at", "finished_at")
+    list_filter = ("status", "scenario")
+    search_fields = ("id", "scenario", "requested_by__username")
+    readonly_fields = (
+        "created_at",
+        "started_at",
+        "finished_at",
+        "progress_processed",
+        "progress_total",
+        "progress_updated_at",
+        "log_lines",
+        "result",
+        "output",
+        "error",
+    )
+    ordering = ("-created_at", "-id")
+
+    actions = ["enqueue_seed_listings_job"]
+
+    def enqueue_seed_listings_job(self, request, queryset):
+        for _ in queryset:
+            with transaction.atomic():
+                job = AdminSeedJob.objects.create(
+                    scenario="seed_listings",
+                    options={"per_category": 5, "images_per_listing": 1, "sleep_seconds": 0.3},
+                    requested_by=request.user,
+                )
+                enqueue_seed_job(job)
+        self.message_user(request, "Seed job(s) enqueued.")
+    enqueue_seed_listings_job.short_description = "Enqueue seed_listings job (slow, safe)"
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ("id", "name_ar", "name_en", "slug", "parent")
+    list_display = ("id", "name_ar", "name_en", "slug", "parent", "listing_ttl_days")
     list_filter = ("parent",)
     search_fields = ("name_ar", "name_en", "slug")
 
@@ -66,13 +91,45 @@ class NeighborhoodAdmin(admin.ModelAdmin):
     search_fields = ("name_ar", "name_en", "slug")
 
 
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ("currency", "rate", "updated_at")
+    search_fields = ("currency",)
+    ordering = ("currency",)
+
+
 class ListingImageInline(admin.TabularInline):
     model = ListingImage
     extra = 0
+    raw_id_fields = ("blob",)
+
+
+class ArchivedListingImageInline(admin.TabularInline):
+    """A cold listing's images (market.lifecycle); editing the listing back to life restores them."""
+
+    model = ArchivedListingImage
+    extra = 0
+    fields = ("image", "alt_text", "sort_order", "blob", "created_at")
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ImageBlob)
+class ImageBlobAdmin(admin.ModelAdmin):
+    list_display = ("id", "sha256", "file", "size", "ref_count", "phash", "created_at")
+    search_fields = ("sha256", "file")
+    readonly_fields = ("sha256", "file", "size", "ref_count", "phash", "hashed_at", "created_at", "updated_at")
+    ordering = ("-id",)
 
 
 @admin.register(Listing)
-class ListingAdmin(admin.ModelAdmin):
+class ListingAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     change_list_template = "admin/market/listing/change_list.html"
 
     list_display = (
@@ -85,10 +142,23 @@ class ListingAdmin(admin.ModelAdmin):
         "is_removed",
         "city",
         "created_at",
+        "expires_at",
     )
-    list_filter = ("status", "moderation_status", "is_flagged", "is_removed", "governorate", "city")
+    list_select_related = ("seller", "city__governorate")
+    list_filter = (
+        "status",
+        "moderation_status",
+        "is_flagged",
+        "is_removed",
+        ("governorate", AutocompleteFilter),
+        ("city", AutocompleteFilter),
+    )
+    # Searched through the full-text index (see get_search_results).
     search_fields = ("title", "description")
-    inlines = [ListingImageInline]
+    search_help_text = "Words from the title or description, or a listing id."
+    autocomplete_fields = ("category", "governorate", "city", "neighborhood")
+    raw_id_fields = ("seller",)
+    inlines = [ListingImageInline, ArchivedListingImageInline]
 
     actions = [
         "approve",
@@ -99,29 +169,54 @@ class ListingAdmin(admin.ModelAdmin):
         "unflag",
     ]
 
+    def get_search_results(self, request, queryset, search_term):
+        return search_listings(queryset, search_term), False
+
+    def chunked_action(self, request, queryset, message, **values):
+        # Queryset updates skip Listing.save: record the change events per chunk.
+        super().chunked_action(
+            request,
+            queryset,
+            message,
+            on_chunk=lambda pks: events.record(pks, ListingEventKind.UPDATED, values),
+            **values,
+        )
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            events.record(queryset.values_list("pk", flat=True), ListingEventKind.DELETED)
+            super().delete_queryset(request, queryset)
+
+    def _reviving_action(self, request, queryset, message, **values):
+        # Read first: the update can move rows out of the changelist's filters.
+        cold = list(queryset.filter(is_cold=True).values_list("pk", flat=True))
+        self.chunked_action(request, queryset, message, **values)
+        if cold:
+            thaw_live(Listing.objects.filter(pk__in=cold))
+
     @admin.action(description="Approve selected listings")
     def approve(self, request, queryset):
-        queryset.update(moderation_status="approved")
+        self._reviving_action(request, queryset, "Approved %(count)d listing(s).", moderation_status="approved")
 
     @admin.action(description="Reject selected listings")
     def reject(self, request, queryset):
-        queryset.update(moderation_status="rejected")
+        self.chunked_action(request, queryset, "Rejected %(count)d listing(s).", moderation_status="rejected")
 
     @admin.action(description="Remove selected listings")
     def mark_removed(self, request, queryset):
-        queryset.update(is_removed=True)
+        self.chunked_action(request, queryset, "Removed %(count)d listing(s).", is_removed=True)
 
     @admin.action(description="Restore selected listings")
     def restore(self, request, queryset):
-        queryset.update(is_removed=False)
+        self._reviving_action(request, queryset, "Restored %(count)d listing(s).", is_removed=False)
 
     @admin.action(description="Flag selected listings")
     def flag(self, request, queryset):
-        queryset.update(is_flagged=True)
+        self.chunked_action(request, queryset, "Flagged %(count)d listing(s).", is_flagged=True)
 
     @admin.action(description="Unflag selected listings")
     def unflag(self, request, queryset):
-        queryset.update(is_flagged=False)
+        self.chunked_action(request, queryset, "Unflagged %(count)d listing(s).", is_flagged=False)
 
     def get_urls(self):
         urls = super().get_urls()
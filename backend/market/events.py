@@ -0,0 +1,192 @@
+"""A transactional outbox of listing changes, for derived data to follow.
+
+Search indexes, counters, caches, sitemaps and map tiles must learn about
+every listing write, but most writes are ``QuerySet.update`` calls (bulk
+edits, admin actions, the expiry sweep, re-pricing) that never send
+``post_save``. So each write path calls ``record`` inside its own
+transaction: the ``ListingEvent`` rows commit or roll back with the change.
+``Listing.save``/``delete`` and ``ListingImage.save``/``delete`` record their
+own events; everything else records them explicitly. Writes that touch a
+listing several times (an API request saving it, its attributes and its
+images) run in ``batched``, which merges their events into one per listing
+and writes them with one INSERT just before the transaction commits.
+
+Consumers read from their checkpoint (``read``), apply the events, and then
+``advance``. Delivery is at least once, so events should be applied
+idempotently; they name what changed, not the new values, so consumers
+reload the listing. Ids are assigned at insert but transactions commit in
+any order, so on PostgreSQL each event carries its transaction's id and
+``read`` goes in ``(txid, id)`` order, only up to the oldest transaction
+still running (``pg_snapshot_xmin``): a transaction that commits later,
+however long it ran, can only add events after everything already read.
+SQLite runs one write transaction at a time, so there id order already is
+commit order. ``prune`` drops events every consumer has read and that are
+older than ``LISTING_EVENT_RETENTION_DAYS``.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, Func, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from market.models import ListingEvent, ListingEventCheckpoint, ListingEventKind
+
+
+class CurrentTransactionId(Func):
+    """The id of the transaction writing the row on PostgreSQL, else 0."""
+
+    output_field = BigIntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return "0", []
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return "pg_current_xact_id()::text::bigint", []
+
+
+# Every transaction with a lower id has committed or rolled back.
+OLDEST_RUNNING_TXID = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+
+# Events recorded inside ``batched``, not yet written.
+_pending: ContextVar[list[ListingEvent] | None] = ContextVar("listing_events_pending", default=None)
+
+# What an images/attributes event adds to ``fields`` when merged into an update.
+_MERGED_FIELDS = {ListingEventKind.IMAGES: "images", ListingEventKind.ATTRIBUTES: "attributes"}
+
+
+def record(listing_ids: Iterable[int], kind: ListingEventKind | str, fields: Iterable[str] = ()) -> int:
+    """Write one ``kind`` event per listing; call inside the transaction making the change."""
+    fields = sorted(set(fields))
+    events = [
+        ListingEvent(listing_id=pk, kind=kind, fields=fields, txid=CurrentTransactionId()) for pk in listing_ids
+    ]
+    pending = _pending.get()
+    if pending is not None:
+        pending.extend(events)
+    else:
+        ListingEvent.objects.bulk_create(events)
+    return len(events)
+
+
+@contextmanager
+def batched(*, savepoint: bool = True) -> Iterator[None]:
+    """``transaction.atomic`` that writes the events recorded in it once, merged per listing.
+
+    Nested blocks join the outermost one; events recorded in a nested block
+    that raises are dropped with its savepoint.
+    """
+    pending = _pending.get()
+    with transaction.atomic(savepoint=savepoint):
+        if pending is not None:
+            mark = len(pending)
+            try:
+                yield
+            except BaseException:
+                del pending[mark:]
+                raise
+            return
+        pending = []
+        token = _pending.set(pending)
+        try:
+            yield
+        finally:
+            _pending.reset(token)
+        ListingEvent.objects.bulk_create(_merge(pending))
+
+
+def _merge(events: list[ListingEvent]) -> list[ListingEvent]:
+    """One event per listing, in the order the listings were first touched.
+
+    A delete or create wins; several kinds of change become one ``updated``
+    event whose ``fields`` add ``images``/``attributes``, and stay empty
+    (any field) if one of the updates did not say what it changed.
+    """
+    kinds: dict[int, set[str]] = {}
+    fields: dict[int, set[str] | None] = {}
+    for event in events:
+        kinds.setdefault(event.listing_id, set()).add(event.kind)
+        touched = fields.setdefault(event.listing_id, set())
+        if touched is None:
+            continue
+        if event.kind == ListingEventKind.UPDATED and not event.fields:
+            fields[event.listing_id] = None
+        else:
+            touched.update(event.fields)
+            if event.kind in _MERGED_FIELDS:
+                touched.add(_MERGED_FIELDS[event.kind])
+    merged = []
+    for listing_id, seen in kinds.items():
+        if ListingEventKind.DELETED in seen:
+            kind, changed = ListingEventKind.DELETED, []
+        elif ListingEventKind.CREATED in seen:
+            kind, changed = ListingEventKind.CREATED, []
+        elif len(seen) == 1 and ListingEventKind.UPDATED not in seen:
+            kind, changed = seen.pop(), []
+        else:
+            kind, changed = ListingEventKind.UPDATED, sorted(fields[listing_id] or [])
+        merged.append(ListingEvent(listing_id=listing_id, kind=kind, fields=changed, txid=CurrentTransactionId()))
+    return merged
+
+
+def read(after: int = 0, *, limit: int | None = None) -> list[ListingEvent]:
+    """Committed events after event ``after``, in ``(txid, id)`` order."""
+    limit = min(limit or settings.LISTING_EVENT_PAGE_SIZE, settings.LISTING_EVENT_PAGE_SIZE)
+    txid, pk = _order_key(after)
+    events = ListingEvent.objects.filter(Q(txid__gt=txid) | Q(txid=txid, pk__gt=pk))
+    return list(_committed(events).order_by("txid", "pk")[:limit])
+
+
+def _committed(events):
+    if connection.vendor != "postgresql":
+        return events
+    # A running transaction may still commit events with lower ids; they sort
+    # after everything below the oldest running transaction, so stop there.
+    return events.filter(txid__lt=RawSQL(OLDEST_RUNNING_TXID, ()))
+
+
+def _order_key(pk: int) -> tuple[int, int]:
+    """Where event ``pk`` sorts in read order."""
+    if not pk:
+        return (-1, 0)
+    # A pruned event sorts first: reading after it redelivers rather than skips.
+    return (ListingEvent.objects.filter(pk=pk).values_list("txid", flat=True).first() or 0, pk)
+
+
+def position(consumer: str) -> int:
+    return ListingEventCheckpoint.objects.filter(consumer=consumer).values_list("position", flat=True).first() or 0
+
+
+def advance(consumer: str, to: int) -> int:
+    """Move ``consumer``'s checkpoint forward to ``to`` (never back); returns the checkpoint."""
+    with transaction.atomic():
+        checkpoint, created = ListingEventCheckpoint.objects.select_for_update().get_or_create(
+            consumer=consumer, defaults={"position": to}
+        )
+        if not created and _order_key(to) > _order_key(checkpoint.position):
+            checkpoint.position = to
+            checkpoint.save(update_fields=["position", "updated_at"])
+    return checkpoint.position
+
+
+def prune(*, now=None, chunk_size: int = 5000) -> int:
+    """Delete old events every consumer has read past; returns how many."""
+    cutoff = (now or timezone.now()) - timedelta(days=settings.LISTING_EVENT_RETENTION_DAYS)
+    positions = ListingEventCheckpoint.objects.values_list("position", flat=True)
+    # With no consumers yet, keep everything for the first one. Checkpointed
+    # events themselves are kept: ``read`` needs them to find its place.
+    txid, pk = min((_order_key(p) for p in positions), default=(-1, 0))
+    read_by_all = ListingEvent.objects.filter(Q(txid__lt=txid) | Q(txid=txid, pk__lt=pk), created_at__lt=cutoff)
+    deleted = 0
+    while True:
+        pks = list(read_by_all.order_by("txid", "pk").values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        deleted += ListingEvent.objects.filter(pk__in=pks).delete()[0]
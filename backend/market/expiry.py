@@ -0,0 +1,179 @@
+"""Listing expiry: published listings are archived after their category's TTL.
+
+Publishing a listing stamps ``Listing.expires_at`` from the category's
+``listing_ttl_days`` (inherited down the category tree, then
+``LISTING_TTL_DAYS``); renewing restamps it. ``archive_expired`` is the
+periodic sweep (task ``market.expire_listings``, or ``manage.py
+expire_listings``). It walks ``listing_published_expiry_idx`` oldest expiry
+first and archives ``LISTING_EXPIRY_CHUNK_SIZE`` rows per short transaction,
+skipping rows another transaction holds. Sellers then get one digest email
+per sweep listing what was archived and how to renew it, each sent by its own
+``market.send_expiry_digest`` task so a mail outage is retried rather than
+losing digests for listings already archived.
+
+Archived listings leave the feed's partial indexes, so the published working
+set stays bounded by the TTLs however much history accumulates.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from market import events
+from market.models import Category, Listing, ListingEventKind, ListingStatus
+from market.tasks import enqueue_expiry_digest
+
+# Titles listed per seller in one digest; the rest are counted.
+DIGEST_MAX_TITLES = 20
+
+
+def category_ttls() -> dict[int, int | None]:
+    """Effective TTL in days per category id; None never expires."""
+    rows = {
+        pk: (parent_id, days)
+        for pk, parent_id, days in Category.objects.values_list("id", "parent_id", "listing_ttl_days")
+    }
+    resolved: dict[int, int | None] = {}
+
+    def resolve(pk: int, seen: frozenset = frozenset()) -> int | None:
+        if pk in resolved:
+            return resolved[pk]
+        parent_id, days = rows[pk]
+        if days is None:
+            if parent_id in rows and parent_id not in seen:
+                days = resolve(parent_id, seen | {pk})
+            else:
+                days = settings.LISTING_TTL_DAYS
+        resolved[pk] = days or None
+        return resolved[pk]
+
+    for pk in rows:
+        resolve(pk)
+    return resolved
+
+
+def fresh_expiry(category_id: int, *, now: datetime | None = None, ttls: dict | None = None) -> datetime | None:
+    days = (ttls if ttls is not None else category_ttls()).get(category_id, settings.LISTING_TTL_DAYS or None)
+    if not days:
+        return None
+    return (now or timezone.now()) + timedelta(days=days)
+
+
+def needs_fresh_expiry(listing: Listing) -> bool:
+    """Published with no expiry yet, or with one already past (republished)."""
+    if listing.status != ListingStatus.PUBLISHED:
+        return False
+    return listing.expires_at is None or listing.expires_at <= timezone.now()
+
+
+def stamp_expiry(queryset: QuerySet, *, now: datetime | None = None) -> int:
+    """Give published listings in ``queryset`` that need one a fresh expiry.
+
+    For queryset updates that publish listings, which bypass ``Listing.save``.
+    """
+    now = now or timezone.now()
+    stale = queryset.filter(status=ListingStatus.PUBLISHED).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__lte=now)
+    )
+    ttls = category_ttls()
+    by_expiry: dict[datetime | None, list[int]] = defaultdict(list)
+    for pk, category_id in stale.values_list("pk", "category_id"):
+        by_expiry[fresh_expiry(category_id, now=now, ttls=ttls)].append(pk)
+    if not by_expiry:
+        return 0
+    stamped = 0
+    # Inside a caller's ``events.batched`` the events merge with its own.
+    with events.batched(savepoint=False):
+        for expires_at, pks in by_expiry.items():
+            stamped += Listing.objects.filter(pk__in=pks).update(expires_at=expires_at)
+            events.record(pks, ListingEventKind.UPDATED, ["expires_at"])
+    return stamped
+
+
+def renew(listing: Listing) -> Listing:
+    """Publish ``listing`` again (if archived) with a full TTL from now."""
+    listing.status = ListingStatus.PUBLISHED
+    listing.expires_at = fresh_expiry(listing.category_id)
+    listing.save(update_fields=["status", "expires_at", "updated_at"])
+    return listing
+
+
+@dataclass
+class SweepResult:
+    archived: int = 0
+    chunks: int = 0
+    # Digests queued (sellers with an email address).
+    digests: int = 0
+    # seller id -> (archived count, first titles)
+    by_seller: dict[int, list] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {"archived": self.archived, "chunks": self.chunks, "digests": self.digests}
+
+
+def archive_expired(
+    *, now: datetime | None = None, chunk_size: int | None = None, notify: bool = True
+) -> SweepResult:
+    """Archive every published listing whose ``expires_at`` has passed."""
+    now = now or timezone.now()
+    chunk_size = chunk_size or settings.LISTING_EXPIRY_CHUNK_SIZE
+    due = (
+        Listing.objects.filter(status=ListingStatus.PUBLISHED, expires_at__lte=now)
+        .order_by("expires_at", "id")
+        .values_list("pk", "seller_id", "title")
+    )
+    result = SweepResult()
+    while True:
+        with transaction.atomic():
+            # Rows being edited (e.g. renewed) right now are left for the next sweep.
+            rows = list(due.select_for_update(skip_locked=True)[:chunk_size])
+            if rows:
+                pks = [pk for pk, _, _ in rows]
+                Listing.objects.filter(pk__in=pks).update(status=ListingStatus.ARCHIVED, updated_at=now)
+                events.record(pks, ListingEventKind.UPDATED, ["status"])
+        if not rows:
+            break
+        result.archived += len(rows)
+        result.chunks += 1
+        for _, seller_id, title in rows:
+            entry = result.by_seller.setdefault(seller_id, [0, []])
+            entry[0] += 1
+            if len(entry[1]) < DIGEST_MAX_TITLES:
+                entry[1].append(title)
+        if len(rows) < chunk_size:
+            break
+    if notify and result.by_seller:
+        result.digests = queue_expiry_digests(result.by_seller)
+    return result
+
+
+def queue_expiry_digests(by_seller: dict[int, list]) -> int:
+    """Queue one digest per seller with an email address for the listings a sweep archived."""
+    users = get_user_model().objects.filter(pk__in=list(by_seller)).exclude(email="")
+    sellers = list(users.values_list("pk", flat=True))
+    for pk in sellers:
+        count, titles = by_seller[pk]
+        enqueue_expiry_digest(pk, count, titles)
+    return len(sellers)
+
+
+def send_expiry_digest(seller_id: int, count: int, titles: list[str]) -> int:
+    """Email one seller's digest; mail errors propagate so the task is retried."""
+    user = get_user_model().objects.filter(pk=seller_id).exclude(email="").values_list("email", "username").first()
+    if user is None:
+        return 0
+    email, username = user
+    lines = [f"Hi {username},", "", f"{count} of your listings expired and were archived:", ""]
+    lines += [f"- {title}" for title in titles]
+    if count > len(titles):
+        lines.append(f"...and {count - len(titles)} more.")
+    lines += ["", "Renew any of them from your listings to publish it again."]
+    return send_mail(f"{count} listing(s) expired", "\n".join(lines), settings.DEFAULT_FROM_EMAIL, [email])
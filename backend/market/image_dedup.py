@@ -0,0 +1,263 @@
+"""Content-addressed listing photo storage and near-duplicate lookup.
+
+- Originals are keyed by SHA-256: re-uploading the same bytes reuses the
+  stored ``ImageBlob`` and only bumps its ``ref_count``.
+- Each blob gets a 64-bit difference hash (dHash). Near-identical photos
+  (re-encoded, resized, lightly edited) differ in a few bits, so a BK-tree
+  over the hashes answers "within N bits" queries without a table scan.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+from typing import Iterable
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from market.models import ImageBlob
+
+BLOB_PREFIX = "blobs"
+_HASH_CHUNK_SIZE = 256 * 1024
+_MASK64 = (1 << 64) - 1
+
+
+# --- Content hashing -------------------------------------------------------
+
+def content_sha256(fileobj) -> str:
+    digest = hashlib.sha256()
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(_HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def blob_name(sha256: str, filename: str) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()[:10]
+    return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256}{ext}"
+
+
+def _claim_existing(sha256: str) -> ImageBlob | None:
+    # Touching updated_at keeps gc_image_blobs away from a blob that is being reused.
+    claimed = ImageBlob.objects.filter(sha256=sha256).update(
+        ref_count=F("ref_count") + 1, updated_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    return ImageBlob.objects.filter(sha256=sha256).first()
+
+
+def _register(sha256: str, name: str, size: int) -> ImageBlob:
+    try:
+        with transaction.atomic():
+            return ImageBlob.objects.create(sha256=sha256, file=name, size=size, ref_count=1)
+    except IntegrityError:
+        # Another request stored the same content first; keep theirs.
+        winner = _claim_existing(sha256)
+        if winner is None:
+            raise
+        if winner.file.name != name:
+            default_storage.delete(name)
+        return winner
+
+
+def acquire_blob_for_upload(uploaded) -> ImageBlob:
+    """Return the blob for an uploaded file, storing it only if the content is new."""
+    sha256 = content_sha256(uploaded)
+    blob = _claim_existing(sha256)
+    if blob is not None:
+        return blob
+    name = default_storage.save(blob_name(sha256, getattr(uploaded, "name", "")), uploaded)
+    return _register(sha256, name, uploaded.size)
+
+
+def acquire_blob_for_stored(name: str) -> ImageBlob:
+    """Return the blob for an object already written to storage (direct uploads).
+
+    When the content is already known the new object is deleted and the
+    existing blob is reused; otherwise the object itself becomes the blob.
+    """
+    with default_storage.open(name, "rb") as fh:
+        sha256 = content_sha256(fh)
+    blob = _claim_existing(sha256)
+    if blob is not None:
+        if blob.file.name != name:
+            default_storage.delete(name)
+        return blob
+    return _register(sha256, name, default_storage.size(name))
+
+
+def release_blob(blob_id: int | None) -> None:
+    if blob_id is None:
+        return
+    ImageBlob.objects.filter(id=blob_id, ref_count__gt=0).update(
+        ref_count=F("ref_count") - 1, updated_at=timezone.now()
+    )
+
+
+def release_blobs(blob_ids: Iterable[int | None]) -> None:
+    """``release_blob`` for each entry, one UPDATE per distinct repeat count (usually one)."""
+    refs = Counter(blob_id for blob_id in blob_ids if blob_id is not None)
+    by_refs: dict[int, list[int]] = defaultdict(list)
+    for blob_id, n in refs.items():
+        by_refs[n].append(blob_id)
+    for n, ids in by_refs.items():
+        ImageBlob.objects.filter(id__in=ids, ref_count__gt=0).update(
+            ref_count=Greatest(F("ref_count") - n, 0), updated_at=timezone.now()
+        )
+
+
+# --- Perceptual hashing ----------------------------------------------------
+
+def dhash(img, hash_size: int = 8) -> int:
+    """64-bit difference hash: one bit per horizontally adjacent pixel pair."""
+    from PIL import Image
+
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = small.load()
+    value = 0
+    for y in range(hash_size):
+        for x in range(hash_size):
+            value = (value << 1) | (1 if pixels[x, y] > pixels[x + 1, y] else 0)
+    return value
+
+
+def to_signed64(value: int) -> int:
+    value &= _MASK64
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def hamming(a: int, b: int) -> int:
+    return ((a ^ b) & _MASK64).bit_count()
+
+
+def record_phash(blob_id: int, img) -> None:
+    ImageBlob.objects.filter(id=blob_id, phash__isnull=True).update(
+        phash=to_signed64(dhash(img)),
+        hashed_at=timezone.now(),
+    )
+
+
+class BKTree:
+    """Metric tree over 64-bit hashes under Hamming distance.
+
+    Each node keeps children keyed by their distance to it; a search only
+    descends into children whose key is within ``max_distance`` of the
+    query's distance to the node (triangle inequality).
+    """
+
+    def __init__(self):
+        self._root: list | None = None  # [hash, [items], {distance: child}]
+        self.size = 0
+
+    def add(self, value: int, item) -> None:
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, object]]:
+        """Return ``(distance, item)`` pairs within ``max_distance``, nearest first."""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                found.extend((distance, item) for item in node[1])
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for key, child in node[2].items() if low <= key <= high)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+class BlobHashIndex:
+    """Per-process BK-tree of blob hashes, topped up incrementally.
+
+    Each query first loads blobs hashed since the last refresh (an indexed
+    range scan on ``hashed_at``). Deleted blobs may linger in the tree;
+    ``similar_blob_ids`` re-checks matches against the database.
+    """
+
+    # Rows can commit slightly after their hashed_at timestamp; re-read a window.
+    OVERLAP = timedelta(minutes=5)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = BKTree()
+        self._seen: dict[int, int] = {}
+        self._watermark = None
+
+    def refresh(self) -> None:
+        with self._lock:
+            qs = ImageBlob.objects.filter(phash__isnull=False)
+            if self._watermark is not None:
+                qs = qs.filter(hashed_at__gte=self._watermark - self.OVERLAP)
+            latest = self._watermark
+            for blob_id, phash, hashed_at in qs.values_list("id", "phash", "hashed_at").iterator():
+                if latest is None or hashed_at > latest:
+                    latest = hashed_at
+                if self._seen.get(blob_id) == phash:
+                    continue
+                self._seen[blob_id] = phash
+                self._tree.add(phash & _MASK64, blob_id)
+            self._watermark = latest
+
+    def search(self, phash: int, max_distance: int, *, refresh: bool = True) -> list[tuple[int, int]]:
+        if refresh:
+            self.refresh()
+        return self._tree.search(phash & _MASK64, max_distance)
+
+
+_index = BlobHashIndex()
+
+
+def similar_blob_ids(phash: int, max_distance: int) -> list[tuple[int, int]]:
+    """Return ``(distance, blob_id)`` for blobs within ``max_distance`` bits of ``phash``."""
+    return similar_blob_ids_many([phash], max_distance)[phash]
+
+
+def similar_blob_ids_many(phashes, max_distance: int) -> dict[int, list[tuple[int, int]]]:
+    """``similar_blob_ids`` for several hashes, with one refresh and one verification query."""
+    phashes = list(dict.fromkeys(phashes))
+    if not phashes:
+        return {}
+    _index.refresh()
+    candidates = {
+        phash: {blob_id for _distance, blob_id in _index.search(phash, max_distance, refresh=False)}
+        for phash in phashes
+    }
+    wanted = set().union(*candidates.values())
+    if not wanted:
+        return {phash: [] for phash in phashes}
+    # The tree can hold deleted blobs; confirm against current rows.
+    current = dict(ImageBlob.objects.filter(id__in=wanted, phash__isnull=False).values_list("id", "phash"))
+    result = {}
+    for phash in phashes:
+        found = [
+            (hamming(phash, current[blob_id]), blob_id) for blob_id in candidates[phash] if blob_id in current
+        ]
+        result[phash] = sorted(pair for pair in found if pair[0] <= max_distance)
+    return result
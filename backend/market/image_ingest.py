@@ -0,0 +1,141 @@
+"""Memory-bounded image ingestion shared by avatar, cover and listing uploads.
+
+- Dimensions are checked from the file header before any pixel is decoded.
+- JPEGs are decoded with ``draft()`` at the smallest DCT scale that still
+  covers the requested output size (1/2, 1/4 or 1/8 of the pixels).
+- EXIF orientation is applied after the reduced decode.
+- Sources are read from files on disk (upload temp files, local storage paths,
+  or a temp copy of a remote object), never from an in-memory copy.
+"""
+from __future__ import annotations
+
+import math
+import os
+import shutil
+import tempfile
+import warnings
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# EXIF orientations 5-8 swap width and height when applied.
+_ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+_EXIF_ORIENTATION = 0x0112
+_COPY_CHUNK_SIZE = 256 * 1024
+
+
+class ImageRejected(ValueError):
+    pass
+
+
+def max_image_pixels() -> int:
+    return int(getattr(settings, "IMAGE_MAX_PIXELS", 50_000_000))
+
+
+def _open_checked(fh):
+    from PIL import Image
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            img = Image.open(fh)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ImageRejected("Image is too large")
+    except Exception:
+        raise ImageRejected("Unsupported or corrupt image")
+
+    width, height = img.size
+    if width <= 0 or height <= 0:
+        raise ImageRejected("Unsupported or corrupt image")
+    if width * height > max_image_pixels():
+        raise ImageRejected(f"Image is too large ({width}x{height})")
+    return img
+
+
+def probe(fileobj) -> tuple[str, int, int]:
+    """Validate an image from its header only and return (format, width, height)."""
+    pos = fileobj.tell() if hasattr(fileobj, "tell") else None
+    try:
+        img = _open_checked(fileobj)
+        return img.format or "", img.width, img.height
+    finally:
+        if pos is not None:
+            fileobj.seek(pos)
+
+
+@contextmanager
+def local_file(source):
+    """Yield a binary file handle on disk for a path, uploaded file or storage FieldFile."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fh:
+            yield fh
+        return
+
+    temporary_path = getattr(source, "temporary_file_path", None)
+    if callable(temporary_path):
+        with open(temporary_path(), "rb") as fh:
+            yield fh
+        return
+
+    try:
+        path = source.path
+    except (AttributeError, NotImplementedError, ValueError):
+        path = None
+    if path:
+        with open(path, "rb") as fh:
+            yield fh
+        return
+
+    # Remote storage (GCS) or an in-memory upload: spool to a temp file in chunks.
+    with tempfile.NamedTemporaryFile(suffix=".img") as tmp:
+        opened = source.open("rb") if hasattr(source, "open") else source
+        try:
+            if hasattr(opened, "seek"):
+                opened.seek(0)
+            shutil.copyfileobj(opened, tmp, _COPY_CHUNK_SIZE)
+        finally:
+            if hasattr(source, "close") and hasattr(source, "storage"):
+                source.close()
+        tmp.flush()
+        tmp.seek(0)
+        yield tmp
+
+
+def _draft_size(width: int, height: int, box: tuple[int, int], rotated: bool) -> tuple[int, int]:
+    # draft() works in stored orientation; the box is in displayed orientation.
+    disp_w, disp_h = (height, width) if rotated else (width, height)
+    scale = min(box[0] / disp_w, box[1] / disp_h, 1.0)
+    need_w, need_h = max(1, math.ceil(disp_w * scale)), max(1, math.ceil(disp_h * scale))
+    return (need_h, need_w) if rotated else (need_w, need_h)
+
+
+@contextmanager
+def open_for_resize(source, box: tuple[int, int]):
+    """Yield an upright RGB image decoded no larger than needed to fill ``box``.
+
+    The yielded image may still be larger than ``box``; callers downscale it
+    with ``Image.thumbnail``.
+    """
+    from PIL import ImageOps
+
+    with local_file(source) as fh:
+        img = _open_checked(fh)
+        if img.format == "JPEG":
+            orientation = img.getexif().get(_EXIF_ORIENTATION, 1)
+            img.draft("RGB", _draft_size(img.width, img.height, box, orientation in _ROTATED_ORIENTATIONS))
+        try:
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+        except ImageRejected:
+            raise
+        except Exception:
+            raise ImageRejected("Unsupported or corrupt image")
+        yield img
+
+
+def fit(img, box: tuple[int, int]):
+    """Return a downscaled copy of ``img`` that fits inside ``box``."""
+    out = img.copy()
+    out.thumbnail(box)
+    return out
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from api.metrics import IMAGE_PROCESSING
+from market import events
+from market.image_dedup import BLOB_PREFIX, record_phash
+from market.image_ingest import fit, open_for_resize
+from market.models import ImageBlob, ImageProcessingStatus, ListingEventKind, ListingImage, Profile
+
+logger = logging.getLogger(__name__)
+
+AVATAR_MEDIUM_SIZE = (400, 400)
+AVATAR_THUMBNAIL_SIZE = (128, 128)
+COVER_MEDIUM_SIZE = (1200, 400)
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# Longest-edge ladder for listing photos (list cards/map pins, detail, lightbox).
+LISTING_IMAGE_LADDER = {
+    "thumb": 320,
+    "medium": 800,
+    "large": 1600,
+}
+
+
+def _jpeg_variant(img, size: tuple[int, int], name: str) -> ContentFile:
+    buf = BytesIO()
+    fit(img, size).save(buf, format="JPEG", quality=JPEG_QUALITY)
+    return ContentFile(buf.getvalue(), name=name)
+
+
+def _variant_name(source_name: str) -> str:
+    base = os.path.splitext(os.path.basename(source_name))[0] or "image"
+    return f"{base}.jpg"
+
+
+@IMAGE_PROCESSING.timed("avatar")
+def process_profile_avatar(profile_id: int, source_name: str) -> bool:
+    """Generate avatar medium/thumbnail variants for the given original.
+
+    Returns False when the profile no longer points at ``source_name`` (a newer
+    upload superseded this one) or when processing failed.
+    """
+    profile = Profile.objects.filter(id=profile_id, avatar=source_name).first()
+    if profile is None:
+        return False
+
+    Profile.objects.filter(id=profile_id, avatar=source_name).update(
+        avatar_status=ImageProcessingStatus.PROCESSING
+    )
+    try:
+        name = _variant_name(source_name)
+        with open_for_resize(profile.avatar, AVATAR_MEDIUM_SIZE) as img:
+            medium = fit(img, AVATAR_MEDIUM_SIZE)
+        profile.avatar_medium.save(name, _jpeg_variant(medium, AVATAR_MEDIUM_SIZE, name), save=False)
+        # The thumbnail is derived from the medium, not from the original.
+        profile.avatar_thumbnail.save(
+            f"thumb_{name}", _jpeg_variant(medium, AVATAR_THUMBNAIL_SIZE, name), save=False
+        )
+    except Exception:
+        logger.exception("Avatar processing failed for profile %s", profile_id)
+        Profile.objects.filter(id=profile_id, avatar=source_name).update(
+            avatar_status=ImageProcessingStatus.FAILED
+        )
+        return False
+
+    # Only publish the variants if the original was not replaced meanwhile.
+    updated = Profile.objects.filter(id=profile_id, avatar=source_name).update(
+        avatar_medium=profile.avatar_medium.name,
+        avatar_thumbnail=profile.avatar_thumbnail.name,
+        avatar_status=ImageProcessingStatus.READY,
+    )
+    return bool(updated)
+
+
+@IMAGE_PROCESSING.timed("cover")
+def process_profile_cover(profile_id: int, source_name: str) -> bool:
+    """Generate the cover medium variant for the given original."""
+    profile = Profile.objects.filter(id=profile_id, cover=source_name).first()
+    if profile is None:
+        return False
+
+    Profile.objects.filter(id=profile_id, cover=source_name).update(cover_status=ImageProcessingStatus.PROCESSING)
+    try:
+        name = _variant_name(source_name)
+        with open_for_resize(profile.cover, COVER_MEDIUM_SIZE) as img:
+            content = _jpeg_variant(img, COVER_MEDIUM_SIZE, name)
+        profile.cover_medium.save(name, content, save=False)
+    except Exception:
+        logger.exception("Cover processing failed for profile %s", profile_id)
+        Profile.objects.filter(id=profile_id, cover=source_name).update(cover_status=ImageProcessingStatus.FAILED)
+        return False
+
+    updated = Profile.objects.filter(id=profile_id, cover=source_name).update(
+        cover_medium=profile.cover_medium.name,
+        cover_status=ImageProcessingStatus.READY,
+    )
+    return bool(updated)
+
+
+def _encode(img, fmt: str) -> ContentFile:
+    buf = BytesIO()
+    # No exif= argument: the encoded derivative carries no EXIF (GPS, device) data.
+    if fmt == "WEBP":
+        img.save(buf, format="WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return ContentFile(buf.getvalue())
+
+
+def listing_image_derivative_path(image: ListingImage, label: str, ext: str) -> str:
+    stem = os.path.splitext(os.path.basename(image.image.name))[0] or f"image_{image.id}"
+    return f"listings/{image.listing_id}/derived/{image.id}/{stem}_{label}.{ext}"
+
+
+def blob_derivative_path(blob: ImageBlob, label: str, ext: str) -> str:
+    return f"{BLOB_PREFIX}/derived/{blob.sha256[:2]}/{blob.sha256}_{label}.{ext}"
+
+
+def derivative_paths(derivatives: dict | None) -> set[str]:
+    return {
+        entry[key]
+        for entry in (derivatives or {}).values()
+        for key in ("jpeg", "webp")
+        if entry.get(key)
+    }
+
+
+def delete_derivatives(derivatives: dict | None, *, keep: set[str] = frozenset()) -> None:
+    for path in derivative_paths(derivatives) - keep:
+        default_storage.delete(path)
+
+
+def _publish_derivatives(image: ListingImage, source_name: str, derivatives: dict) -> bool:
+    with transaction.atomic():
+        updated = ListingImage.objects.filter(id=image.id, image=source_name).update(
+            derivatives=derivatives,
+            derivatives_status=ImageProcessingStatus.READY,
+        )
+        if updated:
+            # New thumbnails for the listing.
+            events.record([image.listing_id], ListingEventKind.IMAGES)
+    return bool(updated)
+
+
+@IMAGE_PROCESSING.timed("listing")
+def process_listing_image(image_id: int, source_name: str, *, force: bool = False) -> bool:
+    """Generate the JPEG + WebP size ladder for a listing photo.
+
+    Derivatives are orientation-corrected (EXIF transpose) and stripped of
+    metadata. For a photo stored as a blob they belong to the blob, named by
+    its hash, and images sharing it reuse them unless ``force``; the paths are
+    copied to ``ListingImage.derivatives``.
+    """
+    image = ListingImage.objects.filter(id=image_id, image=source_name).select_related("blob").first()
+    if image is None:
+        return False
+
+    if image.blob is not None and image.blob.derivatives and not force:
+        return _publish_derivatives(image, source_name, image.blob.derivatives)
+
+    ListingImage.objects.filter(id=image_id, image=source_name).update(
+        derivatives_status=ImageProcessingStatus.PROCESSING
+    )
+    storage = image.image.storage
+    derivatives: dict[str, dict] = {}
+    try:
+        largest = max(LISTING_IMAGE_LADDER.values())
+        with open_for_resize(image.image, (largest, largest)) as decoded:
+            current = fit(decoded, (largest, largest))
+
+        # Largest first so each rung is downscaled from the previous one.
+        for label, edge in sorted(LISTING_IMAGE_LADDER.items(), key=lambda kv: -kv[1]):
+            rung = fit(current, (edge, edge))
+            current = rung
+            entry = {"width": rung.width, "height": rung.height}
+            for key, fmt, ext in (("jpeg", "JPEG", "jpg"), ("webp", "WEBP", "webp")):
+                if image.blob is not None:
+                    path = blob_derivative_path(image.blob, label, ext)
+                else:
+                    path = listing_image_derivative_path(image, label, ext)
+                if storage.exists(path):
+                    storage.delete(path)
+                entry[key] = storage.save(path, _encode(rung, fmt))
+            derivatives[label] = entry
+
+        if image.blob_id is not None:
+            # ``current`` is now the smallest rung; plenty for a 9x8 dHash.
+            record_phash(image.blob_id, current)
+    except Exception:
+        logger.exception("Derivative generation failed for listing image %s", image_id)
+        ListingImage.objects.filter(id=image_id, image=source_name).update(
+            derivatives_status=ImageProcessingStatus.FAILED
+        )
+        return False
+
+    if image.blob_id is not None:
+        # Paths are named by content, so a concurrent run for the same blob wrote the same files.
+        ImageBlob.objects.filter(id=image.blob_id).update(derivatives=derivatives)
+    return _publish_derivatives(image, source_name, derivatives)
+
+
+PROFILE_IMAGE_PROCESSORS = {
+    "avatar": process_profile_avatar,
+    "cover": process_profile_cover,
+}
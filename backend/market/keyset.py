@@ -0,0 +1,44 @@
+"""Walks over large querysets by primary-key keyset instead of ``OFFSET``.
+
+Each step is one ``pk > last`` query, so no cursor or transaction is held
+between chunks and the cost of a step does not grow with how far the walk
+has come. Used by staff exports, admin bulk actions and price re-normalization.
+"""
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+
+def keyset_chunks(queryset: QuerySet, fields: list[str], chunk_size: int):
+    """``queryset`` as ``values_list(*fields)`` tuples in primary-key order, one list per query."""
+    rows_qs = queryset.order_by("pk").values_list("pk", *fields)
+    last = None
+    while True:
+        page = rows_qs if last is None else rows_qs.filter(pk__gt=last)
+        rows = list(page[:chunk_size])
+        if not rows:
+            return
+        yield [row[1:] for row in rows]
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][0]
+
+
+def chunked_update(queryset: QuerySet, *, chunk_size: int, on_chunk=None, **values) -> int:
+    """``queryset.update(**values)`` one primary-key range at a time.
+
+    Each chunk is its own transaction, so a large selection holds row locks
+    only briefly and a failure part-way keeps the chunks already done.
+    ``on_chunk(pks)`` runs inside each chunk's transaction (e.g. to record
+    change events). Returns the number of rows updated.
+    """
+    manager = queryset.model._base_manager.db_manager(queryset.db)
+    updated = 0
+    for rows in keyset_chunks(queryset, ["pk"], chunk_size):
+        pks = [pk for (pk,) in rows]
+        with transaction.atomic(using=queryset.db):
+            updated += manager.filter(pk__in=pks).update(**values)
+            if on_chunk is not None:
+                on_chunk(pks)
+    return updated
@@ -0,0 +1,151 @@
+"""Hot/cold storage for listings: cold listings' satellite rows live apart.
+
+Archived, removed and rejected listings (``COLD_STATE``) never reach the
+public feed, yet their attribute values and images sit in the same tables
+and indexes the feed's attribute filters and thumbnails read. Once a listing
+has been cold for ``LISTING_COLD_AFTER_DAYS`` (by ``updated_at``), ``freeze``
+moves those rows, ids and timestamps unchanged, to ``ArchivedListingAttributeValue``
+and ``ArchivedListingImage`` and sets ``Listing.is_cold``. The listing row
+itself stays put: messages, questions and reports point at it, and the feed
+already skips it through its partial indexes.
+
+Reads go through ``Listing.current_images`` and ``current_attribute_values``,
+which pick the table by ``is_cold``; ``prefetch_archived`` loads a page's cold
+rows in one query per relation, and none when the page has no cold listing.
+Writes to a cold listing thaw it first (``thaw``), and ``Listing.save`` thaws a
+listing that leaves ``COLD_STATE``. Queryset updates that can revive listings
+call ``thaw_live``; the periodic ``market.move_cold_listings`` task runs it
+over everything as well, then freezes, ``LISTING_COLD_CHUNK_SIZE`` listings per
+short transaction.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Model, QuerySet, prefetch_related_objects
+from django.utils import timezone
+
+from market.models import (
+    COLD_STATE,
+    ArchivedListingAttributeValue,
+    ArchivedListingImage,
+    Listing,
+    ListingAttributeValue,
+    ListingImage,
+)
+
+# (live table, archive table); same columns, so rows move with INSERT ... SELECT.
+SATELLITES: list[tuple[type[Model], type[Model]]] = [
+    (ListingAttributeValue, ArchivedListingAttributeValue),
+    (ListingImage, ArchivedListingImage),
+]
+
+
+# Most statements one ``thaw``, or one ``thaw_live`` chunk, runs: the locking
+# select, an INSERT ... SELECT and a DELETE per satellite, the flag update, and
+# SAVEPOINT/RELEASE inside an outer transaction. Views that thaw add this to
+# their query budget.
+THAW_QUERIES = 2 * len(SATELLITES) + 4
+
+
+def _move_rows(source: type[Model], target: type[Model], listing_ids: list[int]) -> int:
+    """Move ``listing_ids``' rows from ``source`` to ``target``, keeping every column."""
+    qn = connection.ops.quote_name
+    columns = ", ".join(qn(f.column) for f in source._meta.concrete_fields)
+    placeholders = ", ".join(["%s"] * len(listing_ids))
+    with connection.cursor() as cursor:
+        # Not bulk_create: it would restamp created_at/updated_at.
+        cursor.execute(
+            f"INSERT INTO {qn(target._meta.db_table)} ({columns}) "
+            f"SELECT {columns} FROM {qn(source._meta.db_table)} WHERE {qn('listing_id')} IN ({placeholders})",
+            listing_ids,
+        )
+        moved = cursor.rowcount
+    source.objects.filter(listing_id__in=listing_ids).delete()
+    return moved
+
+
+def _freeze(listing_ids: list[int]) -> None:
+    for live, archive in SATELLITES:
+        _move_rows(live, archive, listing_ids)
+    # A queryset update: being moved is not an edit, so updated_at stays.
+    Listing.objects.filter(pk__in=listing_ids).update(is_cold=True)
+
+
+def _thaw(listing_ids: list[int]) -> None:
+    for live, archive in SATELLITES:
+        _move_rows(archive, live, listing_ids)
+    Listing.objects.filter(pk__in=listing_ids).update(is_cold=False)
+
+
+def thaw(listing: Listing) -> Listing:
+    """Move ``listing``'s rows back to the live tables before it is edited."""
+    with transaction.atomic():
+        # Locked, so a concurrent freeze skips it rather than racing the move.
+        if Listing.objects.select_for_update().filter(pk=listing.pk, is_cold=True).exists():
+            _thaw([listing.pk])
+    listing.is_cold = False
+    return listing
+
+
+def _in_chunks(candidates: QuerySet, move, chunk_size: int) -> int:
+    """Apply ``move`` to ``candidates``' ids, ``chunk_size`` per transaction."""
+    done = 0
+    while True:
+        with transaction.atomic():
+            # Rows locked by another transaction are left for the next run.
+            pks = list(candidates.select_for_update(skip_locked=True)[:chunk_size])
+            if pks:
+                move(pks)
+        done += len(pks)
+        if len(pks) < chunk_size:
+            return done
+
+
+def thaw_live(queryset: QuerySet | None = None, *, chunk_size: int | None = None) -> int:
+    """Thaw listings (in ``queryset``, or anywhere) that are cold but no longer in ``COLD_STATE``."""
+    candidates = (queryset if queryset is not None else Listing.objects.all()).filter(~COLD_STATE, is_cold=True)
+    return _in_chunks(
+        candidates.order_by("pk").values_list("pk", flat=True),
+        _thaw,
+        chunk_size or settings.LISTING_COLD_CHUNK_SIZE,
+    )
+
+
+def freeze_cold(*, now: datetime | None = None, chunk_size: int | None = None) -> int:
+    """Freeze listings in ``COLD_STATE`` untouched for ``LISTING_COLD_AFTER_DAYS``."""
+    cutoff = (now or timezone.now()) - timedelta(days=settings.LISTING_COLD_AFTER_DAYS)
+    candidates = Listing.objects.filter(COLD_STATE, is_cold=False, updated_at__lt=cutoff)
+    return _in_chunks(
+        candidates.order_by("updated_at", "id").values_list("pk", flat=True),
+        _freeze,
+        chunk_size or settings.LISTING_COLD_CHUNK_SIZE,
+    )
+
+
+@dataclass
+class MoveResult:
+    thawed: int = 0
+    frozen: int = 0
+
+    def as_dict(self) -> dict:
+        return {"thawed": self.thawed, "frozen": self.frozen}
+
+
+def move_cold_listings(*, now: datetime | None = None, chunk_size: int | None = None) -> MoveResult:
+    """One pass of the periodic task: thaw revived listings, then freeze cold ones."""
+    return MoveResult(
+        thawed=thaw_live(chunk_size=chunk_size),
+        frozen=freeze_cold(now=now, chunk_size=chunk_size),
+    )
+
+
+def prefetch_archived(listings: Iterable[Listing], *lookups: str) -> None:
+    """Prefetch ``lookups`` (e.g. ``"archived_images"``) for the cold listings only."""
+    cold = [listing for listing in listings if listing.is_cold]
+    if cold:
+        prefetch_related_objects(cold, *lookups)
@@ -0,0 +1,373 @@
+"""Bulk synthetic marketplace data for load testing (``generate_load_data``).
+
+Listings are generated in fixed-size chunks. Chunk ``i`` draws from its own
+``Random(f"{seed}:{i}")`` and derives listing/thread ids from positions, so a
+seed always produces the same rows however many workers insert them.
+
+This module must stay importable before ``django.setup()``: pool workers are
+spawned fresh and only load Django in ``init_worker``.
+"""
+from __future__ import annotations
+
+import math
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+# Fixed id slots per listing for threads, so thread ids don't depend on chunk order.
+MAX_THREADS_PER_LISTING = 4
+BULK_BATCH_SIZE = 2000
+
+ADJECTIVES = ["Great", "Clean", "Original", "New", "Used", "Premium", "Budget", "Limited", "Rare", "Mint"]
+SELLING_LINES = [
+    "Fast sale.",
+    "Serious buyers only.",
+    "Delivery available.",
+    "Negotiable.",
+    "Test before you buy.",
+    "In good condition.",
+    "Price is final.",
+    "Can meet in the city center.",
+]
+QUESTIONS = [
+    "Is this still available?",
+    "What is the lowest price?",
+    "Can you deliver?",
+    "Any scratches or damage?",
+    "Is the warranty still valid?",
+    "Can I see it this weekend?",
+]
+ANSWERS = ["Yes, still available.", "Price is negotiable.", "Delivery is possible.", "No damage at all."]
+MESSAGES = [
+    "Hello, I'm interested.",
+    "When can I see it?",
+    "Would you accept a lower offer?",
+    "Sure, tomorrow works.",
+    "Deal.",
+    "Can you send more photos?",
+]
+REPORT_REASONS = ["spam", "scam", "duplicate", "prohibited", "other"]
+
+
+def zipf_cum_weights(n: int, s: float) -> list[float]:
+    """Cumulative weights where rank ``k`` has weight ``1 / k**s`` (a few items dominate)."""
+    out, total = [], 0.0
+    for rank in range(1, n + 1):
+        total += 1.0 / rank**s
+        out.append(total)
+    return out
+
+
+def _poisson(rnd: random.Random, mean: float) -> int:
+    if mean <= 0:
+        return 0
+    # Knuth; means here are small.
+    limit, k, p = math.exp(-mean), 0, 1.0
+    while True:
+        p *= rnd.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+@dataclass
+class Plan:
+    seed: int
+    listings: int
+    chunk_size: int
+    listing_id_base: int
+    thread_id_base: int
+    now: datetime
+    days: int
+
+    user_ids: list[int]
+    seller_cum_weights: list[float]
+    category_ids: list[int]
+    category_names: dict[int, str]
+    category_cum_weights: list[float]
+    cities: list[tuple[int, int]]  # (city_id, governorate_id), most popular first
+    city_cum_weights: list[float]
+    neighborhoods: dict[int, list[int]]
+    # category_id -> [(definition_id, type, key, choices)] including inherited definitions
+    attribute_defs: dict[int, list[tuple]] = field(default_factory=dict)
+    images: list[tuple[int, str]] = field(default_factory=list)  # (blob_id, storage name)
+    # Base-currency value of one SYP (market.pricing), for price_normalized; None if unknown.
+    syp_rate: Decimal | None = Decimal(1)
+    # category_id -> listing TTL in days (market.expiry); missing or None never expires.
+    category_ttls: dict[int, int | None] = field(default_factory=dict)
+
+    images_per_listing: float = 2.0
+    questions_per_listing: float = 0.6
+    threads_per_listing: float = 0.4
+    messages_per_thread: float = 4.0
+    reports_per_listing: float = 0.02
+    use_copy: bool = False
+
+    @property
+    def chunks(self) -> int:
+        return (self.listings + self.chunk_size - 1) // self.chunk_size
+
+
+def init_worker() -> None:
+    import django
+
+    django.setup()
+
+
+def _attribute_columns(def_type: str, value) -> dict:
+    from market.models import CategoryAttributeType
+
+    columns = dict.fromkeys(("int_value", "decimal_value", "text_value", "bool_value", "enum_value"))
+    if def_type == CategoryAttributeType.INT:
+        columns["int_value"] = int(value)
+    elif def_type == CategoryAttributeType.DECIMAL:
+        columns["decimal_value"] = Decimal(str(value))
+    elif def_type == CategoryAttributeType.BOOL:
+        columns["bool_value"] = bool(value)
+    elif def_type == CategoryAttributeType.ENUM:
+        columns["enum_value"] = str(value)
+    else:
+        columns["text_value"] = str(value)
+    return columns
+
+
+def generate_chunk(plan: Plan, index: int) -> dict[str, list[dict]]:
+    """Build the rows for one chunk, keyed by model label."""
+    from market.management.commands.seed_listings import _gen_attr_value
+    from market.models import ListingStatus, ModerationStatus
+    from reports.models import ReportStatus
+
+    rnd = random.Random(f"{plan.seed}:{index}")
+    rows: dict[str, list[dict]] = {
+        "market.Listing": [],
+        "market.ListingAttributeValue": [],
+        "market.ListingImage": [],
+        "messaging.PublicQuestion": [],
+        "messaging.PrivateThread": [],
+        "messaging.PrivateMessage": [],
+        "reports.ListingReport": [],
+    }
+
+    first = index * plan.chunk_size
+    last = min(plan.listings, first + plan.chunk_size)
+    for position in range(first, last):
+        listing_id = plan.listing_id_base + position
+        seller_id = rnd.choices(plan.user_ids, cum_weights=plan.seller_cum_weights)[0]
+        category_id = rnd.choices(plan.category_ids, cum_weights=plan.category_cum_weights)[0]
+        city_id, governorate_id = rnd.choices(plan.cities, cum_weights=plan.city_cum_weights)[0]
+        neighborhoods = plan.neighborhoods.get(city_id) or []
+        # Skewed towards recent listings.
+        created_at = plan.now - timedelta(days=plan.days * rnd.random() ** 2, seconds=rnd.randrange(86400))
+        age = (plan.now - created_at).total_seconds()
+
+        roll = rnd.random()
+        if roll < 0.08:
+            price = None
+        elif roll < 0.12:
+            price = Decimal("0")
+        else:
+            price = Decimal(int(math.exp(rnd.uniform(math.log(10_000), math.log(50_000_000)))))
+
+        listing = {
+            "id": listing_id,
+            "seller_id": seller_id,
+            "title": f"{rnd.choice(ADJECTIVES)} {plan.category_names[category_id]} {position + 1}"[:140],
+            "description": " ".join(rnd.sample(SELLING_LINES, k=3)),
+            "price": price,
+            "currency": "SYP",
+            "price_normalized": (
+                None
+                if price is None or plan.syp_rate is None
+                else (price * plan.syp_rate).quantize(Decimal("0.01"))
+            ),
+            "category_id": category_id,
+            "governorate_id": governorate_id,
+            "city_id": city_id,
+            "neighborhood_id": rnd.choice(neighborhoods) if neighborhoods and rnd.random() < 0.8 else None,
+            "latitude": Decimal(str(round(rnd.uniform(32.3, 37.3), 6))),
+            "longitude": Decimal(str(round(rnd.uniform(35.7, 42.4), 6))),
+            "status": rnd.choices(
+                [ListingStatus.PUBLISHED, ListingStatus.DRAFT, ListingStatus.ARCHIVED], weights=[85, 10, 5]
+            )[0],
+            "moderation_status": rnd.choices(
+                [ModerationStatus.APPROVED, ModerationStatus.PENDING, ModerationStatus.REJECTED],
+                weights=[90, 7, 3],
+            )[0],
+            "is_flagged": rnd.random() < 0.01,
+            "is_removed": rnd.random() < 0.01,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+        ttl = plan.category_ttls.get(category_id)
+        if ttl and listing["status"] == ListingStatus.PUBLISHED:
+            # Old listings come out already expired, for the expiry sweep to archive.
+            listing["expires_at"] = created_at + timedelta(days=ttl)
+        rows["market.Listing"].append(listing)
+
+        for definition_id, def_type, key, choices in plan.attribute_defs.get(category_id, []):
+            value = _gen_attr_value(SimpleNamespace(key=key, type=def_type, choices=choices), rnd)
+            if value in (None, ""):
+                continue
+            rows["market.ListingAttributeValue"].append(
+                {
+                    "listing_id": listing_id,
+                    "definition_id": definition_id,
+                    **_attribute_columns(def_type, value),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+
+        if plan.images:
+            count = min(_poisson(rnd, plan.images_per_listing), 8)
+            for sort_order, (blob_id, name) in enumerate(rnd.sample(plan.images, k=min(count, len(plan.images)))):
+                rows["market.ListingImage"].append(
+                    {
+                        "listing_id": listing_id,
+                        "image": name,
+                        "blob_id": blob_id,
+                        "alt_text": "",
+                        "sort_order": sort_order,
+                        "derivatives": {},
+                        "derivatives_status": "",
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                    }
+                )
+
+        for _ in range(_poisson(rnd, plan.questions_per_listing)):
+            asked_at = created_at + timedelta(seconds=rnd.uniform(0, age))
+            answered = rnd.random() < 0.6
+            rows["messaging.PublicQuestion"].append(
+                {
+                    "listing_id": listing_id,
+                    "author_id": rnd.choice(plan.user_ids),
+                    "question": rnd.choice(QUESTIONS),
+                    "answer": rnd.choice(ANSWERS) if answered else "",
+                    "answered_by_id": seller_id if answered else None,
+                    "answered_at": asked_at + timedelta(hours=rnd.uniform(0.1, 48)) if answered else None,
+                    "created_at": asked_at,
+                    "updated_at": asked_at,
+                }
+            )
+
+        thread_count = min(_poisson(rnd, plan.threads_per_listing), MAX_THREADS_PER_LISTING)
+        buyers = [
+            u for u in rnd.sample(plan.user_ids, k=min(len(plan.user_ids), thread_count + 1)) if u != seller_id
+        ]
+        for slot, buyer_id in enumerate(buyers[:thread_count]):
+            thread_id = plan.thread_id_base + position * MAX_THREADS_PER_LISTING + slot
+            started_at = created_at + timedelta(seconds=rnd.uniform(0, age))
+            rows["messaging.PrivateThread"].append(
+                {
+                    "id": thread_id,
+                    "listing_id": listing_id,
+                    "buyer_id": buyer_id,
+                    "seller_id": seller_id,
+                    "created_at": started_at,
+                    "updated_at": started_at,
+                }
+            )
+            sent_at = started_at
+            for n in range(max(1, _poisson(rnd, plan.messages_per_thread))):
+                sent_at += timedelta(minutes=rnd.uniform(1, 600))
+                rows["messaging.PrivateMessage"].append(
+                    {
+                        "thread_id": thread_id,
+                        "sender_id": buyer_id if n % 2 == 0 else seller_id,
+                        "body": rnd.choice(MESSAGES),
+                        "created_at": sent_at,
+                        "updated_at": sent_at,
+                    }
+                )
+
+        if rnd.random() < plan.reports_per_listing:
+            reported_at = created_at + timedelta(seconds=rnd.uniform(0, age))
+            status = rnd.choices(
+                [ReportStatus.OPEN, ReportStatus.RESOLVED, ReportStatus.DISMISSED], weights=[70, 20, 10]
+            )[0]
+            rows["reports.ListingReport"].append(
+                {
+                    "listing_id": listing_id,
+                    "reporter_id": rnd.choice(plan.user_ids),
+                    "reason": rnd.choice(REPORT_REASONS),
+                    "message": "",
+                    "status": status,
+                    "handled_by_id": None,
+                    "handled_at": None if status == ReportStatus.OPEN else reported_at + timedelta(days=1),
+                    "created_at": reported_at,
+                    "updated_at": reported_at,
+                }
+            )
+
+    return rows
+
+
+def copy_supported() -> bool:
+    from django.db import connection
+
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        return hasattr(cursor.cursor, "copy")  # psycopg 3
+
+
+@contextmanager
+def manual_timestamps(model):
+    """Let bulk_create keep generated created_at/updated_at values."""
+    fields = [
+        f
+        for f in model._meta.concrete_fields
+        if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False)
+    ]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _copy_rows(model, rows: list[dict]) -> None:
+    from django.db import connection, models
+    from psycopg.types.json import Jsonb
+
+    fields = [f for f in model._meta.concrete_fields if f.attname in rows[0]]
+    attnames = [f.attname for f in fields]
+    json_attnames = {f.attname for f in fields if isinstance(f, models.JSONField)}
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+    sql = f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN"
+    with connection.cursor() as cursor:
+        with cursor.cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row([Jsonb(row[a]) if a in json_attnames else row[a] for a in attnames])
+
+
+def insert_rows(model, rows: list[dict], *, use_copy: bool) -> int:
+    if not rows:
+        return 0
+    if use_copy:
+        _copy_rows(model, rows)
+    else:
+        with manual_timestamps(model):
+            model.objects.bulk_create([model(**row) for row in rows], batch_size=BULK_BATCH_SIZE)
+    return len(rows)
+
+
+def run_chunk(plan: Plan, index: int) -> dict[str, int]:
+    """Generate and insert one chunk atomically; returns row counts by model label."""
+    from django.apps import apps
+    from django.db import transaction
+
+    rows = generate_chunk(plan, index)
+    counts = {}
+    with transaction.atomic():
+        # Dict order is parent-before-child, which keeps FKs satisfied.
+        for label, model_rows in rows.items():
+            counts[label] = insert_rows(apps.get_model(label), model_rows, use_copy=plan.use_copy)
+    return counts
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import json
+import platform
+import random
+import subprocess
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from market import loadgen
+from market.models import (
+    CategoryAttributeDefinition,
+    Listing,
+    ListingAttributeValue,
+    ListingStatus,
+    ModerationStatus,
+)
+from messaging.models import PrivateThread
+
+User = get_user_model()
+
+# Each tier has its own generate_load_data seed, so tiers can coexist in one database.
+TIERS = {"10k": (10_000, 10), "100k": (100_000, 100), "1m": (1_000_000, 1000)}
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            cwd=settings.BASE_DIR,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return out.stdout.strip()
+
+
+def _rows_in(response) -> int:
+    data = getattr(response, "data", None)
+    if isinstance(data, dict):
+        for key in ("results", "updated"):
+            if isinstance(data.get(key), list):
+                return len(data[key])
+        return 1
+    if isinstance(data, list):
+        return len(data)
+    return 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark API endpoints in-process against the configured database and write p50/p95 latency, "
+        "queries per request and rows/sec to a JSON file that can be diffed across commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tier", choices=sorted(TIERS), default="10k", help="Dataset size (default: 10k)")
+        parser.add_argument(
+            "--listings", type=int, default=0, help="Override the tier's listing count (smoke runs)"
+        )
+        parser.add_argument(
+            "--prepare",
+            action="store_true",
+            help="Generate the tier's dataset with generate_load_data if it is missing or incomplete",
+        )
+        parser.add_argument("--iterations", type=int, default=50, help="Measured requests per scenario")
+        parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per scenario")
+        parser.add_argument(
+            "--scenario", action="append", dest="scenarios", help="Only run this scenario (repeatable)"
+        )
+        parser.add_argument("--output", default="", help="Write results JSON here (default: print only)")
+        parser.add_argument("--baseline", default="", help="Compare against a previous results JSON")
+        parser.add_argument("--seed", type=int, default=7, help="RNG seed for picking request targets")
+
+    def handle(self, *args, **options):
+        tier = options["tier"]
+        listings, data_seed = TIERS[tier]
+        listings = int(options["listings"] or 0) or listings
+        prefix = f"load_{data_seed}_"
+
+        have = Listing.objects.filter(seller__username__startswith=prefix).count()
+        if have < listings:
+            if not options["prepare"]:
+                raise CommandError(
+                    f"Tier {tier} needs {listings} generated listings, found {have}. Rerun with --prepare."
+                )
+            self.stdout.write(f"Generating tier {tier} ({listings} listings)...")
+            call_command(
+                "generate_load_data",
+                listings=listings,
+                seed=data_seed,
+                purge=True,
+                images_per_listing=0,
+                stdout=self.stdout,
+            )
+
+        rnd = random.Random(options["seed"])
+        targets = self._targets(prefix, rnd)
+        scenarios = self._scenarios(targets, rnd)
+        wanted = options["scenarios"] or list(scenarios)
+        unknown = sorted(set(wanted) - set(scenarios))
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(unknown)}. Available: {', '.join(scenarios)}")
+
+        host = next(
+            (h for h in settings.ALLOWED_HOSTS if h and "*" not in h and not h.startswith(".")), "localhost"
+        )
+        results = {}
+        for name in wanted:
+            user, make_request, writes = scenarios[name]
+            client = APIClient(HTTP_HOST=host)
+            if user is not None:
+                client.force_authenticate(user)
+            results[name] = self._measure(
+                client, make_request, writes=writes, warmup=options["warmup"], iterations=options["iterations"]
+            )
+            r = results[name]
+            self.stdout.write(
+                f"{name:<16} p50={r['p50_ms']:>8.2f}ms p95={r['p95_ms']:>8.2f}ms "
+                f"queries={r['queries_mean']:>5.1f} (max {r['queries_max']}) rows/s={r['rows_per_sec']:>9.0f}"
+            )
+
+        report = {
+            "meta": {
+                "commit": _git_commit(),
+                "timestamp": datetime.now(dt_timezone.utc).isoformat(timespec="seconds"),
+                "tier": tier,
+                "listings": Listing.objects.filter(seller__username__startswith=prefix).count(),
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "iterations": options["iterations"],
+                "warmup": options["warmup"],
+            },
+            "scenarios": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2, sort_keys=True)
+                fh.write("\n")
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        if options["baseline"]:
+            self._compare(options["baseline"], report)
+
+    def _targets(self, prefix: str, rnd: random.Random) -> dict:
+        generated = Listing.objects.filter(seller__username__startswith=prefix)
+        visible = generated.filter(
+            status=ListingStatus.PUBLISHED, moderation_status=ModerationStatus.APPROVED, is_removed=False
+        )
+        # Ids are contiguous per run, so sampling from the range avoids ORDER BY RANDOM().
+        bounds = list(visible.order_by("id").values_list("id", flat=True)[:1]) + list(
+            visible.order_by("-id").values_list("id", flat=True)[:1]
+        )
+        if not bounds:
+            raise CommandError("No visible generated listings to benchmark against")
+        lo, hi = bounds
+        detail_ids = [
+            i
+            for i in visible.filter(id__in=[rnd.randint(lo, hi) for _ in range(200)]).values_list("id", flat=True)
+        ] or [lo]
+
+        # Zipf rank 1 is the first generated user: the heaviest seller.
+        power_seller = User.objects.filter(username=f"{prefix}0").first()
+        own_ids = list(generated.filter(seller=power_seller, is_removed=False).values_list("id", flat=True)[:50])
+
+        busiest = (
+            PrivateThread.objects.filter(listing__in=generated)
+            .values("buyer_id")
+            .annotate(n=Count("id"))
+            .order_by("-n")
+            .first()
+        )
+        inbox_user = User.objects.get(id=busiest["buyer_id"]) if busiest else power_seller
+        thread_id = (
+            PrivateThread.objects.filter(buyer=inbox_user).values_list("id", flat=True).first()
+            if busiest
+            else None
+        )
+
+        attr = None
+        value = (
+            ListingAttributeValue.objects.filter(
+                listing_id=detail_ids[0], definition__is_filterable=True, definition__type="enum"
+            )
+            .select_related("definition")
+            .first()
+        )
+        if value is not None:
+            listing = Listing.objects.only("category_id").get(id=value.listing_id)
+            attr = (listing.category_id, value.definition.key, value.enum_value)
+        elif CategoryAttributeDefinition.objects.filter(is_filterable=True).exists():
+            self.stdout.write(self.style.WARNING("No enum attribute value found; skipping attr_filter"))
+
+        sample = visible.filter(id=detail_ids[0]).values("category_id", "city_id").first()
+        return {
+            "detail_ids": detail_ids,
+            "category_id": sample["category_id"],
+            "city_id": sample["city_id"],
+            "power_seller": power_seller,
+            "own_ids": own_ids,
+            "inbox_user": inbox_user,
+            "thread_id": thread_id,
+            "attr": attr,
+        }
+
+    def _scenarios(self, t: dict, rnd: random.Random) -> dict:
+        """name -> (user or None, request callable taking a client, performs writes)."""
+        scenarios = {
+            "list": (None, lambda c: c.get("/api/v1/listings/"), False),
+            "list_filtered": (
+                None,
+                lambda c: c.get(
+                    "/api/v1/listings/",
+                    {
+                        "category": t["category_id"],
+                        "city": t["city_id"],
+                        "price_min": 50_000,
+                        "ordering": "-price",
+                    },
+                ),
+                False,
+            ),
+            "search": (
+                None,
+                lambda c: c.get("/api/v1/listings/", {"search": rnd.choice(loadgen.ADJECTIVES)}),
+                False,
+            ),
+            "detail": (None, lambda c: c.get(f"/api/v1/listings/{rnd.choice(t['detail_ids'])}/"), False),
+            # Signed-in feeds add the user's own unpublished listings to the public ones.
+            "list_signed_in": (t["power_seller"], lambda c: c.get("/api/v1/listings/"), False),
+            "list_signed_in_filtered": (
+                t["power_seller"],
+                lambda c: c.get("/api/v1/listings/", {"category": t["category_id"], "city": t["city_id"]}),
+                False,
+            ),
+            "mine": (t["power_seller"], lambda c: c.get("/api/v1/listings/mine/"), False),
+            "thread_inbox": (t["inbox_user"], lambda c: c.get("/api/v1/threads/"), False),
+        }
+        if t["attr"] is not None:
+            category_id, key, value = t["attr"]
+            scenarios["attr_filter"] = (
+                None,
+                lambda c: c.get("/api/v1/listings/", {"category": category_id, f"attr_{key}": value}),
+                False,
+            )
+        if t["own_ids"]:
+            scenarios["bulk_update"] = (
+                t["power_seller"],
+                lambda c: c.post(
+                    "/api/v1/listings/bulk_update/",
+                    {"ids": t["own_ids"], "data": {"price": rnd.randint(10_000, 900_000)}},
+                    format="json",
+                ),
+                True,
+            )
+        if t["thread_id"]:
+            scenarios["message_send"] = (
+                t["inbox_user"],
+                lambda c: c.post(
+                    f"/api/v1/threads/{t['thread_id']}/messages/",
+                    {"thread": t["thread_id"], "body": "Benchmark"},
+                    format="json",
+                ),
+                True,
+            )
+        return scenarios
+
+    def _measure(self, client, make_request, *, writes: bool, warmup: int, iterations: int) -> dict:
+        timings: list[float] = []
+        queries: list[int] = []
+        statuses: dict[str, int] = {}
+        rows = 0
+        with transaction.atomic() if writes else nullcontext():
+            for n in range(max(0, warmup) + max(1, iterations)):
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = make_request(client)
+                    elapsed = time.perf_counter() - started
+                if n < warmup:
+                    continue
+                timings.append(elapsed)
+                queries.append(len(captured))
+                statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+                rows += _rows_in(response)
+            if writes:
+                # Leave the dataset as it was so runs stay comparable.
+                transaction.set_rollback(True)
+
+        timings.sort()
+        total = sum(timings)
+        return {
+            "requests": len(timings),
+            "p50_ms": round(_percentile(timings, 50) * 1000, 3),
+            "p95_ms": round(_percentile(timings, 95) * 1000, 3),
+            "mean_ms": round(total / len(timings) * 1000, 3),
+            "max_ms": round(timings[-1] * 1000, 3),
+            "queries_mean": round(sum(queries) / len(queries), 2),
+            "queries_max": max(queries),
+            "rows_per_sec": round(rows / total, 1) if total else 0.0,
+            "status_codes": statuses,
+        }
+
+    def _compare(self, path: str, report: dict) -> None:
+        with open(path) as fh:
+            baseline = json.load(fh)
+        self.stdout.write(f"\nvs {path} (commit {baseline.get('meta', {}).get('commit') or '?'}):")
+        for name, cur in report["scenarios"].items():
+            old = baseline.get("scenarios", {}).get(name)
+            if not old:
+                self.stdout.write(f"{name:<16} (new)")
+                continue
+            parts = []
+            for key in ("p50_ms", "p95_ms", "queries_mean"):
+                before, after = old.get(key) or 0, cur[key]
+                delta = (after - before) / before * 100 if before else 0.0
+                parts.append(f"{key}={after} ({delta:+.1f}%)")
+            self.stdout.write(f"{name:<16} " + " ".join(parts))
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+
+
+def _reset_peak_rss() -> None:
+    # ru_maxrss survives fork+exec, so a spawned worker starts at the parent's
+    # peak. On Linux the high-water mark can be reset explicitly.
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_kb() -> int:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _legacy_avatar(path: str, sizes: tuple, quality: int) -> None:
+    # Pre-ingest pipeline: whole upload in memory, full-resolution decode, two resizes.
+    from PIL import Image
+
+    with open(path, "rb") as fh:
+        data = BytesIO(fh.read())
+    img = Image.open(data).convert("RGB")
+    for size in sizes:
+        variant = img.copy()
+        variant.thumbnail(size)
+        variant.save(BytesIO(), format="JPEG", quality=quality)
+
+
+def _current_avatar(path: str, sizes: tuple, quality: int) -> None:
+    from market.image_ingest import fit, open_for_resize
+
+    medium_size, thumbnail_size = sizes
+    with open_for_resize(path, medium_size) as img:
+        medium = fit(img, medium_size)
+    medium.save(BytesIO(), format="JPEG", quality=quality)
+    fit(medium, thumbnail_size).save(BytesIO(), format="JPEG", quality=quality)
+
+
+PIPELINES = {"legacy": _legacy_avatar, "current": _current_avatar}
+
+
+def _measure(pipeline: str, path: str, sizes: tuple, quality: int) -> dict:
+    # Runs in a fresh spawned process so ru_maxrss reflects this pipeline only.
+    # Django apps are not loaded there, so nothing here may import models.
+    import PIL.Image  # noqa: F401  (exclude import cost from the delta)
+
+    _reset_peak_rss()
+    before = _peak_rss_kb()
+    started = time.perf_counter()
+    PIPELINES[pipeline](path, sizes, quality)
+    elapsed = time.perf_counter() - started
+    return {"ms": round(elapsed * 1000, 1), "peak_rss_delta_kb": max(0, _peak_rss_kb() - before)}
+
+
+def _make_source(path: str, megapixels: float) -> tuple[int, int]:
+    from PIL import Image, ImageFilter
+
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    # Noise keeps the JPEG close to a real photo's size; a flat image compresses to nothing.
+    noise = Image.effect_noise((width // 8, height // 8), 64).filter(ImageFilter.SMOOTH)
+    img = Image.merge("RGB", [noise, noise.rotate(180), noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)])
+    img.resize((width, height)).save(path, format="JPEG", quality=90)
+    return width, height
+
+
+class Command(BaseCommand):
+    help = "Compare peak RSS and latency of the legacy and current avatar ingest pipelines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--megapixels", type=float, default=24.0, help="Size of the synthetic source JPEG")
+        parser.add_argument("--runs", type=int, default=3, help="Runs per pipeline (median is reported)")
+        parser.add_argument("--source", default="", help="Use this image instead of a synthetic one")
+        parser.add_argument("--json", action="store_true", help="Emit results as JSON")
+
+    def handle(self, *args, **options):
+        from market.images import AVATAR_MEDIUM_SIZE, AVATAR_THUMBNAIL_SIZE, JPEG_QUALITY
+
+        sizes = (AVATAR_MEDIUM_SIZE, AVATAR_THUMBNAIL_SIZE)
+        runs = max(1, int(options["runs"]))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = options["source"]
+            if not path:
+                path = os.path.join(tmpdir, "source.jpg")
+                width, height = _make_source(path, options["megapixels"])
+                self.stderr.write(f"source={width}x{height} bytes={os.path.getsize(path)}")
+
+            ctx = multiprocessing.get_context("spawn")
+            results = {}
+            for pipeline in PIPELINES:
+                samples = []
+                for _ in range(runs):
+                    with ctx.Pool(1) as pool:
+                        samples.append(pool.apply(_measure, (pipeline, path, sizes, JPEG_QUALITY)))
+                samples.sort(key=lambda s: s["ms"])
+                median = samples[len(samples) // 2]
+                results[pipeline] = {
+                    "ms": median["ms"],
+                    "peak_rss_delta_kb": max(s["peak_rss_delta_kb"] for s in samples),
+                }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results))
+            return
+        for pipeline, row in results.items():
+            self.stdout.write(f"{pipeline}: ms={row['ms']} peak_rss_delta_kb={row['peak_rss_delta_kb']}")
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+
+from api.v1.listing_filters import clear_plan_cache, parse_listing_filters
+from market.models import Category, CategoryAttributeDefinition, City, Listing
+
+
+def _median_us(fn, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1_000_000, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request cost of the listing filter params: parsing (cold and memoized) and compiling "
+        "the plan onto a queryset, with the queries compiling takes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=2000, help="Timed calls per step (median is reported)"
+        )
+        parser.add_argument("--json", action="store_true", help="Emit results as JSON")
+
+    def _cases(self) -> dict[str, str]:
+        cities = list(City.objects.order_by("id").values_list("id", flat=True)[:3])
+        roots = list(Category.objects.filter(parent=None).order_by("id").values_list("id", flat=True)[:2])
+        cases = {
+            "feed": "",
+            "city": f"city={cities[0]}" if cities else "",
+            "multi_value": "&".join(
+                filter(
+                    None,
+                    [
+                        f"city={','.join(map(str, cities))}" if cities else "",
+                        f"category={','.join(map(str, roots))}" if roots else "",
+                        "price_min=100&price__lte=5000",
+                    ],
+                )
+            ),
+        }
+        definition = (
+            CategoryAttributeDefinition.objects.filter(is_filterable=True, type="int").order_by("id").first()
+        )
+        if definition is not None:
+            cases["attribute"] = f"category={definition.category_id}&attr_{definition.key}__gte=1"
+        return cases
+
+    def handle(self, *args, **options):
+        iterations = max(1, int(options["iterations"]))
+        base = Listing.objects.select_related("category", "city", "seller")
+        results = {}
+        for name, query in self._cases().items():
+            params = QueryDict(query)
+
+            def parse_cold():
+                clear_plan_cache()
+                parse_listing_filters(params)
+
+            def compile_sql():
+                str(parse_listing_filters(params).apply(base).query)
+
+            with CaptureQueriesContext(connection) as ctx:
+                compile_sql()
+            results[name] = {
+                "query": query,
+                "parse_cold_us": _median_us(parse_cold, iterations),
+                "parse_memoized_us": _median_us(lambda: parse_listing_filters(params), iterations),
+                "compile_us": _median_us(compile_sql, max(1, iterations // 10)),
+                "compile_queries": len(ctx.captured_queries),
+                "signature": parse_listing_filters(params).signature,
+            }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results))
+            return
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<12} parse_cold={row['parse_cold_us']}us parse_memoized={row['parse_memoized_us']}us "
+                f"compile={row['compile_us']}us ({row['compile_queries']} queries)  [{row['signature'] or '-'}]"
+            )
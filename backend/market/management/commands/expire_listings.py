@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from market.expiry import archive_expired
+from market.tasks import schedule_listing_expiry
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive published listings past their expiry and queue a digest email to each seller. "
+        "With --schedule, queue the periodic sweep on the task queue instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Queue market.expire_listings to run now and every LISTING_EXPIRY_INTERVAL_SECONDS",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Rows archived per transaction (default: LISTING_EXPIRY_CHUNK_SIZE)",
+        )
+        parser.add_argument("--no-notify", action="store_true", help="Don't email sellers")
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            schedule_listing_expiry(delay_seconds=0)
+            self.stdout.write("Queued the periodic listing expiry sweep.")
+            return
+        result = archive_expired(chunk_size=options["chunk_size"], notify=not options["no_notify"])
+        self.stdout.write(
+            f"Archived {result.archived} listing(s) in {result.chunks} chunk(s); "
+            f"queued {result.digests} digest(s)."
+        )
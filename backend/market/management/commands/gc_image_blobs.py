@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from market import events
+from market.image_dedup import acquire_blob_for_stored, record_phash
+from market.image_ingest import open_for_resize
+from market.images import delete_derivatives, derivative_paths
+from market.models import ArchivedListingImage, ImageBlob, ImageProcessingStatus, ListingEventKind, ListingImage
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile listing image blobs: optionally move legacy images onto shared blobs, "
+        "hash blobs missing a perceptual hash, move derivatives onto blobs, fix ref counts and "
+        "delete unreferenced blobs with their derivatives."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backfill", action="store_true", help="Attach blobs to images uploaded before dedup")
+        parser.add_argument(
+            "--grace-hours",
+            type=int,
+            default=None,
+            help="Keep unreferenced blobs this long (default: IMAGE_BLOB_GC_GRACE_HOURS)",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting")
+
+    def handle(self, *args, **options):
+        if options.get("backfill"):
+            self._backfill()
+        self._hash_missing()
+        self._adopt_derivatives()
+
+        # Cascades (listing deletes, admin) bypass release_blob; recount from the source of truth.
+        recounted = 0
+        # Cold listings' images (market.lifecycle) hold references too.
+        refs = Count("listing_images", distinct=True) + Count("archived_listing_images", distinct=True)
+        for blob_id, ref_count, refs in ImageBlob.objects.annotate(refs=refs).values_list(
+            "id", "ref_count", "refs"
+        ):
+            if ref_count != refs:
+                ImageBlob.objects.filter(id=blob_id).update(ref_count=refs)
+                recounted += 1
+
+        grace = options.get("grace_hours")
+        if grace is None:
+            grace = settings.IMAGE_BLOB_GC_GRACE_HOURS
+        cutoff = timezone.now() - timedelta(hours=grace)
+        deleted = 0
+        unreferenced = ImageBlob.objects.filter(ref_count=0, updated_at__lt=cutoff)
+        for blob_id, sha256, name, derivatives in unreferenced.values_list("id", "sha256", "file", "derivatives"):
+            if options.get("dry_run"):
+                self.stdout.write(f"would delete blob={blob_id} file={name}")
+                continue
+            # Conditional delete: a concurrent upload may have claimed the blob meanwhile.
+            removed, _ = ImageBlob.objects.filter(id=blob_id, ref_count=0, updated_at__lt=cutoff).delete()
+            if not removed:
+                continue
+            if (
+                name
+                and not ImageBlob.objects.filter(file=name).exists()
+                and not ListingImage.objects.filter(image=name).exists()
+                and not ArchivedListingImage.objects.filter(image=name).exists()
+            ):
+                default_storage.delete(name)
+            # Derivative paths are named by content; keep them if the content was uploaded again.
+            if not ImageBlob.objects.filter(sha256=sha256).exists():
+                delete_derivatives(derivatives)
+            deleted += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Recounted {recounted} blob(s); deleted {deleted} unreferenced blob(s)")
+        )
+
+    def _backfill(self):
+        attached = 0
+        legacy = ListingImage.objects.filter(blob=None).exclude(image="")
+        for image_id, listing_id, name in legacy.values_list("id", "listing_id", "image").iterator():
+            if not default_storage.exists(name):
+                continue
+            blob = acquire_blob_for_stored(name)
+            # The image's URL changes: a queryset update, so record the event here.
+            with transaction.atomic():
+                ListingImage.objects.filter(id=image_id).update(blob=blob, image=blob.file.name)
+                events.record([listing_id], ListingEventKind.IMAGES)
+            attached += 1
+        self.stdout.write(f"Attached {attached} legacy image(s) to blobs")
+
+    def _adopt_derivatives(self):
+        """Give blobs without derivatives those of one of their processed images.
+
+        Images processed before derivatives moved to the blob (and legacy
+        images attached by --backfill) may each hold their own copies; one set
+        becomes the blob's and the others are deleted.
+        """
+        adopted = 0
+        for blob in ImageBlob.objects.filter(derivatives={}, ref_count__gt=0).iterator():
+            images = [
+                (model, image_id, listing_id, derivatives)
+                for model in (ListingImage, ArchivedListingImage)
+                for image_id, listing_id, derivatives in model.objects.filter(
+                    blob=blob, derivatives_status=ImageProcessingStatus.READY
+                ).exclude(derivatives={}).order_by("id").values_list("id", "listing_id", "derivatives")
+            ]
+            if not images:
+                continue
+            kept = images[0][3]
+            if not ImageBlob.objects.filter(id=blob.id, derivatives={}).update(derivatives=kept):
+                continue
+            for model, image_id, listing_id, derivatives in images:
+                if derivatives != kept:
+                    delete_derivatives(derivatives, keep=derivative_paths(kept))
+                    # The image's rendition URLs change with its derivatives.
+                    with transaction.atomic():
+                        model.objects.filter(id=image_id).update(derivatives=kept)
+                        events.record([listing_id], ListingEventKind.IMAGES)
+            adopted += 1
+        if adopted:
+            self.stdout.write(f"Moved derivatives onto {adopted} blob(s)")
+
+    def _hash_missing(self):
+        hashed = 0
+        for blob in ImageBlob.objects.filter(phash__isnull=True).iterator():
+            try:
+                with open_for_resize(blob.file, (64, 64)) as img:
+                    record_phash(blob.id, img)
+            except Exception as exc:
+                self.stderr.write(f"blob={blob.id}: {exc}")
+                continue
+            hashed += 1
+        if hashed:
+            self.stdout.write(f"Hashed {hashed} blob(s)")
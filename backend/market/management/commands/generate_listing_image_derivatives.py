@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from market.images import process_listing_image
+from market.models import ImageProcessingStatus, ListingImage
+
+
+class Command(BaseCommand):
+    help = "Generate thumb/medium/large JPEG+WebP derivatives for listing images that lack them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listing", type=int, default=None, help="Only process images of this listing id")
+        parser.add_argument("--force", action="store_true", help="Regenerate even when derivatives are ready")
+
+    def handle(self, *args, **options):
+        qs = ListingImage.objects.order_by("id")
+        if options.get("listing"):
+            qs = qs.filter(listing_id=options["listing"])
+        if not options.get("force"):
+            qs = qs.exclude(derivatives_status=ImageProcessingStatus.READY)
+
+        done = 0
+        failed = 0
+        for image_id, source_name in qs.values_list("id", "image").iterator():
+            if source_name and process_listing_image(image_id, source_name, force=options.get("force")):
+                done += 1
+            else:
+                failed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated derivatives for {done} image(s); {failed} skipped/failed")
+        )
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from market import loadgen
+from market.image_dedup import acquire_blob_for_upload
+from market.management.commands.seed_listings import _effective_attr_defs, _render_seed_image
+from market.models import Category, City, ImageBlob, Listing, ListingImage, Neighborhood
+from market.expiry import category_ttls
+from market.pricing import rate_for
+from market.seeding import ensure_minimum_lookups, is_admin_seeding_enabled
+from messaging.models import PrivateThread
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate a large, skewed synthetic dataset (listings, attributes, images, Q&A, "
+        "threads, messages, reports) for load testing. Deterministic for a given --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=10_000, help="Listings to generate (default: 10000)")
+        parser.add_argument(
+            "--users", type=int, default=0, help="Users to create (default: listings / 10, min 50)"
+        )
+        parser.add_argument("--seed", type=int, default=1337, help="RNG seed (default: 1337)")
+        parser.add_argument("--days", type=int, default=365, help="Spread created_at over this many past days")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Listings per worker chunk/transaction")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Worker processes (default: CPU count; always 1 on SQLite)",
+        )
+        parser.add_argument("--images-per-listing", type=float, default=2.0, help="Mean images per listing")
+        parser.add_argument(
+            "--image-pool", type=int, default=24, help="Distinct rendered images shared by listings"
+        )
+        parser.add_argument(
+            "--questions-per-listing", type=float, default=0.6, help="Mean public questions per listing"
+        )
+        parser.add_argument(
+            "--threads-per-listing", type=float, default=0.4, help="Mean private threads per listing"
+        )
+        parser.add_argument("--messages-per-thread", type=float, default=4.0, help="Mean messages per thread")
+        parser.add_argument("--reports-per-listing", type=float, default=0.02, help="Share of listings reported")
+        parser.add_argument("--no-copy", action="store_true", help="Use bulk_create even when COPY is available")
+        parser.add_argument(
+            "--purge", action="store_true", help="Delete data previously generated for this seed first"
+        )
+
+    def handle(self, *args, **options):
+        if not is_admin_seeding_enabled():
+            raise CommandError("Seeding is disabled. Set ADMIN_SEEDING_ENABLED=true (or run with DEBUG=true).")
+
+        seed = int(options["seed"])
+        listings = max(0, int(options["listings"]))
+        users = int(options["users"] or 0) or max(50, listings // 10)
+        prefix = f"load_{seed}_"
+
+        existing = User.objects.filter(username__startswith=prefix)
+        if existing.exists():
+            if not options["purge"]:
+                raise CommandError(f"Data for seed {seed} already exists; rerun with --purge to replace it.")
+            deleted, _ = Listing.objects.filter(seller__in=existing).delete()
+            existing.delete()
+            self.stdout.write(f"Purged {deleted} row(s) from the previous run")
+
+        started = time.monotonic()
+        plan = self._build_plan(options, seed=seed, listings=listings, users=users, prefix=prefix)
+
+        workers = int(options["workers"] or 0) or os.cpu_count() or 1
+        if connection.vendor == "sqlite":
+            # SQLite has a single writer; parallel workers would just contend for the lock.
+            workers = 1
+        workers = max(1, min(workers, plan.chunks))
+
+        totals: dict[str, int] = {"auth.User": users}
+        for counts in self._run(plan, workers):
+            for label, n in counts.items():
+                totals[label] = totals.get(label, 0) + n
+
+        self._finish(plan)
+        elapsed = time.monotonic() - started
+        rows = sum(totals.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-6):.0f} rows/s, "
+                f"workers={workers}, copy={plan.use_copy})"
+            )
+        )
+        for label, n in totals.items():
+            self.stdout.write(f"  {label}: {n}")
+
+    def _run(self, plan: loadgen.Plan, workers: int):
+        if workers == 1:
+            for index in range(plan.chunks):
+                yield loadgen.run_chunk(plan, index)
+            return
+
+        # Children open their own connections; don't hand them ours.
+        connections.close_all()
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=loadgen.init_worker) as pool:
+            futures = [pool.submit(loadgen.run_chunk, plan, index) for index in range(plan.chunks)]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _build_plan(self, options, *, seed: int, listings: int, users: int, prefix: str) -> loadgen.Plan:
+        rnd = random.Random(seed)
+        with transaction.atomic():
+            ensure_minimum_lookups(created={}, updated={}, skipped={})
+
+        all_categories = list(Category.objects.order_by("slug"))
+        parents = set(Category.objects.exclude(parent_id=None).values_list("parent_id", flat=True))
+        leaves = [c for c in all_categories if c.id not in parents] or all_categories
+        # Popularity order is seeded, so "popular" categories differ by seed but not by run.
+        rnd.shuffle(leaves)
+
+        cities = list(City.objects.order_by("id").values_list("id", "governorate_id"))
+        if not cities:
+            raise CommandError("No cities found")
+        rnd.shuffle(cities)
+        neighborhoods: dict[int, list[int]] = {}
+        for nb_id, city_id in Neighborhood.objects.order_by("id").values_list("id", "city_id"):
+            neighborhoods.setdefault(city_id, []).append(nb_id)
+
+        attribute_defs = {
+            c.id: [(d.id, d.type, d.key, d.choices) for d in _effective_attr_defs(c)]
+            for c in leaves
+        }
+
+        # Explicit ids keep rows deterministic and let children reference parents without a round trip.
+        user_base = (User.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+        User.objects.bulk_create(
+            [
+                User(id=user_base + n, username=f"{prefix}{n}", email=f"{prefix}{n}@example.com", password="!")
+                for n in range(users)
+            ],
+            batch_size=loadgen.BULK_BATCH_SIZE,
+        )
+        user_ids = list(range(user_base, user_base + users))
+
+        images = []
+        if options["images_per_listing"] > 0:
+            for n in range(max(0, int(options["image_pool"]))):
+                png = _render_seed_image(text=f"Load test\n#{n}", seed=seed * 1000 + n, width=640, height=480)
+                blob = acquire_blob_for_upload(ContentFile(png, name=f"load_{seed}_{n}.png"))
+                images.append((blob.id, blob.file.name))
+
+        return loadgen.Plan(
+            seed=seed,
+            listings=listings,
+            chunk_size=max(1, int(options["chunk_size"])),
+            listing_id_base=(Listing.objects.aggregate(m=Max("id"))["m"] or 0) + 1,
+            thread_id_base=(PrivateThread.objects.aggregate(m=Max("id"))["m"] or 0) + 1,
+            now=timezone.now(),
+            days=max(1, int(options["days"])),
+            user_ids=user_ids,
+            # Power sellers: a few accounts own a large share of listings.
+            seller_cum_weights=loadgen.zipf_cum_weights(users, 1.2),
+            category_ids=[c.id for c in leaves],
+            category_names={c.id: (c.name_en or c.name_ar or c.slug) for c in leaves},
+            category_cum_weights=loadgen.zipf_cum_weights(len(leaves), 1.1),
+            cities=cities,
+            city_cum_weights=loadgen.zipf_cum_weights(len(cities), 1.3),
+            neighborhoods=neighborhoods,
+            attribute_defs=attribute_defs,
+            images=images,
+            syp_rate=rate_for("SYP"),
+            category_ttls=category_ttls(),
+            images_per_listing=float(options["images_per_listing"]),
+            questions_per_listing=float(options["questions_per_listing"]),
+            threads_per_listing=float(options["threads_per_listing"]),
+            messages_per_thread=float(options["messages_per_thread"]),
+            reports_per_listing=float(options["reports_per_listing"]),
+            use_copy=not options["no_copy"] and loadgen.copy_supported(),
+        )
+
+    def _finish(self, plan: loadgen.Plan) -> None:
+        # Rows were inserted with explicit ids; move sequences past them.
+        statements = connection.ops.sequence_reset_sql(no_style(), [User, Listing, PrivateThread])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+        if plan.images:
+            refs = (
+                ListingImage.objects.filter(blob_id=OuterRef("pk"))
+                .order_by()
+                .values("blob_id")
+                .annotate(n=Count("id"))
+                .values("n")
+            )
+            ImageBlob.objects.filter(id__in=[blob_id for blob_id, _name in plan.images]).update(
+                ref_count=Coalesce(Subquery(refs), 0)
+            )
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from market.lifecycle import move_cold_listings
+from market.tasks import schedule_cold_listing_moves
+
+
+class Command(BaseCommand):
+    help = (
+        "Move long-cold listings' attribute values and images to the archive tables, and "
+        "move back those of listings live again. With --schedule, queue the periodic task instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Queue market.move_cold_listings to run now and every LISTING_COLD_INTERVAL_SECONDS",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Listings moved per transaction (default: LISTING_COLD_CHUNK_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            schedule_cold_listing_moves(delay_seconds=0)
+            self.stdout.write("Queued the periodic cold listing moves.")
+            return
+        result = move_cold_listings(chunk_size=options["chunk_size"])
+        self.stdout.write(f"Moved {result.frozen} listing(s) to cold storage and {result.thawed} back.")
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from market.images import PROFILE_IMAGE_PROCESSORS
+from market.models import ImageProcessingStatus, Profile
+
+
+class Command(BaseCommand):
+    help = "Generate missing avatar/cover variants (recovers uploads left pending after a worker restart)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--include-failed",
+            action="store_true",
+            help="Also retry profiles whose previous processing failed",
+        )
+
+    def handle(self, *args, **options):
+        statuses = [ImageProcessingStatus.PENDING, ImageProcessingStatus.PROCESSING]
+        if options.get("include_failed"):
+            statuses.append(ImageProcessingStatus.FAILED)
+
+        done = 0
+        for kind, process in PROFILE_IMAGE_PROCESSORS.items():
+            rows = Profile.objects.filter(**{f"{kind}_status__in": statuses}).values_list("id", kind)
+            for profile_id, source_name in rows.iterator():
+                if source_name and process(profile_id, source_name):
+                    done += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} image(s)"))
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from market.events import prune
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete listing change events older than LISTING_EVENT_RETENTION_DAYS "
+        "that every consumer has already read."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Pruned {prune()} listing event(s).")
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from market.models import Listing
+from market.pricing import listings_in, renormalize
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Listing.price_normalized from the current exchange rates, in keyset chunks "
+        "(all listings, or one currency's)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--currency", default="", help="Only listings priced in this currency")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Rows per transaction (default: PRICE_RENORMALIZE_CHUNK_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        currency = options["currency"].strip()
+        queryset = listings_in(currency) if currency else Listing.objects.all()
+        updated = renormalize(queryset, chunk_size=options["chunk_size"])
+        self.stdout.write(f"Re-priced {updated} listing(s).")
@@ -1,92 +1,34 @@
 from __future__ import annotations
 
-import io
-import time
-import traceback
-
-from django.core.management import call_command
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db import close_old_connections, transaction
-from django.utils import timezone
+from django.db import transaction
 
 from market.models import AdminSeedJob, AdminSeedJobStatus
+from market.tasks import enqueue_seed_job
+from taskqueue.models import Task
+from taskqueue.worker import Worker
 
 
 class Command(BaseCommand):
-    help = "Run queued admin seed jobs in the background (Render worker-friendly)."
+    help = "Run queued admin seed jobs (deprecated: seed jobs now run on the task queue via `run_tasks`)."
 
     def add_arguments(self, parser):
-        parser.add_argument("--once", action="store_true", help="Process at most one job, then exit")
+        parser.add_argument("--once", action="store_true", help="Run pending seed jobs, then exit")
         parser.add_argument("--poll-seconds", type=float, default=3.0, help="Sleep time when no jobs are pending")
 
     def handle(self, *args, **options):
-        once = bool(options.get("once"))
-        poll_seconds = float(options.get("poll_seconds") or 3.0)
+        # Jobs created before the task queue existed have no task row yet.
+        queued = set(Task.objects.filter(name="market.run_seed_job").values_list("payload__job_id", flat=True))
+        for job in AdminSeedJob.objects.filter(status=AdminSeedJobStatus.PENDING).order_by("created_at", "id"):
+            if job.id not in queued:
+                with transaction.atomic():
+                    enqueue_seed_job(job)
 
         self.stdout.write(self.style.SUCCESS("Seed job worker started"))
-
-        while True:
-            close_old_connections()
-
-            job = None
-            with transaction.atomic():
-                # Lock one pending job (skip if another worker took it).
-                job = (
-                    AdminSeedJob.objects.select_for_update(skip_locked=True)
-                    .filter(status=AdminSeedJobStatus.PENDING)
-                    .order_by("created_at", "id")
-                    .first()
-                )
-                if job:
-                    job.status = AdminSeedJobStatus.RUNNING
-                    job.started_at = timezone.now()
-                    job.error = ""
-                    job.output = ""
-                    job.save(update_fields=["status", "started_at", "error", "output", "updated_at"])
-
-            if not job:
-                if once:
-                    return
-                time.sleep(poll_seconds)
-                continue
-
-            buf = io.StringIO()
-            try:
-                scenario = str(job.scenario or "demo")
-                opts = job.options or {}
-                if not isinstance(opts, dict):
-                    opts = {}
-
-                # Run built-in demo seed synchronously.
-                if scenario == "demo":
-                    from market.seeding import run_admin_seed
-
-                    res = run_admin_seed(scenario="demo", options=opts)
-                    job.result = res.as_dict()
-                elif scenario == "seed_listings":
-                    # Heavy seed via management command (supports sleep_seconds in options).
-                    call_command("seed_listings", stdout=buf, stderr=buf, **opts)
-                    job.result = {"scenario": "seed_listings", "detail": "completed"}
-                else:
-                    raise ValueError(f"Unknown scenario: {scenario}")
-
-                job.status = AdminSeedJobStatus.SUCCEEDED
-            except Exception:
-                job.status = AdminSeedJobStatus.FAILED
-                job.error = traceback.format_exc()
-            finally:
-                job.output = (buf.getvalue() or "")[:200_000]
-                job.finished_at = timezone.now()
-                job.save(
-                    update_fields=[
-                        "status",
-                        "finished_at",
-                        "result",
-                        "output",
-                        "error",
-                        "updated_at",
-                    ]
-                )
-
-            if once:
-                return
+        worker = Worker(
+            concurrency=1,
+            names=["market.run_seed_job"],
+            poll_seconds=float(options.get("poll_seconds") or settings.TASKQUEUE_POLL_SECONDS),
+        )
+        worker.run(drain=bool(options.get("once")))
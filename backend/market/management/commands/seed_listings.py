@@ -26,6 +26,7 @@ from market.models import (
     ModerationStatus,
     Neighborhood,
 )
+from market.seed_jobs import report_progress
 from market.seeding import ensure_minimum_lookups, is_admin_seeding_enabled
 
 User = get_user_model()
@@ -341,8 +342,11 @@ class Command(BaseCommand):
                 "In good condition.",
             ]
 
+            total = len(leaf_cats) * per_category
+            report_progress(0, total)
             for cat_idx, cat in enumerate(leaf_cats):
                 for n in range(1, per_category + 1):
+                    report_progress(cat_idx * per_category + n - 1, total)
                     seller = seller_users[(cat_idx + n) % len(seller_users)]
 
                     adj = rnd.choice(adjectives)
@@ -479,6 +483,8 @@ class Command(BaseCommand):
                     if sleep_seconds > 0:
                         time.sleep(sleep_seconds)
 
+            report_progress(total, total)
+
         self.stdout.write(self.style.SUCCESS("Listing seeding complete"))
         self.stdout.write(f"MEDIA_ROOT: {getattr(settings, 'MEDIA_ROOT', None)}")
         self.stdout.write(f"Leaf categories targeted: {len(leaf_cats)}")
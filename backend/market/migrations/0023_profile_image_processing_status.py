@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+STATUS_CHOICES = [
+    ("pending", "Pending"),
+    ("processing", "Processing"),
+    ("ready", "Ready"),
+    ("failed", "Failed"),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market", "0022_add_cover_medium"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="avatar_status",
+            field=models.CharField(blank=True, choices=STATUS_CHOICES, default="", max_length=16),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="cover_status",
+            field=models.CharField(blank=True, choices=STATUS_CHOICES, default="", max_length=16),
+        ),
+    ]
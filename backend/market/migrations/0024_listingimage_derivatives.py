@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market", "0023_profile_image_processing_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listingimage",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="listingimage",
+            name="derivatives_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="",
+                max_length=16,
+            ),
+        ),
+    ]
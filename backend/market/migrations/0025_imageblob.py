@@ -0,0 +1,40 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market", "0024_listingimage_derivatives"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageBlob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                ("file", models.FileField(max_length=255, upload_to="")),
+                ("size", models.PositiveBigIntegerField(default=0)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("phash", models.BigIntegerField(blank=True, db_index=True, null=True)),
+                ("hashed_at", models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="listingimage",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="listing_images",
+                to="market.imageblob",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market", "0025_imageblob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="adminseedjob",
+            name="progress_processed",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="adminseedjob",
+            name="progress_total",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="adminseedjob",
+            name="progress_updated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="adminseedjob",
+            name="log_lines",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="AdminSeedJobLog",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("line_start", models.PositiveIntegerField()),
+                ("line_count", models.PositiveIntegerField()),
+                ("text", models.TextField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="log_chunks",
+                        to="market.adminseedjob",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["job", "line_start"],
+                "constraints": [
+                    models.UniqueConstraint(fields=("job", "line_start"), name="uq_seedjoblog_job_line_start"),
+                ],
+            },
+        ),
+    ]
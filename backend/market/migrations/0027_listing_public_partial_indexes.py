@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+PUBLIC_LISTING = models.Q(("is_removed", False), ("moderation_status", "approved"), ("status", "published"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("market", "0026_admin_seed_job_progress"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                condition=PUBLIC_LISTING, fields=["created_at", "id"], name="listing_public_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                condition=PUBLIC_LISTING, fields=["category", "created_at", "id"], name="listing_public_cat_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                condition=PUBLIC_LISTING, fields=["city", "created_at", "id"], name="listing_public_city_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(condition=PUBLIC_LISTING, fields=["price", "id"], name="listing_public_price_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(fields=["seller", "created_at", "id"], name="listing_seller_created_idx"),
+        ),
+    ]
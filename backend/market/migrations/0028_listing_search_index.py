@@ -0,0 +1,34 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def _index():
+    # Must match market.search.listing_search_vector() for queries to use it.
+    return GinIndex(SearchVector("title", "description", config="simple"), name="listing_search_idx")
+
+
+def add_search_index(apps, schema_editor):
+    # Full-text search needs Postgres; SQLite searches with icontains instead.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.add_index(apps.get_model("market", "Listing"), _index(), concurrently=True)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("market", "Listing"), _index(), concurrently=True)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("market", "0027_listing_public_partial_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
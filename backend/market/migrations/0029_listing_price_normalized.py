@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+PUBLIC_LISTING = models.Q(("is_removed", False), ("moderation_status", "approved"), ("status", "published"))
+
+
+def backfill_base_currency(apps, schema_editor):
+    # No exchange rates exist yet, so only base-currency prices are known;
+    # `manage.py renormalize_prices` fills in the rest once rates are entered.
+    Listing = apps.get_model("market", "Listing")
+    rows = (
+        Listing.objects.filter(currency__iexact=settings.PRICE_BASE_CURRENCY.strip(), price__isnull=False)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    last = 0
+    while True:
+        pks = list(rows.filter(pk__gt=last)[:1000])
+        if not pks:
+            return
+        Listing.objects.filter(pk__in=pks).update(price_normalized=models.F("price"))
+        last = pks[-1]
+
+
+class Migration(migrations.Migration):
+    # The backfill commits chunk by chunk instead of locking the table throughout.
+    atomic = False
+
+    dependencies = [
+        ("market", "0028_listing_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExchangeRate",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("currency", models.CharField(max_length=8, unique=True)),
+                ("rate", models.DecimalField(decimal_places=8, max_digits=18)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="price_normalized",
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.RemoveIndex(
+            model_name="listing",
+            name="listing_public_price_idx",
+        ),
+        migrations.RunPython(backfill_base_currency, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                condition=PUBLIC_LISTING, fields=["price_normalized", "id"], name="listing_public_price_norm_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_expiry(apps, schema_editor):
+    # Listings already up get a full TTL from now rather than from when they
+    # were published, so the first sweep doesn't archive the whole backlog.
+    if not settings.LISTING_TTL_DAYS:
+        return
+    Listing = apps.get_model("market", "Listing")
+    expires_at = timezone.now() + timedelta(days=settings.LISTING_TTL_DAYS)
+    rows = Listing.objects.filter(status="published", expires_at__isnull=True).order_by("pk").values_list("pk", flat=True)
+    last = 0
+    while True:
+        pks = list(rows.filter(pk__gt=last)[:1000])
+        if not pks:
+            return
+        Listing.objects.filter(pk__in=pks).update(expires_at=expires_at)
+        last = pks[-1]
+
+
+class Migration(migrations.Migration):
+    # The backfill commits chunk by chunk instead of locking the table throughout.
+    atomic = False
+
+    dependencies = [
+        ("market", "0029_listing_price_normalized"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="listing_ttl_days",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="listing",
+            name="expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_expiry, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                condition=models.Q(("status", "published")),
+                fields=["expires_at", "id"],
+                name="listing_published_expiry_idx",
+            ),
+        ),
+    ]
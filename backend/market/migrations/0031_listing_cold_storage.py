@@ -0,0 +1,129 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+import market.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("market", "0030_listing_expiry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listing",
+            name="is_cold",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name="ArchivedListingImage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("image", models.ImageField(upload_to=market.models.listing_image_upload_to)),
+                ("alt_text", models.CharField(blank=True, max_length=140)),
+                ("sort_order", models.PositiveIntegerField(default=0)),
+                ("derivatives", models.JSONField(blank=True, default=dict)),
+                (
+                    "derivatives_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("pending", "Pending"),
+                            ("processing", "Processing"),
+                            ("ready", "Ready"),
+                            ("failed", "Failed"),
+                        ],
+                        default="",
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "listing",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_images",
+                        to="market.listing",
+                    ),
+                ),
+                (
+                    "blob",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_listing_images",
+                        to="market.imageblob",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["sort_order", "id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedListingAttributeValue",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("int_value", models.IntegerField(blank=True, null=True)),
+                ("decimal_value", models.DecimalField(blank=True, decimal_places=6, max_digits=18, null=True)),
+                ("text_value", models.TextField(blank=True, null=True)),
+                ("bool_value", models.BooleanField(blank=True, null=True)),
+                ("enum_value", models.CharField(blank=True, max_length=120, null=True)),
+                (
+                    "listing",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_attribute_values",
+                        to="market.listing",
+                    ),
+                ),
+                (
+                    "definition",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_values",
+                        to="market.categoryattributedefinition",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=["listing", "definition"], name="uq_archived_attrvalue_listing_def")
+                ],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                condition=models.Q(
+                    models.Q(
+                        ("status", "archived"), ("is_removed", True), ("moderation_status", "rejected"), _connector="OR"
+                    ),
+                    ("is_cold", False),
+                ),
+                fields=["updated_at", "id"],
+                name="listing_to_freeze_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listing",
+            index=models.Index(
+                condition=models.Q(
+                    models.Q(
+                        ("status", "archived"),
+                        ("is_removed", True),
+                        ("moderation_status", "rejected"),
+                        _connector="OR",
+                        _negated=True,
+                    ),
+                    ("is_cold", True),
+                ),
+                fields=["id"],
+                name="listing_to_thaw_idx",
+            ),
+        ),
+    ]
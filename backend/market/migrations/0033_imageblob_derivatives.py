@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("market", "0032_listing_events"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imageblob",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
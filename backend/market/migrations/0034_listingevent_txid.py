@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("market", "0033_imageblob_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listingevent",
+            name="txid",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterModelOptions(
+            name="listingevent",
+            options={"ordering": ["txid", "id"]},
+        ),
+        migrations.AddIndex(
+            model_name="listingevent",
+            index=models.Index(fields=["txid", "id"], name="listingevent_txid_id_idx"),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("market", "0034_listingevent_txid"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="listingimage",
+            name="upload_name",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="archivedlistingimage",
+            name="upload_name",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+    ]
@@ -3,7 +3,7 @@ from __future__ import annotations
 from decimal import Decimal
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 
@@ -27,6 +27,9 @@ class Category(TimestampedModel):
         on_delete=models.PROTECT,
         related_name="children",
     )
+    # Days a published listing stays up before it is archived (market.expiry).
+    # Blank inherits from the parent category, then LISTING_TTL_DAYS; 0 never expires.
+    listing_ttl_days = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
         indexes = [models.Index(fields=["parent", "slug"]) ]
@@ -132,6 +135,38 @@ class ModerationStatus(models.TextChoices):
     REJECTED = "rejected", "Rejected"
 
 
+class ExchangeRate(TimestampedModel):
+    """What one unit of ``currency`` is worth in ``PRICE_BASE_CURRENCY``.
+
+    Saving a changed rate, or deleting one, re-prices that currency's listings
+    in the background (see market.signals and market.pricing).
+    """
+
+    currency = models.CharField(max_length=8, unique=True)
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+
+    def save(self, *args, **kwargs):
+        self.currency = self.currency.strip().upper()
+        super().save(*args, **kwargs)
+
+    def __str__(self) -> str:
+        return f"{self.currency} = {self.rate} {settings.PRICE_BASE_CURRENCY}"
+
+
+# Condition of the public feed's partial indexes. A query can use them only if
+# its WHERE clause implies this, so keep it in step with market.visibility.
+PUBLIC_LISTING = models.Q(
+    status=ListingStatus.PUBLISHED, moderation_status=ModerationStatus.APPROVED, is_removed=False
+)
+
+# Listings the feed never shows and sellers rarely touch again.
+COLD_STATE = (
+    models.Q(status=ListingStatus.ARCHIVED)
+    | models.Q(is_removed=True)
+    | models.Q(moderation_status=ModerationStatus.REJECTED)
+)
+
+
 class Listing(TimestampedModel):
     seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="listings")
 
@@ -140,6 +175,10 @@ class Listing(TimestampedModel):
 
     price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     currency = models.CharField(max_length=8, default="SYP")
+    # ``price`` in PRICE_BASE_CURRENCY, kept by save() and market.pricing; what
+    # price ordering and range filters compare. Null when the price or the
+    # currency's rate is unknown.
+    price_normalized = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True, editable=False)
 
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name="listings")
     governorate = models.ForeignKey(Governorate, on_delete=models.PROTECT, related_name="listings")
@@ -167,11 +206,49 @@ class Listing(TimestampedModel):
     is_flagged = models.BooleanField(default=False)
     is_removed = models.BooleanField(default=False)
 
+    # When a published listing is archived unless its seller renews it; set on
+    # publishing (see market.expiry). Null: never expires.
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    # Cold: archived, removed or rejected for LISTING_COLD_AFTER_DAYS, with its
+    # attribute values and images moved to the archive tables (market.lifecycle).
+    is_cold = models.BooleanField(default=False, editable=False)
+
     class Meta:
         indexes = [
             models.Index(fields=["status", "created_at"]),
             models.Index(fields=["city", "status", "created_at"]),
             models.Index(fields=["category", "status", "created_at"]),
+            # The public feed (see market.visibility): only rows anyone may see,
+            # keyed by the feed's sort orders.
+            models.Index(fields=["created_at", "id"], condition=PUBLIC_LISTING, name="listing_public_created_idx"),
+            models.Index(
+                fields=["category", "created_at", "id"], condition=PUBLIC_LISTING, name="listing_public_cat_idx"
+            ),
+            models.Index(
+                fields=["city", "created_at", "id"], condition=PUBLIC_LISTING, name="listing_public_city_idx"
+            ),
+            models.Index(
+                fields=["price_normalized", "id"], condition=PUBLIC_LISTING, name="listing_public_price_norm_idx"
+            ),
+            # A seller's own listings, newest first (the signed-in feed's second stream, "mine").
+            models.Index(fields=["seller", "created_at", "id"], name="listing_seller_created_idx"),
+            # The expiry sweep walks published listings by expiry time.
+            models.Index(
+                fields=["expires_at", "id"],
+                condition=models.Q(status=ListingStatus.PUBLISHED),
+                name="listing_published_expiry_idx",
+            ),
+            # market.lifecycle's two work queues: listings to move to the archive
+            # tables, and cold ones live again whose rows must move back.
+            models.Index(
+                fields=["updated_at", "id"],
+                condition=COLD_STATE & models.Q(is_cold=False),
+                name="listing_to_freeze_idx",
+            ),
+            models.Index(
+                fields=["id"], condition=~COLD_STATE & models.Q(is_cold=True), name="listing_to_thaw_idx"
+            ),
         ]
         ordering = ["-created_at"]
 
@@ -184,27 +261,174 @@ class Listing(TimestampedModel):
         if self.longitude is not None and (self.longitude < Decimal("-180") or self.longitude > Decimal("180")):
             raise ValidationError({"longitude": "Longitude must be between -180 and 180"})
 
+    def save(self, *args, **kwargs):
+        from market import events
+        from market.expiry import fresh_expiry, needs_fresh_expiry
+        from market.lifecycle import thaw
+        from market.pricing import normalized_price
+
+        update_fields = kwargs.get("update_fields")
+        # What the change event names; a full save touches any column.
+        changed = () if update_fields is None else update_fields
+        if update_fields is None and not self._state.adding and not kwargs.get("force_insert"):
+            # is_cold is owned by market.lifecycle; an instance loaded before a
+            # move must not write its stale value back.
+            update_fields = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != "is_cold"
+            ]
+        derived = set()
+        if update_fields is None or {"price", "currency"} & set(update_fields):
+            self.price_normalized = normalized_price(self.price, self.currency)
+            derived.add("price_normalized")
+        if (update_fields is None or "status" in update_fields) and needs_fresh_expiry(self):
+            self.expires_at = fresh_expiry(self.category_id)
+            derived.add("expires_at")
+        if self.is_cold and not self.in_cold_state:
+            # Live again: bring its attribute values and images back first.
+            thaw(self)
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *derived}
+        if changed:
+            changed = {*changed, *derived}
+        kind = ListingEventKind.CREATED if self._state.adding else ListingEventKind.UPDATED
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+            events.record([self.pk], kind, changed)
+
+    def delete(self, *args, **kwargs):
+        from market import events
+
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            events.record([self.pk], ListingEventKind.DELETED)
+            return super().delete(*args, **kwargs)
+
+    @property
+    def current_images(self) -> models.QuerySet:
+        """``images``, or ``archived_images`` while the listing is cold (market.lifecycle)."""
+        return (self.archived_images if self.is_cold else self.images).all()
+
+    @property
+    def current_attribute_values(self) -> models.QuerySet:
+        return (self.archived_attribute_values if self.is_cold else self.attribute_values).all()
+
+    @property
+    def in_cold_state(self) -> bool:
+        """Whether ``COLD_STATE`` holds for this instance's current field values."""
+        return (
+            self.status == ListingStatus.ARCHIVED
+            or self.is_removed
+            or self.moderation_status == ModerationStatus.REJECTED
+        )
+
     def __str__(self) -> str:
         return self.title
 
 
+class ImageProcessingStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    PROCESSING = "processing", "Processing"
+    READY = "ready", "Ready"
+    FAILED = "failed", "Failed"
+
+
 def listing_image_upload_to(instance: "ListingImage", filename: str) -> str:
     return f"listings/{instance.listing_id}/{filename}"
 
 
-class ListingImage(TimestampedModel):
-    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="images")
+class ImageBlob(TimestampedModel):
+    """One stored original per distinct file content, shared by listing images.
+
+    ``ref_count`` counts the ListingImage rows pointing at the blob; blobs that
+    drop to zero are removed by ``gc_image_blobs``, with their derivatives.
+    """
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    # Resized copies, in ListingImage.derivatives' shape. The blob owns the
+    # files; its images hold a copy of the paths for serialization.
+    derivatives = models.JSONField(default=dict, blank=True)
+
+    # 64-bit difference hash (stored signed); near-duplicates differ in a few bits.
+    phash = models.BigIntegerField(null=True, blank=True, db_index=True)
+    hashed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"ImageBlob({self.sha256[:12]})"
+
+
+class ListingImageBase(TimestampedModel):
     image = models.ImageField(upload_to=listing_image_upload_to)
     alt_text = models.CharField(max_length=140, blank=True)
     sort_order = models.PositiveIntegerField(default=0)
 
+    # Resized copies keyed by ladder name, e.g.
+    # {"thumb": {"width": 320, "height": 240, "jpeg": "<path>", "webp": "<path>"}, ...}
+    derivatives = models.JSONField(default=dict, blank=True)
+    derivatives_status = models.CharField(
+        max_length=16, choices=ImageProcessingStatus.choices, blank=True, default=""
+    )
+    # Storage name of the direct upload this image was finalized from; dedup may
+    # have replaced that object, so retried finalize calls look the image up here.
+    upload_name = models.CharField(max_length=255, blank=True, default="")
+
     class Meta:
+        abstract = True
         ordering = ["sort_order", "id"]
 
+
+class ListingImage(ListingImageBase):
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="images")
+    blob = models.ForeignKey(
+        ImageBlob,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="listing_images",
+    )
+
+    class Meta(ListingImageBase.Meta):
+        pass
+
+    def save(self, *args, **kwargs):
+        from market import events
+
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+            events.record([self.listing_id], ListingEventKind.IMAGES)
+
+    def delete(self, *args, **kwargs):
+        from market import events
+
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            events.record([self.listing_id], ListingEventKind.IMAGES)
+            return super().delete(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"ListingImage({self.listing_id})"
 
 
+class ArchivedListingImage(ListingImageBase):
+    """A cold listing's ``ListingImage`` row, same id, moved by market.lifecycle."""
+
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="archived_images")
+    # Still a reference: gc_image_blobs counts these too.
+    blob = models.ForeignKey(
+        ImageBlob,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="archived_listing_images",
+    )
+
+    class Meta(ListingImageBase.Meta):
+        pass
+
+    def __str__(self) -> str:
+        return f"ArchivedListingImage({self.listing_id})"
+
+
 class AdminSeedJobStatus(models.TextChoices):
     PENDING = "pending", "Pending"
     RUNNING = "running", "Running"
@@ -234,12 +458,36 @@ class AdminSeedJob(TimestampedModel):
     output = models.TextField(blank=True, default="")
     error = models.TextField(blank=True, default="")
 
+    # Live progress, refreshed by the worker every few seconds while the job runs.
+    progress_processed = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    progress_updated_at = models.DateTimeField(null=True, blank=True)
+    # Lines written to AdminSeedJobLog so far.
+    log_lines = models.PositiveIntegerField(default=0)
+
     class Meta:
         ordering = ["-created_at", "-id"]
 
 
+class AdminSeedJobLog(models.Model):
+    """A chunk of consecutive output lines from a running AdminSeedJob."""
+
+    job = models.ForeignKey(AdminSeedJob, on_delete=models.CASCADE, related_name="log_chunks")
+    line_start = models.PositiveIntegerField()
+    line_count = models.PositiveIntegerField()
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["job", "line_start"]
+        constraints = [
+            models.UniqueConstraint(fields=["job", "line_start"], name="uq_seedjoblog_job_line_start"),
+        ]
+
+
 # -- Profile model ----------------------------------------------------------------
 
+
 def profile_avatar_upload_to(instance: "Profile", filename: str) -> str:
     return f"profiles/{instance.user_id}/avatars/{filename}"
 
@@ -262,6 +510,9 @@ class Profile(TimestampedModel):
     cover = models.ImageField(upload_to=profile_cover_upload_to, null=True, blank=True)
     # Derived cover variant for responsive delivery
     cover_medium = models.ImageField(upload_to=lambda instance, fn: f"profiles/{instance.user_id}/covers/medium/{fn}", null=True, blank=True)
+    # Variants are generated off-request; clients poll these until "ready".
+    avatar_status = models.CharField(max_length=16, choices=ImageProcessingStatus.choices, blank=True, default="")
+    cover_status = models.CharField(max_length=16, choices=ImageProcessingStatus.choices, blank=True, default="")
 
     governorate = models.ForeignKey(Governorate, on_delete=models.SET_NULL, null=True, blank=True)
     city = models.ForeignKey(City, on_delete=models.SET_NULL, null=True, blank=True)
@@ -336,14 +587,7 @@ class CategoryAttributeDefinition(TimestampedModel):
         return f"{self.category_id}:{self.key}"
 
 
-class ListingAttributeValue(TimestampedModel):
-    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="attribute_values")
-    definition = models.ForeignKey(
-        CategoryAttributeDefinition,
-        on_delete=models.CASCADE,
-        related_name="values",
-    )
-
+class ListingAttributeValueBase(TimestampedModel):
     int_value = models.IntegerField(null=True, blank=True)
     decimal_value = models.DecimalField(max_digits=18, decimal_places=6, null=True, blank=True)
     text_value = models.TextField(null=True, blank=True)
@@ -351,14 +595,7 @@ class ListingAttributeValue(TimestampedModel):
     enum_value = models.CharField(max_length=120, null=True, blank=True)
 
     class Meta:
-        constraints = [
-            models.UniqueConstraint(fields=["listing", "definition"], name="uq_listing_attrvalue_listing_def"),
-        ]
-        indexes = [
-            models.Index(fields=["definition", "int_value"]),
-            models.Index(fields=["definition", "decimal_value"]),
-            models.Index(fields=["definition", "enum_value"]),
-        ]
+        abstract = True
 
     def clean(self):
         # Ensure at most one typed value is set.
@@ -372,5 +609,104 @@ class ListingAttributeValue(TimestampedModel):
         if sum(1 for v in vals if v) > 1:
             raise ValidationError("Only one value field can be set")
 
+
+class ListingAttributeValue(ListingAttributeValueBase):
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="attribute_values")
+    definition = models.ForeignKey(
+        CategoryAttributeDefinition,
+        on_delete=models.CASCADE,
+        related_name="values",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["listing", "definition"], name="uq_listing_attrvalue_listing_def"),
+        ]
+        indexes = [
+            models.Index(fields=["definition", "int_value"]),
+            models.Index(fields=["definition", "decimal_value"]),
+            models.Index(fields=["definition", "enum_value"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        from market import events
+
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+            events.record([self.listing_id], ListingEventKind.ATTRIBUTES)
+
+    def delete(self, *args, **kwargs):
+        from market import events
+
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            events.record([self.listing_id], ListingEventKind.ATTRIBUTES)
+            return super().delete(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"ListingAttributeValue({self.listing_id},{self.definition_id})"
+
+
+class ArchivedListingAttributeValue(ListingAttributeValueBase):
+    """A cold listing's ``ListingAttributeValue`` row, same id, moved by market.lifecycle.
+
+    No value indexes: attribute filters only ever search live listings.
+    """
+
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="archived_attribute_values")
+    definition = models.ForeignKey(
+        CategoryAttributeDefinition,
+        on_delete=models.CASCADE,
+        related_name="archived_values",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["listing", "definition"], name="uq_archived_attrvalue_listing_def"),
+        ]
+
+    def __str__(self) -> str:
+        return f"ArchivedListingAttributeValue({self.listing_id},{self.definition_id})"
+
+
+# -- Listing change outbox (market.events) ------------------------------------------
+
+
+class ListingEventKind(models.TextChoices):
+    CREATED = "created", "Created"
+    UPDATED = "updated", "Updated"
+    DELETED = "deleted", "Deleted"
+    IMAGES = "images", "Images"
+    ATTRIBUTES = "attributes", "Attributes"
+
+
+class ListingEvent(models.Model):
+    """One change to a listing, written in the transaction that made it.
+
+    ``fields`` names the listing columns an ``updated`` event touched; empty
+    means any of them. ``txid`` is the writing transaction's id on
+    PostgreSQL (0 elsewhere); consumers read in ``(txid, id)`` order. Not a
+    foreign key: events outlive deleted listings.
+    """
+
+    listing_id = models.BigIntegerField()
+    kind = models.CharField(max_length=16, choices=ListingEventKind.choices)
+    fields = models.JSONField(default=list, blank=True)
+    txid = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["txid", "id"]
+        indexes = [models.Index(fields=["txid", "id"], name="listingevent_txid_id_idx")]
+
+    def __str__(self) -> str:
+        return f"ListingEvent({self.id}, {self.listing_id}, {self.kind})"
+
+
+class ListingEventCheckpoint(TimestampedModel):
+    """How far a named consumer of ``ListingEvent`` has read (the last id it applied)."""
+
+    consumer = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.consumer}@{self.position}"
@@ -0,0 +1,69 @@
+"""Listing prices in one currency, for price ordering and range filters.
+
+``Listing.currency`` is free text and sellers price in several currencies,
+so ``Listing.price_normalized`` holds the price converted to
+``PRICE_BASE_CURRENCY`` with the rates in ``ExchangeRate``. ``Listing.save``
+fills it in; queryset updates that touch ``price`` or ``currency`` must call
+``renormalize``. When a rate is saved or deleted, ``market.signals`` re-prices
+that currency's listings on the task queue (``enqueue_renormalize_prices``), in
+keyset chunks of ``PRICE_RENORMALIZE_CHUNK_SIZE`` rows, one transaction each.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Case, DecimalField, F, OuterRef, QuerySet, Subquery, When
+from django.db.models.functions import Upper
+
+from market import events
+from market.keyset import chunked_update
+from market.models import ExchangeRate, Listing, ListingEventKind
+
+_CENTS = Decimal("0.01")
+
+
+def base_currency() -> str:
+    return settings.PRICE_BASE_CURRENCY.strip().upper()
+
+
+def rate_for(currency: str) -> Decimal | None:
+    """Base-currency value of one unit of ``currency``; None if unknown."""
+    code = (currency or "").strip().upper()
+    if code == base_currency():
+        return Decimal(1)
+    return ExchangeRate.objects.filter(currency=code).values_list("rate", flat=True).first()
+
+
+def normalized_price(price: Decimal | None, currency: str) -> Decimal | None:
+    if price is None:
+        return None
+    rate = rate_for(currency)
+    if rate is None:
+        return None
+    return (Decimal(price) * rate).quantize(_CENTS)
+
+
+def normalized_price_expression():
+    """``normalized_price`` in SQL, for updating many listings in one statement."""
+    rate = ExchangeRate.objects.filter(currency=Upper(OuterRef("currency"))).values("rate")[:1]
+    return Case(
+        When(price__isnull=True, then=None),
+        When(currency__iexact=base_currency(), then=F("price")),
+        default=F("price") * Subquery(rate),
+        output_field=DecimalField(max_digits=18, decimal_places=2),
+    )
+
+
+def renormalize(queryset: QuerySet, *, chunk_size: int | None = None) -> int:
+    """Recompute ``price_normalized`` for ``queryset``; returns the rows updated."""
+    return chunked_update(
+        queryset,
+        chunk_size=chunk_size or settings.PRICE_RENORMALIZE_CHUNK_SIZE,
+        on_chunk=lambda pks: events.record(pks, ListingEventKind.UPDATED, ["price_normalized"]),
+        price_normalized=normalized_price_expression(),
+    )
+
+
+def listings_in(currency: str) -> QuerySet:
+    return Listing.objects.filter(currency__iexact=currency.strip())
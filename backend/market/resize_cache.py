@@ -0,0 +1,229 @@
+"""On-demand resized copies of stored images, cached on local disk.
+
+Variants are rendered from the storage original on first request and written
+to ``IMAGE_RESIZE_CACHE_DIR``, keyed by the source's name and, unless the name
+is content-addressed, its size and modification time (``source_version``), so
+an object replaced under the same name is rendered afresh. That version is kept
+in the Django cache for ``IMAGE_RESIZE_VERSION_SECONDS``, so hits and 304s do
+not each stat the (possibly remote) storage. The directory is trimmed
+least-recently-used first (file mtime is the recency clock) once it grows past
+``IMAGE_RESIZE_CACHE_MAX_BYTES``. Concurrent requests for the same variant
+wait on a per-variant lock, so it is rendered once.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache as version_cache
+from django.core.files.storage import default_storage
+
+from market.image_dedup import BLOB_PREFIX
+from market.image_ingest import ImageRejected, fit, open_for_resize
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None
+
+JPEG_QUALITY = 82
+# Re-touching a hit more often than this adds metadata writes without improving LRU order.
+_TOUCH_INTERVAL_SECONDS = 60
+# Evict down to this fraction of the limit so the next few inserts don't rescan.
+_LOW_WATER = 0.9
+
+
+def allowed_sizes() -> set[tuple[int, int]]:
+    out = set()
+    for raw in getattr(settings, "IMAGE_RESIZE_SIZES", []):
+        w, _, h = str(raw).partition("x")
+        out.add((int(w), int(h)))
+    return out
+
+
+def is_allowed_source(name: str) -> bool:
+    if not name or name.startswith("/") or "\\" in name or ".." in name.split("/"):
+        return False
+    prefixes = tuple(getattr(settings, "IMAGE_RESIZE_SOURCE_PREFIXES", ()))
+    return name.startswith(prefixes)
+
+
+def is_content_addressed(name: str) -> bool:
+    # Blob originals and derivatives are named by their SHA-256.
+    return name.startswith(f"{BLOB_PREFIX}/")
+
+
+def source_version(name: str) -> str:
+    """A token that changes when the object stored under ``name`` is replaced.
+
+    Empty for content-addressed names. Raises FileNotFoundError when missing.
+    A replaced object is noticed within ``IMAGE_RESIZE_VERSION_SECONDS``.
+    """
+    if is_content_addressed(name):
+        return ""
+    key = f"resize:source-version:{hashlib.sha256(name.encode('utf-8')).hexdigest()}"
+    version = version_cache.get(key)
+    if version is None:
+        version = _stored_version(name)
+        version_cache.set(key, version, timeout=settings.IMAGE_RESIZE_VERSION_SECONDS)
+    return version
+
+
+def _stored_version(name: str) -> str:
+    if not default_storage.exists(name):
+        raise FileNotFoundError(name)
+    try:
+        modified = default_storage.get_modified_time(name)
+    except NotImplementedError:
+        modified = None
+    return f"{default_storage.size(name)}-{modified.timestamp() if modified else ''}"
+
+
+def render_resized(name: str, box: tuple[int, int]) -> bytes:
+    """Render ``name`` from default storage to a JPEG that fits inside ``box``."""
+    try:
+        source = default_storage.path(name)
+    except NotImplementedError:
+        source = default_storage.open(name, "rb")
+    try:
+        with open_for_resize(source, box) as img:
+            try:
+                out = fit(img, box)
+            except (OSError, SyntaxError, ValueError) as exc:
+                # Pixels are decoded here: truncated or corrupt data surfaces now.
+                raise ImageRejected("Unsupported or corrupt image") from exc
+    finally:
+        if hasattr(source, "close"):
+            source.close()
+    buf = BytesIO()
+    out.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+class DiskLRUCache:
+    def __init__(self, root, max_bytes: int):
+        self.root = os.fspath(root)
+        self.max_bytes = int(max_bytes)
+        self._total: int | None = None
+        self._total_lock = threading.Lock()
+        # Striped by the first digest byte, matching the lock files below.
+        self._shard_locks = [threading.Lock() for _ in range(256)]
+
+    @staticmethod
+    def digest(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        digest = self.digest(key)
+        return os.path.join(self.root, digest[:2], f"{digest}.jpg")
+
+    def open(self, key: str):
+        """Return an open binary handle for a cached entry, or None on a miss.
+
+        The handle stays readable even if the entry is evicted meanwhile.
+        """
+        path = self.path_for(key)
+        try:
+            fh = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            if time.time() - os.fstat(fh.fileno()).st_mtime > _TOUCH_INTERVAL_SECONDS:
+                os.utime(path)
+        except OSError:
+            pass
+        return fh
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so readers never see a partial file.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._account(len(data))
+
+    @contextmanager
+    def lock(self, key: str):
+        """Serialize rendering of one variant across threads and worker processes."""
+        digest = self.digest(key)
+        with self._shard_locks[int(digest[:2], 16)]:
+            if fcntl is None:
+                yield
+                return
+            # One lock per digest shard keeps the lock set bounded; unrelated
+            # variants in the same shard just render one at a time.
+            lock_dir = os.path.join(self.root, "locks")
+            os.makedirs(lock_dir, exist_ok=True)
+            with open(os.path.join(lock_dir, digest[:2]), "a+b") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _entries(self):
+        for dirpath, _dirnames, filenames in os.walk(self.root):
+            if os.path.basename(dirpath) == "locks":
+                continue
+            for filename in filenames:
+                if not filename.endswith(".jpg"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def _account(self, added: int) -> None:
+        with self._total_lock:
+            if self._total is None:
+                # Other worker processes write here too; start from what's on disk.
+                self._total = sum(size for _mtime, size, _path in self._entries())
+            else:
+                self._total += added
+            if self._total > self.max_bytes:
+                self._total = self._evict()
+
+    def _evict(self) -> int:
+        entries = sorted(self._entries())
+        total = sum(size for _mtime, size, _path in entries)
+        target = int(self.max_bytes * _LOW_WATER)
+        for _mtime, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+
+_cache: DiskLRUCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_resize_cache() -> DiskLRUCache:
+    global _cache
+    root = os.fspath(settings.IMAGE_RESIZE_CACHE_DIR)
+    max_bytes = int(settings.IMAGE_RESIZE_CACHE_MAX_BYTES)
+    with _cache_lock:
+        if _cache is None or _cache.root != root or _cache.max_bytes != max_bytes:
+            _cache = DiskLRUCache(root, max_bytes)
+        return _cache
@@ -0,0 +1,34 @@
+"""Full-text search over listing titles and descriptions.
+
+On Postgres the match runs against the GIN index ``listing_search_idx``
+(migration 0028), which is built on exactly ``listing_search_vector()``;
+keep the two in step or the index stops being used. The ``simple`` text
+search config is used because listings mix Arabic and English. Other
+databases (SQLite in development and tests) fall back to ``icontains``.
+"""
+from __future__ import annotations
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connections
+from django.db.models import Q, QuerySet
+
+SEARCH_CONFIG = "simple"
+
+
+def listing_search_vector() -> SearchVector:
+    return SearchVector("title", "description", config=SEARCH_CONFIG)
+
+
+def search_listings(queryset: QuerySet, term: str) -> QuerySet:
+    """Listings in ``queryset`` matching ``term``; a number also matches the id."""
+    term = term.strip()
+    if not term:
+        return queryset
+    if connections[queryset.db].vendor == "postgresql":
+        queryset = queryset.alias(search=listing_search_vector())
+        match = Q(search=SearchQuery(term, config=SEARCH_CONFIG, search_type="websearch"))
+    else:
+        match = Q(title__icontains=term) | Q(description__icontains=term)
+    if term.isdigit():
+        match |= Q(pk=int(term))
+    return queryset.filter(match)
@@ -0,0 +1,201 @@
+"""Live progress and output streaming for running AdminSeedJobs.
+
+Seeding code calls ``report_progress`` (a no-op outside a job) and writes to
+stdout as usual. While a job runs, ``SeedJobReporter`` buffers both in memory
+and a background thread persists them every ``SEED_JOB_FLUSH_SECONDS``:
+progress onto the job row, output as ``AdminSeedJobLog`` chunks. The flusher
+uses its own DB connection, so progress stays visible while the seed itself
+holds a long transaction.
+"""
+from __future__ import annotations
+
+import io
+import logging
+import threading
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from market.models import AdminSeedJob, AdminSeedJobLog
+
+logger = logging.getLogger(__name__)
+
+# Kept in AdminSeedJob.output when the job finishes, for clients that read the whole blob.
+OUTPUT_TAIL_CHARS = 200_000
+
+_active_reporter: ContextVar["SeedJobReporter | None"] = ContextVar("seed_job_reporter", default=None)
+
+
+def report_progress(processed: int, total: int | None = None) -> None:
+    """Record how far the current seed job has got. Cheap; safe to call per row."""
+    reporter = _active_reporter.get()
+    if reporter is not None:
+        reporter.progress(processed, total)
+
+
+class SeedJobReporter(io.TextIOBase):
+    """A writable text stream that persists a job's output and progress in the background."""
+
+    def __init__(self, job_id: int, *, flush_seconds: float | None = None):
+        super().__init__()
+        self.job_id = job_id
+        self.flush_seconds = float(
+            flush_seconds if flush_seconds is not None else getattr(settings, "SEED_JOB_FLUSH_SECONDS", 2.0)
+        )
+        self._lock = threading.Lock()
+        # Serializes persist() so line_start values stay contiguous.
+        self._persist_lock = threading.Lock()
+        self._partial = ""
+        self._pending: list[str] = []
+        self._lines_written = 0
+        self._tail: deque[str] = deque()
+        self._tail_chars = 0
+        self._processed = 0
+        self._total: int | None = None
+        self._progress_dirty = False
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._token = None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        with self._lock:
+            *lines, self._partial = (self._partial + s).split("\n")
+            self._pending.extend(lines)
+            self._remember(lines)
+        return len(s)
+
+    def progress(self, processed: int, total: int | None = None) -> None:
+        with self._lock:
+            self._processed = max(0, int(processed))
+            if total is not None:
+                self._total = max(0, int(total))
+            self._progress_dirty = True
+
+    def tail(self) -> str:
+        with self._lock:
+            lines = [*self._tail, self._partial] if self._partial else list(self._tail)
+            return "\n".join(lines)[-OUTPUT_TAIL_CHARS:]
+
+    def _remember(self, lines: list[str]) -> None:
+        for line in lines:
+            self._tail.append(line)
+            self._tail_chars += len(line) + 1
+        while self._tail_chars > OUTPUT_TAIL_CHARS and len(self._tail) > 1:
+            self._tail_chars -= len(self._tail.popleft()) + 1
+
+    def __enter__(self):
+        self._token = _active_reporter.set(self)
+        self._thread = threading.Thread(target=self._flush_loop, name=f"seed-job-{self.job_id}-log", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_reporter.reset(self._token)
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            if self._partial:
+                self._pending.append(self._partial)
+                self._remember([self._partial])
+                self._partial = ""
+        self.persist()
+        return False
+
+    def _flush_loop(self) -> None:
+        try:
+            while not self._stopping.wait(self.flush_seconds):
+                try:
+                    self.persist()
+                except Exception:
+                    # e.g. SQLite is locked by the seed's own transaction; retry next tick.
+                    logger.warning("Could not persist progress for seed job %s", self.job_id, exc_info=True)
+        finally:
+            connection.close()
+
+    def persist(self) -> None:
+        with self._persist_lock:
+            self._persist()
+
+    def _persist(self) -> None:
+        with self._lock:
+            lines, self._pending = self._pending, []
+            dirty, self._progress_dirty = self._progress_dirty, False
+            processed, total = self._processed, self._total
+        if not lines and not dirty:
+            return
+        try:
+            with transaction.atomic():
+                fields = {"progress_updated_at": timezone.now()}
+                if dirty:
+                    fields.update(progress_processed=processed, progress_total=total)
+                if lines:
+                    AdminSeedJobLog.objects.create(
+                        job_id=self.job_id,
+                        line_start=self._lines_written,
+                        line_count=len(lines),
+                        text="\n".join(lines),
+                    )
+                    fields["log_lines"] = F("log_lines") + len(lines)
+                AdminSeedJob.objects.filter(id=self.job_id).update(**fields)
+        except Exception:
+            with self._lock:
+                self._pending[:0] = lines
+                self._progress_dirty = self._progress_dirty or dirty
+            raise
+        self._lines_written += len(lines)
+
+
+def reset_job_log(job_id: int) -> None:
+    """Clear output and progress left by an earlier attempt of the same job."""
+    AdminSeedJobLog.objects.filter(job_id=job_id).delete()
+    AdminSeedJob.objects.filter(id=job_id).update(
+        log_lines=0, progress_processed=0, progress_total=None, progress_updated_at=None
+    )
+
+
+def read_job_log(job_id: int, offset: int, limit: int) -> tuple[list[str], int]:
+    """Return up to ``limit`` lines starting at line ``offset``, and the offset to ask for next."""
+    chunks = (
+        AdminSeedJobLog.objects.filter(job_id=job_id, line_start__lt=offset + limit)
+        .alias(line_end=F("line_start") + F("line_count"))
+        .filter(line_end__gt=offset)
+        .order_by("line_start")
+        .values_list("line_start", "text")
+    )
+    lines: list[str] = []
+    for line_start, text in chunks:
+        chunk_lines = text.split("\n")
+        lines.extend(chunk_lines[max(0, offset + len(lines) - line_start):])
+        if len(lines) >= limit:
+            break
+    lines = lines[:limit]
+    return lines, offset + len(lines)
+
+
+def job_progress(job: AdminSeedJob) -> dict:
+    """Progress with a throughput estimate derived from the job's start time."""
+    processed, total = job.progress_processed, job.progress_total
+    rate = None
+    eta_seconds = None
+    if job.started_at and job.progress_updated_at and processed:
+        elapsed = (job.progress_updated_at - job.started_at).total_seconds()
+        if elapsed > 0:
+            rate = processed / elapsed
+            if total is not None and rate > 0:
+                eta_seconds = max(0.0, (total - processed) / rate)
+    return {
+        "processed": processed,
+        "total": total,
+        "percent": round(100.0 * processed / total, 1) if total else None,
+        "rate_per_second": round(rate, 3) if rate is not None else None,
+        "eta_seconds": round(eta_seconds) if eta_seconds is not None else None,
+        "updated_at": job.progress_updated_at,
+    }
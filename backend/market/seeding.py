@@ -10,6 +10,7 @@ from django.db import transaction
 from django.utils import timezone
 
 from market.models import Category, City, Governorate, Listing, ListingStatus, ModerationStatus, Neighborhood
+from market.seed_jobs import report_progress
 from messaging.models import PrivateMessage, PrivateThread, PublicQuestion
 from reports.models import ListingReport, ReportStatus
 
@@ -142,8 +143,11 @@ def seed_demo_data(
             raise ValueError("Unable to seed demo data: no suitable seller/buyer users available")
 
         # Listings + questions/threads/reports.
+        total = len(seller_users) * int(listings_per_seller)
+        report_progress(0, total)
         for seller_idx, seller in enumerate(seller_users, start=1):
             for n in range(1, int(listings_per_seller) + 1):
+                report_progress((seller_idx - 1) * int(listings_per_seller) + n - 1, total)
                 title = f"Seed Listing {seller_idx:02d}-{n:03d}"
                 defaults = {
                     "description": "Seeded demo listing. You can delete these safely.",
@@ -215,6 +219,7 @@ def seed_demo_data(
                     )
                     _inc(created if rep_created else skipped, "reports")
 
+    report_progress(total, total)
     return SeedResult(scenario="demo", created=created, updated=updated, skipped=skipped)
 
 
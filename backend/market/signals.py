@@ -0,0 +1,36 @@
+"""Signal handlers that keep derived listing data in step with other models.
+
+Exchange rates change through the admin, the shell, fixtures and queryset
+deletes alike, so re-pricing hangs off the model signals rather than any one
+of those paths. ``QuerySet.update`` sends no signals; callers that update
+rates that way must call ``enqueue_renormalize_prices`` themselves.
+"""
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from market.models import ExchangeRate
+from market.tasks import enqueue_renormalize_prices
+
+
+@receiver(pre_save, sender=ExchangeRate)
+def remember_previous_rate(sender, instance, **kwargs):
+    rows = ExchangeRate.objects.filter(pk=instance.pk) if instance.pk else ExchangeRate.objects.none()
+    instance._previous_rate = rows.values_list("currency", "rate").first()
+
+
+@receiver(post_save, sender=ExchangeRate)
+def reprice_saved_rate(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_rate", None)
+    if previous == (instance.currency, instance.rate):
+        return
+    enqueue_renormalize_prices(instance.currency)
+    # A renamed currency loses its rate: re-price the old one too.
+    if previous and previous[0] != instance.currency:
+        enqueue_renormalize_prices(previous[0])
+
+
+@receiver(post_delete, sender=ExchangeRate)
+def reprice_deleted_rate(sender, instance, **kwargs):
+    enqueue_renormalize_prices(instance.currency)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from storages.backends.gcloud import GoogleCloudStorage
+from storages.utils import clean_name
+
+LOCAL_UPLOAD_SALT = "market.storage.local-direct-upload"
+LOCAL_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class DirectUploadError(Exception):
+    pass
+
+
+@dataclass
+class DirectUploadTicket:
+    """Where and how the client should send the object bytes."""
+
+    method: str
+    url: str
+    headers: dict[str, str] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {"method": self.method, "url": self.url, "headers": self.headers}
+
+
+class DirectUploadGoogleCloudStorage(GoogleCloudStorage):
+    """GCS storage that can hand out V4 signed PUT URLs for direct uploads."""
+
+    def direct_upload_ticket(
+        self, name: str, *, content_type: str, max_bytes: int, expires_in: int
+    ) -> DirectUploadTicket:
+        blob = self.bucket.blob(self._normalize_name(clean_name(name)))
+        # Both headers are part of the signature, so the client cannot change
+        # the type or exceed the size range.
+        signed_headers = {"x-goog-content-length-range": f"0,{int(max_bytes)}"}
+        params = {
+            "version": "v4",
+            "method": "PUT",
+            "expiration": timedelta(seconds=int(expires_in)),
+            "content_type": content_type,
+            "headers": signed_headers,
+        }
+        if self.custom_endpoint:
+            params["bucket_bound_hostname"] = self.custom_endpoint
+        if self.iam_sign_blob:
+            service_account_email, access_token = self._get_iam_sign_blob_params()
+            params["service_account_email"] = service_account_email
+            params["access_token"] = access_token
+
+        return DirectUploadTicket(
+            method="PUT",
+            url=blob.generate_signed_url(**params),
+            headers={"Content-Type": content_type, **signed_headers},
+        )
+
+
+class DirectUploadFileSystemStorage(FileSystemStorage):
+    """Local stand-in for direct uploads.
+
+    Tickets point at ``v1-upload-local``, which streams the PUT body into this
+    storage under the ticketed name, mirroring a signed storage URL.
+    """
+
+    def direct_upload_ticket(
+        self, name: str, *, content_type: str, max_bytes: int, expires_in: int
+    ) -> DirectUploadTicket:
+        token = signing.dumps(
+            {"n": name, "ct": content_type, "max": int(max_bytes), "exp": int(time.time()) + int(expires_in)},
+            salt=LOCAL_UPLOAD_SALT,
+        )
+        return DirectUploadTicket(
+            method="PUT",
+            url=reverse("v1-upload-local", kwargs={"token": token}),
+            headers={"Content-Type": content_type},
+        )
+
+    def receive_direct_upload(self, token: str, stream, *, content_type: str, content_length: int | None) -> str:
+        try:
+            payload = signing.loads(token, salt=LOCAL_UPLOAD_SALT)
+        except signing.BadSignature:
+            raise DirectUploadError("Invalid upload URL")
+
+        if time.time() > payload["exp"]:
+            raise DirectUploadError("Upload URL expired")
+        if content_type.split(";")[0].strip() != payload["ct"]:
+            raise DirectUploadError("Content-Type does not match the upload ticket")
+        max_bytes = int(payload["max"])
+        if content_length is not None and content_length > max_bytes:
+            raise DirectUploadError("File too large")
+
+        name = payload["n"]
+        if self.exists(name):
+            raise DirectUploadError("Upload already received")
+
+        received = 0
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as tmp:
+            while stream is not None:
+                chunk = stream.read(LOCAL_UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                received += len(chunk)
+                if received > max_bytes:
+                    raise DirectUploadError("File too large")
+                tmp.write(chunk)
+            tmp.seek(0)
+            saved = self.save(name, File(tmp, name=name))
+
+        if saved != name:
+            self.delete(saved)
+            raise DirectUploadError("Upload already received")
+        return saved
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from api.metrics import SEED_JOB_DURATION
+from taskqueue.registry import task
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Pillow releases the GIL while decoding/resizing/encoding, so a thread
+            # pool sized to the cores keeps them busy without forking the worker.
+            workers = int(getattr(settings, "IMAGE_PROCESSING_WORKERS", 0) or os.cpu_count() or 1)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-processing")
+        return _executor
+
+
+def _run_in_worker(func, *args) -> None:
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(func, "__name__", func))
+    finally:
+        # Each pool thread owns its DB connection; don't leak it between tasks.
+        connection.close()
+
+
+def submit(func, *args) -> None:
+    """Run ``func(*args)`` off-request once the current transaction commits.
+
+    With IMAGE_PROCESSING_EAGER the call runs inline (tests, management commands).
+    """
+    if getattr(settings, "IMAGE_PROCESSING_EAGER", False):
+        func(*args)
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, func, *args))
+
+
+def _use_task_queue() -> bool:
+    if getattr(settings, "IMAGE_PROCESSING_EAGER", False):
+        return False
+    return getattr(settings, "IMAGE_PROCESSING_BACKEND", "thread") == "queue"
+
+
+def enqueue_profile_image(profile_id: int, kind: str, source_name: str) -> None:
+    from market.images import PROFILE_IMAGE_PROCESSORS
+
+    if _use_task_queue():
+        from taskqueue.queue import enqueue
+
+        enqueue(
+            "market.process_profile_image",
+            {"profile_id": profile_id, "kind": kind, "source_name": source_name},
+            dedupe_key=f"{profile_id}:{kind}:{source_name}",
+        )
+        return
+    submit(PROFILE_IMAGE_PROCESSORS[kind], profile_id, source_name)
+
+
+def enqueue_listing_image(image_id: int, source_name: str) -> None:
+    from market.images import process_listing_image
+
+    if _use_task_queue():
+        from taskqueue.queue import enqueue
+
+        enqueue(
+            "market.process_listing_image",
+            {"image_id": image_id, "source_name": source_name},
+            dedupe_key=f"{image_id}:{source_name}",
+        )
+        return
+    submit(process_listing_image, image_id, source_name)
+
+
+def enqueue_seed_job(job) -> None:
+    """Queue an AdminSeedJob. Call inside the transaction that created it."""
+    from taskqueue.queue import enqueue
+
+    enqueue("market.run_seed_job", {"job_id": job.id}, dedupe_key=str(job.id))
+
+
+def enqueue_renormalize_prices(currency: str) -> None:
+    """Re-price ``currency``'s listings once the current transaction commits."""
+    from taskqueue.queue import enqueue
+
+    code = currency.strip().upper()
+    transaction.on_commit(lambda: enqueue("market.renormalize_prices", {"currency": code}, dedupe_key=code))
+
+
+def enqueue_expiry_digest(seller_id: int, count: int, titles: list[str]) -> None:
+    """Queue one seller's expiry digest; mail errors are retried by the task queue."""
+    from taskqueue.queue import enqueue
+
+    enqueue("market.send_expiry_digest", {"seller_id": seller_id, "count": count, "titles": titles})
+
+
+def schedule_listing_expiry(*, delay_seconds: int | None = None) -> None:
+    """Queue the next periodic expiry sweep (at most one is ever queued)."""
+    from taskqueue.queue import enqueue
+
+    delay = settings.LISTING_EXPIRY_INTERVAL_SECONDS if delay_seconds is None else delay_seconds
+    enqueue(
+        "market.expire_listings",
+        {"reschedule": True},
+        run_at=timezone.now() + timedelta(seconds=delay),
+        dedupe_key="periodic",
+    )
+
+
+def schedule_cold_listing_moves(*, delay_seconds: int | None = None) -> None:
+    """Queue the next periodic hot/cold move (at most one is ever queued)."""
+    from taskqueue.queue import enqueue
+
+    delay = settings.LISTING_COLD_INTERVAL_SECONDS if delay_seconds is None else delay_seconds
+    enqueue(
+        "market.move_cold_listings",
+        {"reschedule": True},
+        run_at=timezone.now() + timedelta(seconds=delay),
+        dedupe_key="periodic",
+    )
+
+
+# -- Task queue handlers (run by `manage.py run_tasks`) -----------------------------
+
+
+@task("market.process_listing_image", priority=10)
+def process_listing_image_task(*, image_id: int, source_name: str) -> None:
+    from market.images import process_listing_image
+
+    process_listing_image(image_id, source_name)
+
+
+@task("market.process_profile_image", priority=10)
+def process_profile_image_task(*, profile_id: int, kind: str, source_name: str) -> None:
+    from market.images import PROFILE_IMAGE_PROCESSORS
+
+    PROFILE_IMAGE_PROCESSORS[kind](profile_id, source_name)
+
+
+@task("market.renormalize_prices", max_attempts=3)
+def renormalize_prices(*, currency: str) -> dict:
+    from market.pricing import listings_in, renormalize
+
+    return {"currency": currency, "updated": renormalize(listings_in(currency))}
+
+
+# Not retried: a retry would collide with the next sweep's dedupe key, and that
+# sweep, queued whether or not this one succeeds, archives whatever it left.
+@task("market.expire_listings", max_attempts=1)
+def expire_listings(*, reschedule: bool = False) -> dict:
+    from market.expiry import archive_expired
+
+    try:
+        return archive_expired().as_dict()
+    finally:
+        # Eager mode would run the next sweep inline, forever.
+        if reschedule and not getattr(settings, "TASKQUEUE_EAGER", False):
+            schedule_listing_expiry()
+
+
+@task("market.send_expiry_digest", max_attempts=5, retry_backoff=60)
+def send_expiry_digest(*, seller_id: int, count: int, titles: list[str]) -> dict:
+    from market.expiry import send_expiry_digest as send
+
+    return {"seller_id": seller_id, "sent": send(seller_id, count, titles)}
+
+
+# Not retried, like market.expire_listings: the next pass, always queued, picks up the rest.
+@task("market.move_cold_listings", max_attempts=1)
+def move_cold_listings(*, reschedule: bool = False) -> dict:
+    from market.lifecycle import move_cold_listings as run
+
+    try:
+        return run().as_dict()
+    finally:
+        if reschedule and not getattr(settings, "TASKQUEUE_EAGER", False):
+            schedule_cold_listing_moves()
+
+
+# A second attempt only happens when a worker died mid-job (lease expiry);
+# ordinary failures are recorded on the job itself.
+@task("market.run_seed_job", max_attempts=2, retry_backoff=30)
+def run_seed_job(*, job_id: int) -> dict:
+    from market.models import AdminSeedJob, AdminSeedJobStatus
+    from market.seed_jobs import SeedJobReporter, reset_job_log
+
+    claimed = AdminSeedJob.objects.filter(
+        id=job_id, status__in=[AdminSeedJobStatus.PENDING, AdminSeedJobStatus.RUNNING]
+    ).update(status=AdminSeedJobStatus.RUNNING, started_at=timezone.now(), error="", output="")
+    if not claimed:
+        return {"job_id": job_id, "skipped": True}
+    reset_job_log(job_id)
+    job = AdminSeedJob.objects.get(id=job_id)
+
+    reporter = SeedJobReporter(job_id)
+    started = time.perf_counter()
+    scenario = str(job.scenario or "demo")
+    try:
+        with reporter:
+            opts = job.options or {}
+            if not isinstance(opts, dict):
+                opts = {}
+
+            if scenario == "demo":
+                from market.seeding import run_admin_seed
+
+                res = run_admin_seed(scenario="demo", options=opts)
+                job.result = res.as_dict()
+            elif scenario == "seed_listings":
+                # Heavy seed via management command (supports sleep_seconds in options).
+                call_command("seed_listings", stdout=reporter, stderr=reporter, **opts)
+                job.result = {"scenario": "seed_listings", "detail": "completed"}
+            else:
+                raise ValueError(f"Unknown scenario: {scenario}")
+
+        job.status = AdminSeedJobStatus.SUCCEEDED
+    except Exception:
+        job.status = AdminSeedJobStatus.FAILED
+        job.error = traceback.format_exc()
+    finally:
+        job.output = reporter.tail()
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "finished_at", "result", "output", "error", "updated_at"])
+        SEED_JOB_DURATION.observe(time.perf_counter() - started, scenario, job.status)
+    return {"job_id": job_id, "status": job.status}
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.views.decorators.http import require_GET
+
+from api.metrics import record_cache_lookup
+from market.image_ingest import ImageRejected
+from market.resize_cache import (
+    allowed_sizes,
+    get_resize_cache,
+    is_allowed_source,
+    is_content_addressed,
+    render_resized,
+    source_version,
+)
+
+# Content-addressed sources never change under their name. Other names can be
+# reused (storage overwrite, delete and re-upload), so clients revalidate.
+RESIZED_CACHE_CONTROL = "public, max-age=31536000, immutable"
+RESIZED_MUTABLE_CACHE_CONTROL = "public, max-age=300"
+
+
+@require_GET
+def resized_media(request, width: int, height: int, name: str):
+    """Serve ``name`` scaled to fit ``width`` x ``height`` (whitelisted sizes only)."""
+    if (width, height) not in allowed_sizes() or not is_allowed_source(name):
+        raise Http404("Unknown image size or path")
+
+    try:
+        version = source_version(name)
+    except FileNotFoundError:
+        raise Http404("Image not found")
+
+    cache = get_resize_cache()
+    key = f"{width}x{height}/{name}@{version}" if version else f"{width}x{height}/{name}"
+    etag = f'"{cache.digest(key)[:32]}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponse(status=304)
+    else:
+        fh = cache.open(key)
+        record_cache_lookup("image_resize", fh is not None)
+        if fh is None:
+            with cache.lock(key):
+                # Another request may have rendered it while we waited.
+                fh = cache.open(key)
+                if fh is None:
+                    if not default_storage.exists(name):
+                        raise Http404("Image not found")
+                    try:
+                        cache.put(key, render_resized(name, (width, height)))
+                    except (ImageRejected, OSError):
+                        # Undecodable (truncated, corrupt) or unreadable source.
+                        raise Http404("Image not found")
+                    fh = cache.open(key)
+        if fh is None:
+            raise Http404("Image not found")
+        response = _file_response(fh)
+
+    response["Cache-Control"] = (
+        RESIZED_CACHE_CONTROL if is_content_addressed(name) else RESIZED_MUTABLE_CACHE_CONTROL
+    )
+    response["ETag"] = etag
+    return response
+
+
+def _file_response(fh) -> HttpResponse:
+    sendfile_header = getattr(settings, "IMAGE_RESIZE_SENDFILE_HEADER", "")
+    if sendfile_header:
+        # Let the front proxy stream the cached file (X-Accel-Redirect / X-Sendfile).
+        cache = get_resize_cache()
+        relative = fh.name[len(cache.root):].lstrip("/")
+        fh.close()
+        response = HttpResponse(content_type="image/jpeg")
+        response[sendfile_header] = f"{settings.IMAGE_RESIZE_SENDFILE_PREFIX.rstrip('/')}/{relative}"
+        return response
+    # FileResponse hands the open file to wsgi.file_wrapper, which gunicorn serves with sendfile().
+    return FileResponse(fh, content_type="image/jpeg")
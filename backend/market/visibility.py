@@ -0,0 +1,125 @@
+"""Which listings a user may see, and a feed that reads them index-first.
+
+Anonymous users see the public set: published, approved and not removed.
+Signed-in sellers also see their own listings in any state. Written as one
+``public | Q(seller=user)`` filter, the OR keeps the database from walking a
+feed index in order: it unions two index searches and sorts the result (a
+``MULTI-INDEX OR`` plus temp B-tree on SQLite, a ``BitmapOr`` plus ``Sort``
+on Postgres), and that sort grows with the whole public set.
+
+``SignedInFeed`` splits the filter into two disjoint streams, the public set
+(served by the ``listing_public_*`` partial indexes) and the user's own
+non-public listings (served by the seller index), reads each in the feed's
+order up to the end of the requested page, and merges them in Python.
+"""
+from __future__ import annotations
+
+from django.db.models import Q, QuerySet
+
+from market.models import ListingStatus, ModerationStatus
+
+
+def public_listing_q() -> Q:
+    """Published and approved; callers add ``is_removed=False`` themselves."""
+    return Q(status=ListingStatus.PUBLISHED, moderation_status=ModerationStatus.APPROVED)
+
+
+def _sort_key(index: int):
+    # NULLs sort as the largest value, as on Postgres.
+    return lambda row: (row[index] is None, 0 if row[index] is None else row[index])
+
+
+# Own non-public listings are few; up to this many are read once for both the
+# count and the merge.
+OWN_KEYS_LIMIT = 500
+
+
+class SignedInFeed:
+    """``queryset`` restricted to what ``user`` may see, in ``queryset``'s order.
+
+    Quacks like a queryset for Django's ``Paginator``: ``count()``, ``len()``,
+    slicing and iteration. The own stream's sort keys are read once and give
+    its count. A page is then the public count plus either the public rows
+    themselves (no own listings match) or the public stream's sort keys up to
+    the end of the page, merged, and one row fetch by primary key. Both keep
+    ``queryset``'s ``select_related`` and prefetches.
+    """
+
+    ordered = True
+
+    def __init__(self, queryset: QuerySet, user):
+        ordering = [str(field) for field in (queryset.query.order_by or queryset.model._meta.ordering)]
+        if not any(field.lstrip("-") in ("pk", "id") for field in ordering):
+            # A total order, so the merged page matches what one query would return.
+            ordering.append("-pk")
+        self.queryset = queryset.order_by(*ordering)
+        self.model = queryset.model
+        self._ordering = ordering
+        self._fields = [field.lstrip("-") for field in ordering]
+        public = public_listing_q()
+        self.public = self.queryset.filter(public)
+        self.own = self.queryset.filter(seller=user).exclude(public)
+        self._count: int | None = None
+        self._own_keys: list[tuple] | None = None
+        self._own_read = False
+
+    @property
+    def streams(self) -> list[QuerySet]:
+        return [self.public, self.own]
+
+    @staticmethod
+    def supports(queryset: QuerySet) -> bool:
+        """Orderings by plain field names only; expressions fall back to the OR."""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return all(isinstance(field, str) and field != "?" for field in ordering)
+
+    def _keys(self, stream: QuerySet):
+        return stream.prefetch_related(None).values_list("pk", *self._fields)
+
+    def _own(self) -> list[tuple] | None:
+        """The own stream's sort keys, or None if there are more than ``OWN_KEYS_LIMIT``."""
+        if not self._own_read:
+            keys = list(self._keys(self.own)[: OWN_KEYS_LIMIT + 1])
+            self._own_keys = keys if len(keys) <= OWN_KEYS_LIMIT else None
+            self._own_read = True
+        return self._own_keys
+
+    def count(self) -> int:
+        if self._count is None:
+            own = self._own()
+            self._count = self.public.count() + (len(own) if own is not None else self.own.count())
+        return self._count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[0:None])
+
+    def __getitem__(self, index):
+        if isinstance(index, int):
+            page = self[index:index + 1]
+            if not page:
+                raise IndexError("SignedInFeed index out of range")
+            return page[0]
+        if index.step is not None:
+            raise ValueError("SignedInFeed does not support slice steps")
+        start = index.start or 0
+        stop = index.stop
+
+        own = self._own()
+        if own is None:
+            own = list(self._keys(self.own)[:stop])
+        if not own:
+            return list(self.public[start:stop])
+
+        rows = own[:stop] + list(self._keys(self.public)[:stop])
+        # Stable sorts from the least significant key up give the full ordering.
+        for position in range(len(self._fields), 0, -1):
+            rows.sort(key=_sort_key(position), reverse=self._ordering[position - 1].startswith("-"))
+
+        ids = [row[0] for row in rows[start:stop]]
+        if not ids:
+            return []
+        by_id = self.queryset.in_bulk(ids)
+        return [by_id[pk] for pk in ids if pk in by_id]
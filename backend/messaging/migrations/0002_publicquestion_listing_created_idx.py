@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("messaging", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="publicquestion",
+            index=models.Index(fields=["listing", "created_at"], name="msg_pubq_listing_created_idx"),
+        ),
+    ]
@@ -21,6 +21,9 @@ class PublicQuestion(TimestampedModel):
     answered_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=["listing", "created_at"], name="msg_pubq_listing_created_idx"),
+        ]
         ordering = ["-created_at"]
 
 
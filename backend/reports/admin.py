@@ -1,11 +1,30 @@
 from django.contrib import admin
+from django.db.models import Q
+
+from api.admin_performance import PerformanceAdminMixin
+from market.models import Listing
+from market.search import search_listings
 
 from .models import ListingReport
 
 
 @admin.register(ListingReport)
-class ListingReportAdmin(admin.ModelAdmin):
+class ListingReportAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ("id", "listing", "reporter", "reason", "status", "created_at", "handled_at")
-    list_filter = ("status", "reason")
-    search_fields = ("reason", "message", "reporter__username", "listing__title")
+    list_select_related = ("listing", "reporter")
+    # No "reason" filter: listing its values is a DISTINCT over the whole table.
+    list_filter = ("status",)
+    # Matched by get_search_results through indexed columns only.
+    search_fields = ("reason", "reporter__username", "listing__title")
+    search_help_text = "A report or listing id, a reason, a reporter's exact username, or words from the listing."
+    autocomplete_fields = ("listing", "reporter", "handled_by")
     readonly_fields = ("created_at", "updated_at", "handled_at")
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(Q(pk=int(term)) | Q(listing_id=int(term))), False
+        listings = search_listings(Listing.objects.all(), term).values("pk")
+        return queryset.filter(Q(reason=term) | Q(reporter__username=term) | Q(listing__in=listings)), False
@@ -0,0 +1,40 @@
+from django.contrib import admin
+
+from .models import Task, TaskStatus
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        "id", "name", "status", "priority", "attempts", "max_attempts", "run_at", "locked_by", "finished_at"
+    )
+    list_filter = ("status", "name")
+    search_fields = ("id", "name", "dedupe_key", "locked_by")
+    readonly_fields = (
+        "attempts",
+        "locked_by",
+        "lease_expires_at",
+        "heartbeat_at",
+        "started_at",
+        "finished_at",
+        "result",
+        "last_error",
+        "created_at",
+        "updated_at",
+    )
+    ordering = ("-created_at", "-id")
+
+    actions = ["retry_now"]
+
+    @admin.action(description="Retry selected failed tasks now")
+    def retry_now(self, request, queryset):
+        from django.db.models import F
+        from django.utils import timezone
+
+        updated = queryset.filter(status=TaskStatus.FAILED).update(
+            status=TaskStatus.QUEUED,
+            run_at=timezone.now(),
+            max_attempts=F("attempts") + 1,
+            locked_by="",
+        )
+        self.message_user(request, f"Requeued {updated} task(s).")
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class TaskQueueConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "taskqueue"
+
+    def ready(self):
+        # Task handlers register themselves from each app's ``tasks`` module.
+        from django.utils.module_loading import autodiscover_modules
+
+        autodiscover_modules("tasks")
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from taskqueue.registry import registered_tasks
+from taskqueue.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run background tasks from the task queue (LISTEN/NOTIFY wakeups on Postgres)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Tasks to run at once (default: TASKQUEUE_CONCURRENCY)",
+        )
+        parser.add_argument(
+            "--processes", action="store_true", help="Run handlers in a process pool instead of threads"
+        )
+        parser.add_argument(
+            "--task", action="append", dest="names", default=None, help="Only run this task name (repeatable)"
+        )
+        parser.add_argument(
+            "--poll-seconds",
+            type=float,
+            default=None,
+            help="Fallback poll interval when no NOTIFY arrives (default: TASKQUEUE_POLL_SECONDS)",
+        )
+        parser.add_argument("--drain", action="store_true", help="Exit once no task is due or running")
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options["concurrency"] or settings.TASKQUEUE_CONCURRENCY,
+            processes=bool(options["processes"]),
+            names=options["names"],
+            poll_seconds=options["poll_seconds"] or settings.TASKQUEUE_POLL_SECONDS,
+        )
+
+        def _graceful(signum, frame):
+            self.stdout.write("Stopping after in-flight tasks finish...")
+            worker.stop()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                signal.signal(sig, _graceful)
+            except ValueError:  # not the main thread (e.g. called from tests)
+                pass
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Task worker {worker.worker_id} started (concurrency={worker.concurrency}, "
+                f"tasks={', '.join(sorted(options['names'] or registered_tasks()))})"
+            )
+        )
+        processed = worker.run(drain=bool(options["drain"]))
+        self.stdout.write(f"Processed {processed} task(s)")
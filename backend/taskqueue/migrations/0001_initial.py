@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('priority', models.SmallIntegerField(default=0)),
+                ('dedupe_key', models.CharField(blank=True, default='', max_length=200)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('locked_by', models.CharField(blank=True, default='', max_length=120)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'queued')), fields=['-priority', 'run_at', 'id'], name='taskq_ready_idx'), models.Index(condition=models.Q(('status', 'running')), fields=['lease_expires_at'], name='taskq_running_lease_idx'), models.Index(fields=['name', 'status'], name='taskq_name_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'queued'), models.Q(('dedupe_key', ''), _negated=True)), fields=('name', 'dedupe_key'), name='uq_taskq_queued_dedupe')],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from market.models import TimestampedModel
+
+
+class TaskStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Running"
+    SUCCEEDED = "succeeded", "Succeeded"
+    FAILED = "failed", "Failed"
+
+
+class Task(TimestampedModel):
+    """One unit of background work for a handler registered under ``name``."""
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Higher runs first; ties go to the earliest run_at.
+    priority = models.SmallIntegerField(default=0)
+    # Optional: while a task with the same name+key is queued, enqueue() returns it instead.
+    dedupe_key = models.CharField(max_length=200, blank=True, default="")
+
+    status = models.CharField(max_length=16, choices=TaskStatus.choices, default=TaskStatus.QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+
+    # Lease held by the claiming worker; expired leases are requeued by any worker.
+    locked_by = models.CharField(max_length=120, blank=True, default="")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-priority", "run_at", "id"],
+                name="taskq_ready_idx",
+                condition=Q(status=TaskStatus.QUEUED),
+            ),
+            models.Index(
+                fields=["lease_expires_at"],
+                name="taskq_running_lease_idx",
+                condition=Q(status=TaskStatus.RUNNING),
+            ),
+            models.Index(fields=["name", "status"], name="taskq_name_status_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "dedupe_key"],
+                name="uq_taskq_queued_dedupe",
+                condition=Q(status=TaskStatus.QUEUED) & ~Q(dedupe_key=""),
+            ),
+        ]
+        ordering = ["-created_at", "-id"]
+
+    def __str__(self) -> str:
+        return f"Task({self.id}, {self.name}, {self.status})"
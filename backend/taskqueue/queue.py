@@ -0,0 +1,228 @@
+"""Enqueue, claim and settle rows of the ``Task`` table.
+
+Claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED`` so concurrent workers
+never block on, or double-claim, the same rows. A claimed task carries a
+lease that its worker extends by heartbeating; when a worker dies the lease
+runs out and ``requeue_expired`` hands the task back to the queue.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from taskqueue.models import Task, TaskStatus
+from taskqueue.registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+def channel() -> str:
+    return getattr(settings, "TASKQUEUE_CHANNEL", "taskqueue")
+
+
+def lease_seconds() -> int:
+    return int(getattr(settings, "TASKQUEUE_LEASE_SECONDS", 60))
+
+
+def notify(name: str = "") -> None:
+    """Wake LISTENing workers. NOTIFY is transactional: it fires on commit."""
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [channel(), name])
+
+
+def enqueue(
+    name: str, payload: dict | None = None, *, priority: int | None = None, run_at=None, dedupe_key: str = ""
+) -> Task:
+    """Queue ``name`` to run with ``payload`` (JSON-serializable keyword arguments).
+
+    With TASKQUEUE_EAGER the handler runs inline and the settled row is returned.
+    """
+    spec = get_task(name)
+    fields = {
+        "name": name,
+        "payload": payload or {},
+        "priority": spec.priority if priority is None else priority,
+        "run_at": run_at or timezone.now(),
+        "max_attempts": spec.max_attempts,
+        "dedupe_key": dedupe_key,
+    }
+    try:
+        with transaction.atomic():
+            task = Task.objects.create(**fields)
+            notify(name)
+    except IntegrityError:
+        if not dedupe_key:
+            raise
+        existing = Task.objects.filter(name=name, dedupe_key=dedupe_key, status=TaskStatus.QUEUED).first()
+        if existing is None:
+            raise
+        return existing
+
+    if getattr(settings, "TASKQUEUE_EAGER", False):
+        task.status = TaskStatus.RUNNING
+        task.attempts = 1
+        task.locked_by = "eager"
+        task.save(update_fields=["status", "attempts", "locked_by", "updated_at"])
+        execute(task, worker_id="eager")
+        task.refresh_from_db()
+    return task
+
+
+def claim(worker_id: str, limit: int, *, names: list[str] | None = None) -> list[Task]:
+    """Lease up to ``limit`` due tasks to ``worker_id``, highest priority first."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        qs = Task.objects.select_for_update(skip_locked=True).filter(status=TaskStatus.QUEUED, run_at__lte=now)
+        if names:
+            qs = qs.filter(name__in=names)
+        ids = list(qs.order_by("-priority", "run_at", "id").values_list("id", flat=True)[:limit])
+        if not ids:
+            return []
+        # The status guard matters where SKIP LOCKED is a no-op (SQLite).
+        Task.objects.filter(id__in=ids, status=TaskStatus.QUEUED).update(
+            status=TaskStatus.RUNNING,
+            locked_by=worker_id,
+            lease_expires_at=now + timedelta(seconds=lease_seconds()),
+            heartbeat_at=now,
+            started_at=now,
+            attempts=F("attempts") + 1,
+            updated_at=now,
+        )
+    return list(
+        Task.objects.filter(id__in=ids, status=TaskStatus.RUNNING, locked_by=worker_id).order_by(
+            "-priority", "run_at", "id"
+        )
+    )
+
+
+def heartbeat(worker_id: str, task_ids) -> int:
+    """Extend the leases of tasks this worker still owns."""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return 0
+    now = timezone.now()
+    return Task.objects.filter(id__in=task_ids, status=TaskStatus.RUNNING, locked_by=worker_id).update(
+        lease_expires_at=now + timedelta(seconds=lease_seconds()),
+        heartbeat_at=now,
+    )
+
+
+def _retry_delay(spec, attempts: int) -> float:
+    delay = min(spec.retry_backoff * 2 ** max(0, attempts - 1), spec.retry_backoff_max)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def complete(task: Task, worker_id: str, result=None) -> bool:
+    updated = Task.objects.filter(id=task.id, status=TaskStatus.RUNNING, locked_by=worker_id).update(
+        status=TaskStatus.SUCCEEDED,
+        result=result,
+        finished_at=timezone.now(),
+        lease_expires_at=None,
+        last_error="",
+    )
+    if not updated:
+        logger.warning("Task %s finished after its lease was lost; result discarded", task.id)
+    return bool(updated)
+
+
+def fail(task: Task, worker_id: str, error: str) -> bool:
+    """Record a failed attempt: requeue with backoff, or give up after max_attempts."""
+    now = timezone.now()
+    owned = Task.objects.filter(id=task.id, status=TaskStatus.RUNNING, locked_by=worker_id)
+    if task.attempts >= task.max_attempts:
+        return bool(
+            owned.update(status=TaskStatus.FAILED, finished_at=now, lease_expires_at=None, last_error=error)
+        )
+    try:
+        spec = get_task(task.name)
+    except LookupError:
+        return bool(
+            owned.update(status=TaskStatus.FAILED, finished_at=now, lease_expires_at=None, last_error=error)
+        )
+    try:
+        with transaction.atomic():
+            requeued = owned.update(
+                status=TaskStatus.QUEUED,
+                run_at=now + timedelta(seconds=_retry_delay(spec, task.attempts)),
+                locked_by="",
+                lease_expires_at=None,
+                last_error=error,
+            )
+    except IntegrityError:
+        # A task with the same dedupe key was queued meanwhile; it runs instead of a retry.
+        return bool(
+            owned.update(status=TaskStatus.FAILED, finished_at=now, lease_expires_at=None, last_error=error)
+        )
+    return bool(requeued)
+
+
+def requeue_expired() -> int:
+    """Return tasks whose worker stopped heartbeating to the queue (or fail them)."""
+    now = timezone.now()
+    expired = Task.objects.filter(status=TaskStatus.RUNNING, lease_expires_at__lt=now)
+    failed = expired.filter(attempts__gte=F("max_attempts")).update(
+        status=TaskStatus.FAILED,
+        finished_at=now,
+        lease_expires_at=None,
+        last_error="Lease expired (worker stopped heartbeating)",
+    )
+    requeue = {
+        "status": TaskStatus.QUEUED,
+        "run_at": now,
+        "locked_by": "",
+        "lease_expires_at": None,
+        "last_error": "Lease expired (worker stopped heartbeating)",
+    }
+    retryable = expired.filter(attempts__lt=F("max_attempts"))
+    try:
+        with transaction.atomic():
+            requeued = retryable.update(**requeue)
+    except IntegrityError:
+        # Some share a dedupe key with a queued task: requeue the rest one by one
+        # and fail those, as the queued duplicate runs in their place.
+        requeued = 0
+        for task_id in retryable.values_list("id", flat=True):
+            row = retryable.filter(id=task_id)
+            try:
+                with transaction.atomic():
+                    requeued += row.update(**requeue)
+            except IntegrityError:
+                failed += row.update(
+                    status=TaskStatus.FAILED,
+                    finished_at=now,
+                    lease_expires_at=None,
+                    last_error="Lease expired; a task with the same dedupe key is already queued",
+                )
+    if requeued:
+        logger.warning("Requeued %s task(s) with expired leases", requeued)
+    return failed + requeued
+
+
+def run_handler(name: str, payload: dict):
+    return get_task(name).func(**(payload or {}))
+
+
+def execute(task: Task, *, worker_id: str, runner=None) -> bool:
+    """Run a claimed task and settle it. ``runner`` defaults to calling the handler inline."""
+    try:
+        result = (runner or run_handler)(task.name, task.payload)
+    except Exception:
+        logger.exception("Task %s (%s) failed on attempt %s", task.id, task.name, task.attempts)
+        fail(task, worker_id, traceback.format_exc()[-20_000:])
+        return False
+    return complete(task, worker_id, result if _is_json_safe(result) else None)
+
+
+def _is_json_safe(value) -> bool:
+    return value is None or isinstance(value, (bool, int, float, str, list, dict))
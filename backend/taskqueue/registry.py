@@ -0,0 +1,62 @@
+"""Task handler registry.
+
+Handlers are plain functions taking the task payload as keyword arguments::
+
+    @task("market.recount_listings", max_attempts=3)
+    def recount_listings(*, seller_id):
+        ...
+
+Modules named ``tasks`` in installed apps are imported at startup, so
+decorated handlers are known to every worker and web process.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class TaskSpec:
+    name: str
+    func: Callable
+    max_attempts: int = 5
+    # Retry n waits min(retry_backoff * 2**(n-1), retry_backoff_max) seconds, +/- jitter.
+    retry_backoff: float = 10.0
+    retry_backoff_max: float = 3600.0
+    priority: int = 0
+
+
+_registry: dict[str, TaskSpec] = {}
+
+
+def task(
+    name: str,
+    *,
+    max_attempts: int = 5,
+    retry_backoff: float = 10.0,
+    retry_backoff_max: float = 3600.0,
+    priority: int = 0,
+):
+    def decorator(func):
+        _registry[name] = TaskSpec(
+            name=name,
+            func=func,
+            max_attempts=max_attempts,
+            retry_backoff=retry_backoff,
+            retry_backoff_max=retry_backoff_max,
+            priority=priority,
+        )
+        return func
+
+    return decorator
+
+
+def get_task(name: str) -> TaskSpec:
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"Unknown task: {name}") from None
+
+
+def registered_tasks() -> dict[str, TaskSpec]:
+    return dict(_registry)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, connections
+
+from taskqueue import queue
+
+logger = logging.getLogger(__name__)
+
+
+def _init_process() -> None:
+    import django
+
+    django.setup()
+
+
+class Worker:
+    """Claims tasks and runs them on a thread pool (optionally backed by processes).
+
+    The main loop sleeps until a NOTIFY arrives (Postgres), a running task
+    finishes, or ``poll_seconds`` pass. A heartbeat thread keeps the leases of
+    in-flight tasks alive.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int = 4,
+        processes: bool = False,
+        names: list[str] | None = None,
+        poll_seconds: float = 5.0,
+    ):
+        self.concurrency = max(1, int(concurrency))
+        self.processes = processes
+        self.names = names or None
+        self.poll_seconds = float(poll_seconds)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.processed = 0
+
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._inflight: set[int] = set()
+        self._inflight_lock = threading.Lock()
+        self._process_pool: ProcessPoolExecutor | None = None
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+
+    def run(self, *, drain: bool = False) -> int:
+        """Work until stopped; with ``drain`` return once nothing is due or running."""
+        background = [threading.Thread(target=self._heartbeat_loop, name="taskqueue-heartbeat", daemon=True)]
+        if connection.vendor == "postgresql":
+            background.append(threading.Thread(target=self._listen_loop, name="taskqueue-listen", daemon=True))
+        for thread in background:
+            thread.start()
+
+        if self.processes:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.concurrency,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+            )
+        last_reap = 0.0
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="taskqueue") as pool:
+                while not self._stopping.is_set():
+                    close_old_connections()
+                    if time.monotonic() - last_reap > queue.lease_seconds() / 2:
+                        try:
+                            queue.requeue_expired()
+                        except Exception:
+                            logger.exception("Requeueing expired tasks failed")
+                        last_reap = time.monotonic()
+
+                    with self._inflight_lock:
+                        free = self.concurrency - len(self._inflight)
+                    tasks = queue.claim(self.worker_id, free, names=self.names)
+                    for task in tasks:
+                        with self._inflight_lock:
+                            self._inflight.add(task.id)
+                        pool.submit(self._run_one, task)
+
+                    with self._inflight_lock:
+                        busy = len(self._inflight)
+                    if drain and not tasks and not busy:
+                        break
+                    if tasks and busy < self.concurrency:
+                        continue  # more may be due right now
+                    self._wakeup.wait(self.poll_seconds)
+                    self._wakeup.clear()
+        finally:
+            self._stopping.set()
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=True)
+        return self.processed
+
+    def _run_one(self, task) -> None:
+        close_old_connections()
+        try:
+            runner = None
+            if self._process_pool is not None:
+                pool = self._process_pool
+                runner = lambda name, payload: pool.submit(queue.run_handler, name, payload).result()  # noqa: E731
+            queue.execute(task, worker_id=self.worker_id, runner=runner)
+            with self._inflight_lock:
+                self.processed += 1
+        except Exception:
+            logger.exception("Worker failed to settle task %s", task.id)
+        finally:
+            connection.close()
+            with self._inflight_lock:
+                self._inflight.discard(task.id)
+            self._wakeup.set()
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(1.0, queue.lease_seconds() / 3)
+        while not self._stopping.wait(interval):
+            with self._inflight_lock:
+                ids = list(self._inflight)
+            if not ids:
+                continue
+            try:
+                queue.heartbeat(self.worker_id, ids)
+            except Exception:
+                logger.exception("Task heartbeat failed")
+            finally:
+                connection.close()
+
+    def _listen_loop(self) -> None:
+        # A dedicated autocommit connection; LISTEN only delivers outside transactions.
+        wrapper = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            wrapper.ensure_connection()
+            raw = wrapper.connection
+            raw.autocommit = True
+            raw.execute(f"LISTEN {wrapper.ops.quote_name(queue.channel())}")
+            while not self._stopping.is_set():
+                for _notification in raw.notifies(timeout=1.0, stop_after=1):
+                    self._wakeup.set()
+        except Exception:
+            logger.exception("LISTEN failed; falling back to polling every %ss", self.poll_seconds)
+        finally:
+            wrapper.close()
@@ -566,6 +566,7 @@ const STRINGS = {
     detail_noImages: 'لا توجد صور بعد',
     detail_questions: 'الأسئلة',
     detail_noQuestions: 'لا توجد أسئلة بعد',
+    detail_moreQuestions: 'عرض المزيد من الأسئلة',
     detail_unanswered: 'لم يتم الرد بعد',
     detail_askQuestion: 'اكتب سؤالك',
     detail_sendQuestion: 'إرسال السؤال',
@@ -1303,6 +1304,7 @@ const STRINGS = {
     detail_noImages: 'No images yet',
     detail_questions: 'Questions',
     detail_noQuestions: 'No questions yet',
+    detail_moreQuestions: 'Show more questions',
     detail_unanswered: 'Not answered yet',
     detail_askQuestion: 'Ask a question',
     detail_sendQuestion: 'Send question',
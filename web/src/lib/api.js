@@ -187,7 +187,8 @@ export const api = {
   createListing: (data) => apiFetchJson('api/v1/listings/', { method: 'POST', body: data }),
   updateListing: (id, data) => apiFetchJson(`api/v1/listings/${id}/`, { method: 'PATCH', body: data }),
   bulkUpdateListings: ({ ids, data }) => apiFetchJson('api/v1/listings/bulk_update/', { method: 'POST', body: { ids, data } }),
-  listingQuestions: (listingId, { auth = false } = {}) => apiFetchJson(`api/v1/listings/${listingId}/questions/`, { auth }),
+  listingQuestions: (listingId, { auth = false, page } = {}) =>
+    apiFetchJson(`api/v1/listings/${listingId}/questions/${toQuery({ page })}`, { auth }),
   askListingQuestion: (listingId, { question }) =>
     apiFetchJson(`api/v1/listings/${listingId}/questions/`, { method: 'POST', body: { question } }),
   answerQuestion: (questionId, { answer }) =>
@@ -94,6 +94,9 @@ export function ListingDetailPage() {
   const [questions, setQuestions] = useState([]);
   const [qLoading, setQLoading] = useState(false);
   const [qError, setQError] = useState(null);
+  const [qPage, setQPage] = useState(1);
+  const [qHasMore, setQHasMore] = useState(false);
+  const [qLoadingMore, setQLoadingMore] = useState(false);
   const [qDraft, setQDraft] = useState('');
   const [asking, setAsking] = useState(false);
   const [answeringId, setAnsweringId] = useState(null);
@@ -309,7 +312,11 @@ export function ListingDetailPage() {
       setQError(null);
       try {
         const res = await api.listingQuestions(data.id, { auth: isAuthenticated });
-        if (!cancelled) setQuestions(Array.isArray(res) ? res : []);
+        if (!cancelled) {
+          setQuestions(Array.isArray(res) ? res : Array.isArray(res?.results) ? res.results : []);
+          setQPage(1);
+          setQHasMore(!!res?.next);
+        }
       } catch (e) {
         if (!cancelled) setQError(e);
       } finally {
@@ -531,6 +538,26 @@ export function ListingDetailPage() {
     }
   }
 
+  async function loadMoreQuestions() {
+    if (!data?.id || !qHasMore) return;
+    setQLoadingMore(true);
+    try {
+      const res = await api.listingQuestions(data.id, { auth: isAuthenticated, page: qPage + 1 });
+      const batch = Array.isArray(res?.results) ? res.results : [];
+      // Skip questions already shown (e.g. asked since the first page loaded).
+      setQuestions((prev) => {
+        const seen = new Set(prev.map((q) => q.id));
+        return [...prev, ...batch.filter((q) => !seen.has(q.id))];
+      });
+      setQPage((p) => p + 1);
+      setQHasMore(!!res?.next);
+    } catch (e) {
+      setQError(e);
+    } finally {
+      setQLoadingMore(false);
+    }
+  }
+
   async function askQuestion() {
     if (!data?.id || !isAuthenticated) return;
     const q = String(qDraft || '').trim();
@@ -1117,6 +1144,13 @@ export function ListingDetailPage() {
                           </Card>
                         );
                       })}
+                      {qHasMore ? (
+                        <Flex>
+                          <Button size="sm" variant="secondary" onClick={loadMoreQuestions} disabled={qLoadingMore}>
+                            {qLoadingMore ? t('loading') : t('detail_moreQuestions')}
+                          </Button>
+                        </Flex>
+                      ) : null}
                     </Flex>
                   ) : null}
 